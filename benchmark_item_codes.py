@@ -0,0 +1,282 @@
+"""
+Benchmark: item-code parsing, legacy per-call helpers from api.py vs production_scheduler.item_codes.
+
+Runs without frappe. The corpus is the item codes seen in this repo (docs, debug scripts, docstrings)
+plus synthetic codes in the same PPP|QQQ|CCC|GGG|WWWW / design-107 layouts; pass a file with one
+item code per line (e.g. an Item list export) to run it on real data instead.
+Checks that every field matches the legacy helpers, then times a board-sized workload where each
+code is parsed by every helper on many rows.
+Usage: python benchmark_item_codes.py [rows] [codes.txt]
+"""
+import random
+import re
+import sys
+import time
+
+from production_scheduler.item_codes import clear_item_code_cache, decode_item_code, item_code_cache_info
+
+REPO_CODES = [
+    "1001004830551420",
+    "1001035041001600",
+    "1001165421501865",
+    "100PREMIUM542150",
+    "1021035420501600-1600",
+    "1031035210500050",
+    "1031052210500050",
+    "1041030010231475-B1",
+    "1041030010231475-A",
+    "1041030010231475-F",
+    "PB-1031035210500050",
+    "HB-1031052210500050-X2",
+    "7499-107F101MCC91500",
+    "7892-107D101MCC1065M0",
+    "7425-1071000950",
+    " 7425 - 107A101BAB1500 ",
+    "1071035420501600",
+    "",
+    "ABC",
+    "104-1030010231475",
+]
+
+# ---------------------------------------------------------------------------
+# Legacy helpers (api.py before the decoder), with cint/flt swapped for int/float.
+# ---------------------------------------------------------------------------
+_LAM_GSM_SUFFIX_MAP = {"A": 10, "B": 12, "C": 13, "D": 15, "E": 20, "F": 30}
+_LAMINATION_QUALITY_BY_CODE_SUB = {
+    "A": "PREMIUM", "B": "PLATINUM", "C": "SUPER PLATINUM", "D": "GOLD", "E": "SILVER", "F": "BRONZE",
+    "G": "CLASSIC", "H": "SUPER CLASSIC", "I": "LIFE STYLE", "J": "ECO SPECIAL", "K": "ECO GREEN",
+    "L": "SUPER ECO", "M": "ULTRA", "N": "DELUXE", "O": "VIRGIN MIX - GOLD MIX",
+    "P": "MID MIX - CLASSIC MIX", "Q": "ECO MIX", "R": "DELUXE MIX",
+}
+_LAMINATION_FABRIC_GSM_BY_CODE_SUB = {chr(ord("A") + i): 20 + 5 * i for i in range(21)}
+_LAMINATION_BOPP_GSM_BY_CODE_SUB = {"A": 10, "B": 12, "C": 15, "D": 30}
+_TAIL_3 = r"(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{3})(?P<finish1>\d)(?P<finish2>\d)$"
+_TAIL_4 = r"(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{4})(?P<finish1>[A-Z0-9])(?P<finish2>[A-Z0-9])$"
+
+
+def legacy_process_prefix(item_code):
+    ic = str(item_code or "").strip()
+    if not ic:
+        return ""
+    digits = "".join(ch for ch in ic if ch.isdigit())
+    return digits[:3] if len(digits) >= 3 else ""
+
+
+def legacy_rewinding_width_mm(item_code):
+    ic = str(item_code or "").strip()
+    if legacy_process_prefix(ic) != "102":
+        return None
+    parts = ic.split("-")
+    if len(parts) < 2:
+        return None
+    tail = parts[-1].strip()
+    if tail.isdigit():
+        return int(tail)
+    return None
+
+
+def legacy_trace_id(item_code):
+    ic = str(item_code or "").strip()
+    if len(ic) < 16:
+        return ""
+    process = legacy_process_prefix(ic)
+    if process not in ("103", "104"):
+        return ""
+    left = ic
+    suffix = ""
+    if "-" in ic:
+        left, right = ic.rsplit("-", 1)
+        suffix = str(right or "").strip().upper()
+    digits = "".join(ch for ch in left if ch.isdigit())
+    if len(digits) < 16:
+        return ""
+    colour, gsm, width = digits[6:9], digits[9:12], digits[12:16]
+    if not colour or not gsm or not width:
+        return ""
+    if suffix:
+        return f"{process}-{colour}-{gsm}-{width}-{suffix}"
+    return f"{process}-{colour}-{gsm}-{width}"
+
+
+def legacy_laminated_gsm(item_code):
+    if not item_code:
+        return 0
+    digits = "".join(ch for ch in str(item_code).strip() if ch.isdigit())
+    if len(digits) < 12:
+        return 0
+    return int(digits[9:12])
+
+
+def legacy_lam_suffix_gsm(item_code):
+    code = str(item_code or "").strip().upper()
+    if not code or "-" not in code:
+        return 0
+    left, suffix = code.rsplit("-", 1)
+    if legacy_process_prefix(left.strip()) != "104":
+        return 0
+    return int(_LAM_GSM_SUFFIX_MAP.get(suffix.strip(), 0) or 0)
+
+
+def legacy_is_bopp_107(item_code):
+    ic = str(item_code or "").strip()
+    if not ic:
+        return False
+    if legacy_process_prefix(ic) == "107":
+        return True
+    m = re.search(r"-(\d{3})", ic)
+    return bool(m and m.group(1) == "107")
+
+
+def legacy_parse_107(item_code):
+    code = re.sub(r"\s+", "", str(item_code or "").strip().upper())
+    if not code:
+        return {}
+
+    def _row(design, gd):
+        width_code = gd.get("width") or ""
+        width_inch = 0.0
+        if width_code.isdigit():
+            if len(width_code) == 4:
+                width_inch = float(width_code) / 25.4
+            elif len(width_code) == 3:
+                width_inch = float(width_code) / 10.0
+        qc = (gd.get("quality") or "").strip().upper()
+        lam_letter = (gd.get("lam") or "").strip().upper()
+        fab_letter = (gd.get("fabric") or "").strip().upper()
+        bopp_letter = (gd.get("bopp") or "").strip().upper()
+        return {
+            "design_code": design or "",
+            "process": "107",
+            "quality_code": qc,
+            "quality_name": _LAMINATION_QUALITY_BY_CODE_SUB.get(qc, ""),
+            "colour_code": gd.get("colour") or "",
+            "fabric_gsm_code": fab_letter,
+            "fabric_gsm": int(_LAMINATION_FABRIC_GSM_BY_CODE_SUB.get(fab_letter, 0) or 0),
+            "bopp_gsm_code": bopp_letter,
+            "bopp_gsm": int(_LAMINATION_BOPP_GSM_BY_CODE_SUB.get(bopp_letter, 0) or 0),
+            "lam_gsm_code": lam_letter,
+            "lam_gsm": int(_LAM_GSM_SUFFIX_MAP.get(lam_letter, 0) or 0),
+            "width_code": width_code,
+            "width_inch": width_inch,
+            "finish_matte_glossy": gd.get("finish1") or "0",
+            "finish_metallic_cooler": gd.get("finish2") or "0",
+        }
+
+    for tail in (_TAIL_3, _TAIL_4):
+        m = re.match(r"^(?P<design>[A-Z0-9]+)-(?P<process>107)" + tail, code)
+        if m:
+            return _row((m.group("design") or "").strip().upper(), m.groupdict())
+    m2 = re.match(r"^(?P<design>[A-Z0-9]+)-(?P<process>107)(?P<body>\d+)$", code)
+    if m2:
+        blank = _row("", {})
+        blank.update({"design_code": m2.group("design") or "", "quality_code": "", "width_code": ""})
+        return blank
+    pos = code.find("-107")
+    if pos > 0:
+        design = re.sub(r"[^A-Z0-9]", "", code[:pos])
+        for tail in (_TAIL_3, _TAIL_4):
+            m3 = re.match("^" + tail, code[pos + 4:])
+            if m3 and design:
+                return _row(design, m3.groupdict())
+    return {}
+
+
+def legacy_colour_candidates(item_code):
+    digits = "".join(ch for ch in str(item_code or "") if ch.isdigit())
+    if len(digits) < 9:
+        return ()
+    candidates = []
+    for start in (6, 5, 7):
+        if len(digits) >= start + 3:
+            cc = digits[start:start + 3]
+            if cc and cc not in candidates:
+                candidates.append(cc)
+    return tuple(candidates)
+
+
+def legacy_fields(code):
+    return (
+        legacy_process_prefix(code),
+        legacy_rewinding_width_mm(code),
+        legacy_trace_id(code),
+        legacy_laminated_gsm(code),
+        legacy_lam_suffix_gsm(code),
+        legacy_is_bopp_107(code),
+        legacy_parse_107(code),
+        legacy_colour_candidates(code),
+    )
+
+
+def decoded_fields(code):
+    spec = decode_item_code(code)
+    return (
+        spec.process,
+        spec.rewinding_width_mm,
+        spec.trace_id,
+        spec.laminated_gsm,
+        spec.lam_suffix_gsm,
+        spec.is_bopp_107,
+        spec.bopp_107_dict(),
+        spec.colour_candidates,
+    )
+
+
+def synthetic_codes(rng, count):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    codes = []
+    for _ in range(count):
+        kind = rng.random()
+        body = "%03d%03d%03d%04d" % (rng.randint(0, 999), rng.randint(0, 999), rng.randint(0, 999), rng.randint(0, 9999))
+        if kind < 0.25:
+            codes.append(rng.choice(("100", "103")) + body)
+        elif kind < 0.45:
+            codes.append("104" + body + "-" + rng.choice("ABCDEFZ") + rng.choice(("", "1", "2")))
+        elif kind < 0.6:
+            codes.append("102" + body + "-" + str(rng.randint(100, 2400)))
+        elif kind < 0.8:
+            width = "%03d%d%d" % (rng.randint(100, 999), rng.randint(0, 9), rng.randint(0, 9)) if rng.random() < 0.5 else "%04d%s%s" % (rng.randint(500, 2000), rng.choice(letters), rng.choice("0123456789"))
+            codes.append("%d-107%s%03d%s%s%s%s" % (rng.randint(1000, 9999), rng.choice(letters[:18]), rng.randint(0, 999), rng.choice(letters[:21]), rng.choice("ABCD"), rng.choice("ABCDEF"), width))
+        elif kind < 0.9:
+            codes.append(rng.choice(("PB-", "HB-", "")) + "103" + body + rng.choice(("", "-X", "-B1")))
+        else:
+            codes.append("%d-107%d" % (rng.randint(1000, 9999), rng.randint(1000000, 9999999)))
+    return codes
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(14)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as fh:
+            corpus = [line.rstrip("\n") for line in fh if line.strip()]
+    else:
+        corpus = REPO_CODES + synthetic_codes(rng, 2000)
+
+    mismatches = [c for c in corpus if legacy_fields(c) != decoded_fields(c)]
+    for code in mismatches[:10]:
+        print("MISMATCH", repr(code), legacy_fields(code), decoded_fields(code))
+    print(f"parity: {len(corpus) - len(mismatches)}/{len(corpus)} codes match")
+
+    # A board / sync pass touches the same codes on many rows, each through several helpers.
+    workload = [rng.choice(corpus) for _ in range(rows)]
+
+    t0 = time.perf_counter()
+    for code in workload:
+        legacy_fields(code)
+    legacy_ms = (time.perf_counter() - t0) * 1000
+
+    clear_item_code_cache()  # time cold decodes too, not just the parity-warmed cache
+    t0 = time.perf_counter()
+    for code in workload:
+        decoded_fields(code)
+    decoded_ms = (time.perf_counter() - t0) * 1000
+
+    info = item_code_cache_info()
+    print(f"{rows} rows over {len(corpus)} distinct codes")
+    print(f"legacy helpers : {legacy_ms:8.1f} ms")
+    print(f"decoder (LRU)  : {decoded_ms:8.1f} ms  hits={info.hits} misses={info.misses}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Benchmark: get_smart_push_sequence ordering, legacy per-bucket sort vs production_scheduler.smart_push.
+
+Runs without frappe: fixture items stand in for the Planning Table fetch.
+Checks that both versions return the same order, then prints timings.
+Usage: python benchmark_smart_push_sequence.py [item_count]
+"""
+import random
+import sys
+import time
+
+from production_scheduler.smart_push import build_quality_ranks, order_smart_push
+
+UNIT_QUALITY_ORDER = {
+    "Unit 1": ["PREMIUM","PLATINUM","SUPER PLATINUM","GOLD","SILVER"],
+    "Unit 2": ["GOLD","SILVER","BRONZE","CLASSIC","SUPER CLASSIC","LIFE STYLE",
+               "ECO SPECIAL","ECO GREEN","SUPER ECO","ULTRA","DELUXE"],
+    "Unit 3": ["PREMIUM","PLATINUM","SUPER PLATINUM","GOLD","SILVER","BRONZE"],
+    "Unit 4": ["PREMIUM","GOLD","SILVER","BRONZE","CLASSIC","CRT"],
+}
+
+COLOR_ORDER_LIST = [
+    "BRIGHT WHITE","SUPER WHITE","MILKY WHITE","SUNSHINE WHITE",
+    "BLEACH WHITE 1.0","BLEACH WHITE 2.0","BLEACH WHITE","WHITE MIX","WHITE",
+    "CREAM 2.0","CREAM 3.0","CREAM 4.0","CREAM 5.0",
+    "GOLDEN YELLOW 4.0 SPL","GOLDEN YELLOW 1.0","GOLDEN YELLOW 2.0","GOLDEN YELLOW 3.0","GOLDEN YELLOW",
+    "LEMON YELLOW 1.0","LEMON YELLOW 3.0","LEMON YELLOW",
+    "BRIGHT ORANGE","DARK ORANGE","ORANGE 2.0",
+    "PINK 7.0 DARK","PINK 6.0 DARK","DARK PINK","BABY PINK","PINK 1.0","PINK 2.0","PINK 3.0","PINK 5.0",
+    "CRIMSON RED","RED","LIGHT MAROON","DARK MAROON","MAROON 1.0","MAROON 2.0",
+    "BLUE 13.0 INK BLUE","BLUE 12.0 SPL NAVY BLUE","BLUE 11.0 NAVY BLUE",
+    "BLUE 8.0 DARK ROYAL BLUE","BLUE 7.0 DARK BLUE","BLUE 6.0 ROYAL BLUE",
+    "LIGHT PEACOCK BLUE","PEACOCK BLUE","LIGHT MEDICAL BLUE","MEDICAL BLUE",
+    "ROYAL BLUE","NAVY BLUE","SKY BLUE","LIGHT BLUE",
+    "BLUE 9.0","BLUE 4.0","BLUE 2.0","BLUE 1.0","BLUE",
+    "PURPLE 4.0 BLACKBERRY","PURPLE 1.0","PURPLE 2.0","PURPLE 3.0","VOILET",
+    "GREEN 13.0 ARMY GREEN","GREEN 12.0 OLIVE GREEN","GREEN 11.0 DARK GREEN",
+    "GREEN 10.0","GREEN 9.0 BOTTLE GREEN","GREEN 8.0 APPLE GREEN",
+    "GREEN 7.0","GREEN 6.0","GREEN 5.0 GRASS GREEN","GREEN 4.0",
+    "GREEN 3.0 RELIANCE GREEN","GREEN 2.0 TORQUISE GREEN","GREEN 1.0 MINT",
+    "MEDICAL GREEN","RELIANCE GREEN","PARROT GREEN","GREEN",
+    "SILVER 1.0","SILVER 2.0","LIGHT GREY","DARK GREY","GREY 1.0",
+    "CHOCOLATE BROWN 2.0","CHOCOLATE BROWN","CHOCOLATE BLACK",
+    "BROWN 3.0 DARK COFFEE","BROWN 2.0 DARK","BROWN 1.0",
+    "CHIKOO 1.0","CHIKOO 2.0",
+    "BEIGE 1.0","BEIGE 2.0","BEIGE 3.0","BEIGE 4.0","BEIGE 5.0",
+    "LIGHT BEIGE","DARK BEIGE","BEIGE MIX","BLACK MIX","COLOR MIX","BLACK",
+]
+COLOR_PRIORITY = {c: i for i, c in enumerate(COLOR_ORDER_LIST)}
+
+ALL_QUALITIES = sorted({q for order in UNIT_QUALITY_ORDER.values() for q in order}) + ["UNKNOWN"]
+RAW_UNITS = ["Unit 1", "UNIT 2", "unit3", "Unit 4", "", None, "Lamination Unit"]
+
+
+def _normalize_unit(raw):
+    r = (raw or "").strip().upper().replace(" ", "")
+    for n in ("1", "2", "3", "4"):
+        if "UNIT" + n in r:
+            return "Unit " + n
+    if "LAMINATIONUNIT" in r:
+        return "Lamination Unit"
+    return "UNASSIGNED"
+
+
+def legacy_order(items, unit_seeds, seed_color=None, seed_quality=None):
+    """Copy of the previous get_smart_push_sequence sorting loop (enrichment removed)."""
+    result_sequence = []
+    for u in ["Unit 1", "Unit 2", "Unit 3", "Unit 4", "UNASSIGNED"]:
+        unit_items = [it for it in items if _normalize_unit(it.get("unit")) == u]
+        if not unit_items: continue
+
+        seed = unit_seeds.get(u)
+        s_col = (seed.get("color") if seed else seed_color or "").upper().strip()
+        s_qual = (seed.get("quality") if seed else seed_quality or "").upper().strip()
+
+        perfect, same_col, remaining = [], [], []
+        for it in unit_items:
+            c = (it.get("color") or "").upper().strip()
+            q = (it.get("custom_quality") or "").upper().strip()
+            if c == s_col and q == s_qual: perfect.append(it)
+            elif c == s_col: same_col.append(it)
+            else: remaining.append(it)
+
+        def color_sort_key_fn(it):
+            col = (it.get("color") or "").upper().strip()
+            qual = (it.get("custom_quality") or "").upper().strip()
+            c_idx = COLOR_PRIORITY.get(col, 999)
+            s_idx = COLOR_PRIORITY.get(s_col, -1)
+            if s_idx != -1 and c_idx != 999:
+                total_colors = len(COLOR_ORDER_LIST)
+                color_score = (c_idx - s_idx + total_colors) % total_colors
+            else:
+                color_score = c_idx
+            q_order = UNIT_QUALITY_ORDER.get(u, [])
+            q_idx = q_order.index(qual) if qual in q_order else 999
+            gsm_val = -float(it.get("gsm") or 0)
+            return (color_score, q_idx, gsm_val)
+
+        perfect.sort(key=color_sort_key_fn)
+        same_col.sort(key=color_sort_key_fn)
+        remaining.sort(key=color_sort_key_fn)
+        result_sequence.extend(perfect + same_col + remaining)
+    return result_sequence
+
+
+def make_items(count, rng):
+    colors = COLOR_ORDER_LIST + ["UNLISTED COLOUR", ""]
+    return [{
+        "name": f"PSI-{n:06d}",
+        "unit": rng.choice(RAW_UNITS),
+        "color": rng.choice(colors),
+        "custom_quality": rng.choice(ALL_QUALITIES),
+        "gsm": rng.choice([None, 40, 50, 60, 70, 80, 90, 100]),
+    } for n in range(count)]
+
+
+def make_seeds(rng):
+    return {u: {"color": rng.choice(COLOR_ORDER_LIST), "quality": rng.choice(UNIT_QUALITY_ORDER[u])}
+            for u in ("Unit 1", "Unit 2", "Unit 4")}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    quality_ranks = build_quality_ranks(UNIT_QUALITY_ORDER)
+    total = len(COLOR_ORDER_LIST)
+
+    for trial in range(20):
+        items = make_items(rng.randint(1, 300), rng)
+        seeds = make_seeds(rng)
+        expected = [it["name"] for it in legacy_order(items, seeds, "RED", "GOLD")]
+        got = [it["name"] for it in order_smart_push(items, seeds, COLOR_PRIORITY, total, quality_ranks,
+                                                       _normalize_unit, "RED", "GOLD")]
+        assert expected == got, f"Order mismatch in trial {trial}"
+    print("Order check: 20 random fixtures match the legacy sort")
+
+    items = make_items(count, rng)
+    seeds = make_seeds(rng)
+
+    t0 = time.perf_counter()
+    legacy_order(items, seeds)
+    legacy_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    order_smart_push(items, seeds, COLOR_PRIORITY, total, quality_ranks, _normalize_unit)
+    new_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"{count} items: legacy {legacy_ms:.1f} ms, smart_push {new_ms:.1f} ms")
+    # The server side also drops one get_value per parent sheet and three seed queries
+    # (one joined fetch + one seed query instead of 1 + 4 + sheets).
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,17 @@ from frappe.utils import getdate, flt, cint
 import json
 import re
 import datetime
+import threading
+import itertools
+from bisect import bisect_right
+from collections import OrderedDict
 
 from production_scheduler.planning_doctypes import normalize_planning_unit_for_select
+from production_scheduler.smart_push import build_quality_ranks, order_smart_push
+from production_scheduler.item_codes import decode_item_code
+from production_scheduler.item_text import ItemTextExtractor
+from production_scheduler.plan_codes import month_prefix, plan_base, plan_code, plan_month, unit_segment
+from production_scheduler.sequence_diff import apply_sequence_diff, encode_sequence_diff
 
 # Party / order code auto-generation (MonthLetter+YY+NNN + SO writeback).
 # Set True to enable; False disables all calls (no codes generated, no SO writeback from this path).
@@ -22,28 +31,81 @@ REWINDING_UNIT_L4 = "JSB - L4 REWINDING MACHINE"
 REWINDING_UNIT_L5 = "JSB - L5 REWINDING MACHINE"
 REWINDING_UNASSIGNED_UNIT = "Unassigned rewinding machine"
 
+# Schema capability registry: physical columns of the hot DocTypes, resolved once per worker.
+# Each entry is stamped with the DocType / Custom Field `modified` so a migrate or a new custom
+# field invalidates it; the stamps themselves are read once per request (one query).
+SCHEMA_REGISTRY_DOCTYPES = ("Planning Table", "Planning sheet", "Sales Order", "Colour Master", "Shaft Production Run")
+_schema_registry = {}  # doctype -> (stamp, frozenset of column names)
+
+
+def _schema_registry_stamps():
+	"""doctype -> schema stamp for SCHEMA_REGISTRY_DOCTYPES, memoized on frappe.local for this request."""
+	stamps = getattr(frappe.local, "production_scheduler_schema_stamps", None)
+	if stamps is not None:
+		return stamps
+	stamps = {}
+	try:
+		rows = frappe.db.sql(
+			"""
+			SELECT d.name,
+				GREATEST(d.modified, COALESCE(
+					(SELECT MAX(cf.modified) FROM `tabCustom Field` cf WHERE cf.dt = d.name), d.modified
+				))
+			FROM `tabDocType` d
+			WHERE d.name IN %s
+			""",
+			(SCHEMA_REGISTRY_DOCTYPES,),
+		)
+		stamps = {r[0]: str(r[1]) for r in rows or []}
+	except Exception:
+		stamps = {}
+	frappe.local.production_scheduler_schema_stamps = stamps
+	return stamps
+
+
+def _table_columns(doctype):
+	"""Column names of `doctype` as a frozenset; registry DocTypes are served from the worker cache."""
+	if doctype not in SCHEMA_REGISTRY_DOCTYPES:
+		try:
+			return frozenset(frappe.db.get_table_columns(doctype) or [])
+		except Exception:
+			return frozenset()
+	stamp = _schema_registry_stamps().get(doctype)
+	cached = _schema_registry.get(doctype)
+	if cached and cached[0] == stamp:
+		return cached[1]
+	try:
+		cols = frozenset(frappe.db.get_table_columns(doctype) or [])
+	except Exception:
+		cols = frozenset()
+	_schema_registry[doctype] = (stamp, cols)
+	return cols
+
+
+def _has_column(doctype, column):
+	"""Drop-in for frappe.db.has_column backed by the schema registry."""
+	if doctype not in SCHEMA_REGISTRY_DOCTYPES:
+		return frappe.db.has_column(doctype, column)
+	return column in _table_columns(doctype)
+
+
+def clear_schema_registry():
+	"""Forget cached columns (call after creating custom fields in the same request)."""
+	_schema_registry.clear()
+	try:
+		frappe.local.production_scheduler_schema_stamps = None
+	except Exception:
+		pass
+
 
 def _item_process_prefix(item_code):
-	ic = str(item_code or "").strip()
-	if not ic:
-		return ""
 	# Accept prefixed codes like HB-103... by using the leading numeric stream.
-	digits = "".join(ch for ch in ic if ch.isdigit())
-	return digits[:3] if len(digits) >= 3 else ""
+	return decode_item_code(item_code).process
 
 
 def _rewinding_width_mm_from_item_code(item_code):
 	"""Last hyphen segment on 102 codes, e.g. 1021035420501600-1600 -> 1600 (mm)."""
-	ic = str(item_code or "").strip()
-	if _item_process_prefix(ic) != "102":
-		return None
-	parts = ic.split("-")
-	if len(parts) < 2:
-		return None
-	tail = parts[-1].strip()
-	if tail.isdigit():
-		return cint(tail)
-	return None
+	return decode_item_code(item_code).rewinding_width_mm
 
 
 def _parent_child_trace_id_from_item_code(item_code):
@@ -60,33 +122,7 @@ def _parent_child_trace_id_from_item_code(item_code):
 	- 1031035210500050 -> 103-521-050-0050
 	- 1041030010231475-B1 -> 104-023-147-5-B1
 	"""
-	ic = str(item_code or "").strip()
-	if len(ic) < 16:
-		return ""
-	process = _item_process_prefix(ic)
-	if process not in ("103", "104"):
-		return ""
-
-	left = ic
-	suffix = ""
-	if "-" in ic:
-		left, right = ic.rsplit("-", 1)
-		suffix = str(right or "").strip().upper()
-
-	digits = "".join(ch for ch in left if ch.isdigit())
-	if len(digits) < 16:
-		return ""
-	
-	colour = digits[6:9]      # positions 6-8: colour code
-	gsm = digits[9:12]        # positions 9-11: gsm
-	width = digits[12:16]     # positions 12-15: width
-	
-	if not colour or not gsm or not width:
-		return ""
-	
-	if suffix:
-		return f"{process}-{colour}-{gsm}-{width}-{suffix}"
-	return f"{process}-{colour}-{gsm}-{width}"
+	return decode_item_code(item_code).trace_id
 
 
 def _set_trace_id_if_supported(row_dict_or_doc, trace_id):
@@ -94,7 +130,7 @@ def _set_trace_id_if_supported(row_dict_or_doc, trace_id):
 		return
 	can_write = False
 	try:
-		can_write = frappe.db.has_column("Planning Table", "custom_parent_child_trace_id") or frappe.db.has_column("Planning sheet Item", "custom_parent_child_trace_id")
+		can_write = _has_column("Planning Table", "custom_parent_child_trace_id") or frappe.db.has_column("Planning sheet Item", "custom_parent_child_trace_id")
 	except Exception:
 		can_write = False
 	if not can_write:
@@ -117,7 +153,7 @@ def _sql_fabric_row_join_predicate(alias_pt="pt", alias_fab="fab"):
 	"""
 	has_trace = False
 	try:
-		has_trace = bool(frappe.db.has_column("Planning Table", "custom_parent_child_trace_id"))
+		has_trace = bool(_has_column("Planning Table", "custom_parent_child_trace_id"))
 	except Exception:
 		has_trace = False
 	so_fallback = (
@@ -152,7 +188,7 @@ def _sql_correlated_pick_one_fabric_name(alias_pt="pt"):
 	Matches trace ID first when both sides have it; else SO-line key via fab.so_item.
 	"""
 	try:
-		has_trace = bool(frappe.db.has_column("Planning Table", "custom_parent_child_trace_id"))
+		has_trace = bool(_has_column("Planning Table", "custom_parent_child_trace_id"))
 	except Exception:
 		has_trace = False
 	pa = alias_pt
@@ -191,7 +227,7 @@ def _submitted_spr_run_date_map(spr_names):
 	out = {}
 	if not spr_names or not frappe.db.exists("DocType", "Shaft Production Run"):
 		return out
-	spr_cols = set(frappe.db.get_table_columns("Shaft Production Run") or [])
+	spr_cols = set(_table_columns("Shaft Production Run") or [])
 	run_col = ""
 	for c in ("run_date", "custom_run_date", "start_date", "posting_date", "creation"):
 		if c in spr_cols:
@@ -225,7 +261,7 @@ def _next_lamination_order_code():
     yy = str(now.year)[-2:]
     ml = _month_letter_from_date(now)
     prefix = f"U{yy}{ml}"
-    sheet_code_field = "custom_lamination_order_code" if frappe.db.has_column("Planning sheet", "custom_lamination_order_code") else "custom_lamination_booking_id"
+    sheet_code_field = "custom_lamination_order_code" if _has_column("Planning sheet", "custom_lamination_order_code") else "custom_lamination_booking_id"
     rows = frappe.db.sql(
         """
         SELECT {field} FROM `tabPlanning sheet`
@@ -256,18 +292,18 @@ def ensure_lamination_booking_for_planning_sheet(doc):
 		meta = frappe.get_meta("Planning sheet")
 	except Exception:
 		return
-	has_sheet_code_new = meta.has_field("custom_lamination_order_code") or frappe.db.has_column("Planning sheet", "custom_lamination_order_code")
-	has_sheet_code_old = meta.has_field("custom_lamination_booking_id") or frappe.db.has_column("Planning sheet", "custom_lamination_booking_id")
+	has_sheet_code_new = meta.has_field("custom_lamination_order_code") or _has_column("Planning sheet", "custom_lamination_order_code")
+	has_sheet_code_old = meta.has_field("custom_lamination_booking_id") or _has_column("Planning sheet", "custom_lamination_booking_id")
 	if not (has_sheet_code_new or has_sheet_code_old):
 		return
-	has_pt_booking_new = frappe.db.has_column("Planning Table", "custom_lamination_order_code_")
-	has_pt_booking_old = frappe.db.has_column("Planning Table", "custom_lamination_booking_id")
+	has_pt_booking_new = _has_column("Planning Table", "custom_lamination_order_code_")
+	has_pt_booking_old = _has_column("Planning Table", "custom_lamination_booking_id")
 	has_psi_booking = frappe.db.has_column("Planning sheet Item", "custom_lamination_order_code")
 	has_psi_lam_gsm = frappe.db.has_column("Planning sheet Item", "custom_lam_gsm")
-	has_pt_lam_gsm = frappe.db.has_column("Planning Table", "custom_lam_gsm")
+	has_pt_lam_gsm = _has_column("Planning Table", "custom_lam_gsm")
 	has_psi_lam_side = frappe.db.has_column("Planning sheet Item", "custom_lam_side")
-	has_pt_lam_side = frappe.db.has_column("Planning Table", "custom_lam_side_")
-	has_ps_lam_side = frappe.db.has_column("Planning sheet", "custom_lam_side")
+	has_pt_lam_side = _has_column("Planning Table", "custom_lam_side_")
+	has_ps_lam_side = _has_column("Planning sheet", "custom_lam_side")
 
 	has_104 = False
 	for fn in ("planned_items", "items", "custom_planned_items"):
@@ -377,9 +413,9 @@ def ensure_lamination_booking_for_planning_sheet(doc):
 	sales_order = (getattr(doc, "sales_order", None) or "").strip()
 	if sales_order:
 		try:
-			if frappe.db.has_column("Sales Order", "custom_lamination_order_code"):
+			if _has_column("Sales Order", "custom_lamination_order_code"):
 				frappe.db.set_value("Sales Order", sales_order, "custom_lamination_order_code", code, update_modified=False)
-			elif frappe.db.has_column("Sales Order", "custom_lamination_booking_id"):
+			elif _has_column("Sales Order", "custom_lamination_booking_id"):
 				frappe.db.set_value("Sales Order", sales_order, "custom_lamination_booking_id", code, update_modified=False)
 		except Exception:
 			frappe.log_error(frappe.get_traceback(), "sync_lamination_order_code_sales_order")
@@ -400,42 +436,22 @@ def _fabric_gsm_from_item_name(item_name: str) -> int:
 
 def _gsm_from_lamination_item_code(item_code: str) -> int:
     """Read laminated GSM from item-code index 9:12 (digits-only code), e.g. ...070... -> 70."""
-    if not item_code:
-        return 0
-    digits = "".join(ch for ch in str(item_code).strip() if ch.isdigit())
-    if len(digits) < 12:
-        return 0
-    try:
-        return cint(digits[9:12])
-    except Exception:
-        return 0
-
-
-# Lamination GSM from suffix after '-':
-# 10-A, 12-B, 13-C, 15-D, 20-E, 30-F
-_LAM_GSM_SUFFIX_MAP = {
-    "A": 10,
-    "B": 12,
-    "C": 13,
-    "D": 15,
-    "E": 20,
-    "F": 30,
-}
+    return decode_item_code(item_code).laminated_gsm
 
 
 def _lam_gsm_from_item_code_suffix(item_code: str) -> int:
-    """Read lamination GSM from item-code suffix after last '-', for 104 items only."""
-    code = str(item_code or "").strip().upper()
-    if not code or "-" not in code:
-        return 0
-    left, suffix = code.rsplit("-", 1)
-    if _item_process_prefix(left.strip()) != "104":
-        return 0
-    return cint(_LAM_GSM_SUFFIX_MAP.get(suffix.strip(), 0) or 0)
+    """Read lamination GSM from item-code suffix after last '-', for 104 items only (10-A .. 30-F)."""
+    return decode_item_code(item_code).lam_suffix_gsm
 
 
 def _lam_side_from_sales_order_item(so_item_name: str) -> str:
     """Fetch lamination side directly from Sales Order Item row."""
+    row = _prefetched_sales_order_item(so_item_name)
+    if row is not None:
+        for fn in ("custom_lamination_side", "custom_lam_side", "lamination_side"):
+            if fn in row:
+                return str(row.get(fn) or "").strip()
+        return ""
     if not so_item_name or not frappe.db.exists("Sales Order Item", so_item_name):
         return ""
     cols = set(frappe.db.get_table_columns("Sales Order Item") or [])
@@ -454,8 +470,8 @@ def _ensure_sheet_lamination_order_code(sheet_name):
 	if not sheet_name or not frappe.db.exists("Planning sheet", sheet_name):
 		return ""
 
-	has_sheet_new = frappe.db.has_column("Planning sheet", "custom_lamination_order_code")
-	has_sheet_old = frappe.db.has_column("Planning sheet", "custom_lamination_booking_id")
+	has_sheet_new = _has_column("Planning sheet", "custom_lamination_order_code")
+	has_sheet_old = _has_column("Planning sheet", "custom_lamination_booking_id")
 	if not (has_sheet_new or has_sheet_old):
 		return ""
 
@@ -495,7 +511,7 @@ def _ensure_sheet_lamination_order_code(sheet_name):
 			tuple(([code] * len(updates)) + [sheet_name]),
 		)
 
-	if frappe.db.has_column("Planning Table", "custom_lamination_order_code_"):
+	if _has_column("Planning Table", "custom_lamination_order_code_"):
 		frappe.db.sql(
 			"""
 			UPDATE `tabPlanning Table`
@@ -504,7 +520,7 @@ def _ensure_sheet_lamination_order_code(sheet_name):
 			""",
 			(code, sheet_name),
 		)
-	if frappe.db.has_column("Planning Table", "custom_lamination_booking_id"):
+	if _has_column("Planning Table", "custom_lamination_booking_id"):
 		frappe.db.sql(
 			"""
 			UPDATE `tabPlanning Table`
@@ -525,9 +541,9 @@ def _ensure_sheet_lamination_order_code(sheet_name):
 
 	so = (sheet.get("sales_order") or "").strip()
 	if so:
-		if frappe.db.has_column("Sales Order", "custom_lamination_order_code"):
+		if _has_column("Sales Order", "custom_lamination_order_code"):
 			frappe.db.set_value("Sales Order", so, "custom_lamination_order_code", code, update_modified=False)
-		elif frappe.db.has_column("Sales Order", "custom_lamination_booking_id"):
+		elif _has_column("Sales Order", "custom_lamination_booking_id"):
 			frappe.db.set_value("Sales Order", so, "custom_lamination_booking_id", code, update_modified=False)
 
 	return code
@@ -552,46 +568,18 @@ def _get_fabric_item_from_process_item(item_code, expected_process, process_labe
 				process_label, expected_process, _item_process_prefix(item_code) or ""
 			)
 		)
-	if not frappe.db.exists("Item", item_code):
+	if not _bom_graph_item(item_code)["exists"]:
 		frappe.throw(_("Item {0} does not exist.").format(item_code))
 
-	bom_name = frappe.db.get_value(
-		"BOM",
-		{"item": item_code, "docstatus": 1, "is_active": 1, "is_default": 1},
-		"name",
-		order_by="modified desc",
-	)
-	if not bom_name:
-		bom_name = frappe.db.get_value(
-			"BOM",
-			{"item": item_code, "docstatus": 1, "is_active": 1},
-			"name",
-			order_by="is_default desc, modified desc",
-		)
-	if not bom_name and frappe.db.exists("Item", item_code):
-		# Variant fallback: sometimes the BOM is on the template item.
-		tmpl = frappe.db.get_value("Item", item_code, "variant_of")
-		if tmpl:
-			bom_name = frappe.db.get_value(
-				"BOM",
-				{"item": tmpl, "docstatus": 1, "is_active": 1, "is_default": 1},
-				"name",
-				order_by="modified desc",
-			) or frappe.db.get_value(
-				"BOM",
-				{"item": tmpl, "docstatus": 1, "is_active": 1},
-				"name",
-				order_by="is_default desc, modified desc",
-			)
+	# Variant fallback: sometimes the BOM is on the template item.
+	bom_name = _default_bom_for_item(item_code, template_fallback=True)
 	if not bom_name:
 		frappe.throw(_("No active submitted BOM for {0} item {1}.").format(process_label.lower(), item_code))
 
-	bom = frappe.get_doc("BOM", bom_name)
 	fabric_rows = []
-	for row in bom.items or []:
-		ic = (row.item_code or "").strip()
+	for ic, qty in (_bom_graph_bom(bom_name) or {}).get("items") or ():
 		if len(ic) >= 3 and ic[:3] == "100":
-			fabric_rows.append((ic, row))
+			fabric_rows.append((ic, qty))
 
 	if len(fabric_rows) == 0:
 		frappe.throw(
@@ -606,7 +594,7 @@ def _get_fabric_item_from_process_item(item_code, expected_process, process_labe
 		)
 
 	fabric_item_code = fabric_rows[0][0]
-	if not frappe.db.exists("Item", fabric_item_code):
+	if not _bom_graph_item(fabric_item_code)["exists"]:
 		frappe.throw(_("Fabric item {0} from BOM does not exist.").format(fabric_item_code))
 
 	return {"fabric_item_code": fabric_item_code, "bom_no": bom_name}
@@ -624,17 +612,181 @@ def get_fabric_item_from_rewinding_item(rewinding_item_code):
 	return _get_fabric_item_from_process_item(rewinding_item_code, expected_process="102", process_label="Rewinding")
 
 
-def _fabric_qty_from_bom(bom_name, fabric_item_code, lamination_so_qty):
-	"""Lamination SO qty (FG) -> required fabric qty using BOM line qty / BOM quantity."""
-	bom = frappe.get_doc("BOM", bom_name)
-	fg_qty = flt(bom.quantity) or 1.0
+# ---- BOM graph cache ----
+# Nodes "item::<code>" (exists, variant_of, own default active BOM) and "bom::<name>" (quantity,
+# (child item, qty) lines) live in the Redis hash BOM_GRAPH_CACHE_KEY, with a per-process LRU in
+# front. BOM / Item doc events drop the affected Redis nodes (a Colour Master rename drops them all)
+# and bump BOM_GRAPH_VERSION_KEY, which empties every process's LRU for the site on its next
+# request. Nodes are shared: never mutate them.
+BOM_GRAPH_CACHE_KEY = "production_scheduler:bom_graph"
+BOM_GRAPH_VERSION_KEY = "production_scheduler:bom_graph_version"
+BOM_GRAPH_LRU_SIZE = 2048
+
+_bom_graph_lru = OrderedDict()
+_bom_graph_lru_versions = {}
+_bom_graph_lru_lock = threading.Lock()
+# Per-process counters (see get_bom_graph_cache_stats).
+_bom_graph_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _bom_graph_version():
+	"""Site graph version, read from Redis once per request / job."""
+	ver = getattr(frappe.local, "production_scheduler_bom_graph_version", None)
+	if ver is None:
+		ver = frappe.cache().get_value(BOM_GRAPH_VERSION_KEY) or ""
+		frappe.local.production_scheduler_bom_graph_version = ver
+	return ver
+
+
+def _bom_graph_get(field, builder):
+	site = getattr(frappe.local, "site", None) or ""
+	key = (site, field)
+	version = _bom_graph_version()
+	with _bom_graph_lru_lock:
+		if _bom_graph_lru_versions.get(site) != version:
+			for stale in [k for k in _bom_graph_lru if k[0] == site]:
+				del _bom_graph_lru[stale]
+			_bom_graph_lru_versions[site] = version
+		if key in _bom_graph_lru:
+			_bom_graph_lru.move_to_end(key)
+			_bom_graph_stats["local_hits"] += 1
+			return _bom_graph_lru[key]
+
+	cache = frappe.cache()
+	value = cache.hget(BOM_GRAPH_CACHE_KEY, field)
+	if value is None:
+		value = builder()
+		cache.hset(BOM_GRAPH_CACHE_KEY, field, value)
+		_bom_graph_stats["misses"] += 1
+	else:
+		_bom_graph_stats["redis_hits"] += 1
+
+	with _bom_graph_lru_lock:
+		_bom_graph_lru[key] = value
+		_bom_graph_lru.move_to_end(key)
+		while len(_bom_graph_lru) > BOM_GRAPH_LRU_SIZE:
+			_bom_graph_lru.popitem(last=False)
+	return value
+
+
+def _build_bom_graph_item(item_code):
+	exists = bool(frappe.db.exists("Item", item_code))
+	variant_of = frappe.db.get_value("Item", item_code, "variant_of") if exists else None
+	# Default active BOM first, else any active one (same pick as the former two get_value calls).
+	bom = frappe.db.sql(
+		"""
+		SELECT name FROM `tabBOM`
+		WHERE item = %s AND docstatus = 1 AND is_active = 1
+		ORDER BY is_default DESC, modified DESC
+		LIMIT 1
+		""",
+		(item_code,),
+	)
+	return {"exists": exists, "variant_of": variant_of or None, "bom_no": bom[0][0] if bom else None}
+
+
+def _build_bom_graph_bom(bom_no):
+	quantity = frappe.db.get_value("BOM", bom_no, "quantity")
+	lines = frappe.db.sql(
+		"""
+		SELECT item_code, qty FROM `tabBOM Item`
+		WHERE parent = %s AND parenttype = 'BOM' AND parentfield = 'items'
+		ORDER BY idx
+		""",
+		(bom_no,),
+	)
+	return {
+		"quantity": flt(quantity),
+		"items": tuple(((ic or "").strip(), flt(qty)) for ic, qty in lines),
+	}
+
+
+def _bom_graph_item(item_code):
+	"""Cached {"exists", "variant_of", "bom_no"} for an item (bom_no: own default active BOM)."""
+	ic = (item_code or "").strip()
+	return _bom_graph_get(f"item::{ic}", lambda: _build_bom_graph_item(ic))
+
+
+def _bom_graph_bom(bom_no):
+	"""Cached {"quantity", "items": ((child_item_code, qty), ...)} for a BOM, None without a name."""
+	if not bom_no:
+		return None
+	return _bom_graph_get(f"bom::{bom_no}", lambda: _build_bom_graph_bom(bom_no))
+
+
+def _default_bom_for_item(item_code, template_fallback=False):
+	"""Active BOM for the item; with template_fallback, the template's BOM when a variant has none."""
+	node = _bom_graph_item(item_code)
+	bom_no = node["bom_no"]
+	if not bom_no and template_fallback and node["exists"] and node["variant_of"]:
+		bom_no = _bom_graph_item(node["variant_of"])["bom_no"]
+	return bom_no
+
+
+def _bom_child_qty(bom_name, child_item_code, parent_so_qty):
+	"""Parent FG SO qty -> child qty using BOM line qty / BOM quantity (parent qty when the line is missing)."""
+	bom = _bom_graph_bom(bom_name) or {}
+	fg_qty = flt(bom.get("quantity")) or 1.0
 	if fg_qty <= 0:
 		fg_qty = 1.0
-	lamination_so_qty = flt(lamination_so_qty) or 0
-	for row in bom.items or []:
-		if (row.item_code or "").strip() == fabric_item_code:
-			return flt(lamination_so_qty) * flt(row.qty) / fg_qty
-	return lamination_so_qty
+	parent_so_qty = flt(parent_so_qty) or 0
+	child_item_code = (child_item_code or "").strip()
+	for ic, qty in bom.get("items") or ():
+		if ic == child_item_code:
+			return flt(parent_so_qty) * flt(qty) / fg_qty
+	return parent_so_qty
+
+
+def _drop_bom_graph_nodes(fields):
+	cache = frappe.cache()
+	for field in fields:
+		cache.hdel(BOM_GRAPH_CACHE_KEY, field)
+	cache.set_value(BOM_GRAPH_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def invalidate_bom_graph_cache(doc=None, method=None, *args):
+	"""
+	BOM / Item doc event: drop the graph nodes the document feeds (or the whole graph without a doc).
+	A Colour Master rename changes the item codes resolved through the colour, so it drops the whole graph.
+	Dropped again after commit so a concurrent rebuild from pre-commit rows cannot stick.
+	"""
+	try:
+		if doc is None or doc.doctype == "Colour Master":
+			frappe.cache().delete_value(BOM_GRAPH_CACHE_KEY)
+			fields = []
+		elif doc.doctype == "BOM":
+			fields = [f"bom::{doc.name}", f"item::{(doc.get('item') or '').strip()}"]
+		else:
+			fields = [f"item::{(doc.name or '').strip()}"]
+			# after_rename passes (old, new, merge)
+			if method == "after_rename" and args and args[0]:
+				fields.append(f"item::{str(args[0]).strip()}")
+		_drop_bom_graph_nodes(fields)
+		after_commit = getattr(frappe.db, "after_commit", None)
+		if after_commit is not None:
+			after_commit.add(lambda: _drop_bom_graph_nodes(fields))
+		frappe.local.production_scheduler_bom_graph_version = None
+		_bom_graph_stats["invalidations"] += 1
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "BOM graph cache invalidation failed")
+
+
+@frappe.whitelist()
+def get_bom_graph_cache_stats():
+	"""Hit / miss counters of this worker process's BOM graph cache."""
+	lookups = _bom_graph_stats["local_hits"] + _bom_graph_stats["redis_hits"] + _bom_graph_stats["misses"]
+	hits = _bom_graph_stats["local_hits"] + _bom_graph_stats["redis_hits"]
+	return dict(
+		_bom_graph_stats,
+		lookups=lookups,
+		hit_ratio=round(hits / lookups, 4) if lookups else 0.0,
+		lru_entries=len(_bom_graph_lru),
+	)
+
+
+def _fabric_qty_from_bom(bom_name, fabric_item_code, lamination_so_qty):
+	"""Lamination SO qty (FG) -> required fabric qty using BOM line qty / BOM quantity."""
+	return _bom_child_qty(bom_name, fabric_item_code, lamination_so_qty)
 
 
 def _resolve_lamination_bom(item_code):
@@ -642,44 +794,15 @@ def _resolve_lamination_bom(item_code):
 	ic = (item_code or "").strip()
 	if not ic:
 		return None
-
-	def _pick_bom_for_item(it_code):
-		bn = frappe.db.get_value(
-			"BOM",
-			{"item": it_code, "docstatus": 1, "is_active": 1, "is_default": 1},
-			"name",
-			order_by="modified desc",
-		)
-		if not bn:
-			bn = frappe.db.get_value(
-				"BOM",
-				{"item": it_code, "docstatus": 1, "is_active": 1},
-				"name",
-				order_by="is_default desc, modified desc",
-			)
-		return bn
-
-	bom_name = _pick_bom_for_item(ic)
-	if not bom_name and frappe.db.exists("Item", ic):
-		tmpl = frappe.db.get_value("Item", ic, "variant_of")
-		if tmpl:
-			bom_name = _pick_bom_for_item(tmpl)
+	bom_name = _default_bom_for_item(ic, template_fallback=True)
 	if not bom_name:
 		return None
-	return frappe.get_doc("BOM", bom_name)
+	return frappe.get_cached_doc("BOM", bom_name)
 
 
 def _child_qty_from_bom(bom_name, child_item_code, parent_so_qty):
 	"""Generic BOM child quantity calculator based on parent FG SO qty."""
-	bom = frappe.get_doc("BOM", bom_name)
-	fg_qty = flt(bom.quantity) or 1.0
-	if fg_qty <= 0:
-		fg_qty = 1.0
-	parent_so_qty = flt(parent_so_qty) or 0
-	for row in bom.items or []:
-		if (row.item_code or "").strip() == (child_item_code or "").strip():
-			return flt(parent_so_qty) * flt(row.qty) / fg_qty
-	return parent_so_qty
+	return _bom_child_qty(bom_name, child_item_code, parent_so_qty)
 
 
 def _is_bopp_parent_107(item_code: str) -> bool:
@@ -688,67 +811,7 @@ def _is_bopp_parent_107(item_code: str) -> bool:
 	1) leading numeric process stream (e.g. 107xxxx...)
 	2) hyphen pattern (e.g. 7425-1071000950)
 	"""
-	ic = str(item_code or "").strip()
-	if not ic:
-		return False
-	if _item_process_prefix(ic) == "107":
-		return True
-	try:
-		m = re.search(r"-(\d{3})", ic)
-		if m and m.group(1) == "107":
-			return True
-	except Exception:
-		pass
-	return False
-
-
-# 107 decoding MUST match production_entry.production_planning.scheduler_api exactly.
-# Otherwise regenerate will show wrong GSMs vs creation (your current issue: C->20, M->30, etc.).
-_LAM_GSM_SUFFIX_MAP_SUB = {"A": 10, "B": 12, "C": 13, "D": 15, "E": 20, "F": 30}
-_LAMINATION_QUALITY_BY_CODE_SUB = {
-	"A": "PREMIUM",
-	"B": "PLATINUM",
-	"C": "SUPER PLATINUM",
-	"D": "GOLD",
-	"E": "SILVER",
-	"F": "BRONZE",
-	"G": "CLASSIC",
-	"H": "SUPER CLASSIC",
-	"I": "LIFE STYLE",
-	"J": "ECO SPECIAL",
-	"K": "ECO GREEN",
-	"L": "SUPER ECO",
-	"M": "ULTRA",
-	"N": "DELUXE",
-	"O": "VIRGIN MIX - GOLD MIX",
-	"P": "MID MIX - CLASSIC MIX",
-	"Q": "ECO MIX",
-	"R": "DELUXE MIX",
-}
-_LAMINATION_FABRIC_GSM_BY_CODE_SUB = {
-	"A": 20,
-	"B": 25,
-	"C": 30,
-	"D": 35,
-	"E": 40,
-	"F": 45,
-	"G": 50,
-	"H": 55,
-	"I": 60,
-	"J": 65,
-	"K": 70,
-	"L": 75,
-	"M": 80,
-	"N": 85,
-	"O": 90,
-	"P": 95,
-	"Q": 100,
-	"R": 105,
-	"S": 110,
-	"T": 115,
-	"U": 120,
-}
-_LAMINATION_BOPP_GSM_BY_CODE_SUB = {"A": 10, "B": 12, "C": 15, "D": 30}
+	return decode_item_code(item_code).is_bopp_107
 
 
 def _parse_107_item_code(item_code):
@@ -760,108 +823,35 @@ def _parse_107_item_code(item_code):
 	colour_code, fabric_gsm_code, fabric_gsm, bopp_gsm_code, bopp_gsm,
 	lam_gsm_code, lam_gsm, width_code, width_inch, finish_matte_glossy, finish_metallic_cooler.
 	Returns {} when the code does not match any known pattern.
+	Decode tables live in production_scheduler.item_codes (kept in step with production_entry).
 	"""
-	code = re.sub(r"\s+", "", str(item_code or "").strip().upper())
-	if not code:
-		return {}
-
-	def _row_from_groups(design, gd):
-		width_code = gd.get("width") or ""
-		width_inch = 0.0
-		if width_code.isdigit():
-			wl = len(width_code)
-			if wl == 4:
-				width_inch = flt(width_code) / 25.4
-			elif wl == 3:
-				width_inch = flt(width_code) / 10.0
-		qc = (gd.get("quality") or "").strip().upper()
-		lam_letter = (gd.get("lam") or "").strip().upper()
-		lam_val = cint(_LAM_GSM_SUFFIX_MAP_SUB.get(lam_letter, 0) or 0)
-		fab_letter = (gd.get("fabric") or "").strip().upper()
-		bopp_letter = (gd.get("bopp") or "").strip().upper()
-		return {
-			"design_code": design or "",
-			"process": "107",
-			"quality_code": qc,
-			"quality_name": _LAMINATION_QUALITY_BY_CODE_SUB.get(qc, ""),
-			"colour_code": gd.get("colour") or "",
-			"fabric_gsm_code": fab_letter,
-			"fabric_gsm": cint(_LAMINATION_FABRIC_GSM_BY_CODE_SUB.get(fab_letter, 0) or 0),
-			"bopp_gsm_code": bopp_letter,
-			"bopp_gsm": cint(_LAMINATION_BOPP_GSM_BY_CODE_SUB.get(bopp_letter, 0) or 0),
-			"lam_gsm_code": lam_letter,
-			"lam_gsm": lam_val,
-			"width_code": width_code,
-			"width_inch": width_inch,
-			"finish_matte_glossy": gd.get("finish1") or "0",
-			"finish_metallic_cooler": gd.get("finish2") or "0",
-		}
+	return decode_item_code(item_code).bopp_107_dict()
 
-	m = re.match(
-		r"^(?P<design>[A-Z0-9]+)-(?P<process>107)(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{3})(?P<finish1>\d)(?P<finish2>\d)$",
-		code,
-	)
-	if m:
-		return _row_from_groups((m.group("design") or "").strip().upper(), m.groupdict())
-	mw = re.match(
-		r"^(?P<design>[A-Z0-9]+)-(?P<process>107)(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{4})(?P<finish1>[A-Z0-9])(?P<finish2>[A-Z0-9])$",
-		code,
-	)
-	if mw:
-		return _row_from_groups((mw.group("design") or "").strip().upper(), mw.groupdict())
-	m2 = re.match(r"^(?P<design>[A-Z0-9]+)-(?P<process>107)(?P<body>\d+)$", code)
-	if m2:
-		return {
-			"design_code": m2.group("design") or "",
-			"process": "107",
-			"quality_code": "",
-			"quality_name": "",
-			"colour_code": "",
-			"fabric_gsm_code": "",
-			"fabric_gsm": 0,
-			"bopp_gsm_code": "",
-			"bopp_gsm": 0,
-			"lam_gsm_code": "",
-			"lam_gsm": 0,
-			"width_code": "",
-			"width_inch": 0.0,
-			"finish_matte_glossy": "0",
-			"finish_metallic_cooler": "0",
-		}
-	pos = code.find("-107")
-	if pos > 0:
-		design = re.sub(r"[^A-Z0-9]", "", code[:pos])
-		tail = code[pos + 4:]
-		m3 = re.match(
-			r"^(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{3})(?P<finish1>\d)(?P<finish2>\d)$",
-			tail,
-		)
-		if m3 and design:
-			return _row_from_groups(design, m3.groupdict())
-		m4 = re.match(
-			r"^(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{4})(?P<finish1>[A-Z0-9])(?P<finish2>[A-Z0-9])$",
-			tail,
-		)
-		if m4 and design:
-			return _row_from_groups(design, m4.groupdict())
-	return {}
+
+PB_DESIGN_NAME_FIELDS = (
+	"custom_design_name",
+	"custom_pb_design_name",
+	"custom_style_name",
+	"custom_print_design",
+	"design_name",
+)
 
 
 def _pb_design_name_from_sales_order_item(so_item_name):
 	"""Optional human design name from Sales Order Item custom fields (site-specific)."""
+	row = _prefetched_sales_order_item(so_item_name)
+	if row is not None:
+		for fn in PB_DESIGN_NAME_FIELDS:
+			if (row.get(fn) or "").strip():
+				return (row.get(fn) or "").strip()
+		return ""
 	if not so_item_name or not frappe.db.exists("Sales Order Item", so_item_name):
 		return ""
 	try:
 		meta = frappe.get_meta("Sales Order Item")
 	except Exception:
 		return ""
-	for fn in (
-		"custom_design_name",
-		"custom_pb_design_name",
-		"custom_style_name",
-		"custom_print_design",
-		"design_name",
-	):
+	for fn in PB_DESIGN_NAME_FIELDS:
 		try:
 			if meta.has_field(fn):
 				v = frappe.db.get_value("Sales Order Item", so_item_name, fn)
@@ -880,7 +870,7 @@ def _planning_row_dict_107_lamination_extras(item_code, parsed107_early, sales_o
 	p107r = parsed107_early or (_parse_107_item_code(item_code) or {})
 	mg = (p107r.get("finish_matte_glossy") or "").strip() or "0"
 	mc = (p107r.get("finish_metallic_cooler") or "").strip() or "0"
-	if frappe.db.has_column("Planning Table", "custom_finishing") or frappe.db.has_column(
+	if _has_column("Planning Table", "custom_finishing") or frappe.db.has_column(
 		"Planning sheet Item", "custom_finishing"
 	):
 		out["custom_finishing"] = f"{mg}/{mc}"
@@ -901,21 +891,21 @@ def _planning_row_dict_107_lamination_extras(item_code, parsed107_early, sales_o
 		except Exception:
 			wt = ""
 		if wt and (
-			frappe.db.has_column("Planning Table", "custom_white_tint")
+			_has_column("Planning Table", "custom_white_tint")
 			or frappe.db.has_column("Planning sheet Item", "custom_white_tint")
 		):
 			out["custom_white_tint"] = wt
 
 	bgv = cint(p107r.get("bopp_gsm") or 0)
 	if bgv > 0 and (
-		frappe.db.has_column("Planning Table", "custom_bopp_gsm")
+		_has_column("Planning Table", "custom_bopp_gsm")
 		or frappe.db.has_column("Planning sheet Item", "custom_bopp_gsm")
 	):
 		out["custom_bopp_gsm"] = bgv
 
 	lgv = cint(p107r.get("lam_gsm") or 0)
 	if lgv > 0 and (
-		frappe.db.has_column("Planning Table", "custom_lam_gsm")
+		_has_column("Planning Table", "custom_lam_gsm")
 		or frappe.db.has_column("Planning sheet Item", "custom_lam_gsm")
 	):
 		out["custom_lam_gsm"] = lgv
@@ -933,26 +923,13 @@ def _get_bopp_child_items_from_parent_item(parent_item_code):
 		frappe.throw(_("Parent item code is missing for BOPP extraction."))
 	if not _is_bopp_parent_107(item_code):
 		frappe.throw(_("BOPP parent item must contain process code 107. Got: {0}").format(item_code))
-	if not frappe.db.exists("Item", item_code):
+	if not _bom_graph_item(item_code)["exists"]:
 		frappe.throw(_("Item {0} does not exist.").format(item_code))
 
-	bom_name = frappe.db.get_value(
-		"BOM",
-		{"item": item_code, "docstatus": 1, "is_active": 1, "is_default": 1},
-		"name",
-		order_by="modified desc",
-	)
-	if not bom_name:
-		bom_name = frappe.db.get_value(
-			"BOM",
-			{"item": item_code, "docstatus": 1, "is_active": 1},
-			"name",
-			order_by="is_default desc, modified desc",
-		)
+	bom_name = _default_bom_for_item(item_code)
 	if not bom_name:
 		frappe.throw(_("No active submitted BOM for BOPP item {0}.").format(item_code))
 
-	bom = frappe.get_doc("BOM", bom_name)
 	fabric_codes = []
 	pb_short = []
 	pb_long = []
@@ -961,8 +938,7 @@ def _get_bopp_child_items_from_parent_item(parent_item_code):
 	_m107 = re.match(r"^([A-Z0-9]+)-107", str(item_code or "").strip().upper())
 	if _m107:
 		_design_u = (_m107.group(1) or "").strip().upper()
-	for row in bom.items or []:
-		ic = str(row.item_code or "").strip()
+	for ic, _qty in (_bom_graph_bom(bom_name) or {}).get("items") or ():
 		ic_u = ic.upper()
 		if len(ic) >= 3 and ic[:3] == "100":
 			fabric_codes.append(ic)
@@ -1065,635 +1041,358 @@ def _specs_from_nonfabric_child_item(child_ic, so_it, parent_row):
 	}
 
 
-def _sync_bopp_child_planning_rows(planning_sheet_name):
-	"""For each SO line with process-107 parent, append child 100 + PB rows to both planning tables. Idempotent."""
-	if not planning_sheet_name:
-		return
-	if not frappe.db.exists("Planning sheet", planning_sheet_name):
-		return
-	ps = frappe.get_doc("Planning sheet", planning_sheet_name)
-	if not ps.get("sales_order"):
-		return
-	so = frappe.get_doc("Sales Order", ps.sales_order)
-	parent_field = _get_pt_parentfield()
-	changed = False
-
-	for so_it in so.items or []:
-		parent_ic = (so_it.item_code or "").strip()
-		if not _is_bopp_parent_107(parent_ic):
-			continue
-		trace_id = _parent_child_trace_id_from_item_code(parent_ic)
-		try:
-			res = _get_bopp_child_items_from_parent_item(parent_ic)
-		except Exception as e:
-			frappe.log_error(
-				title="BOPP BOM child extraction",
-				message=f"SO {so.name} line {so_it.name}: {e}\n{frappe.get_traceback()}",
-			)
-			frappe.msgprint(
-				_("BOPP child rows skipped for {0}: {1}").format(parent_ic, str(e)),
-				indicator="orange",
-			)
-			continue
+class _BomChildSync:
+	"""
+	One Planning sheet + Sales Order load shared by every BOM child-row handler.
+	Handlers append new child rows (written by a single save) and queue column fixes on existing
+	rows (one batched UPDATE, mirrored on the loaded rows so that save cannot revert them).
+	Per-item BOM resolutions are memoized for the run; BOM lines come from the BOM graph cache.
+	"""
 
-		parent_match = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "sales_order_item": so_it.name, "item_code": parent_ic},
-			fields=["name"],
-			limit=1,
+	def __init__(self, ps, so, resolved=None):
+		self.ps = ps
+		self.so = so
+		self.parent_field = _get_pt_parentfield()
+		self.has_items_table = hasattr(ps, "items") or ps.meta.has_field("items")
+		self.rows_by_child = {}
+		self.rows_by_parent = {}
+		for row in ps.get(self.parent_field) or []:
+			self._index(row)
+		self.updates = {}
+		self.appended = 0
+		# Bulk creation passes one dict for the whole batch, so each item's BOM is resolved once.
+		self._resolved = {} if resolved is None else resolved
+
+	def _index(self, row):
+		# (child item_code, so_item) -> fabric / PB row; (sales_order_item, item_code) -> parent row
+		self.rows_by_child.setdefault((row.get("item_code"), row.get("so_item")), row)
+		self.rows_by_parent.setdefault((row.get("sales_order_item"), row.get("item_code")), row)
+
+	def existing_child(self, child_ic, so_item):
+		return self.rows_by_child.get((child_ic, so_item))
+
+	def parent_row(self, so_item, item_code):
+		return self.rows_by_parent.get((so_item, item_code))
+
+	def resolve(self, resolver, item_code):
+		"""resolver(item_code) once per item -> (result, error, traceback)."""
+		key = (resolver, item_code)
+		if key not in self._resolved:
+			try:
+				self._resolved[key] = (resolver(item_code), None, "")
+			except Exception as e:
+				self._resolved[key] = (None, e, frappe.get_traceback())
+		return self._resolved[key]
+
+	def bom_line_qty(self, bom_no, child_ic, parent_qty):
+		"""Parent FG SO qty -> child qty (BOM graph cache)."""
+		return _bom_child_qty(bom_no, child_ic, parent_qty)
+
+	def queue_update(self, row, updates):
+		if not updates:
+			return
+		for col, val in updates.items():
+			row.set(col, val)
+		self.updates.setdefault(row.name, {}).update(updates)
+
+	def append(self, row):
+		if self.has_items_table:
+			self.ps.append("items", dict(row))
+		self._index(self.ps.append(self.parent_field, dict(row)))
+		self.appended += 1
+
+	def flush(self):
+		if self.updates:
+			_bulk_update_by_name("Planning Table", self.updates)
+		if self.appended:
+			self.ps.flags.ignore_permissions = True
+			self.ps.save()
+		if self.updates or self.appended:
+			frappe.db.commit()
+
+
+def _bom_child_row(sync, so_it, child_ic, child_qty, specs, unit, trace_id):
+	"""New Planning Table child row (legacy items get a copy) for a parent SO line."""
+	ps = sync.ps
+	row = {
+		"sales_order_item": so_it.name,
+		"item_code": child_ic,
+		"item_name": frappe.db.get_value("Item", child_ic, "item_name") or "",
+		"qty": child_qty,
+		"uom": so_it.uom,
+		"gsm": specs["gsm"],
+		"width_inch": specs["width_inch"],
+		"color": specs["color"],
+		"quality": specs["quality"],
+		"custom_quality": specs["custom_quality"],
+		"unit": unit,
+		"meter": specs["meter"],
+		"meter_per_roll": specs["meter_per_roll"],
+		"no_of_rolls": specs["no_of_rolls"],
+		"weight_per_roll": specs["weight_per_roll"],
+		"planned_date": getdate(ps.ordered_date) if _is_white_color(specs.get("color") or "") else None,
+		"plan_name": ps.get("custom_plan_name"),
+		"party_code": ps.party_code,
+		"planning_sheet": ps.name,
+		"so_item": so_it.name,
+	}
+	_set_trace_id_if_supported(row, trace_id)
+	if _has_column("Planning Table", "split_from"):
+		row["split_from"] = ""
+	return row
+
+
+def _bom_child_fabric_row_fixes(row, so_item, trace_id=None):
+	"""Existing child-100 row: keep it linked to its parent SO line, with independent placement."""
+	updates = {}
+	if _has_column("Planning Table", "sales_order_item") and not row.get("sales_order_item"):
+		updates["sales_order_item"] = so_item
+	if trace_id and _has_column("Planning Table", "custom_parent_child_trace_id"):
+		if not str(row.get("custom_parent_child_trace_id") or "").strip():
+			updates["custom_parent_child_trace_id"] = trace_id
+	# Child 100 rows must not inherit parent source/split lineage.
+	if _has_column("Planning Table", "split_from") and str(row.get("split_from") or "").strip():
+		updates["split_from"] = ""
+	if _has_column("Planning Table", "source_item"):
+		cur_src = str(row.get("source_item") or "").strip()
+		# source_item must point to Planning sheet Item; clear stale board-row links.
+		if cur_src and frappe.db.exists("Planning Table", cur_src) and not frappe.db.exists("Planning sheet Item", cur_src):
+			updates["source_item"] = ""
+	return updates
+
+
+def _bom_child_sync_fabric(sync, so_it, parent_ic, resolver, label, indicator="orange", title=None, fill_trace=False):
+	"""
+	Shared 104 / 103 / 251 / 102 flow: resolve the 100* fabric child from the parent's BOM, then fix
+	the existing fabric row or append a new one. Returns (new_row, parent_row) so callers can adjust.
+	"""
+	trace_id = _parent_child_trace_id_from_item_code(parent_ic)
+	res, err, tb = sync.resolve(resolver, parent_ic)
+	if err is not None:
+		frappe.log_error(
+			title=f"{label} fabric BOM",
+			message=f"SO {sync.so.name} line {so_it.name}: {err}\n{tb}",
 		)
-		parent_pt_name = parent_match[0].get("name") if parent_match else None
-		parent_row = frappe.get_doc("Planning Table", parent_pt_name) if parent_pt_name else None
-		if parent_row and trace_id:
-			_set_trace_id_if_supported(parent_row, trace_id)
-
-		for child_ic in [res.get("fabric_item_code"), res.get("pb_item_code")]:
-			child_ic = str(child_ic or "").strip()
-			if not child_ic:
-				continue
-			child_qty = _child_qty_from_bom(res["bom_no"], child_ic, flt(so_it.qty))
-			existing = frappe.get_all(
-				"Planning Table",
-				filters={"parent": ps.name, "item_code": child_ic, "so_item": so_it.name},
-				pluck="name",
-				limit=1,
-			)
-			if existing:
-				updates = {}
-				if frappe.db.has_column("Planning Table", "sales_order_item"):
-					cur_soi = frappe.db.get_value("Planning Table", existing[0], "sales_order_item")
-					if not cur_soi:
-						updates["sales_order_item"] = so_it.name
-				if trace_id and frappe.db.has_column("Planning Table", "custom_parent_child_trace_id"):
-					cur_tr = str(frappe.db.get_value("Planning Table", existing[0], "custom_parent_child_trace_id") or "").strip()
-					if not cur_tr:
-						updates["custom_parent_child_trace_id"] = trace_id
-				# PB child should inherit parent design name (same as creation flow).
-				if str(child_ic or "").strip().upper().startswith("PB-") and frappe.db.has_column("Planning Table", "custom_design_name"):
-					cur_dn = str(frappe.db.get_value("Planning Table", existing[0], "custom_design_name") or "").strip()
-					if not cur_dn:
-						dn = _pb_design_name_from_sales_order_item(so_it.name)
-						if dn:
-							updates["custom_design_name"] = dn
-				if updates:
-					frappe.db.set_value("Planning Table", existing[0], updates, update_modified=False)
-				continue
-
-			if child_ic.startswith("100"):
-				specs = _fabric_row_specs_from_fabric_item(child_ic, so_it, parent_row)
-			else:
-				specs = _specs_from_nonfabric_child_item(child_ic, so_it, parent_row)
-			child_item_name = frappe.db.get_value("Item", child_ic, "item_name") or ""
-			child_unit = compute_default_production_unit(specs.get("color") or "", flt(specs.get("width_inch") or 0), child_ic)
-			child_planned_date = getdate(ps.ordered_date) if _is_white_color(specs.get("color") or "") else None
-
-			row = {
-				"sales_order_item": so_it.name,
-				"item_code": child_ic,
-				"item_name": child_item_name,
-				"qty": child_qty,
-				"uom": so_it.uom,
-				"gsm": specs["gsm"],
-				"width_inch": specs["width_inch"],
-				"color": specs["color"],
-				"quality": specs["quality"],
-				"custom_quality": specs["custom_quality"],
-				"unit": child_unit,
-				"meter": specs["meter"],
-				"meter_per_roll": specs["meter_per_roll"],
-				"no_of_rolls": specs["no_of_rolls"],
-				"weight_per_roll": specs["weight_per_roll"],
-				"planned_date": child_planned_date,
-				"plan_name": ps.get("custom_plan_name"),
-				"party_code": ps.party_code,
-				"planning_sheet": ps.name,
-				"so_item": so_it.name,
-			}
-			# PB child should inherit design name (same label as parent).
-			if str(child_ic or "").strip().upper().startswith("PB-") and frappe.db.has_column("Planning Table", "custom_design_name"):
-				dn_new = _pb_design_name_from_sales_order_item(so_it.name)
-				if dn_new:
-					row["custom_design_name"] = dn_new
-			_set_trace_id_if_supported(row, trace_id)
-			if frappe.db.has_column("Planning Table", "split_from"):
-				row["split_from"] = ""
-
-			row_b = dict(row)
-			if hasattr(ps, "items") or ps.meta.has_field("items"):
-				ps.append("items", row_b)
-			ps.append(parent_field, dict(row))
-			changed = True
-
-	if changed:
-		ps.flags.ignore_permissions = True
-		ps.save()
-		frappe.db.commit()
-
-
-def _sync_lamination_fabric_planning_rows(planning_sheet_name):
-	"""For each SO line with item 104, append one fabric (100) row to legacy items + board table. Idempotent."""
-	if not LAMINATION_FLOW_ENABLED or not planning_sheet_name:
-		return
-	if not frappe.db.exists("Planning sheet", planning_sheet_name):
-		return
-	ps = frappe.get_doc("Planning sheet", planning_sheet_name)
-	if not ps.get("sales_order"):
-		return
-	so = frappe.get_doc("Sales Order", ps.sales_order)
-	parent_field = _get_pt_parentfield()
-	changed = False
-	for so_it in so.items or []:
-		lam_ic = (so_it.item_code or "").strip()
-		if _item_process_prefix(lam_ic) != "104":
-			continue
-		trace_id = _parent_child_trace_id_from_item_code(lam_ic)
-		# Pre-check BOM before calling the thrower, so we can give a specific red message
-		_bom_104 = _resolve_lamination_bom(lam_ic)
-		if not _bom_104:
-			_any_bom_104 = frappe.db.get_value("BOM", {"item": lam_ic}, "name", order_by="modified desc")
-			if _any_bom_104:
-				_ds_104, _ia_104 = frappe.db.get_value("BOM", _any_bom_104, ["docstatus", "is_active"]) or (None, None)
-				frappe.msgprint(
-					_(
-						"BOM <b>{0}</b> found for <b>{1}</b> but it is not active/submitted "
-						"(docstatus={2}, is_active={3}). "
-						"Please <b>Submit</b> the BOM and set it as <b>Default</b>, then click Sync BOM Children."
-					).format(_any_bom_104, lam_ic, _ds_104, _ia_104),
-					indicator="red",
-					title=_("BOM Not Active (104)"),
-				)
-			else:
-				frappe.msgprint(
-					_(
-						"No BOM found for <b>{0}</b> (104 lamination item). "
-						"Please create a BOM with one 100* fabric child item, submit it, and set as Default."
-					).format(lam_ic),
-					indicator="red",
-					title=_("BOM Missing (104)"),
-				)
-			frappe.log_error(
-				title="104 BOM missing",
-				message=f"SO {so.name} line {so_it.name}: no active submitted BOM for 104 item {lam_ic}",
-			)
-			continue
-		try:
-			res = get_fabric_item_from_laminated_item(lam_ic)
-		except Exception as e:
-			frappe.log_error(
-				title="Lamination fabric BOM",
-				message=f"SO {so.name} line {so_it.name}: {e}\n{frappe.get_traceback()}",
+		msg_kwargs = {"indicator": indicator}
+		if title:
+			msg_kwargs["title"] = title
+		frappe.msgprint(_("{0} fabric row skipped for {1}: {2}").format(label, parent_ic, str(err)), **msg_kwargs)
+		return None, None
+
+	fabric_ic = res["fabric_item_code"]
+	existing = sync.existing_child(fabric_ic, so_it.name)
+	if existing:
+		sync.queue_update(existing, _bom_child_fabric_row_fixes(existing, so_it.name, trace_id if fill_trace else None))
+		return None, None
+
+	parent_row = sync.parent_row(so_it.name, parent_ic)
+	if parent_row and trace_id:
+		_set_trace_id_if_supported(parent_row, trace_id)
+	specs = _fabric_row_specs_from_fabric_item(fabric_ic, so_it, parent_row)
+	unit = compute_default_production_unit(specs.get("color") or "", flt(specs.get("width_inch")))
+	fabric_qty = sync.bom_line_qty(res["bom_no"], fabric_ic, flt(so_it.qty))
+	return _bom_child_row(sync, so_it, fabric_ic, fabric_qty, specs, unit, trace_id), parent_row
+
+
+def _bom_child_sync_lamination(sync, so_it):
+	"""104: one fabric (100) row per lamination SO line; red message when the BOM is missing / inactive."""
+	lam_ic = (so_it.item_code or "").strip()
+	# Pre-check BOM before calling the thrower, so we can give a specific red message
+	if not _resolve_lamination_bom(lam_ic):
+		_any_bom_104 = frappe.db.get_value("BOM", {"item": lam_ic}, "name", order_by="modified desc")
+		if _any_bom_104:
+			_ds_104, _ia_104 = frappe.db.get_value("BOM", _any_bom_104, ["docstatus", "is_active"]) or (None, None)
+			frappe.msgprint(
+				_(
+					"BOM <b>{0}</b> found for <b>{1}</b> but it is not active/submitted "
+					"(docstatus={2}, is_active={3}). "
+					"Please <b>Submit</b> the BOM and set it as <b>Default</b>, then click Sync BOM Children."
+				).format(_any_bom_104, lam_ic, _ds_104, _ia_104),
+				indicator="red",
+				title=_("BOM Not Active (104)"),
 			)
+		else:
 			frappe.msgprint(
-				_("Lamination fabric row skipped for {0}: {1}").format(lam_ic, str(e)),
+				_(
+					"No BOM found for <b>{0}</b> (104 lamination item). "
+					"Please create a BOM with one 100* fabric child item, submit it, and set as Default."
+				).format(lam_ic),
 				indicator="red",
-				title=_("BOM Extraction Error"),
+				title=_("BOM Missing (104)"),
 			)
-			continue
-		fabric_ic = res["fabric_item_code"]
-		bom_no = res["bom_no"]
-		fabric_qty = _fabric_qty_from_bom(bom_no, fabric_ic, flt(so_it.qty))
-
-		existing = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "item_code": fabric_ic, "so_item": so_it.name},
-			pluck="name",
-			limit=1,
+		frappe.log_error(
+			title="104 BOM missing",
+			message=f"SO {sync.so.name} line {so_it.name}: no active submitted BOM for 104 item {lam_ic}",
 		)
-		if existing:
-			# Keep existing child-100 row linked to its parent SO line for board visibility.
-			updates = {}
-			if frappe.db.has_column("Planning Table", "sales_order_item"):
-				cur_soi = frappe.db.get_value("Planning Table", existing[0], "sales_order_item")
-				if not cur_soi:
-					updates["sales_order_item"] = so_it.name
-			# Child 100 rows must keep independent placement; do not inherit parent source/split lineage.
-			if frappe.db.has_column("Planning Table", "split_from"):
-				cur_sf = str(frappe.db.get_value("Planning Table", existing[0], "split_from") or "").strip()
-				if cur_sf:
-					updates["split_from"] = ""
-			if frappe.db.has_column("Planning Table", "source_item"):
-				cur_src = str(frappe.db.get_value("Planning Table", existing[0], "source_item") or "").strip()
-				# source_item must point to Planning sheet Item; clear stale board-row links.
-				if cur_src and frappe.db.exists("Planning Table", cur_src) and not frappe.db.exists("Planning sheet Item", cur_src):
-					updates["source_item"] = ""
-			if updates:
-				frappe.db.set_value("Planning Table", existing[0], updates, update_modified=False)
-			continue
-
-		lam_match = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "sales_order_item": so_it.name, "item_code": lam_ic},
-			fields=["name"],
-			limit=1,
-		)
-		lam_pt_name = lam_match[0].get("name") if lam_match else None
-		lam_row = frappe.get_doc("Planning Table", lam_pt_name) if lam_pt_name else None
-		if lam_row and trace_id:
-			_set_trace_id_if_supported(lam_row, trace_id)
-
-		fabric_item_name = frappe.db.get_value("Item", fabric_ic, "item_name") or ""
-		specs = _fabric_row_specs_from_fabric_item(fabric_ic, so_it, lam_row)
-		fab_color = specs.get("color") or ""
-		fab_width = flt(specs.get("width_inch"))
-		fabric_unit = compute_default_production_unit(fab_color, fab_width)
-		fabric_planned_date = getdate(ps.ordered_date) if _is_white_color(fab_color) else None
-
-		# Pull lam side from SO item
-		so_item_lam_side = ""
-		if frappe.db.has_column("Sales Order Item", "custom_lamination_side"):
-			so_item_lam_side = (getattr(so_it, "custom_lamination_side", None) or "").strip()
-
-		row = {
-			"sales_order_item": so_it.name,
-			"item_code": fabric_ic,
-			"item_name": fabric_item_name,
-			"qty": fabric_qty,
-			"uom": so_it.uom,
-			"gsm": specs["gsm"],
-			"width_inch": specs["width_inch"],
-			"color": specs["color"],
-			"quality": specs["quality"],
-			"custom_quality": specs["custom_quality"],
-			"unit": fabric_unit,
-			"meter": specs["meter"],
-			"meter_per_roll": specs["meter_per_roll"],
-			"no_of_rolls": specs["no_of_rolls"],
-			"weight_per_roll": specs["weight_per_roll"],
-			"planned_date": fabric_planned_date,
-			"plan_name": ps.get("custom_plan_name"),
-			"party_code": ps.party_code,
-			"planning_sheet": ps.name,
-			"so_item": so_it.name,
-		}
-		_set_trace_id_if_supported(row, trace_id)
-		if frappe.db.has_column("Planning Table", "split_from"):
-			row["split_from"] = ""
+		return
+	row, _parent = _bom_child_sync_fabric(
+		sync, so_it, lam_ic, get_fabric_item_from_laminated_item, "Lamination",
+		indicator="red", title=_("BOM Extraction Error"),
+	)
+	if not row:
+		return
+	# Pull lam side from SO item
+	if frappe.db.has_column("Sales Order Item", "custom_lamination_side"):
+		so_item_lam_side = (getattr(so_it, "custom_lamination_side", None) or "").strip()
 		if so_item_lam_side:
 			row["custom_lam_side_"] = so_item_lam_side
+	sync.append(row)
 
-		row_b = dict(row)
-		if hasattr(ps, "items") or ps.meta.has_field("items"):
-			ps.append("items", row_b)
-		ps.append(parent_field, dict(row))
-		changed = True
 
-	if changed:
-		ps.flags.ignore_permissions = True
-		ps.save()
-		frappe.db.commit()
+def _bom_child_sync_slitting(sync, so_it):
+	"""103: one fabric (100) row per slitting SO line."""
+	row, _parent = _bom_child_sync_fabric(sync, so_it, (so_it.item_code or "").strip(), get_fabric_item_from_slitting_item, "Slitting")
+	if row:
+		sync.append(row)
 
 
-def _sync_slitting_fabric_planning_rows(planning_sheet_name):
-	"""For each SO line with item 103, append one fabric (100) row to legacy items + board table. Idempotent."""
-	if not SLITTING_FLOW_ENABLED or not planning_sheet_name:
-		return
-	if not frappe.db.exists("Planning sheet", planning_sheet_name):
+def _sheet_cutting_fabric_resolver(item_code):
+	return _get_fabric_item_from_process_item(item_code, expected_process="251", process_label="Sheet Cutting")
+
+
+def _bom_child_sync_sheet_cutting(sync, so_it):
+	"""251: one fabric (100) row per sheet cutting SO line, split from the parent row."""
+	row, parent_row = _bom_child_sync_fabric(
+		sync, so_it, (so_it.item_code or "").strip(), _sheet_cutting_fabric_resolver, "Sheet Cutting",
+		title=_("Sheet Cutting BOM skipped"), fill_trace=True,
+	)
+	if not row:
 		return
-	ps = frappe.get_doc("Planning sheet", planning_sheet_name)
-	if not ps.get("sales_order"):
+	row["sales_order_item"] = ""
+	if parent_row and parent_row.get("name") and _has_column("Planning Table", "split_from"):
+		row["split_from"] = parent_row.name
+	sync.append(row)
+
+
+def _bom_child_sync_rewinding(sync, so_it):
+	"""102: one fabric (100) row per rewinding SO line."""
+	row, _parent = _bom_child_sync_fabric(sync, so_it, (so_it.item_code or "").strip(), get_fabric_item_from_rewinding_item, "Rewinding")
+	if row:
+		sync.append(row)
+
+
+def _bom_child_sync_bopp(sync, so_it):
+	"""107: child 100 fabric + PB rows per BOPP SO line."""
+	parent_ic = (so_it.item_code or "").strip()
+	trace_id = _parent_child_trace_id_from_item_code(parent_ic)
+	res, err, tb = sync.resolve(_get_bopp_child_items_from_parent_item, parent_ic)
+	if err is not None:
+		frappe.log_error(
+			title="BOPP BOM child extraction",
+			message=f"SO {sync.so.name} line {so_it.name}: {err}\n{tb}",
+		)
+		frappe.msgprint(
+			_("BOPP child rows skipped for {0}: {1}").format(parent_ic, str(err)),
+			indicator="orange",
+		)
 		return
-	so = frappe.get_doc("Sales Order", ps.sales_order)
-	parent_field = _get_pt_parentfield()
-	changed = False
-	for so_it in so.items or []:
-		sl_ic = (so_it.item_code or "").strip()
-		if _item_process_prefix(sl_ic) != "103":
-			continue
-		trace_id = _parent_child_trace_id_from_item_code(sl_ic)
-		try:
-			res = get_fabric_item_from_slitting_item(sl_ic)
-		except Exception as e:
-			frappe.log_error(
-				title="Slitting fabric BOM",
-				message=f"SO {so.name} line {so_it.name}: {e}\n{frappe.get_traceback()}",
-			)
-			frappe.msgprint(
-				_("Slitting fabric row skipped for {0}: {1}").format(sl_ic, str(e)),
-				indicator="orange",
-			)
-			continue
 
-		fabric_ic = res["fabric_item_code"]
-		bom_no = res["bom_no"]
-		fabric_qty = _fabric_qty_from_bom(bom_no, fabric_ic, flt(so_it.qty))
+	parent_row = sync.parent_row(so_it.name, parent_ic)
+	if parent_row and trace_id:
+		_set_trace_id_if_supported(parent_row, trace_id)
+	has_design_col = _has_column("Planning Table", "custom_design_name")
 
-		existing = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "item_code": fabric_ic, "so_item": so_it.name},
-			pluck="name",
-			limit=1,
-		)
+	for child_ic in [res.get("fabric_item_code"), res.get("pb_item_code")]:
+		child_ic = str(child_ic or "").strip()
+		if not child_ic:
+			continue
+		is_pb = child_ic.upper().startswith("PB-")
+		existing = sync.existing_child(child_ic, so_it.name)
 		if existing:
-			# Keep existing child-100 row linked to its parent SO line for board visibility.
 			updates = {}
-			if frappe.db.has_column("Planning Table", "sales_order_item"):
-				cur_soi = frappe.db.get_value("Planning Table", existing[0], "sales_order_item")
-				if not cur_soi:
-					updates["sales_order_item"] = so_it.name
-			# Child 100 rows must keep independent placement; do not inherit parent source/split lineage.
-			if frappe.db.has_column("Planning Table", "split_from"):
-				cur_sf = str(frappe.db.get_value("Planning Table", existing[0], "split_from") or "").strip()
-				if cur_sf:
-					updates["split_from"] = ""
-			if frappe.db.has_column("Planning Table", "source_item"):
-				cur_src = str(frappe.db.get_value("Planning Table", existing[0], "source_item") or "").strip()
-				# source_item must point to Planning sheet Item; clear stale board-row links.
-				if cur_src and frappe.db.exists("Planning Table", cur_src) and not frappe.db.exists("Planning sheet Item", cur_src):
-					updates["source_item"] = ""
-			if updates:
-				frappe.db.set_value("Planning Table", existing[0], updates, update_modified=False)
+			if _has_column("Planning Table", "sales_order_item") and not existing.get("sales_order_item"):
+				updates["sales_order_item"] = so_it.name
+			if trace_id and _has_column("Planning Table", "custom_parent_child_trace_id"):
+				if not str(existing.get("custom_parent_child_trace_id") or "").strip():
+					updates["custom_parent_child_trace_id"] = trace_id
+			# PB child should inherit parent design name (same as creation flow).
+			if is_pb and has_design_col and not str(existing.get("custom_design_name") or "").strip():
+				dn = _pb_design_name_from_sales_order_item(so_it.name)
+				if dn:
+					updates["custom_design_name"] = dn
+			sync.queue_update(existing, updates)
 			continue
 
-		sl_match = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "sales_order_item": so_it.name, "item_code": sl_ic},
-			fields=["name"],
-			limit=1,
-		)
-		sl_pt_name = sl_match[0].get("name") if sl_match else None
-		sl_row = frappe.get_doc("Planning Table", sl_pt_name) if sl_pt_name else None
-		if sl_row and trace_id:
-			_set_trace_id_if_supported(sl_row, trace_id)
-
-		fabric_item_name = frappe.db.get_value("Item", fabric_ic, "item_name") or ""
-		specs = _fabric_row_specs_from_fabric_item(fabric_ic, so_it, sl_row)
-		fab_color = specs.get("color") or ""
-		fab_width = flt(specs.get("width_inch"))
-		fabric_unit = compute_default_production_unit(fab_color, fab_width)
-		fabric_planned_date = getdate(ps.ordered_date) if _is_white_color(fab_color) else None
-
-		row = {
-			"sales_order_item": so_it.name,
-			"item_code": fabric_ic,
-			"item_name": fabric_item_name,
-			"qty": fabric_qty,
-			"uom": so_it.uom,
-			"gsm": specs["gsm"],
-			"width_inch": specs["width_inch"],
-			"color": specs["color"],
-			"quality": specs["quality"],
-			"custom_quality": specs["custom_quality"],
-			"unit": fabric_unit,
-			"meter": specs["meter"],
-			"meter_per_roll": specs["meter_per_roll"],
-			"no_of_rolls": specs["no_of_rolls"],
-			"weight_per_roll": specs["weight_per_roll"],
-			"planned_date": fabric_planned_date,
-			"plan_name": ps.get("custom_plan_name"),
-			"party_code": ps.party_code,
-			"planning_sheet": ps.name,
-			"so_item": so_it.name,
-		}
-		_set_trace_id_if_supported(row, trace_id)
-		if frappe.db.has_column("Planning Table", "split_from"):
-			row["split_from"] = ""
-
-		row_b = dict(row)
-		if hasattr(ps, "items") or ps.meta.has_field("items"):
-			ps.append("items", row_b)
-		ps.append(parent_field, dict(row))
-		changed = True
-
-	if changed:
-		ps.flags.ignore_permissions = True
-		ps.save()
-		frappe.db.commit()
+		if child_ic.startswith("100"):
+			specs = _fabric_row_specs_from_fabric_item(child_ic, so_it, parent_row)
+		else:
+			specs = _specs_from_nonfabric_child_item(child_ic, so_it, parent_row)
+		child_unit = compute_default_production_unit(specs.get("color") or "", flt(specs.get("width_inch") or 0), child_ic)
+		child_qty = sync.bom_line_qty(res["bom_no"], child_ic, flt(so_it.qty))
+		row = _bom_child_row(sync, so_it, child_ic, child_qty, specs, child_unit, trace_id)
+		if is_pb and has_design_col:
+			dn_new = _pb_design_name_from_sales_order_item(so_it.name)
+			if dn_new:
+				row["custom_design_name"] = dn_new
+		sync.append(row)
+
+
+# Process flows fed from parent SO lines: (process key, enabled, SO line matcher, handler).
+# Handlers run in this order, the order the former one-pass-per-process functions ran in,
+# so appended rows keep the same idx order. Add a flow by registering a handler here.
+BOM_CHILD_SYNC_HANDLERS = (
+	("104", lambda: LAMINATION_FLOW_ENABLED, lambda ic: _item_process_prefix(ic) == "104", _bom_child_sync_lamination),
+	("103", lambda: SLITTING_FLOW_ENABLED, lambda ic: _item_process_prefix(ic) == "103", _bom_child_sync_slitting),
+	("251", lambda: SHEET_CUTTING_FLOW_ENABLED, lambda ic: _item_process_prefix(ic) == "251", _bom_child_sync_sheet_cutting),
+	("107", lambda: True, _is_bopp_parent_107, _bom_child_sync_bopp),
+	("102", lambda: REWINDING_FLOW_ENABLED, lambda ic: _item_process_prefix(ic) == "102", _bom_child_sync_rewinding),
+)
+# Sales Order creation paths have never added sheet cutting rows; regenerate / sync BOM children do.
+BOM_CHILD_SYNC_SO_CREATE_PROCESSES = ("104", "103", "107", "102")
 
 
-def _sync_sheet_cutting_fabric_planning_rows(planning_sheet_name):
-	"""For each SO line with item 251, append one fabric (100) row to legacy items + board table. Idempotent."""
-	if not SHEET_CUTTING_FLOW_ENABLED or not planning_sheet_name:
-		return
-	if not frappe.db.exists("Planning sheet", planning_sheet_name):
+def _sync_bom_child_planning_rows(planning_sheet_name, processes=None):
+	"""
+	Append / repair BOM child rows for every process flow on a Planning sheet in one pass:
+	sheet, Sales Order and existing rows loaded once, one save for all new rows. Idempotent.
+	processes: optional subset of BOM_CHILD_SYNC_HANDLERS keys.
+	Inside a bulk batch the Sales Order and BOM resolutions come from PlanningSheetPrefetch.
+	"""
+	if not planning_sheet_name or not frappe.db.exists("Planning sheet", planning_sheet_name):
 		return
 	ps = frappe.get_doc("Planning sheet", planning_sheet_name)
 	if not ps.get("sales_order"):
 		return
-	so = frappe.get_doc("Sales Order", ps.sales_order)
-	parent_field = _get_pt_parentfield()
-	changed = False
-	for so_it in so.items or []:
-		sc_ic = (so_it.item_code or "").strip()
-		if _item_process_prefix(sc_ic) != "251":
-			continue
-		trace_id = _parent_child_trace_id_from_item_code(sc_ic)
-		try:
-			res = _get_fabric_item_from_process_item(sc_ic, expected_process="251", process_label="Sheet Cutting")
-		except Exception as e:
-			frappe.log_error(
-				title="Sheet Cutting fabric BOM",
-				message=f"SO {so.name} line {so_it.name}: {e}\n{frappe.get_traceback()}",
-			)
-			frappe.msgprint(
-				_("Sheet Cutting fabric row skipped for {0}: {1}").format(sc_ic, str(e)),
-				indicator="orange",
-				title=_("Sheet Cutting BOM skipped"),
-			)
-			continue
-
-		fabric_ic = res["fabric_item_code"]
-		bom_no = res["bom_no"]
-		fabric_qty = _fabric_qty_from_bom(bom_no, fabric_ic, flt(so_it.qty))
-
-		existing = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "item_code": fabric_ic, "so_item": so_it.name},
-			pluck="name",
-			limit=1,
-		)
-		if existing:
-			# Keep existing child-100 row linked to its parent SO line and ensure trace id is present.
-			updates = {}
-			if frappe.db.has_column("Planning Table", "sales_order_item"):
-				cur_soi = frappe.db.get_value("Planning Table", existing[0], "sales_order_item")
-				if not cur_soi:
-					updates["sales_order_item"] = so_it.name
-			if trace_id and frappe.db.has_column("Planning Table", "custom_parent_child_trace_id"):
-				cur_tr = str(frappe.db.get_value("Planning Table", existing[0], "custom_parent_child_trace_id") or "").strip()
-				if not cur_tr:
-					updates["custom_parent_child_trace_id"] = trace_id
-			# Child 100 rows must keep independent placement; do not inherit parent source/split lineage.
-			if frappe.db.has_column("Planning Table", "split_from"):
-				cur_sf = str(frappe.db.get_value("Planning Table", existing[0], "split_from") or "").strip()
-				if cur_sf:
-					updates["split_from"] = ""
-			if frappe.db.has_column("Planning Table", "source_item"):
-				cur_src = str(frappe.db.get_value("Planning Table", existing[0], "source_item") or "").strip()
-				if cur_src and frappe.db.exists("Planning Table", cur_src) and not frappe.db.exists("Planning sheet Item", cur_src):
-					updates["source_item"] = ""
-			if updates:
-				frappe.db.set_value("Planning Table", existing[0], updates, update_modified=False)
-				changed = True
+	prefetch = _sheet_prefetch()
+	so = prefetch.orders.get(ps.sales_order) if prefetch else None
+	sync = _BomChildSync(
+		ps,
+		so or frappe.get_doc("Sales Order", ps.sales_order),
+		resolved=prefetch.bom_resolutions if prefetch else None,
+	)
+	lines = [(so_it, (so_it.item_code or "").strip()) for so_it in sync.so.items or []]
+	for key, enabled, matches, handler in BOM_CHILD_SYNC_HANDLERS:
+		if (processes and key not in processes) or not enabled():
 			continue
+		for so_it, ic in lines:
+			if matches(ic):
+				handler(sync, so_it)
+	sync.flush()
 
-		sc_match = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "sales_order_item": so_it.name, "item_code": sc_ic},
-			fields=["name"],
-			limit=1,
-		)
-		sc_pt_name = sc_match[0].get("name") if sc_match else None
-		sc_row = frappe.get_doc("Planning Table", sc_pt_name) if sc_pt_name else None
-		if sc_row and trace_id:
-			_set_trace_id_if_supported(sc_row, trace_id)
-
-		fabric_item_name = frappe.db.get_value("Item", fabric_ic, "item_name") or ""
-		specs = _fabric_row_specs_from_fabric_item(fabric_ic, so_it, sc_row)
-		fab_color = specs.get("color") or ""
-		fab_width = flt(specs.get("width_inch"))
-		fabric_unit = compute_default_production_unit(fab_color, fab_width)
-		fabric_planned_date = getdate(ps.ordered_date) if _is_white_color(fab_color) else None
-
-		row = {
-			"sales_order_item": "",
-			"item_code": fabric_ic,
-			"item_name": fabric_item_name,
-			"qty": fabric_qty,
-			"uom": so_it.uom,
-			"gsm": specs["gsm"],
-			"width_inch": specs["width_inch"],
-			"color": specs["color"],
-			"quality": specs["quality"],
-			"custom_quality": specs["custom_quality"],
-			"unit": fabric_unit,
-			"meter": specs["meter"],
-			"meter_per_roll": specs["meter_per_roll"],
-			"no_of_rolls": specs["no_of_rolls"],
-			"weight_per_roll": specs["weight_per_roll"],
-			"planned_date": fabric_planned_date,
-			"plan_name": ps.get("custom_plan_name"),
-			"party_code": ps.party_code,
-			"planning_sheet": ps.name,
-			"so_item": so_it.name,
-		}
-		_set_trace_id_if_supported(row, trace_id)
-		if sc_pt_name and frappe.db.has_column("Planning Table", "split_from"):
-			row["split_from"] = sc_pt_name
 
-		row_b = dict(row)
-		if hasattr(ps, "items") or ps.meta.has_field("items"):
-			ps.append("items", row_b)
-		ps.append(parent_field, dict(row))
-		changed = True
+def _sync_bopp_child_planning_rows(planning_sheet_name):
+	"""For each SO line with process-107 parent, append child 100 + PB rows to both planning tables. Idempotent."""
+	_sync_bom_child_planning_rows(planning_sheet_name, processes=("107",))
 
-	if changed:
-		ps.flags.ignore_permissions = True
-		ps.save()
-		frappe.db.commit()
 
+def _sync_lamination_fabric_planning_rows(planning_sheet_name):
+	"""For each SO line with item 104, append one fabric (100) row to legacy items + board table. Idempotent."""
+	_sync_bom_child_planning_rows(planning_sheet_name, processes=("104",))
 
-def _sync_rewinding_fabric_planning_rows(planning_sheet_name):
-	"""For each SO line with item 102, append one fabric (100) row from BOM. Idempotent."""
-	if not REWINDING_FLOW_ENABLED or not planning_sheet_name:
-		return
-	if not frappe.db.exists("Planning sheet", planning_sheet_name):
-		return
-	ps = frappe.get_doc("Planning sheet", planning_sheet_name)
-	if not ps.get("sales_order"):
-		return
-	so = frappe.get_doc("Sales Order", ps.sales_order)
-	parent_field = _get_pt_parentfield()
-	changed = False
-	for so_it in so.items or []:
-		rw_ic = (so_it.item_code or "").strip()
-		if _item_process_prefix(rw_ic) != "102":
-			continue
-		trace_id = _parent_child_trace_id_from_item_code(rw_ic)
-		try:
-			res = get_fabric_item_from_rewinding_item(rw_ic)
-		except Exception as e:
-			frappe.log_error(
-				title="Rewinding fabric BOM",
-				message=f"SO {so.name} line {so_it.name}: {e}\n{frappe.get_traceback()}",
-			)
-			frappe.msgprint(
-				_("Rewinding fabric row skipped for {0}: {1}").format(rw_ic, str(e)),
-				indicator="orange",
-			)
-			continue
 
-		fabric_ic = res["fabric_item_code"]
-		bom_no = res["bom_no"]
-		fabric_qty = _fabric_qty_from_bom(bom_no, fabric_ic, flt(so_it.qty))
+def _sync_slitting_fabric_planning_rows(planning_sheet_name):
+	"""For each SO line with item 103, append one fabric (100) row to legacy items + board table. Idempotent."""
+	_sync_bom_child_planning_rows(planning_sheet_name, processes=("103",))
 
-		existing = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "item_code": fabric_ic, "so_item": so_it.name},
-			pluck="name",
-			limit=1,
-		)
-		if existing:
-			updates = {}
-			if frappe.db.has_column("Planning Table", "sales_order_item"):
-				cur_soi = frappe.db.get_value("Planning Table", existing[0], "sales_order_item")
-				if not cur_soi:
-					updates["sales_order_item"] = so_it.name
-			if frappe.db.has_column("Planning Table", "split_from"):
-				cur_sf = str(frappe.db.get_value("Planning Table", existing[0], "split_from") or "").strip()
-				if cur_sf:
-					updates["split_from"] = ""
-			if frappe.db.has_column("Planning Table", "source_item"):
-				cur_src = str(frappe.db.get_value("Planning Table", existing[0], "source_item") or "").strip()
-				if cur_src and frappe.db.exists("Planning Table", cur_src) and not frappe.db.exists("Planning sheet Item", cur_src):
-					updates["source_item"] = ""
-			if updates:
-				frappe.db.set_value("Planning Table", existing[0], updates, update_modified=False)
-			continue
 
-		rw_match = frappe.get_all(
-			"Planning Table",
-			filters={"parent": ps.name, "sales_order_item": so_it.name, "item_code": rw_ic},
-			fields=["name"],
-			limit=1,
-		)
-		rw_pt_name = rw_match[0].get("name") if rw_match else None
-		rw_row = frappe.get_doc("Planning Table", rw_pt_name) if rw_pt_name else None
-		if rw_row and trace_id:
-			_set_trace_id_if_supported(rw_row, trace_id)
-
-		fabric_item_name = frappe.db.get_value("Item", fabric_ic, "item_name") or ""
-		specs = _fabric_row_specs_from_fabric_item(fabric_ic, so_it, rw_row)
-		fab_color = specs.get("color") or ""
-		fab_width = flt(specs.get("width_inch"))
-		fabric_unit = compute_default_production_unit(fab_color, fab_width)
-		fabric_planned_date = getdate(ps.ordered_date) if _is_white_color(fab_color) else None
-
-		row = {
-			"sales_order_item": so_it.name,
-			"item_code": fabric_ic,
-			"item_name": fabric_item_name,
-			"qty": fabric_qty,
-			"uom": so_it.uom,
-			"gsm": specs["gsm"],
-			"width_inch": specs["width_inch"],
-			"color": specs["color"],
-			"quality": specs["quality"],
-			"custom_quality": specs["custom_quality"],
-			"unit": fabric_unit,
-			"meter": specs["meter"],
-			"meter_per_roll": specs["meter_per_roll"],
-			"no_of_rolls": specs["no_of_rolls"],
-			"weight_per_roll": specs["weight_per_roll"],
-			"planned_date": fabric_planned_date,
-			"plan_name": ps.get("custom_plan_name"),
-			"party_code": ps.party_code,
-			"planning_sheet": ps.name,
-			"so_item": so_it.name,
-		}
-		_set_trace_id_if_supported(row, trace_id)
-		if frappe.db.has_column("Planning Table", "split_from"):
-			row["split_from"] = ""
+def _sync_sheet_cutting_fabric_planning_rows(planning_sheet_name):
+	"""For each SO line with item 251, append one fabric (100) row to legacy items + board table. Idempotent."""
+	_sync_bom_child_planning_rows(planning_sheet_name, processes=("251",))
 
-		row_b = dict(row)
-		if hasattr(ps, "items") or ps.meta.has_field("items"):
-			ps.append("items", row_b)
-		ps.append(parent_field, dict(row))
-		changed = True
 
-	if changed:
-		ps.flags.ignore_permissions = True
-		ps.save()
-		frappe.db.commit()
+def _sync_rewinding_fabric_planning_rows(planning_sheet_name):
+	"""For each SO line with item 102, append one fabric (100) row from BOM. Idempotent."""
+	_sync_bom_child_planning_rows(planning_sheet_name, processes=("102",))
 
 
 def _force_slitting_unit_on_sheet(planning_sheet_name):
@@ -1730,7 +1429,7 @@ def _force_slitting_unit_on_sheet(planning_sheet_name):
 					""",
 					(color_name, planning_sheet_name, str(rr.get("sales_order_item") or "").strip()),
 				)
-	if frappe.db.has_column("Planning Table", "unit"):
+	if _has_column("Planning Table", "unit"):
 		frappe.db.sql(
 			"""
 			UPDATE `tabPlanning Table`
@@ -1792,7 +1491,7 @@ def _force_rewinding_unit_on_sheet(planning_sheet_name):
 	_rw_legacy_unit = (
 		" (IFNULL(TRIM(unit), '') = '' OR UPPER(TRIM(unit)) IN ('UNASSIGNED', 'MIXED')) "
 	)
-	if ordered_date and frappe.db.has_column("Planning Table", "planned_date"):
+	if ordered_date and _has_column("Planning Table", "planned_date"):
 		frappe.db.sql(
 			f"""
 			UPDATE `tabPlanning Table`
@@ -1804,6 +1503,7 @@ def _force_rewinding_unit_on_sheet(planning_sheet_name):
 			(ordered_date, planning_sheet_name),
 		)
 		updated += int((frappe.db.sql("SELECT ROW_COUNT() as c", as_dict=True)[0] or {}).get("c") or 0)
+		_sync_effective_dates(parents=[planning_sheet_name])
 	if ordered_date and frappe.db.has_column("Planning sheet Item", "planned_date"):
 		frappe.db.sql(
 			f"""
@@ -1816,7 +1516,7 @@ def _force_rewinding_unit_on_sheet(planning_sheet_name):
 			(ordered_date, planning_sheet_name),
 		)
 		updated += int((frappe.db.sql("SELECT ROW_COUNT() as c", as_dict=True)[0] or {}).get("c") or 0)
-	if frappe.db.has_column("Planning Table", "unit"):
+	if _has_column("Planning Table", "unit"):
 		frappe.db.sql(
 			f"""
 			UPDATE `tabPlanning Table`
@@ -1843,62 +1543,73 @@ def _force_rewinding_unit_on_sheet(planning_sheet_name):
 	return updated
 
 
-@frappe.whitelist()
-def backfill_parent_child_trace_ids(planning_sheet_name=None):
-	"""Backfill custom_parent_child_trace_id on parent(103/104) and child(100) rows + legacy table."""
-	if not (frappe.db.has_column("Planning Table", "custom_parent_child_trace_id") or frappe.db.has_column("Planning sheet Item", "custom_parent_child_trace_id")):
-		return {"status": "noop", "updated": 0}
-	sheet_filter = ""
-	params = []
-	if planning_sheet_name:
-		sheet_filter = " AND parent = %s "
-		params.append(planning_sheet_name)
+def _backfill_chunk_parent_child_trace_ids(sheets, report=None):
+	"""Trace ids for parent(103/104) rows of ``sheets``, then their child(100) rows and legacy rows by SO item."""
+	field = "custom_parent_child_trace_id"
+	has_field = _has_column("Planning Table", field)
 	parent_rows = frappe.db.sql(
 		f"""
-		SELECT name, parent, item_code, sales_order_item
+		SELECT name, parent, item_code, sales_order_item, {field if has_field else "''"} AS current
 		FROM `tabPlanning Table`
-		WHERE item_code REGEXP '^(103|104)' {sheet_filter}
+		WHERE parent IN %s AND item_code REGEXP '^(103|104)'
+		ORDER BY parent, idx
 		""",
-		tuple(params),
+		(tuple(sheets),),
 		as_dict=True,
 	)
-	updated = 0
+	updates = {}
+	by_so_item = {}
 	for p in parent_rows or []:
 		trace_id = _parent_child_trace_id_from_item_code(p.get("item_code"))
 		if not trace_id:
 			continue
-		frappe.db.sql(
-			"UPDATE `tabPlanning Table` SET custom_parent_child_trace_id = %s WHERE name = %s",
-			(trace_id, p.get("name")),
-		)
-		updated += 1
+		if has_field and (p.get("current") or "") != trace_id:
+			updates[p.name] = {field: trace_id}
 		so_item = (p.get("sales_order_item") or "").strip()
 		if so_item:
-			frappe.db.sql(
-				"""
-				UPDATE `tabPlanning Table`
-				SET custom_parent_child_trace_id = %s
-				WHERE parent = %s AND item_code LIKE '100%%' AND IFNULL(so_item, '') = %s
-				""",
-				(trace_id, p.get("parent"), so_item),
-			)
-	if frappe.db.has_column("Planning sheet Item", "custom_parent_child_trace_id"):
-		for p in parent_rows or []:
-			trace_id = _parent_child_trace_id_from_item_code(p.get("item_code"))
-			if not trace_id:
-				continue
-			so_item = (p.get("sales_order_item") or "").strip()
-			if so_item:
-				frappe.db.sql(
-					"""
-					UPDATE `tabPlanning sheet Item`
-					SET custom_parent_child_trace_id = %s
-					WHERE parent = %s AND IFNULL(sales_order_item, '') = %s
-					""",
-					(trace_id, p.get("parent"), so_item),
-				)
-	frappe.db.commit()
-	return {"status": "success", "updated": int(updated)}
+			by_so_item[(p.parent, so_item)] = trace_id
+	updated = len(updates)
+	if has_field and by_so_item and _has_column("Planning Table", "so_item"):
+		for c in frappe.db.sql(
+			f"""
+			SELECT name, parent, so_item, {field} AS current
+			FROM `tabPlanning Table`
+			WHERE parent IN %s AND item_code LIKE '100%%' AND IFNULL(so_item, '') != ''
+			""",
+			(tuple(sheets),),
+			as_dict=True,
+		):
+			trace_id = by_so_item.get((c.parent, c.so_item))
+			if trace_id and (c.get("current") or "") != trace_id:
+				updates[c.name] = {field: trace_id}
+	_bulk_update_by_name("Planning Table", updates)
+	if by_so_item and frappe.db.has_column("Planning sheet Item", field):
+		legacy = {}
+		for r in frappe.db.sql(
+			f"""
+			SELECT name, parent, sales_order_item, {field} AS current
+			FROM `tabPlanning sheet Item`
+			WHERE parent IN %s AND IFNULL(sales_order_item, '') != ''
+			""",
+			(tuple(sheets),),
+			as_dict=True,
+		):
+			trace_id = by_so_item.get((r.parent, r.sales_order_item))
+			if trace_id and (r.get("current") or "") != trace_id:
+				legacy[r.name] = {field: trace_id}
+		_bulk_update_by_name("Planning sheet Item", legacy)
+	return {"updated": updated}
+
+
+@frappe.whitelist()
+def backfill_parent_child_trace_ids(planning_sheet_name=None):
+	"""Backfill custom_parent_child_trace_id on parent(103/104) and child(100) rows + legacy table."""
+	if not (_has_column("Planning Table", "custom_parent_child_trace_id") or frappe.db.has_column("Planning sheet Item", "custom_parent_child_trace_id")):
+		return {"status": "noop", "updated": 0}
+	if not planning_sheet_name:
+		return _enqueue_backfill("parent_child_trace_ids")
+	counts = _run_backfill("parent_child_trace_ids", {"planning_sheet_name": planning_sheet_name})
+	return {"status": "success", "updated": cint(counts.get("updated"))}
 
 
 @frappe.whitelist()
@@ -1910,7 +1621,7 @@ def backfill_slitting_units(planning_sheet_name=None):
 		sheet_filter = " AND parent = %s "
 		params.append(planning_sheet_name)
 	updated = 0
-	if frappe.db.has_column("Planning Table", "unit"):
+	if _has_column("Planning Table", "unit"):
 		frappe.db.sql(
 			f"""
 			UPDATE `tabPlanning Table`
@@ -2054,11 +1765,11 @@ def _sync_generated_order_code_to_sales_order(so_name, party_code):
     """Write planning-sheet party code (order code) back to Sales Order."""
     if not so_name or not party_code:
         return
-    if frappe.db.has_column("Sales Order", "custom_party_code"):
+    if _has_column("Sales Order", "custom_party_code"):
         frappe.db.set_value("Sales Order", so_name, "custom_party_code", party_code, update_modified=True)
-    elif frappe.db.has_column("Sales Order", "party_code"):
+    elif _has_column("Sales Order", "party_code"):
         frappe.db.set_value("Sales Order", so_name, "party_code", party_code, update_modified=True)
-    if frappe.db.has_column("Sales Order", "custom_order_code"):
+    if _has_column("Sales Order", "custom_order_code"):
         cur_oc = frappe.db.get_value("Sales Order", so_name, "custom_order_code")
         if not (cur_oc or "").strip():
             frappe.db.set_value("Sales Order", so_name, "custom_order_code", party_code, update_modified=True)
@@ -2080,7 +1791,7 @@ def generate_party_code(doc):
     existing_party_code = None
     if so_ref:
         # 1. Look in Sales Order database
-        existing_party_code = frappe.db.get_value("Sales Order", so_ref, "custom_party_code") if frappe.db.has_column("Sales Order", "custom_party_code") else frappe.db.get_value("Sales Order", so_ref, "party_code") if frappe.db.has_column("Sales Order", "party_code") else None
+        existing_party_code = frappe.db.get_value("Sales Order", so_ref, "custom_party_code") if _has_column("Sales Order", "custom_party_code") else frappe.db.get_value("Sales Order", so_ref, "party_code") if _has_column("Sales Order", "party_code") else None
         
         # 2. Look in other Planning Sheets for the same SO
         if not existing_party_code:
@@ -2160,7 +1871,7 @@ def reset_party_code_series(clear_sales_order_mirror_fields=0):
 
     cleared_so = 0
     if clear_sales_order_mirror_fields:
-        if frappe.db.has_column("Sales Order", "custom_party_code"):
+        if _has_column("Sales Order", "custom_party_code"):
             cleared_so += frappe.db.count(
                 "Sales Order",
                 {"docstatus": ["<", 2], "custom_party_code": ["!=", ""]},
@@ -2168,11 +1879,11 @@ def reset_party_code_series(clear_sales_order_mirror_fields=0):
             frappe.db.sql(
                 "UPDATE `tabSales Order` SET custom_party_code = NULL WHERE docstatus < 2 AND IFNULL(custom_party_code, '') != ''"
             )
-        if frappe.db.has_column("Sales Order", "party_code"):
+        if _has_column("Sales Order", "party_code"):
             frappe.db.sql(
                 "UPDATE `tabSales Order` SET party_code = NULL WHERE docstatus < 2 AND IFNULL(party_code, '') != ''"
             )
-        if frappe.db.has_column("Sales Order", "custom_order_code"):
+        if _has_column("Sales Order", "custom_order_code"):
             frappe.db.sql(
                 "UPDATE `tabSales Order` SET custom_order_code = NULL WHERE docstatus < 2 AND IFNULL(custom_order_code, '') != ''"
             )
@@ -2187,6 +1898,125 @@ def reset_party_code_series(clear_sales_order_mirror_fields=0):
     }
 
 
+# ===========================
+# BOARD SNAPSHOT CACHE
+# ===========================
+# get_color_chart_data results per (dates, plan, mode, planned_only, board_process_scope) are kept
+# in Redis with the per-date board versions they were built from. Every write path that moves rows
+# reaches _touch_unit_load_days (or the Planning sheet doc event), which bumps the versions of the
+# dates it touched, so a repeated view costs one version read + one cache read; raw-SQL admin paths
+# (reverts, merges, cleanups) collect the days of the rows they change before writing and touch them
+# too. "*" is the global version (confirmations, Work Order / SPR changes, site-wide cleanups). The TTL bounds staleness from documents this
+# app does not hook (Stock Entry, Delivery Note, Production Plan).
+BOARD_SNAPSHOT_CACHE_PREFIX = "production_scheduler:board_snapshot"
+BOARD_VERSION_CACHE_KEY = "production_scheduler:board_versions"
+BOARD_VERSION_ALL = "*"
+BOARD_SNAPSHOT_TTL_SEC = 120
+# Wider windows (reports, exports) always run live.
+BOARD_SNAPSHOT_MAX_DAYS = 62
+
+
+def _board_snapshot_days(date=None, start_date=None, end_date=None):
+    """Date keys a board request reads, or None when the request should bypass the snapshot cache."""
+    if start_date and end_date:
+        start_dt, end_dt = getdate(start_date), getdate(end_date)
+        span = (end_dt - start_dt).days
+        if span < 0 or span >= BOARD_SNAPSHOT_MAX_DAYS:
+            return None
+        return [str(frappe.utils.add_days(start_dt, n)) for n in range(span + 1)]
+    if date:
+        return sorted({_load_grid_date_key(d.strip()) for d in str(date).split(",") if d.strip()}) or None
+    return None
+
+
+def _board_versions(day_keys):
+    """Version stamp for a set of dates: the global version plus one version per date (one HMGET)."""
+    cache = frappe.cache()
+    fields = [BOARD_VERSION_ALL] + list(day_keys)
+    return tuple(cache.hmget(cache.make_key(BOARD_VERSION_CACHE_KEY), fields))
+
+
+def _write_board_versions(keys):
+    cache = frappe.cache()
+    token = frappe.generate_hash(length=12)
+    for key in keys:
+        cache.hset(BOARD_VERSION_CACHE_KEY, key, token)
+
+
+def _bump_board_versions(dates=None):
+    """
+    Invalidate board snapshots for the given dates (None = every date).
+    Written now and again after the transaction commits, so a snapshot built by a concurrent
+    request from pre-commit rows cannot keep the new stamp.
+    """
+    if dates is None:
+        keys = [BOARD_VERSION_ALL]
+    else:
+        keys = sorted({_load_grid_date_key(d) for d in dates if d})
+    if not keys:
+        return
+    try:
+        _write_board_versions(keys)
+        after_commit = getattr(frappe.db, "after_commit", None)
+        if after_commit is not None:
+            after_commit.add(lambda: _write_board_versions(keys))
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Board snapshot version bump failed")
+
+
+def invalidate_board_snapshots(doc=None, method=None):
+    """Doc event (Work Order / Shaft Production Run): bump the global board version."""
+    _bump_board_versions(None)
+
+
+def _get_color_chart_data_cached(
+    date=None,
+    start_date=None,
+    end_date=None,
+    plan_name=None,
+    mode=None,
+    planned_only=0,
+    board_process_scope=None,
+):
+    """_get_color_chart_data_impl behind the board snapshot cache (pull mode always runs live)."""
+    kwargs = {
+        "date": date,
+        "start_date": start_date,
+        "end_date": end_date,
+        "plan_name": plan_name,
+        "mode": mode,
+        "planned_only": planned_only,
+        "board_process_scope": board_process_scope,
+    }
+    day_keys = None if mode == "pull" else _board_snapshot_days(date, start_date, end_date)
+    if not day_keys:
+        return _get_color_chart_data_impl(**kwargs)
+
+    import hashlib
+    signature = json.dumps(
+        [day_keys, plan_name or "", mode or "", cint(planned_only), (board_process_scope or "").strip()],
+        default=str,
+    )
+    cache_key = f"{BOARD_SNAPSHOT_CACHE_PREFIX}:{hashlib.md5(signature.encode()).hexdigest()}"
+    try:
+        cache = frappe.cache()
+        stamp = _board_versions(day_keys)
+        # expires=True: always unpickle a fresh copy (callers enrich rows in place).
+        hit = cache.get_value(cache_key, expires=True)
+        if hit and hit.get("stamp") == stamp:
+            return hit["rows"]
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Board snapshot cache read failed")
+        return _get_color_chart_data_impl(**kwargs)
+
+    rows = _get_color_chart_data_impl(**kwargs)
+    try:
+        cache.set_value(cache_key, {"stamp": stamp, "rows": rows}, expires_in_sec=BOARD_SNAPSHOT_TTL_SEC)
+    except Exception:
+        pass
+    return rows
+
+
 @frappe.whitelist()
 def get_color_chart_data(
     date=None,
@@ -2197,9 +2027,9 @@ def get_color_chart_data(
     planned_only=0,
     board_process_scope=None,
 ):
-    """Safe wrapper to avoid UI 502s; logs root cause."""
+    """Safe wrapper to avoid UI 502s; logs root cause. Served from the board snapshot cache when fresh."""
     try:
-        return _get_color_chart_data_impl(
+        return _get_color_chart_data_cached(
             date=date,
             start_date=start_date,
             end_date=end_date,
@@ -2213,6 +2043,232 @@ def get_color_chart_data(
         return []
 
 
+# ===========================
+# BOARD DELTA CHANNEL
+# ===========================
+# Write paths publish the rows they changed on BOARD_DELTA_EVENT instead of a bare
+# "production_board_update" that made every open board refetch its window. BoardDelta snapshots the
+# rows (and the unit/date slots they enter, whose idx is resequenced) before a write and diffs them
+# after it. Deltas queued in one transaction are merged per row and published once after commit,
+# stamped with a site-wide sequence; a rollback drops them. Clients patch rows in place and refetch
+# only on a sequence gap, a resync flag or a row they cannot patch (new / re-parented / re-planned).
+BOARD_DELTA_EVENT = "production_board_delta"
+BOARD_DELTA_SEQ_KEY = "production_scheduler:board_delta_seq"
+# Above this many changed rows a delta carries dates + resync only (a refetch is cheaper than a diff).
+BOARD_DELTA_MAX_ROWS = 200
+# Snapshot order; when nested writes queue the same row, the earliest snapshot's old state wins.
+_BOARD_DELTA_SNAPSHOTS = itertools.count(1)
+
+
+def _board_row_states(names=None, slots=None):
+    """
+    {row name: board state} for live (not cancelled) Planning Table rows by name and/or every row
+    in (date, unit) slots. State fields mirror the board row keys a client can patch without a refetch.
+    Slots are read as indexed date IN / unit IN filters and narrowed to the exact pairs here.
+    """
+    names = [n for n in (names or []) if n]
+    slots = [(str(d), u) for d, u in (slots or []) if d and u]
+    if not names and not slots:
+        return {}
+    eff = _pt_effective_date_sql("i")
+    code_cols = [c for c in ("custom_plan_code", "plan_name") if _has_column("Planning Table", c)]
+    plan_code = f"COALESCE({', '.join(f'NULLIF(i.{c}, %s)' for c in code_cols)}, '')" if code_cols else "''"
+    planned = "i.planned_date" if _has_column("Planning Table", "planned_date") else "NULL"
+    pb_plan = "p.custom_pb_plan_name" if _has_column("Planning sheet", "custom_pb_plan_name") else "''"
+
+    conds, params = [], [""] * len(code_cols)
+    if names:
+        conds.append("i.name IN %s")
+        params.append(tuple(names))
+    if slots:
+        conds.append(f"({eff} IN %s AND i.unit IN %s)")
+        params.append(tuple({day for day, _unit in slots}))
+        params.append(tuple({unit for _day, unit in slots}))
+    rows = frappe.db.sql(
+        f"""
+        SELECT i.name, i.parent, i.unit, {eff} AS date, {planned} AS planned_date, i.idx, i.qty,
+            {plan_code} AS plan_code, p.custom_plan_name AS plan, {pb_plan} AS pb_plan
+        FROM `tabPlanning Table` i
+        JOIN `tabPlanning sheet` p ON p.name = i.parent
+        WHERE p.docstatus < 2 AND i.docstatus < 2 AND ({" OR ".join(conds)})
+        """,
+        tuple(params),
+        as_dict=True,
+    )
+    if slots:
+        # date IN x unit IN is a superset of the pairs: keep named rows and rows in a requested slot.
+        wanted = set(names)
+        slot_keys = {(_load_grid_date_key(day), unit) for day, unit in slots}
+        rows = [r for r in rows if r.name in wanted or (_load_grid_date_key(r.date) if r.date else "", r.unit) in slot_keys]
+    return {
+        r.name: {
+            "parent": r.parent,
+            "unit": r.unit or "",
+            "date": str(r.date) if r.date else "",
+            "planned_date": str(r.planned_date) if r.planned_date else "",
+            "idx": cint(r.idx),
+            "qty": flt(r.qty),
+            "plan": r.plan or "Default",
+            "pb_plan": r.pb_plan or "",
+            "plan_code": r.plan_code or "",
+        }
+        for r in rows
+    }
+
+
+class BoardDelta:
+    """
+    Row-level diff of one write for the board delta channel::
+
+        delta = BoardDelta(names, slots=[(date, unit)], reason="update_schedule")   # before the write
+        ...write...
+        delta.publish()                                                             # before commit
+
+    ``slots`` are the unit/date columns the rows move into (their current columns are added with
+    track_slots); every row in them is diffed too, so neighbours shifted by a resequence are sent.
+    Over BOARD_DELTA_MAX_ROWS rows nothing is snapshotted and publish() sends a resync.
+    """
+
+    def __init__(self, names, slots=None, reason=None, track_slots=True):
+        self.names = list(dict.fromkeys(n for n in (names or []) if n))
+        self.reason = reason
+        self.track_slots = track_slots
+        self.slots = set()
+        self.before = {}
+        self.taken = next(_BOARD_DELTA_SNAPSHOTS)
+        self.overflow = len(self.names) > BOARD_DELTA_MAX_ROWS
+        if self.overflow:
+            return
+        try:
+            self.before = _board_row_states(self.names)
+            if track_slots:
+                self.add_slots([(s["date"], s["unit"]) for s in self.before.values()] + list(slots or []))
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "Board delta snapshot failed")
+            self.overflow = True
+
+    def add_slots(self, slots):
+        """Track more target slots; call before the write that fills them."""
+        new = {(_load_grid_date_key(d), u) for d, u in slots if d and u} - self.slots
+        if not new or self.overflow:
+            return
+        self.slots |= new
+        for name, state in _board_row_states(slots=new).items():
+            self.before.setdefault(name, state)
+
+    def publish(self, extra_names=None, dates=None):
+        """
+        Queue the changed rows for the post-commit flush. ``extra_names`` are rows created by the
+        write (splits); ``dates`` are sent with a resync when the delta overflowed.
+        Board snapshots of the touched dates are invalidated first, so a resync the delta
+        triggers on a client never gets the pre-write snapshot.
+        """
+        if self.overflow:
+            _bump_board_versions(dates)
+            _queue_board_delta([], dates, resync=True, reason=self.reason)
+            return
+        try:
+            names = set(self.before) | set(self.names) | {n for n in (extra_names or []) if n}
+            after = _board_row_states(names)
+            if self.track_slots:
+                landed = {(s["date"], s["unit"]) for s in after.values()} - self.slots
+                for name, state in _board_row_states(slots=landed).items():
+                    after.setdefault(name, state)
+            rows = []
+            for name in sorted(names | set(after)):
+                old, new = self.before.get(name), after.get(name)
+                if old != new:
+                    rows.append({"name": name, "old": old, "new": new})
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "Board delta diff failed")
+            _bump_board_versions(dates)
+            _queue_board_delta([], dates, resync=True, reason=self.reason)
+            return
+        _bump_board_versions({s["date"] for r in rows for s in (r["old"], r["new"]) if s and s.get("date")})
+        _queue_board_delta(rows, None, reason=self.reason, taken=self.taken)
+
+
+def _queue_board_delta(rows, dates=None, resync=False, reason=None, taken=0):
+    """
+    Buffer row deltas for this transaction (earliest old / latest new state per row) and flush them
+    as one event after commit. ``dates`` None with resync means every date; ``taken`` is the
+    BoardDelta snapshot the rows were diffed from.
+    """
+    buf = getattr(frappe.local, "production_scheduler_board_delta", None)
+    if buf is None:
+        buf = {"rows": {}, "taken": {}, "dates": set(), "all_dates": False, "resync": False, "reasons": set()}
+        frappe.local.production_scheduler_board_delta = buf
+        after_commit = getattr(frappe.db, "after_commit", None)
+        if after_commit is not None:
+            after_commit.add(_flush_board_delta)
+        after_rollback = getattr(frappe.db, "after_rollback", None)
+        if after_rollback is not None:
+            after_rollback.add(_drop_board_delta)
+    for row in rows:
+        name = row["name"]
+        prev = buf["rows"].get(name)
+        if prev and buf["taken"][name] <= taken:
+            row = dict(row, old=prev["old"])
+        buf["rows"][name] = row
+        buf["taken"][name] = min(taken, buf["taken"].get(name, taken))
+        for state in (row["old"], row["new"]):
+            if state and state.get("date"):
+                buf["dates"].add(state["date"])
+    if resync:
+        buf["resync"] = True
+        if dates is None:
+            buf["all_dates"] = True
+        else:
+            buf["dates"].update(_load_grid_date_key(d) for d in dates if d)
+    if reason:
+        buf["reasons"].add(reason)
+    if getattr(frappe.db, "after_commit", None) is None:
+        _flush_board_delta()
+
+
+def _drop_board_delta():
+    frappe.local.production_scheduler_board_delta = None
+
+
+def _next_board_delta_version():
+    cache = frappe.cache()
+    return cint(cache.incr(cache.make_key(BOARD_DELTA_SEQ_KEY)))
+
+
+def _flush_board_delta():
+    buf = getattr(frappe.local, "production_scheduler_board_delta", None)
+    frappe.local.production_scheduler_board_delta = None
+    if not buf:
+        return
+    rows = [r for r in buf["rows"].values() if r["old"] != r["new"]]
+    resync = buf["resync"] or len(rows) > BOARD_DELTA_MAX_ROWS
+    if not rows and not resync:
+        return
+    try:
+        # Restamp after commit, right before clients hear about it: a snapshot some request built
+        # from pre-commit rows in the meantime must not satisfy the resync this event triggers.
+        _write_board_versions([BOARD_VERSION_ALL] if buf["all_dates"] else sorted(buf["dates"]))
+        frappe.publish_realtime(
+            BOARD_DELTA_EVENT,
+            {
+                "version": _next_board_delta_version(),
+                "rows": [] if resync else rows,
+                "dates": None if buf["all_dates"] else sorted(buf["dates"]),
+                "resync": resync,
+                "reason": ",".join(sorted(buf["reasons"])),
+            },
+        )
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Board delta publish failed")
+
+
+@frappe.whitelist()
+def get_board_delta_version():
+    """Current board delta sequence; a board reads it before fetching rows and patches from there."""
+    cache = frappe.cache()
+    return cint(cache.get(cache.make_key(BOARD_DELTA_SEQ_KEY)))
+
+
 _CHILD_FABRIC_WO_TERMINAL_STATUSES = frozenset(
     {"completed", "stopped", "cancelled", "canceled", "closed", "close"}
 )
@@ -2263,7 +2319,7 @@ def get_lamination_order_table_data(
 ):
     """104-only board rows for Lamination Order Table: booking id, fabric GSM, planned meters, SPR achieved m/kg."""
     try:
-        rows = _get_color_chart_data_impl(
+        rows = _get_color_chart_data_cached(
             date=date,
             start_date=start_date,
             end_date=end_date,
@@ -2287,13 +2343,13 @@ def get_lamination_order_table_data(
         return rows
 
     fmt = ",".join(["%s"] * len(psi_names))
-    has_spr_col = frappe.db.has_column("Planning Table", "spr_name")
+    has_spr_col = _has_column("Planning Table", "spr_name")
     spr_for_meter_sql = "pt.spr_name as spr_for_meter" if has_spr_col else "'' as spr_for_meter"
-    has_ps_book_new = frappe.db.has_column("Planning sheet", "custom_lamination_order_code")
-    has_ps_book_old = frappe.db.has_column("Planning sheet", "custom_lamination_booking_id")
-    has_pt_book_new = frappe.db.has_column("Planning Table", "custom_lamination_order_code_")
-    has_pt_book_old = frappe.db.has_column("Planning Table", "custom_lamination_booking_id")
-    has_shift_col = frappe.db.has_column("Planning Table", "custom_lamination_shift")
+    has_ps_book_new = _has_column("Planning sheet", "custom_lamination_order_code")
+    has_ps_book_old = _has_column("Planning sheet", "custom_lamination_booking_id")
+    has_pt_book_new = _has_column("Planning Table", "custom_lamination_order_code_")
+    has_pt_book_old = _has_column("Planning Table", "custom_lamination_booking_id")
+    has_shift_col = _has_column("Planning Table", "custom_lamination_shift")
     booking_expr = "''"
     if has_ps_book_new and has_pt_book_new:
         booking_expr = "IFNULL(ps.custom_lamination_order_code, IFNULL(pt.custom_lamination_order_code_, ''))"
@@ -2308,12 +2364,12 @@ def get_lamination_order_table_data(
     elif has_pt_book_old:
         booking_expr = "IFNULL(pt.custom_lamination_booking_id, '')"
     shift_expr = "IFNULL(pt.custom_lamination_shift, 'DAY')" if has_shift_col else "'DAY'"
-    has_pt_lam_gsm = frappe.db.has_column("Planning Table", "custom_lam_gsm")
+    has_pt_lam_gsm = _has_column("Planning Table", "custom_lam_gsm")
     lam_gsm_expr = "IFNULL(pt.custom_lam_gsm, 0)" if has_pt_lam_gsm else "0"
-    has_trace = frappe.db.has_column("Planning Table", "custom_parent_child_trace_id")
+    has_trace = _has_column("Planning Table", "custom_parent_child_trace_id")
     trace_expr_l = "IFNULL(pt.custom_parent_child_trace_id, '')" if has_trace else "''"
     child_trace_expr_l = "IFNULL(fab.custom_parent_child_trace_id, '')" if has_trace else "''"
-    has_pt_spr_lm = frappe.db.has_column("Planning Table", "spr_name")
+    has_pt_spr_lm = _has_column("Planning Table", "spr_name")
     child_spr_lm = "IFNULL(fab.spr_name, '')" if has_pt_spr_lm else "''"
     fabric_pick_sql = _sql_correlated_pick_one_fabric_name("pt")
 
@@ -2437,10 +2493,10 @@ def get_lamination_order_table_data(
             fabric_progress[key] = empty
             return empty
 
-        has_so_item = frappe.db.has_column("Planning Table", "sales_order_item")
-        has_custom_so_item = frappe.db.has_column("Planning Table", "custom_sales_order_item")
-        has_pt_trace_col = frappe.db.has_column("Planning Table", "custom_parent_child_trace_id")
-        achieved_expr = "IFNULL(actual_production_weight_kgs, 0)" if frappe.db.has_column("Planning Table", "actual_production_weight_kgs") else "0"
+        has_so_item = _has_column("Planning Table", "sales_order_item")
+        has_custom_so_item = _has_column("Planning Table", "custom_sales_order_item")
+        has_pt_trace_col = _has_column("Planning Table", "custom_parent_child_trace_id")
+        achieved_expr = "IFNULL(actual_production_weight_kgs, 0)" if _has_column("Planning Table", "actual_production_weight_kgs") else "0"
         child_pp_fields = _psi_production_plan_fields()
         child_pp_select = (
             ", " + ", ".join([f"IFNULL({f}, '') as {f}" for f in child_pp_fields])
@@ -2697,7 +2753,7 @@ def get_slitting_order_table_data(
     Includes parent-child trace id and child fabric readiness date from linked fabric SPR run date.
     """
     try:
-        rows = _get_color_chart_data_impl(
+        rows = _get_color_chart_data_cached(
             date=date,
             start_date=start_date,
             end_date=end_date,
@@ -2729,12 +2785,12 @@ def get_slitting_order_table_data(
         return rows
     fmt = ",".join(["%s"] * len(psi_names))
 
-    has_shift = frappe.db.has_column("Planning Table", "custom_slitting_shift")
+    has_shift = _has_column("Planning Table", "custom_slitting_shift")
     shift_expr = "IFNULL(pt.custom_slitting_shift, 'DAY')" if has_shift else "'DAY'"
-    has_trace = frappe.db.has_column("Planning Table", "custom_parent_child_trace_id")
+    has_trace = _has_column("Planning Table", "custom_parent_child_trace_id")
     trace_expr = "IFNULL(pt.custom_parent_child_trace_id, '')" if has_trace else "''"
     child_trace_expr = "IFNULL(fab.custom_parent_child_trace_id, '')" if has_trace else "''"
-    has_pt_spr = frappe.db.has_column("Planning Table", "spr_name")
+    has_pt_spr = _has_column("Planning Table", "spr_name")
     spr_parent_expr = "IFNULL(pt.spr_name, '')" if has_pt_spr else "''"
     spr_child_expr = "IFNULL(fab.spr_name, '')" if has_pt_spr else "''"
     fabric_pick_sql_s = _sql_correlated_pick_one_fabric_name("pt")
@@ -2839,7 +2895,7 @@ def get_rewinding_order_table_data(
     102-only rows for Rewinding Order Table (same enrichment as slitting table).
     """
     try:
-        rows = _get_color_chart_data_impl(
+        rows = _get_color_chart_data_cached(
             date=date,
             start_date=start_date,
             end_date=end_date,
@@ -2872,12 +2928,12 @@ def get_rewinding_order_table_data(
         return rows
     fmt = ",".join(["%s"] * len(psi_names))
 
-    has_shift = frappe.db.has_column("Planning Table", "custom_slitting_shift")
+    has_shift = _has_column("Planning Table", "custom_slitting_shift")
     shift_expr = "IFNULL(pt.custom_slitting_shift, 'DAY')" if has_shift else "'DAY'"
-    has_trace = frappe.db.has_column("Planning Table", "custom_parent_child_trace_id")
+    has_trace = _has_column("Planning Table", "custom_parent_child_trace_id")
     trace_expr = "IFNULL(pt.custom_parent_child_trace_id, '')" if has_trace else "''"
     child_trace_expr = "IFNULL(fab.custom_parent_child_trace_id, '')" if has_trace else "''"
-    has_pt_spr = frappe.db.has_column("Planning Table", "spr_name")
+    has_pt_spr = _has_column("Planning Table", "spr_name")
     spr_parent_expr = "IFNULL(pt.spr_name, '')" if has_pt_spr else "''"
     spr_child_expr = "IFNULL(fab.spr_name, '')" if has_pt_spr else "''"
     fabric_pick_sql_s = _sql_correlated_pick_one_fabric_name("pt")
@@ -2973,79 +3029,177 @@ def get_rewinding_order_table_data(
     return out
 
 
+# High-water mark (SPR `modified`) of the incremental SPR weight sync. Kept in Redis, not in site
+# defaults (writing those clears the site-wide defaults cache); when it is missing the next pass
+# simply covers every SPR.
+SPR_WEIGHT_SYNC_WATERMARK_KEY = "production_scheduler:spr_weight_synced_upto"
+SPR_PRODUCED_WEIGHT_FIELDS = ("total_produced_weight", "custom_total_produced_weight", "produced_qty")
+
+
+def _spr_produced_weight_column():
+    spr_cols = _table_columns("Shaft Production Run") or []
+    return next((c for c in SPR_PRODUCED_WEIGHT_FIELDS if c in spr_cols), None)
+
+
+def _get_spr_weight_watermark():
+    return frappe.cache().get_value(SPR_WEIGHT_SYNC_WATERMARK_KEY)
+
+
+def _set_spr_weight_watermark(upto):
+    frappe.cache().set_value(SPR_WEIGHT_SYNC_WATERMARK_KEY, str(upto))
+
+
+def _spr_sync_filter(spr_names=None, since=None, upto=None, unsynced_rows=False):
+    """
+    WHERE fragment + params selecting the submitted SPRs a sync pass covers (alias s).
+    unsynced_rows (needs Planning Table joined as i): also rows with no weight yet, whatever the
+    SPR's `modified` - rows linked to an SPR after it was synced.
+    """
+    conds = ["s.docstatus = 1"]
+    params = []
+    if spr_names:
+        conds.append("s.name IN %s")
+        params.append(tuple(spr_names))
+    if since and unsynced_rows:
+        conds.append("(s.modified > %s OR IFNULL(i.actual_production_weight_kgs, 0) = 0)")
+        params.append(since)
+    elif since:
+        conds.append("s.modified > %s")
+        params.append(since)
+    if upto:
+        conds.append("s.modified <= %s")
+        params.append(upto)
+    return " AND ".join(conds), params
+
+
+def _sheets_for_sprs(where, params):
+    """Planning sheets that can link to the selected SPRs (rows already on them, or via their Production Plan)."""
+    sheets = set(frappe.db.sql_list(f"""
+        SELECT DISTINCT i.parent
+        FROM `tabPlanning Table` i
+        JOIN `tabShaft Production Run` s ON s.name = i.spr_name
+        WHERE {where}
+    """, tuple(params)) or [])
+    if not _has_column("Shaft Production Run", "production_plan"):
+        return sheets
+    plans = [p for p in frappe.db.sql_list(f"""
+        SELECT DISTINCT s.production_plan FROM `tabShaft Production Run` s
+        WHERE {where} AND IFNULL(s.production_plan, '') != ''
+    """, tuple(params)) or [] if p]
+    if not plans:
+        return sheets
+    for col in ("custom_production_plan", "production_plan"):
+        if _has_column("Planning sheet", col):
+            sheets.update(frappe.get_all("Planning sheet", filters={col: ["in", plans]}, pluck="name") or [])
+    for col in ("custom_planning_sheet", "planning_sheet"):
+        if _has_column("Production Plan", col):
+            sheets.update(v for v in (frappe.get_all("Production Plan", filters={"name": ["in", plans]}, pluck=col) or []) if v)
+    return sheets
+
+
+def _sync_spr_weights(spr_names=None, since=None, upto=None):
+    """
+    Copy SPR produced weight onto every linked Planning Table row with one UPDATE ... JOIN.
+    Only submitted SPRs with a positive weight, and only rows whose value differs. With ``since``,
+    rows still without a weight are covered too, so a row linked to an already-synced SPR gets it.
+    Returns (spr_count, rows_changed).
+    """
+    produced_col = _spr_produced_weight_column()
+    where, params = _spr_sync_filter(spr_names, since, upto)
+    where += f" AND IFNULL(s.`{produced_col}`, 0) > 0"
+    spr_count = cint((frappe.db.sql(f"SELECT COUNT(*) FROM `tabShaft Production Run` s WHERE {where}", tuple(params)) or [[0]])[0][0])
+    where, params = _spr_sync_filter(spr_names, since, upto, unsynced_rows=True)
+    where += f" AND IFNULL(s.`{produced_col}`, 0) > 0"
+    frappe.db.sql(f"""
+        UPDATE `tabPlanning Table` i
+        JOIN `tabShaft Production Run` s ON s.name = i.spr_name
+        SET i.actual_production_weight_kgs = IFNULL(s.`{produced_col}`, 0)
+        WHERE {where}
+          AND NOT (i.actual_production_weight_kgs <=> IFNULL(s.`{produced_col}`, 0))
+    """, tuple(params))
+    changed = cint((frappe.db.sql("SELECT ROW_COUNT()") or [[0]])[0][0])
+    if changed:
+        _bump_board_versions(None)
+    return spr_count, changed
+
+
 @frappe.whitelist()
-def sync_spr_weight_to_lamination_table(spr_name=None):
-    """Force-refresh Planning Table fabric weights from submitted SPRs."""
+def sync_spr_weight_to_lamination_table(spr_name=None, full=1):
+    """
+    Refresh Planning Table fabric weights from submitted SPRs.
+    spr_name: that SPR only. full=1 (default) re-checks every submitted SPR; full=0 covers SPRs
+    modified since the last pass (high-water mark on SPR `modified`) plus rows without a weight.
+    """
     try:
         if not frappe.db.exists("DocType", "Shaft Production Run"):
             return {"status": "error", "message": "Shaft Production Run DocType not found"}
 
-        if not frappe.db.has_column("Planning Table", "spr_name"):
+        if not _has_column("Planning Table", "spr_name"):
             return {"status": "error", "message": "Planning Table missing spr_name"}
 
-        if not frappe.db.has_column("Planning Table", "actual_production_weight_kgs"):
-            for planning_sheet in frappe.get_all("Planning sheet", pluck="name") or []:
+        full = cint(full)
+        since = None if (spr_name or full) else _get_spr_weight_watermark()
+        # Upper bound fixed before writing, so SPRs saved during the pass are picked up next time.
+        upto = None
+        if not spr_name:
+            upto = frappe.db.sql("SELECT MAX(modified) FROM `tabShaft Production Run` WHERE docstatus = 1")[0][0]
+            if not upto:
+                return {"status": "success", "updated": 0, "message": "No submitted SPRs"}
+        spr_names = [spr_name] if spr_name else None
+
+        if not _has_column("Planning Table", "actual_production_weight_kgs"):
+            if full:
+                sheets = frappe.get_all("Planning sheet", pluck="name") or []
+            else:
+                sheets = _sheets_for_sprs(*_spr_sync_filter(spr_names, since, upto))
+            for planning_sheet in sorted(sheets):
                 try:
                     refresh_planning_sheet_spr_and_order_sheet(planning_sheet)
                 except Exception:
                     continue
+            if upto:
+                _set_spr_weight_watermark(upto)
             return {
                 "status": "success",
                 "updated": 0,
                 "message": "Planning Table does not have actual_production_weight_kgs. Refreshed Planning Table links so Lamination can fall back to Production Plan.",
             }
 
-        spr_cols = frappe.db.get_table_columns("Shaft Production Run") or []
-        produced_col = next(
-            (c for c in ["total_produced_weight", "custom_total_produced_weight", "produced_qty"] if c in spr_cols),
-            None,
-        )
-        if not produced_col:
+        if not _spr_produced_weight_column():
             return {"status": "error", "message": "Shaft Production Run missing produced-weight field"}
 
-        if spr_name:
-            spr_rows = frappe.db.sql(
-                f"""
-                SELECT name, IFNULL({produced_col}, 0) as produced_weight
-                FROM `tabShaft Production Run`
-                WHERE name = %s AND docstatus = 1
-                """,
-                (spr_name,),
-                as_dict=True,
-            )
-        else:
-            spr_rows = frappe.db.sql(
-                f"""
-                SELECT name, IFNULL({produced_col}, 0) as produced_weight
-                FROM `tabShaft Production Run`
-                WHERE docstatus = 1
-                  AND IFNULL({produced_col}, 0) > 0
-                """,
-                as_dict=True,
-            )
-
-        updated = 0
-        for spr in spr_rows or []:
-            spr_id = str(spr.get("name") or "").strip()
-            weight = flt(spr.get("produced_weight") or 0)
-            if not spr_id or weight <= 0:
-                continue
-            frappe.db.sql(
-                """
-                UPDATE `tabPlanning Table`
-                SET actual_production_weight_kgs = %s
-                WHERE spr_name = %s
-                """,
-                (weight, spr_id),
-            )
-            updated += 1
-
-        return {"status": "success", "updated": updated, "message": f"Synced {updated} SPR(s)"}
+        updated, rows_changed = _sync_spr_weights(spr_names, since, upto)
+        if upto:
+            _set_spr_weight_watermark(upto)
+        return {"status": "success", "updated": updated, "rows_changed": rows_changed, "message": f"Synced {updated} SPR(s)"}
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "sync_spr_weight_to_lamination_table")
         return {"status": "error", "message": f"Sync failed: {str(e)}"}
 
 
+def sync_spr_weights_incremental():
+    """Scheduled job (hourly): sync SPRs modified since the last high-water mark, plus rows without a weight."""
+    result = sync_spr_weight_to_lamination_table(full=0)
+    if result.get("status") == "success":
+        frappe.db.commit()
+
+
+def sync_spr_weights_full():
+    """Scheduled job (daily): full reconciliation, e.g. rows re-linked to another already-synced SPR."""
+    result = sync_spr_weight_to_lamination_table(full=1)
+    if result.get("status") == "success":
+        frappe.db.commit()
+
+
+def sync_spr_weight_on_submit(doc, method=None):
+    """Shaft Production Run on_submit: push this run's produced weight onto its Planning Table rows."""
+    try:
+        if _has_column("Planning Table", "spr_name") and _has_column("Planning Table", "actual_production_weight_kgs") and _spr_produced_weight_column():
+            _sync_spr_weights([doc.name])
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "SPR weight sync on submit failed")
+
+
 @frappe.whitelist()
 def start_lamination_parent_wo(item_name, submit_existing=0):
     """Create parent lamination WO in Draft once child fabric WO is terminal; user edits source warehouse then starts."""
@@ -3053,7 +3207,7 @@ def start_lamination_parent_wo(item_name, submit_existing=0):
     if not item_name or not frappe.db.exists("Planning Table", item_name):
         frappe.throw(_("Planning row not found."))
 
-    pt_cols = frappe.db.get_table_columns("Planning Table") or []
+    pt_cols = _table_columns("Planning Table") or []
     so_col = "sales_order_item" if "sales_order_item" in pt_cols else ("custom_sales_order_item" if "custom_sales_order_item" in pt_cols else None)
     fields = ["name", "parent", "item_code", "qty"]
     if "bom_no" in pt_cols:
@@ -3068,7 +3222,7 @@ def start_lamination_parent_wo(item_name, submit_existing=0):
 
     trace_f = ""
     qparams = [item.get("parent")]
-    if frappe.db.has_column("Planning Table", "custom_parent_child_trace_id"):
+    if _has_column("Planning Table", "custom_parent_child_trace_id"):
         ptr = str(frappe.db.get_value("Planning Table", item_name, "custom_parent_child_trace_id") or "").strip()
         if ptr:
             trace_f = " AND TRIM(IFNULL(custom_parent_child_trace_id, '')) = %s "
@@ -3086,7 +3240,7 @@ def start_lamination_parent_wo(item_name, submit_existing=0):
     )
     req_kg = sum(flt(r.get("qty") or 0) for r in (fabric_rows or []))
     ach_kg = 0.0
-    has_actual_col = frappe.db.has_column("Planning Table", "actual_production_weight_kgs")
+    has_actual_col = _has_column("Planning Table", "actual_production_weight_kgs")
     child_done = True if fabric_rows else False
     for fr in fabric_rows or []:
         if has_actual_col:
@@ -3164,7 +3318,7 @@ def assign_lamination_shift(shift_date=None, shift_label="DAY", item_name=None):
     shift_label = (shift_label or "DAY").strip().upper()
     if shift_label not in ("DAY", "NIGHT"):
         frappe.throw(_("Shift must be DAY or NIGHT."))
-    if not frappe.db.has_column("Planning Table", "custom_lamination_shift"):
+    if not _has_column("Planning Table", "custom_lamination_shift"):
         frappe.throw(_("Field custom_lamination_shift is missing on Planning Table. Please migrate."))
     if is_date_under_maintenance("Lamination Unit", str(target_date)):
         info = get_maintenance_info_on_date("Lamination Unit", str(target_date)) or {}
@@ -3177,10 +3331,10 @@ def assign_lamination_shift(shift_date=None, shift_label="DAY", item_name=None):
             )
         )
 
-    pt_date_col = "planned_date" if frappe.db.has_column("Planning Table", "planned_date") else (
-        "custom_item_planned_date" if frappe.db.has_column("Planning Table", "custom_item_planned_date") else None
+    pt_date_col = "planned_date" if _has_column("Planning Table", "planned_date") else (
+        "custom_item_planned_date" if _has_column("Planning Table", "custom_item_planned_date") else None
     )
-    has_sheet_planned = frappe.db.has_column("Planning sheet", "custom_planned_date")
+    has_sheet_planned = _has_column("Planning sheet", "custom_planned_date")
     eff_date = (
         f"CASE WHEN pt.{pt_date_col} IS NOT NULL THEN pt.{pt_date_col} ELSE COALESCE(ps.custom_planned_date, ps.ordered_date) END"
         if (has_sheet_planned and pt_date_col)
@@ -3229,7 +3383,7 @@ def assign_slitting_shift(shift_date=None, shift_label="DAY", item_name=None):
     shift_label = (shift_label or "DAY").strip().upper()
     if shift_label not in ("DAY", "NIGHT"):
         frappe.throw(_("Shift must be DAY or NIGHT."))
-    if not frappe.db.has_column("Planning Table", "custom_slitting_shift"):
+    if not _has_column("Planning Table", "custom_slitting_shift"):
         frappe.throw(_("Field custom_slitting_shift is missing on Planning Table. Please migrate."))
     if is_date_under_maintenance("Slitting Unit", str(target_date)):
         info = get_maintenance_info_on_date("Slitting Unit", str(target_date)) or {}
@@ -3242,10 +3396,10 @@ def assign_slitting_shift(shift_date=None, shift_label="DAY", item_name=None):
             )
         )
 
-    pt_date_col = "planned_date" if frappe.db.has_column("Planning Table", "planned_date") else (
-        "custom_item_planned_date" if frappe.db.has_column("Planning Table", "custom_item_planned_date") else None
+    pt_date_col = "planned_date" if _has_column("Planning Table", "planned_date") else (
+        "custom_item_planned_date" if _has_column("Planning Table", "custom_item_planned_date") else None
     )
-    has_sheet_planned = frappe.db.has_column("Planning sheet", "custom_planned_date")
+    has_sheet_planned = _has_column("Planning sheet", "custom_planned_date")
     eff_date = (
         f"CASE WHEN pt.{pt_date_col} IS NOT NULL THEN pt.{pt_date_col} ELSE COALESCE(ps.custom_planned_date, ps.ordered_date) END"
         if (has_sheet_planned and pt_date_col)
@@ -3294,7 +3448,7 @@ def assign_rewinding_shift(shift_date=None, shift_label="DAY", item_name=None):
     shift_label = (shift_label or "DAY").strip().upper()
     if shift_label not in ("DAY", "NIGHT"):
         frappe.throw(_("Shift must be DAY or NIGHT."))
-    if not frappe.db.has_column("Planning Table", "custom_slitting_shift"):
+    if not _has_column("Planning Table", "custom_slitting_shift"):
         frappe.throw(_("Field custom_slitting_shift is missing on Planning Table. Please migrate."))
     if is_date_under_maintenance(REWINDING_UNIT_L3, str(target_date)):
         info = get_maintenance_info_on_date(REWINDING_UNIT_L3, str(target_date)) or {}
@@ -3307,10 +3461,10 @@ def assign_rewinding_shift(shift_date=None, shift_label="DAY", item_name=None):
             )
         )
 
-    pt_date_col = "planned_date" if frappe.db.has_column("Planning Table", "planned_date") else (
-        "custom_item_planned_date" if frappe.db.has_column("Planning Table", "custom_item_planned_date") else None
+    pt_date_col = "planned_date" if _has_column("Planning Table", "planned_date") else (
+        "custom_item_planned_date" if _has_column("Planning Table", "custom_item_planned_date") else None
     )
-    has_sheet_planned = frappe.db.has_column("Planning sheet", "custom_planned_date")
+    has_sheet_planned = _has_column("Planning sheet", "custom_planned_date")
     eff_date = (
         f"CASE WHEN pt.{pt_date_col} IS NOT NULL THEN pt.{pt_date_col} ELSE COALESCE(ps.custom_planned_date, ps.ordered_date) END"
         if (has_sheet_planned and pt_date_col)
@@ -3410,7 +3564,7 @@ def _resolve_existing_production_plan_for_planning_sheet(sheet_name):
         return None
 
     for col in ("custom_production_plan", "production_plan", "production_plan_id", "pp_id"):
-        if frappe.db.has_column("Planning sheet", col):
+        if _has_column("Planning sheet", col):
             pp = _production_plan_usable(frappe.db.get_value("Planning sheet", sheet_name, col))
             if pp:
                 return pp
@@ -3483,7 +3637,7 @@ def _psi_production_plan_fields():
         "order_sheet",
         "custom_order_plan",
     ]
-    return [f for f in candidates if frappe.db.has_column("Planning Table", f)]
+    return [f for f in candidates if _has_column("Planning Table", f)]
 
 
 def _psi_production_plan_field():
@@ -3495,7 +3649,7 @@ def _psi_production_plan_field():
 def _psi_order_sheet_field():
     """Return optional Planning Sheet Item field used to store row-level order-sheet/PP reference."""
     for f in ["custom_order_sheet", "order_sheet", "custom_order_plan"]:
-        if frappe.db.has_column("Planning Table", f):
+        if _has_column("Planning Table", f):
             return f
     return None
 
@@ -3520,7 +3674,7 @@ def _collect_all_production_plans_for_planning_sheet(sheet_name):
         return []
     names = set()
     for col in ("custom_production_plan", "production_plan", "production_plan_id", "pp_id"):
-        if frappe.db.has_column("Planning sheet", col):
+        if _has_column("Planning sheet", col):
             v = frappe.db.get_value("Planning sheet", sheet_name, col)
             if v:
                 names.add(v)
@@ -3549,7 +3703,7 @@ def _planning_sheets_referencing_production_plan(pp_name):
         if v:
             sheets.add(v)
     for col in ("custom_production_plan", "production_plan", "production_plan_id", "pp_id"):
-        if frappe.db.has_column("Planning sheet", col):
+        if _has_column("Planning sheet", col):
             for r in frappe.get_all("Planning sheet", filters={col: pp_name}, fields=["name"]):
                 sheets.add(r.name)
     for fieldname in _psi_production_plan_fields():
@@ -3649,12 +3803,97 @@ QUAL_LIST = ["SUPER PLATINUM", "SUPER CLASSIC", "SUPER ECO", "ECO SPECIAL", "ECO
              "DELUXE", "BRONZE", "SILVER", "ULTRA", "GOLD", "UV"] + PREMIUM_SPECIAL_QUALITIES
 QUAL_LIST.sort(key=len, reverse=True)
 
-def _normalize_quality_key(text):
-    return re.sub(r"[^A-Z0-9]+", "", str(text or "").upper())
-
 COL_LIST = ["BRIGHT WHITE", "SUPER WHITE", "MILKY WHITE", "SUNSHINE WHITE", "BLEACH WHITE", "BLEACH WHITE 1.0", "BLEACH WHITE 2.0", "WHITE MIX", "WHITE","BRIGHT IVORY","CREAM 2.0", "CREAM 3.0", "CREAM 4.0", "CREAM 5.0", "GOLDEN YELLOW 4.0 SPL", "GOLDEN YELLOW 1.0", "GOLDEN YELLOW 2.0", "GOLDEN YELLOW 3.0", "GOLDEN YELLOW", "LEMON YELLOW 1.0", "LEMON YELLOW 3.0", "LEMON YELLOW", "BRIGHT ORANGE", "DARK ORANGE", "ORANGE 2.0", "PINK 7.0 DARK", "PINK 6.0 DARK", "DARK PINK", "BABY PINK", "PINK 1.0", "PINK 2.0", "PINK 3.0", "PINK 5.0", "CRIMSON RED", "RED", "LIGHT MAROON", "DARK MAROON", "MAROON 1.0", "MAROON 2.0", "BLUE 13.0 INK BLUE", "BLUE 12.0 SPL NAVY BLUE", "BLUE 11.0 NAVY BLUE", "BLUE 8.0 DARK ROYAL BLUE", "BLUE 7.0 DARK BLUE", "BLUE 6.0 ROYAL BLUE", "LIGHT PEACOCK BLUE", "PEACOCK BLUE", "LIGHT MEDICAL BLUE", "MEDICAL BLUE", "ROYAL BLUE", "NAVY BLUE", "SKY BLUE", "LIGHT BLUE", "BLUE 9.0", "BLUE 4.0", "BLUE 2.0", "BLUE 1.0", "BLUE", "PURPLE 4.0 BLACKBERRY", "PURPLE 1.0", "PURPLE 2.0", "PURPLE 3.0", "VIOLET", "VOILET", "GREEN 13.0 ARMY GREEN", "GREEN 12.0 OLIVE GREEN", "GREEN 11.0 DARK GREEN", "GREEN 10.0", "GREEN 9.0 BOTTLE GREEN", "GREEN 8.0 APPLE GREEN", "GREEN 7.0", "GREEN 6.0", "GREEN 5.0 GRASS GREEN", "GREEN 4.0", "GREEN 3.0 RELIANCE GREEN", "GREEN 2.0 TORQUISE GREEN", "GREEN 1.0 MINT", "MEDICAL GREEN", "RELIANCE GREEN", "PARROT GREEN", "GREEN", "SILVER 1.0", "SILVER 2.0", "LIGHT GREY", "DARK GREY", "GREY 1.0", "CHOCOLATE BROWN 2.0", "CHOCOLATE BROWN", "CHOCOLATE BLACK", "BROWN 3.0 DARK COFFEE", "BROWN 2.0 DARK", "BROWN 1.0", "CHIKOO 1.0", "CHIKOO 2.0", "BEIGE 1.0", "BEIGE 2.0", "BEIGE 3.0", "BEIGE 4.0", "BEIGE 5.0", "LIGHT BEIGE", "DARK BEIGE", "BEIGE MIX", "BLACK MIX", "COLOR MIX", "BLACK"]
 COL_LIST.sort(key=len, reverse=True)
 
+# ---- Item text extractor ----
+# QUAL_LIST + Quality Master names and COL_LIST compiled once per worker process and site
+# (see production_scheduler.item_text). Quality Master / Colour Master doc events bump
+# ITEM_TEXT_EXTRACTOR_VERSION_KEY and every process rebuilds on its next request.
+ITEM_TEXT_EXTRACTOR_VERSION_KEY = "production_scheduler:item_text_extractor_version"
+
+_item_text_extractors = {}
+_item_text_extractor_lock = threading.Lock()
+
+
+def _item_text_extractor_version():
+	ver = getattr(frappe.local, "production_scheduler_item_text_version", None)
+	if ver is None:
+		ver = frappe.cache().get_value(ITEM_TEXT_EXTRACTOR_VERSION_KEY) or ""
+		frappe.local.production_scheduler_item_text_version = ver
+	return ver
+
+
+def get_item_text_extractor():
+	"""The site's ItemTextExtractor, rebuilt only after a Quality Master / Colour Master change."""
+	site = getattr(frappe.local, "site", None) or ""
+	version = _item_text_extractor_version()
+	with _item_text_extractor_lock:
+		cached = _item_text_extractors.get(site)
+		if cached and cached[0] == version:
+			return cached[1]
+	qualities = list(QUAL_LIST)
+	try:
+		qualities.extend(frappe.get_all("Quality Master", pluck="name") or [])
+	except Exception:
+		pass
+	extractor = ItemTextExtractor(qualities, COL_LIST)
+	with _item_text_extractor_lock:
+		_item_text_extractors[site] = (version, extractor)
+	return extractor
+
+
+def _write_item_text_extractor_version():
+	frappe.cache().set_value(ITEM_TEXT_EXTRACTOR_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def invalidate_item_text_extractor(doc=None, method=None, *args):
+	"""Quality Master / Colour Master doc event: rebuild the extractor now and again after commit."""
+	try:
+		_write_item_text_extractor_version()
+		after_commit = getattr(frappe.db, "after_commit", None)
+		if after_commit is not None:
+			after_commit.add(_write_item_text_extractor_version)
+		frappe.local.production_scheduler_item_text_version = None
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Item text extractor invalidation failed")
+
+
+# Quality Master code columns in lookup order (newest row wins within a column).
+QUALITY_MASTER_CODE_FIELDS = ("short_code", "code", "quality_code")
+
+
+def _quality_master_code_index():
+	"""{column: {CODE: Quality Master name}}; one query per request / background job."""
+	index = getattr(frappe.local, "production_scheduler_quality_codes", None)
+	if index is None:
+		fields = [f for f in QUALITY_MASTER_CODE_FIELDS if _has_column("Quality Master", f)]
+		index = {f: {} for f in fields}
+		if fields:
+			for row in frappe.db.sql(
+				f"SELECT name, {', '.join(fields)} FROM `tabQuality Master` ORDER BY modified DESC",
+				as_dict=True,
+			):
+				for f in fields:
+					code = str(row.get(f) or "").strip().upper()
+					if code:
+						index[f].setdefault(code, row.name)
+		frappe.local.production_scheduler_quality_codes = index
+	return index
+
+
+def _quality_name_by_code(code):
+	"""Quality Master name for an item-code quality segment (short_code, then code, then quality_code)."""
+	code = str(code or "").strip().upper()
+	if not code:
+		return ""
+	index = _quality_master_code_index()
+	for field in QUALITY_MASTER_CODE_FIELDS:
+		name = (index.get(field) or {}).get(code)
+		if name:
+			return name
+	return ""
+
 
 def _parse_gsm_width_from_item_text(raw_text):
 	"""Parse GSM and width (inch) from item code + item name (same token rules as SO line populate)."""
@@ -3693,16 +3932,7 @@ def _fabric_row_specs_from_fabric_item(fabric_ic, so_it, lam_row):
 	GSM, width, colour, quality for the fabric line  from fabric Item only (never lamination row).
 	Reuses the same extraction rules as _populate_planning_sheet_items for 100* items.
 	"""
-	quality_lookup = list(QUAL_LIST)
-	try:
-		qm_names = frappe.get_all("Quality Master", pluck="name") or []
-		for qn in qm_names:
-			qn_up = str(qn or "").upper().strip()
-			if qn_up and qn_up not in quality_lookup:
-				quality_lookup.append(qn_up)
-	except Exception:
-		pass
-	quality_lookup.sort(key=len, reverse=True)
+	extractor = get_item_text_extractor()
 
 	item_name = frappe.db.get_value("Item", fabric_ic, "item_name") or ""
 	raw_txt = f"{fabric_ic} {item_name}"
@@ -3740,11 +3970,7 @@ def _fabric_row_specs_from_fabric_item(fabric_ic, so_it, lam_row):
 		q_code = item_code_str[3:6]
 		c_code = item_code_str[6:9]
 		try:
-			qual_name = (
-				frappe.db.get_value("Quality Master", {"short_code": q_code}, "name")
-				or frappe.db.get_value("Quality Master", {"code": q_code}, "name")
-				or frappe.db.get_value("Quality Master", {"quality_code": q_code}, "name")
-			)
+			qual_name = _quality_name_by_code(q_code)
 			if qual_name:
 				qual = qual_name
 		except Exception:
@@ -3757,23 +3983,10 @@ def _fabric_row_specs_from_fabric_item(fabric_ic, so_it, lam_row):
 			pass
 
 	search_text = " " + " ".join(words) + " "
-	search_norm = _normalize_quality_key(search_text)
 	if not qual:
-		for q in quality_lookup:
-			if _normalize_quality_key(q) and _normalize_quality_key(q) in search_norm:
-				qual = q
-				break
-	if not col:
-		for c in COL_LIST:
-			if (" " + c + " ") in search_text:
-				col = c
-				break
+		qual = extractor.quality(search_text)
 	if not col:
-		su = search_text.upper()
-		for c in COL_LIST:
-			if c in su:
-				col = c
-				break
+		col = extractor.colour(search_text)
 
 	line_quality = (qual or "").strip()
 	if not line_quality:
@@ -3834,16 +4047,7 @@ def _populate_planning_sheet_items(ps, doc):
             existing_items_map[_so_key].append(it)
 
     # ... [Quality Lookup Logic] ...
-    quality_lookup = list(QUAL_LIST)
-    try:
-        qm_names = frappe.get_all("Quality Master", pluck="name") or []
-        for qn in qm_names:
-            qn_up = str(qn or "").upper().strip()
-            if qn_up and qn_up not in quality_lookup:
-                quality_lookup.append(qn_up)
-    except Exception:
-        pass
-    quality_lookup.sort(key=len, reverse=True)
+    extractor = get_item_text_extractor()
     
     for it in doc.items:
         # Match all rows belonging to this SO item
@@ -3898,9 +4102,7 @@ def _populate_planning_sheet_items(ps, doc):
                 qc_107 = (parsed_107_pop.get("quality_code") or "").strip()
                 if qc_107:
                     try:
-                        qn = frappe.db.get_value("Quality Master", {"short_code": qc_107}, "name") or \
-                             frappe.db.get_value("Quality Master", {"code": qc_107}, "name") or \
-                             frappe.db.get_value("Quality Master", {"quality_code": qc_107}, "name")
+                        qn = _quality_name_by_code(qc_107)
                         if qn:
                             qual = qn
                     except Exception:
@@ -3915,9 +4117,7 @@ def _populate_planning_sheet_items(ps, doc):
             q_code = item_code_str[3:6]
             c_code = item_code_str[6:9]
             try:
-                qual_name = frappe.db.get_value("Quality Master", {"short_code": q_code}, "name") or \
-                           frappe.db.get_value("Quality Master", {"code": q_code}, "name") or \
-                           frappe.db.get_value("Quality Master", {"quality_code": q_code}, "name")
+                qual_name = _quality_name_by_code(q_code)
                 if qual_name: qual = qual_name
             except Exception: pass
             try:
@@ -3930,24 +4130,11 @@ def _populate_planning_sheet_items(ps, doc):
             col = strict_col or ""
 
         search_text = " " + " ".join(words) + " "
-        search_norm = _normalize_quality_key(search_text)
         if not qual:
-            for q in quality_lookup:
-                if _normalize_quality_key(q) and _normalize_quality_key(q) in search_norm:
-                    qual = q
-                    break
-        if not col and _item_process_prefix(item_code_str) != "103":
-            for c in COL_LIST:
-                if (" " + c + " ") in search_text:
-                    col = c
-                    break
-        # Fallback: substring match (longest-first COL_LIST) when spacing breaks " GOLDEN YELLOW " style match
+            qual = extractor.quality(search_text)
+        # Whole-word COL_LIST match first, substring fallback when spacing breaks " GOLDEN YELLOW " style match
         if not col and _item_process_prefix(item_code_str) != "103":
-            su = search_text.upper()
-            for c in COL_LIST:
-                if c in su:
-                    col = c
-                    break
+            col = extractor.colour(search_text)
 
         # Mandatory `quality` on Planning sheet Item / Planning Table (DocType requires it)
         line_quality = (qual or "").strip()
@@ -3957,11 +4144,7 @@ def _populate_planning_sheet_items(ps, doc):
             )
         if not line_quality and it.item_code:
             try:
-                line_quality = str(
-                    frappe.db.get_value("Item", it.item_code, "custom_quality")
-                    or frappe.db.get_value("Item", it.item_code, "quality")
-                    or ""
-                ).strip()
+                line_quality = _item_default_quality(it.item_code)
             except Exception:
                 line_quality = ""
         if not line_quality:
@@ -4043,26 +4226,26 @@ def _populate_planning_sheet_items(ps, doc):
             "planned_date": p_date,
             "planning_sheet": ps.name # Explicitly link for grid visibility
         }
-        if frappe.db.has_column("Planning sheet Item", "so_item") or frappe.db.has_column("Planning Table", "so_item"):
+        if frappe.db.has_column("Planning sheet Item", "so_item") or _has_column("Planning Table", "so_item"):
             psi_data["so_item"] = it.name
-        if lam_gsm > 0 and frappe.db.has_column("Planning Table", "custom_lam_gsm"):
+        if lam_gsm > 0 and _has_column("Planning Table", "custom_lam_gsm"):
             psi_data["custom_lam_gsm"] = lam_gsm
         if lam_gsm > 0 and frappe.db.has_column("Planning sheet Item", "custom_lam_gsm"):
             psi_data["custom_lam_gsm"] = lam_gsm
         if lam_side:
-            if frappe.db.has_column("Planning Table", "custom_lam_side_"):
+            if _has_column("Planning Table", "custom_lam_side_"):
                 psi_data["custom_lam_side_"] = lam_side
             if frappe.db.has_column("Planning sheet Item", "custom_lam_side"):
                 psi_data["custom_lam_side"] = lam_side
             # Also stamp header
-            if frappe.db.has_column("Planning sheet", "custom_lam_side"):
+            if _has_column("Planning sheet", "custom_lam_side"):
                 ps.custom_lam_side = lam_side
         if LAMINATION_FLOW_ENABLED and _is_107:
             for k, v in _planning_row_dict_107_lamination_extras(it.item_code, parsed_107_pop, it.name).items():
                 psi_data[k] = v
             dn = _pb_design_name_from_sales_order_item(it.name)
             if dn:
-                if frappe.db.has_column("Planning Table", "custom_design_name"):
+                if _has_column("Planning Table", "custom_design_name"):
                     psi_data["custom_design_name"] = dn
                 if frappe.db.has_column("Planning sheet Item", "custom_design_name"):
                     psi_data["custom_design_name"] = dn
@@ -4077,12 +4260,12 @@ def _populate_planning_sheet_items(ps, doc):
                 existing_psi.quality = line_quality
                 existing_psi.custom_quality = qual or line_quality
                 existing_psi.color = col
-                if lam_gsm > 0 and frappe.db.has_column("Planning Table", "custom_lam_gsm"):
+                if lam_gsm > 0 and _has_column("Planning Table", "custom_lam_gsm"):
                     existing_psi.custom_lam_gsm = lam_gsm
                 if lam_gsm > 0 and frappe.db.has_column("Planning sheet Item", "custom_lam_gsm"):
                     existing_psi.custom_lam_gsm = lam_gsm
                 if lam_side:
-                    if frappe.db.has_column("Planning Table", "custom_lam_side_"):
+                    if _has_column("Planning Table", "custom_lam_side_"):
                         existing_psi.custom_lam_side_ = lam_side
                     if frappe.db.has_column("Planning sheet Item", "custom_lam_side"):
                         existing_psi.custom_lam_side = lam_side
@@ -4181,20 +4364,97 @@ def resolve_color_name_for_planning_row(item_code, item_name, existing_color=Non
     color_from_code = _color_from_item_code_6_to_8(item_code_str)
     if color_from_code:
         return color_from_code
-    for c in COL_LIST:
-        if (" " + c + " ") in search_text:
-            return c
-    su = search_text.upper()
-    for c in COL_LIST:
-        if c in su:
-            return c
-    return ""
+    return get_item_text_extractor().colour(search_text)
+
+
+COLOUR_CODE_INDEX_CACHE_KEY = "production_scheduler:colour_code_index"
+_COLOUR_CODE_FIELDS = ["custom_color_code", "custom_colour_code", "colour_code", "color_code", "short_code", "code"]
+_COLOUR_NAME_FIELDS = ["colour_name", "custom_colour_name", "color_name", "colour", "color"]
+
+
+def _normalized_colour_code_tokens(v):
+    """Code variants used for loose matching: raw, digits, zero-stripped, zfill(3) and last 3 digits."""
+    s = str(v or "").strip()
+    if not s:
+        return set()
+    d = "".join(ch for ch in s if ch.isdigit())
+    out = {s}
+    if d:
+        out.add(d)
+        out.add(d.lstrip("0") or "0")
+        out.add((d.lstrip("0") or "0").zfill(3))
+        if len(d) >= 3:
+            out.add(d[-3:])
+    return {x.strip() for x in out if str(x or "").strip()}
+
+
+def _build_colour_code_index():
+    """
+    Token -> colour name index over Colour Master, newest `modified` first (rank 0).
+
+    Layout (JSON-safe so it can live in Redis):
+    - fields[field]["exact"]: stored code -> colour name (first/newest row wins)
+    - fields[field]["loose"]: trimmed and zero-stripped code -> [rank, colour name]
+    - tokens: every _normalized_colour_code_tokens variant across all code fields -> [rank, colour name]
+    """
+    if not frappe.db.exists("DocType", "Colour Master"):
+        return None
+    try:
+        cols = _table_columns("Colour Master")
+        code_cols = [c for c in _COLOUR_CODE_FIELDS if c in cols]
+        name_cols = [c for c in _COLOUR_NAME_FIELDS if c in cols]
+        index = {"fields": {c: {"exact": {}, "loose": {}} for c in code_cols}, "tokens": {}}
+        if not code_cols:
+            return index
+        select_cols = list(dict.fromkeys(["name"] + code_cols + name_cols))
+        rows = frappe.get_all("Colour Master", fields=select_cols, order_by="modified desc", limit_page_length=0) or []
+        for rank, rr in enumerate(rows):
+            color_name = ""
+            for ncol in name_cols:
+                if str(rr.get(ncol) or "").strip():
+                    color_name = str(rr.get(ncol)).strip()
+                    break
+            color_name = (color_name or str(rr.get("name") or "").strip()).upper()
+            if not color_name:
+                continue
+            for c in code_cols:
+                raw = rr.get(c)
+                if raw is None or str(raw).strip() == "":
+                    continue
+                field_idx = index["fields"][c]
+                field_idx["exact"].setdefault(str(raw).upper(), color_name)
+                trimmed = str(raw).strip().upper()
+                for key in (trimmed, trimmed.lstrip("0")):
+                    if key and key not in field_idx["loose"]:
+                        field_idx["loose"][key] = [rank, color_name]
+                for tok in _normalized_colour_code_tokens(raw):
+                    index["tokens"].setdefault(tok.upper(), [rank, color_name])
+        return index
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Colour code index build failed")
+        return None
+
+
+def get_colour_code_index():
+    """Colour Master code index from Redis (built on first use, cleared by invalidate_colour_code_index)."""
+    return frappe.cache().get_value(COLOUR_CODE_INDEX_CACHE_KEY, generator=_build_colour_code_index)
+
+
+def invalidate_colour_code_index(doc=None, method=None, *args):
+    """Colour Master doc event: drop the cached code index so the next lookup rebuilds it."""
+    try:
+        frappe.cache().delete_value(COLOUR_CODE_INDEX_CACHE_KEY)
+    except Exception:
+        pass
+    invalidate_item_text_extractor(doc, method, *args)
 
 
 def _get_color_by_code(color_code):
     """
     Look up color in Colour Master by color code.
     Returns the color name if found, None otherwise.
+    Served from the cached code index; match priority is per code field (exact, then
+    trimmed / zero-stripped newest row), then any normalized token across all code fields.
     """
     if not color_code:
         return None
@@ -4210,122 +4470,40 @@ def _get_color_by_code(color_code):
         z3 = color_code_num.zfill(3)
         if z3 not in candidates:
             candidates.append(z3)
-    
-    # Try multiple field names in order of preference
-    fields_to_try = ["custom_color_code", "custom_colour_code", "colour_code", "color_code", "short_code", "code"]
-    cm_cols = set(frappe.db.get_table_columns("Colour Master") or [])
-    fields_to_try = [f for f in fields_to_try if f in cm_cols]
-    
-    def _normalized_code_tokens(v):
-        s = str(v or "").strip()
-        if not s:
-            return set()
-        d = "".join(ch for ch in s if ch.isdigit())
-        out = {s}
-        if d:
-            out.add(d)
-            out.add(d.lstrip("0") or "0")
-            out.add((d.lstrip("0") or "0").zfill(3))
-            if len(d) >= 3:
-                out.add(d[-3:])
-        return {x.strip() for x in out if str(x or "").strip()}
+    candidates = [c.upper() for c in candidates]
 
-    wanted_tokens = set()
-    for c in candidates:
-        wanted_tokens |= _normalized_code_tokens(c)
+    index = get_colour_code_index()
+    if not index:
+        return None
 
-    for field in fields_to_try:
+    # Try multiple field names in order of preference
+    for field in _COLOUR_CODE_FIELDS:
+        field_idx = (index.get("fields") or {}).get(field)
+        if not field_idx:
+            continue
+        exact = field_idx.get("exact") or {}
         for code in candidates:
-            try:
-                result = frappe.db.get_value(
-                    "Colour Master",
-                    {field: code},
-                    ["name", "colour_name", "custom_colour_name", "color_name", "colour", "color"],
-                    as_dict=True
-                )
-                if result:
-                    color_name = (
-                        result.get("colour_name")
-                        or result.get("custom_colour_name")
-                        or result.get("color_name")
-                        or result.get("colour")
-                        or result.get("color")
-                        or result.get("name")
-                    )
-                    if color_name:
-                        return color_name.upper().strip()
-            except Exception:
-                pass
-        try:
-            ph = ", ".join(["%s"] * len(candidates))
-            rows = frappe.db.sql(
-                f"""
-                SELECT name, colour_name, custom_colour_name, color_name, colour, color
-                FROM `tabColour Master`
-                WHERE IFNULL(TRIM(CAST({field} AS CHAR)), '') IN ({ph})
-                   OR IFNULL(TRIM(LEADING '0' FROM TRIM(CAST({field} AS CHAR))), '') IN ({ph})
-                ORDER BY modified DESC
-                LIMIT 1
-                """,
-                tuple(candidates + candidates),
-                as_dict=True,
-            )
-            if rows:
-                rr = rows[0] or {}
-                color_name = (
-                    rr.get("colour_name")
-                    or rr.get("custom_colour_name")
-                    or rr.get("color_name")
-                    or rr.get("colour")
-                    or rr.get("color")
-                    or rr.get("name")
-                )
-                if color_name:
-                    return str(color_name).upper().strip()
-        except Exception:
-            pass
+            if code in exact:
+                return exact[code]
+        loose_hits = [field_idx["loose"][code] for code in candidates if code in (field_idx.get("loose") or {})]
+        if loose_hits:
+            return min(loose_hits)[1]
 
-    # Last-resort Python fallback for messy code formats in Colour Master.
-    try:
-        cols = set(frappe.db.get_table_columns("Colour Master") or [])
-        code_cols = [c for c in ("colour_code", "custom_colour_code", "custom_color_code", "color_code", "short_code", "code") if c in cols]
-        name_cols = [c for c in ("colour_name", "custom_colour_name", "color_name", "colour", "color") if c in cols]
-        if code_cols:
-            select_cols = list(dict.fromkeys(["name"] + code_cols + name_cols))
-            rows = frappe.get_all("Colour Master", fields=select_cols, limit_page_length=0) or []
-            for rr in rows:
-                row_tokens = set()
-                for c in code_cols:
-                    row_tokens |= _normalized_code_tokens(rr.get(c))
-                if not row_tokens.intersection(wanted_tokens):
-                    continue
-                color_name = ""
-                for ncol in ("colour_name", "custom_colour_name", "color_name", "colour", "color"):
-                    if ncol in rr and str(rr.get(ncol) or "").strip():
-                        color_name = str(rr.get(ncol)).strip()
-                        break
-                if not color_name:
-                    color_name = str(rr.get("name") or "").strip()
-                if color_name:
-                    return color_name.upper()
-    except Exception:
-        pass
+    # Last resort: any normalized token variant, newest Colour Master row first.
+    wanted_tokens = set()
+    for c in candidates:
+        wanted_tokens |= _normalized_colour_code_tokens(c)
+    tokens = index.get("tokens") or {}
+    token_hits = [tokens[t.upper()] for t in wanted_tokens if t.upper() in tokens]
+    if token_hits:
+        return min(token_hits)[1]
 
     return None
 
 
 def _color_from_item_code_6_to_8(item_code):
     """Color resolution from item-code numeric stream via Colour Master."""
-    digits = "".join(ch for ch in str(item_code or "") if ch.isdigit())
-    if len(digits) < 9:
-        return ""
-    candidates = []
-    for start in (6, 5, 7):
-        if len(digits) >= start + 3:
-            cc = digits[start:start + 3]
-            if cc and cc not in candidates:
-                candidates.append(cc)
-    for cc in candidates:
+    for cc in decode_item_code(item_code).colour_candidates:
         c_name = str(_get_color_by_code(cc) or "").strip().upper()
         if c_name:
             return c_name
@@ -4410,11 +4588,11 @@ def refresh_planning_sheet_spr_and_order_sheet(planning_sheet: str):
 
     sheet_pp = (
         frappe.db.get_value("Planning sheet", planning_sheet, "custom_production_plan")
-        if frappe.db.has_column("Planning sheet", "custom_production_plan")
+        if _has_column("Planning sheet", "custom_production_plan")
         else ""
     ) or (
         frappe.db.get_value("Planning sheet", planning_sheet, "production_plan")
-        if frappe.db.has_column("Planning sheet", "production_plan")
+        if _has_column("Planning sheet", "production_plan")
         else ""
     ) or (frappe.db.get_value("Planning sheet", planning_sheet, "order_sheet") or "")
     sheet_pp = _pick_valid_pp(sheet_pp)
@@ -4704,25 +4882,7 @@ def _strip_legacy_prefixes(name):
     Example: 'MAR-26 PLAN 1' -> 'PLAN 1'
              'MARCH W10 26 PLAN 1' -> 'PLAN 1'
     """
-    if not name or name == "Default":
-        return name
-        
-    # Pattern 1: [MONTH] W[XX] [YY] [NAME] -> (e.g. MARCH W10 26 PLAN 1)
-    p1 = re.sub(r'^[A-Z]+\s+W\d+\s+\d{2}\s+', '', name, flags=re.IGNORECASE)
-    if p1 != name:
-        return p1.strip()
-        
-    # Pattern 2: [MON]-[YY] [NAME] -> (e.g. MAR-26 PLAN 1)
-    p2 = re.sub(r'^[A-Z]{3}-\d{2}\s+', '', name, flags=re.IGNORECASE)
-    if p2 != name:
-        return p2.strip()
-        
-    # Pattern 3: [MONTH] [YY] [NAME] -> (e.g. MARCH 26 PLAN 1)
-    p3 = re.sub(r'^[A-Z]+\s+\d{2}\s+', '', name, flags=re.IGNORECASE)
-    if p3 != name:
-        return p3.strip()
-        
-    return name.strip()
+    return plan_base(name)
 
 HARD_LIMITS = {
     "Unit 1": 4.4,
@@ -4749,64 +4909,24 @@ def is_quality_allowed(unit, quality):
     return True
 
 def is_sheet_locked(sheet_name):
-    """Checks if a sheet is locked (either submitted or belongs to a locked plan)."""
+    """Checks if a sheet is locked (either submitted or belongs to a locked plan).
+    Batch callers should use locked_sheets(names)."""
     try:
-        sheet = frappe.get_doc("Planning sheet", sheet_name)
-        if sheet.docstatus != 0:
-            return True
-        
-        # Check if its plans are locked
-        cc_plan = sheet.get("custom_plan_name") or "Default"
-        
-        # We need to fetch persisted plans to check lock status
-        from production_entry.production_planning.scheduler_api import get_persisted_plans
-        
-        cc_plans = get_persisted_plans("color_chart")
-        if any(p["name"] == cc_plan and p.get("locked") for p in cc_plans):
-            return True
-            
-        return False
-                
-        return False
+        return sheet_name in locked_sheets([sheet_name])
     except Exception:
         return False
 
-# Cache for column existence check
-_planned_date_col_exists = None
 def _has_planned_date_column():
     """Check if custom_planned_date column exists on Planning sheet table."""
-    global _planned_date_col_exists
-    if _planned_date_col_exists is None:
-        try:
-            frappe.db.sql("SELECT custom_planned_date FROM `tabPlanning sheet` LIMIT 1")
-            _planned_date_col_exists = True
-        except Exception:
-            _planned_date_col_exists = False
-    return _planned_date_col_exists
+    return _has_column("Planning sheet", "custom_planned_date")
 
-_approval_status_col_exists = None
 def _has_approval_status_column():
     """Check if custom_approval_status column exists on Planning sheet table."""
-    global _approval_status_col_exists
-    if _approval_status_col_exists is None:
-        try:
-            frappe.db.sql("SELECT custom_approval_status FROM `tabPlanning sheet` LIMIT 1")
-            _approval_status_col_exists = True
-        except Exception:
-            _approval_status_col_exists = False
-    return _approval_status_col_exists
+    return _has_column("Planning sheet", "custom_approval_status")
 
-_draft_fields_exist = None
 def _has_draft_fields():
     """Check if custom_draft_planned_date/idx columns exist."""
-    global _draft_fields_exist
-    if _draft_fields_exist is None:
-        try:
-            frappe.db.sql("SELECT custom_draft_planned_date FROM `tabPlanning sheet` LIMIT 1")
-            _draft_fields_exist = True
-        except Exception:
-            _draft_fields_exist = False
-    return _draft_fields_exist
+    return _has_column("Planning sheet", "custom_draft_planned_date")
 
 def _effective_date_expr(alias="p"):
     """Returns SQL expression for effective date."""
@@ -4815,11 +4935,90 @@ def _effective_date_expr(alias="p"):
     return f"{alias}.ordered_date"
 
 
+# Planning Table.effective_date persists DATE(COALESCE(row planned_date, sheet custom_planned_date,
+# sheet ordered_date)) so board queries can filter on an index instead of the expression.
+PT_EFFECTIVE_DATE_SOURCE_SQL = "DATE(COALESCE(NULLIF(i.planned_date, ''), NULLIF(p.custom_planned_date, ''), p.ordered_date))"
+
+
+def _has_pt_effective_date():
+    return _has_column("Planning Table", "effective_date")
+
+
+def _pt_effective_date_sql(item_alias="i"):
+    """
+    SQL for a Planning Table row's effective date: the indexed column when present,
+    else the COALESCE expression (expects the sheet joined as ``p``).
+    """
+    if _has_pt_effective_date():
+        return f"{item_alias}.effective_date"
+    return PT_EFFECTIVE_DATE_SOURCE_SQL.replace("i.", f"{item_alias}.")
+
+
+def _sync_effective_dates(item_names=None, parents=None, chunk_size=500):
+    """
+    Recompute Planning Table.effective_date for the given rows and/or whole sheets after their
+    date, qty or unit inputs changed (row planned_date, sheet dates, re-parenting, edits). The old
+    and new day of every row looked at is refreshed in the unit-load summary, whether or not its
+    date moved. Returns the set of touched dates.
+    """
+    item_names = [n for n in set(item_names or []) if n]
+    parents = [n for n in set(parents or []) if n]
+    targets = [("i.name", item_names[k:k + chunk_size]) for k in range(0, len(item_names), chunk_size)]
+    targets += [("i.parent", parents[k:k + chunk_size]) for k in range(0, len(parents), chunk_size)]
+    has_eff_col = _has_pt_effective_date()
+    old_expr = "i.effective_date" if has_eff_col else "NULL"
+    updates = {}
+    dates = set()
+    for column, chunk in targets:
+        for r in frappe.db.sql(f"""
+            SELECT i.name, {old_expr} AS old_date, {PT_EFFECTIVE_DATE_SOURCE_SQL} AS new_date
+            FROM `tabPlanning Table` i
+            JOIN `tabPlanning sheet` p ON i.parent = p.name
+            WHERE {column} IN %s
+        """, (tuple(chunk),), as_dict=True):
+            dates.update(d for d in (r.old_date, r.new_date) if d)
+            if has_eff_col and str(r.old_date or "") != str(r.new_date or ""):
+                updates[r.name] = {"effective_date": r.new_date}
+    _bulk_update_by_name("Planning Table", updates)
+    _touch_unit_load_days(dates)
+    return dates
+
+
+def _item_effective_dates(item_names=None, parents=None, chunk_size=500):
+    """Effective dates the given Planning Table rows (and/or every row of the given sheets) sit on right now."""
+    item_names = [n for n in set(item_names or []) if n]
+    parents = [n for n in set(parents or []) if n]
+    targets = [("i.name", item_names[k:k + chunk_size]) for k in range(0, len(item_names), chunk_size)]
+    targets += [("i.parent", parents[k:k + chunk_size]) for k in range(0, len(parents), chunk_size)]
+    dates = set()
+    for column, chunk in targets:
+        dates.update(r[0] for r in frappe.db.sql(f"""
+            SELECT DISTINCT {_pt_effective_date_sql()}
+            FROM `tabPlanning Table` i
+            JOIN `tabPlanning sheet` p ON i.parent = p.name
+            WHERE {column} IN %s
+        """, (tuple(chunk),)) if r[0])
+    return dates
+
+
+def _backfill_effective_dates():
+    """Set-based resync of every drifted Planning Table.effective_date (backfill patch + hourly job)."""
+    if not _has_pt_effective_date():
+        return 0
+    frappe.db.sql(f"""
+        UPDATE `tabPlanning Table` i
+        JOIN `tabPlanning sheet` p ON i.parent = p.name
+        SET i.effective_date = {PT_EFFECTIVE_DATE_SOURCE_SQL}
+        WHERE NOT (i.effective_date <=> {PT_EFFECTIVE_DATE_SOURCE_SQL})
+    """)
+    return cint((frappe.db.sql("SELECT ROW_COUNT()") or [[0]])[0][0])
+
+
 def _pt_item_planned_date_column():
     """Return physical planned-date column on Planning Table (new or legacy), else None."""
-    if frappe.db.has_column("Planning Table", "planned_date"):
+    if _has_column("Planning Table", "planned_date"):
         return "planned_date"
-    if frappe.db.has_column("Planning Table", "custom_item_planned_date"):
+    if _has_column("Planning Table", "custom_item_planned_date"):
         return "custom_item_planned_date"
     return None
 
@@ -4827,10 +5026,25 @@ def get_unit_load(date, unit, plan_name=None, pb_only=0):
     """Calculates current load (in Tons) for a unit on a given date.
     Filtered per-plan so each plan has its own independent capacity.
     Uses planned_date if set, otherwise falls back to parent.
+    Reads the daily summary table once it has been built.
     """
-    # Priority: Item Date -> Sheet Date -> Sheet Ordered Date
-    eff = "COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)"
     pb_only = cint(pb_only)
+    if _unit_load_summary_ready():
+        conds = ["effective_date = %s", "unit = %s"]
+        params = [getdate(date), unit]
+        if plan_name and plan_name != "__all__":
+            conds.append("plan_name = %s")
+            params.append(_load_grid_plan_key(plan_name))
+        if pb_only:
+            conds.append("pb_flag = 1")
+        result = frappe.db.sql(
+            f"SELECT SUM(total_qty) FROM `{UNIT_LOAD_SUMMARY_TABLE}` WHERE {' AND '.join(conds)}",
+            tuple(params),
+        )
+        return flt(result[0][0]) / 1000.0 if result and result[0][0] else 0.0
+
+    # Priority: Item Date -> Sheet Date -> Sheet Ordered Date
+    eff = _pt_effective_date_sql() if _has_pt_effective_date() else "COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)"
     # Build plan filter ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ each plan is treated independently
     if plan_name and plan_name != "__all__":
         if plan_name == "Default":
@@ -4869,15 +5083,530 @@ def get_unit_load(date, unit, plan_name=None, pb_only=0):
     result = frappe.db.sql(sql, params)
     return flt(result[0][0]) / 1000.0 if result and result[0][0] else 0.0
 
-# ===========================
-# EQUIPMENT MAINTENANCE HELPERS
-# ===========================
 
-NON_BLOCKING_MAINTENANCE_TYPES = {"MESH CHANGE", "DIE CHANGE"}
+def _load_grid_date_key(value):
+    """YYYY-MM-DD key for load grid cells (accepts str / date / datetime)."""
+    if isinstance(value, str) and len(value) == 10:
+        return value
+    return str(getdate(value))
+
+
+def _load_grid_plan_key(plan_name):
+    """Blank / missing plan names are counted as 'Default' (same rule as get_unit_load)."""
+    return str(plan_name or "") or "Default"
+
+
+class UnitLoadGrid:
+    """
+    In-memory (date, unit, plan) load matrix in Tons, filled by one GROUP BY query per date window.
+
+    get() mirrors get_unit_load(date, unit, plan_name, pb_only) without a round trip:
+    - plan_name None / "__all__" sums every plan, "Default" covers blank plans, else exact plan.
+    - pb_only=1 counts only rows whose sheet has custom_planned_date (pushed to Production Board).
+    Dates outside the loaded window are fetched lazily, so long cascades stay correct.
+    add()/remove() keep the grid in step with moves planned in memory.
+    """
+
+    # Extra days fetched when a lookup falls after the loaded window (amortizes lazy loads).
+    EXTEND_DAYS = 30
+
+    def __init__(self):
+        self._cells = {}  # (date, unit, plan) -> [non_pb_tons, pb_tons]
+        self._totals = {}  # (date, unit) -> [non_pb_tons, pb_tons]
+        self._start = None
+        self._end = None
+
+    def covers(self, date):
+        if self._start is None:
+            return False
+        d = getdate(date)
+        return self._start <= d <= self._end
+
+    def load(self, start_date, end_date):
+        """Fetch the window [start_date, end_date] (only the part not already loaded)."""
+        start_dt = getdate(start_date)
+        end_dt = getdate(end_date)
+        if end_dt < start_dt:
+            start_dt, end_dt = end_dt, start_dt
+        if self._start is None:
+            self._fetch(start_dt, end_dt)
+            self._start, self._end = start_dt, end_dt
+            return self
+        if start_dt < self._start:
+            self._fetch(start_dt, frappe.utils.add_days(self._start, -1))
+            self._start = start_dt
+        if end_dt > self._end:
+            self._fetch(frappe.utils.add_days(self._end, 1), end_dt)
+            self._end = end_dt
+        return self
+
+    def _fetch(self, start_dt, end_dt):
+        if _unit_load_summary_ready():
+            rows = _unit_load_summary_rows(start_dt, end_dt)
+        else:
+            rows = _unit_load_live_rows(start_dt, end_dt)
+        for r in rows:
+            if not r.eff_date or not r.unit:
+                continue
+            self._bump(_load_grid_date_key(r.eff_date), r.unit, r.plan_key, 1 if cint(r.pb_flag) else 0, flt(r.total_qty) / 1000.0)
+
+    def _ensure(self, date_key):
+        d = getdate(date_key)
+        if self._start is None:
+            self.load(d, frappe.utils.add_days(d, self.EXTEND_DAYS))
+        elif d < self._start:
+            self.load(d, self._end)
+        elif d > self._end:
+            self.load(self._start, frappe.utils.add_days(d, self.EXTEND_DAYS))
+
+    def _bump(self, date_key, unit, plan_key, pb_flag, tons):
+        cell = self._cells.setdefault((date_key, unit, plan_key), [0.0, 0.0])
+        total = self._totals.setdefault((date_key, unit), [0.0, 0.0])
+        cell[pb_flag] += tons
+        total[pb_flag] += tons
+
+    def get(self, date, unit, plan_name=None, pb_only=0):
+        date_key = _load_grid_date_key(date)
+        self._ensure(date_key)
+        if plan_name and plan_name != "__all__":
+            bucket = self._cells.get((date_key, unit, _load_grid_plan_key(plan_name)))
+        else:
+            bucket = self._totals.get((date_key, unit))
+        if not bucket:
+            return 0.0
+        return bucket[1] if cint(pb_only) else bucket[0] + bucket[1]
+
+    def add(self, date, unit, tons, plan_name=None, pb=1):
+        """Account for `tons` landing on (date, unit, plan). pb=1 counts towards pb_only lookups."""
+        date_key = _load_grid_date_key(date)
+        self._ensure(date_key)
+        self._bump(date_key, unit, _load_grid_plan_key(plan_name), 1 if cint(pb) else 0, flt(tons))
+
+    def remove(self, date, unit, tons, plan_name=None, pb=1):
+        """Take `tons` off (date, unit, plan); never lets a bucket go below zero."""
+        date_key = _load_grid_date_key(date)
+        self._ensure(date_key)
+        pb_flag = 1 if cint(pb) else 0
+        cell = self._cells.get((date_key, unit, _load_grid_plan_key(plan_name)))
+        total = self._totals.get((date_key, unit))
+        tons = flt(tons)
+        for bucket in (cell, total):
+            if bucket:
+                bucket[pb_flag] = max(0.0, bucket[pb_flag] - tons)
+
+
+def get_unit_load_grid(start_date, end_date):
+    """One-query load matrix for a date window; see UnitLoadGrid."""
+    return UnitLoadGrid().load(start_date, end_date)
+
+
+def _bulk_update_by_name(doctype, updates, chunk_size=200):
+    """
+    Write {name: {column: value}} with one multi-row UPDATE per chunk:
+    SET col = CASE name WHEN .. THEN .. ELSE col END WHERE name IN (..).
+    Rows may carry different column sets; untouched columns keep their value.
+    """
+    pending = [(name, vals) for name, vals in (updates or {}).items() if name and vals]
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        columns = sorted({col for _name, vals in chunk for col in vals})
+        set_parts = []
+        params = []
+        for col in columns:
+            whens = []
+            for name, vals in chunk:
+                if col in vals:
+                    whens.append("WHEN %s THEN %s")
+                    params.extend([name, vals[col]])
+            set_parts.append(f"`{col}` = CASE `name` {' '.join(whens)} ELSE `{col}` END")
+        names = [name for name, _vals in chunk]
+        params.extend(names)
+        frappe.db.sql(
+            f"UPDATE `tab{doctype}` SET {', '.join(set_parts)} WHERE `name` IN ({', '.join(['%s'] * len(names))})",
+            tuple(params),
+        )
+
+# ===========================
+# DAILY UNIT LOAD SUMMARY
+# ===========================
+# Materialized (effective_date, unit, plan, pb_flag) -> tons/count table so capacity reads do not
+# scan the Planning Table x Planning sheet join on COALESCE(...). Rows for a date are recomputed
+# whenever something lands on / leaves that date (doc events + raw-SQL move paths call
+# _touch_unit_load_days). The table is created by the build_unit_load_summary patch; until
+# rebuild_unit_load_summary() has run once, readers use the live join.
+
+UNIT_LOAD_SUMMARY_TABLE = "production_unit_load_daily"
+UNIT_LOAD_SUMMARY_BUILT_KEY = "production_scheduler_unit_load_summary_built"
+
+
+def _ensure_unit_load_summary_table():
+    frappe.db.sql(f"""
+        CREATE TABLE IF NOT EXISTS `{UNIT_LOAD_SUMMARY_TABLE}` (
+            `effective_date` DATE NOT NULL,
+            `unit` VARCHAR(140) NOT NULL,
+            `plan_name` VARCHAR(140) NOT NULL,
+            `pb_flag` TINYINT NOT NULL DEFAULT 0,
+            `total_qty` DECIMAL(21,9) NOT NULL DEFAULT 0,
+            `item_count` INT NOT NULL DEFAULT 0,
+            `modified` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (`effective_date`, `unit`, `plan_name`, `pb_flag`)
+        )
+    """)
+
+
+def _unit_load_summary_ready():
+    """True once the summary has been built; memoized per request."""
+    ready = getattr(frappe.local, "production_scheduler_unit_load_ready", None)
+    if ready is None:
+        ready = bool(frappe.db.get_default(UNIT_LOAD_SUMMARY_BUILT_KEY))
+        frappe.local.production_scheduler_unit_load_ready = ready
+    return ready
+
+
+def _unit_load_live_rows(start_date=None, end_date=None, dates=None):
+    """
+    Aggregate load straight from Planning Table x Planning sheet, grouped like the summary table.
+    Filter by an explicit list of ``dates`` or by [start_date, end_date]; neither = all dates.
+    """
+    has_eff_col = _has_pt_effective_date()
+    eff = "i.effective_date" if has_eff_col else "COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)"
+    if _has_planned_date_column():
+        pb_expr = "CASE WHEN p.custom_planned_date IS NOT NULL AND p.custom_planned_date != '' THEN 1 ELSE 0 END"
+    else:
+        # Without the column get_unit_load ignores pb_only, so every row counts as PB.
+        pb_expr = "1"
+    params = {}
+    date_cond = ""
+    if dates:
+        params["dates"] = tuple(dates)
+        date_cond = f"AND {eff} IN %(dates)s"
+        if not has_eff_col:
+            # The OR over the raw columns lets MySQL use their indexes before evaluating COALESCE.
+            date_cond += " AND (i.planned_date IN %(dates)s OR p.custom_planned_date IN %(dates)s OR p.ordered_date IN %(dates)s)"
+    elif start_date and end_date:
+        params["start"] = getdate(start_date)
+        params["end"] = getdate(end_date)
+        date_cond = f"AND {eff} BETWEEN %(start)s AND %(end)s"
+    return frappe.db.sql(f"""
+        SELECT {eff} AS eff_date,
+               i.unit AS unit,
+               COALESCE(NULLIF(p.custom_plan_name, ''), 'Default') AS plan_key,
+               {pb_expr} AS pb_flag,
+               SUM(i.qty) AS total_qty,
+               COUNT(*) AS item_count
+        FROM `tabPlanning Table` i
+        JOIN `tabPlanning sheet` p ON i.parent = p.name
+        WHERE p.docstatus < 2
+          AND i.docstatus < 2
+          AND i.item_name NOT LIKE 'MIX%%'
+          AND IFNULL(i.unit, '') != ''
+          {date_cond}
+        GROUP BY eff_date, i.unit, plan_key, pb_flag
+    """, params, as_dict=True)
+
+
+def _unit_load_summary_rows(start_date, end_date):
+    """Summary rows for [start_date, end_date] in the same shape as _unit_load_live_rows."""
+    return frappe.db.sql(f"""
+        SELECT effective_date AS eff_date, unit, plan_name AS plan_key, pb_flag, total_qty, item_count
+        FROM `{UNIT_LOAD_SUMMARY_TABLE}`
+        WHERE effective_date BETWEEN %s AND %s
+    """, (getdate(start_date), getdate(end_date)), as_dict=True)
+
+
+def _insert_unit_load_rows(rows, chunk_size=500):
+    values = [
+        (r.eff_date, r.unit, r.plan_key, 1 if cint(r.pb_flag) else 0, flt(r.total_qty), cint(r.item_count))
+        for r in rows
+        if r.eff_date and r.unit
+    ]
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        frappe.db.sql(
+            f"""INSERT INTO `{UNIT_LOAD_SUMMARY_TABLE}`
+                (effective_date, unit, plan_name, pb_flag, total_qty, item_count)
+                VALUES {", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))}""",
+            tuple(v for row in chunk for v in row),
+        )
+
+
+def _touch_unit_load_days(dates, chunk_size=200):
+    """
+    Recompute summary rows for the given effective dates (no-op until the summary is built)
+    and invalidate board snapshots covering them.
+    """
+    keys = sorted({_load_grid_date_key(d) for d in (dates or []) if d})
+    if not keys:
+        return
+    _bump_board_versions(keys)
+    if not _unit_load_summary_ready():
+        return
+    for start in range(0, len(keys), chunk_size):
+        chunk = tuple(keys[start:start + chunk_size])
+        frappe.db.sql(f"DELETE FROM `{UNIT_LOAD_SUMMARY_TABLE}` WHERE effective_date IN %s", (chunk,))
+        _insert_unit_load_rows(_unit_load_live_rows(dates=chunk))
+
+
+def _sheet_effective_dates(doc):
+    """Every effective date a Planning sheet's rows sit on (row planned_date -> sheet dates)."""
+    sheet_date = doc.get("custom_planned_date") or doc.get("ordered_date")
+    dates = {sheet_date} if sheet_date else set()
+    for tf in ["planned_items", "custom_planned_items", "planning_table", "custom_planning_table", "table"]:
+        rows = doc.get(tf)
+        if rows:
+            for d in rows:
+                dates.add(d.get("planned_date") or sheet_date)
+            break
+    return {d for d in dates if d}
+
+
+def sync_unit_load_for_sheet(doc, method=None):
+    """
+    Planning sheet doc event: recompute row effective dates, then refresh summary days (and board
+    snapshots) the sheet occupied before and after the write.
+    """
+    if method != "after_delete":
+        _sync_effective_dates(parents=[doc.name])
+    dates = _sheet_effective_dates(doc)
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if before:
+        dates |= _sheet_effective_dates(before)
+    # Board views also list a sheet on its ordered_date.
+    dates |= {d.get("ordered_date") for d in (doc, before) if d and d.get("ordered_date")}
+    _touch_unit_load_days(dates)
+
+
+@frappe.whitelist()
+def rebuild_unit_load_summary():
+    """
+    Rebuild the daily unit-load summary from scratch and mark it ready for readers.
+    bench --site <site> execute production_scheduler.api.rebuild_unit_load_summary
+    The table itself is created by the build_unit_load_summary patch (DDL would commit mid-request).
+    """
+    frappe.only_for("System Manager")
+    frappe.db.sql(f"DELETE FROM `{UNIT_LOAD_SUMMARY_TABLE}`")
+    rows = _unit_load_live_rows()
+    _insert_unit_load_rows(rows)
+    frappe.db.set_default(UNIT_LOAD_SUMMARY_BUILT_KEY, frappe.utils.now())
+    frappe.local.production_scheduler_unit_load_ready = True
+    frappe.db.commit()
+    return {"status": "success", "rows": len(rows)}
+
+
+@frappe.whitelist()
+def check_unit_load_summary(start_date=None, end_date=None, repair=0):
+    """
+    Compare the summary with the live join for a window (default: 30 days back, 60 ahead).
+    Returns the mismatching cells; repair=1 recomputes the affected days.
+    """
+    frappe.only_for("System Manager")
+    if not _unit_load_summary_ready():
+        return {"status": "not_built", "mismatches": []}
+    today = getdate(frappe.utils.nowdate())
+    start_dt = getdate(start_date) if start_date else frappe.utils.add_days(today, -30)
+    end_dt = getdate(end_date) if end_date else frappe.utils.add_days(today, 60)
+
+    def _index(rows):
+        return {
+            (_load_grid_date_key(r.eff_date), r.unit, r.plan_key, cint(r.pb_flag)): (flt(r.total_qty), cint(r.item_count))
+            for r in rows
+            if r.eff_date and r.unit
+        }
+
+    live = _index(_unit_load_live_rows(start_dt, end_dt))
+    stored = _index(_unit_load_summary_rows(start_dt, end_dt))
+    mismatches = []
+    for key in sorted(set(live) | set(stored)):
+        live_qty, live_count = live.get(key, (0.0, 0))
+        stored_qty, stored_count = stored.get(key, (0.0, 0))
+        if abs(live_qty - stored_qty) > 0.001 or live_count != stored_count:
+            mismatches.append({
+                "date": key[0],
+                "unit": key[1],
+                "plan_name": key[2],
+                "pb_flag": key[3],
+                "summary_qty": stored_qty,
+                "live_qty": live_qty,
+                "summary_count": stored_count,
+                "live_count": live_count,
+            })
+
+    if cint(repair) and mismatches:
+        _touch_unit_load_days({m["date"] for m in mismatches})
+        frappe.db.commit()
+
+    return {"status": "success", "mismatches": mismatches, "repaired": bool(cint(repair) and mismatches)}
+
+
+def repair_unit_load_summary():
+    """Scheduled safety net for write paths that bypass the hooks."""
+    if _backfill_effective_dates():
+        frappe.db.commit()
+    check_unit_load_summary(repair=1)
+
+
+# ===========================
+# EQUIPMENT MAINTENANCE HELPERS
+# ===========================
+
+NON_BLOCKING_MAINTENANCE_TYPES = {"MESH CHANGE", "DIE CHANGE"}
+
+
+def _is_non_blocking_maintenance_type(maintenance_type):
+    return str(maintenance_type or "").strip().upper() in NON_BLOCKING_MAINTENANCE_TYPES
+
+MAINTENANCE_CALENDAR_PAD_DAYS = 62
+
+
+def _maintenance_unit_key(unit):
+    # Unit matching in SQL is case-insensitive; keep the same answers in memory.
+    return str(unit or "").strip().lower()
+
+
+class MaintenanceCalendar:
+    """
+    Equipment Maintenance windows overlapping [start_date, end_date], indexed per unit.
+
+    Blocking windows (every type except NON_BLOCKING_MAINTENANCE_TYPES) are merged into sorted,
+    disjoint, non-adjacent day ranges, so is_blocked / blocking_record / next_unblocked_day are one
+    bisect each. Records are full rows (not clipped), so answers stay exact near the horizon edges.
+    Get one through _maintenance_calendar(); it is kept for the request / job.
+    """
+
+    def __init__(self, start_date, end_date, records):
+        self.start = getdate(start_date)
+        self.end = getdate(end_date)
+        self.records = {}
+        self._blocking = {}
+        for rec in records or []:
+            if not rec.get("start_date") or not rec.get("end_date"):
+                continue
+            rec["start_date"] = getdate(rec.get("start_date"))
+            rec["end_date"] = getdate(rec.get("end_date"))
+            if rec["end_date"] < rec["start_date"]:
+                continue
+            self.records.setdefault(_maintenance_unit_key(rec.get("unit")), []).append(rec)
+        for key, recs in self.records.items():
+            recs.sort(key=lambda r: (r["start_date"], r["end_date"], r.get("name") or ""))
+            starts, ends, groups = [], [], []
+            for rec in recs:
+                if _is_non_blocking_maintenance_type(rec.get("maintenance_type")):
+                    continue
+                s, e = rec["start_date"].toordinal(), rec["end_date"].toordinal()
+                if ends and s <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], e)
+                    groups[-1].append(rec)
+                else:
+                    starts.append(s)
+                    ends.append(e)
+                    groups.append([rec])
+            if starts:
+                self._blocking[key] = (starts, ends, groups)
+
+    def covers(self, start_date, end_date):
+        return self.start <= getdate(start_date) and getdate(end_date) <= self.end
+
+    def _blocking_range(self, unit, day):
+        index = self._blocking.get(_maintenance_unit_key(unit))
+        if not index:
+            return None, None
+        starts, ends, groups = index
+        d = getdate(day).toordinal()
+        i = bisect_right(starts, d) - 1
+        if i >= 0 and ends[i] >= d:
+            return ends[i], groups[i]
+        return None, None
+
+    def is_blocked(self, unit, day):
+        return self._blocking_range(unit, day)[0] is not None
+
+    def blocking_record(self, unit, day):
+        """First blocking record (by start, end, name) covering the day, or None."""
+        _end, group = self._blocking_range(unit, day)
+        if not group:
+            return None
+        d = getdate(day)
+        for rec in group:
+            if rec["start_date"] <= d <= rec["end_date"]:
+                return rec
+        return None
+
+    def next_unblocked_day(self, unit, day):
+        """``day`` itself when free, else the day after the blocking range that covers it."""
+        end, _group = self._blocking_range(unit, day)
+        if end is None:
+            return getdate(day)
+        return datetime.date.fromordinal(end + 1)
+
+    def blocked_days(self, start_date, end_date):
+        """Set of (unit, 'YYYY-MM-DD') under blocking maintenance inside the range."""
+        start_dt, end_dt = getdate(start_date), getdate(end_date)
+        blocked = set()
+        for recs in self.records.values():
+            for rec in recs:
+                if _is_non_blocking_maintenance_type(rec.get("maintenance_type")):
+                    continue
+                current = max(rec["start_date"], start_dt)
+                last = min(rec["end_date"], end_dt)
+                while current <= last:
+                    blocked.add((rec.get("unit"), str(current)))
+                    current += datetime.timedelta(days=1)
+        return blocked
+
+    def windows(self, unit, start_date, end_date):
+        """{date: [record summary]} for every maintenance type, dates inside the range only."""
+        start_dt, end_dt = getdate(start_date), getdate(end_date)
+        result = {}
+        for rec in self.records.get(_maintenance_unit_key(unit), []):
+            if rec["start_date"] > end_dt:
+                break
+            current = max(rec["start_date"], start_dt)
+            last = min(rec["end_date"], end_dt)
+            summary = {
+                "type": rec.get("maintenance_type"),
+                "start_date": str(rec["start_date"]),
+                "end_date": str(rec["end_date"]),
+                "status": rec.get("status"),
+            }
+            while current <= last:
+                result.setdefault(str(current), []).append(dict(summary))
+                current += datetime.timedelta(days=1)
+        return result
+
+
+def _maintenance_calendar(start_date, end_date=None):
+    """
+    Request-scoped MaintenanceCalendar covering [start_date, end_date] (one query, padded by
+    MAINTENANCE_CALENDAR_PAD_DAYS). A lookup outside the loaded horizon reloads a wider one.
+    """
+    start_dt = getdate(start_date)
+    end_dt = getdate(end_date) if end_date else start_dt
+    cal = getattr(frappe.local, "production_scheduler_maintenance_calendar", None)
+    if cal is not None and cal.covers(start_dt, end_dt):
+        return cal
+
+    lo = frappe.utils.add_days(start_dt, -MAINTENANCE_CALENDAR_PAD_DAYS)
+    hi = frappe.utils.add_days(end_dt, MAINTENANCE_CALENDAR_PAD_DAYS)
+    if cal is not None:
+        lo, hi = min(lo, cal.start), max(hi, cal.end)
+    records = []
+    if frappe.db.exists("DocType", "Equipment Maintenance"):
+        records = frappe.db.sql("""
+            SELECT name, unit, maintenance_type, start_date, end_date, status
+            FROM `tabEquipment Maintenance`
+            WHERE start_date <= %s
+              AND end_date >= %s
+              AND docstatus < 2
+        """, (hi, lo), as_dict=True)
+    cal = MaintenanceCalendar(lo, hi, records)
+    frappe.local.production_scheduler_maintenance_calendar = cal
+    return cal
 
 
-def _is_non_blocking_maintenance_type(maintenance_type):
-    return str(maintenance_type or "").strip().upper() in NON_BLOCKING_MAINTENANCE_TYPES
+def invalidate_maintenance_calendar(doc=None, method=None):
+    """Drop the request's MaintenanceCalendar (Equipment Maintenance writes)."""
+    frappe.local.production_scheduler_maintenance_calendar = None
+
 
 @frappe.whitelist()
 def get_maintenance_windows(unit, start_date, end_date):
@@ -4885,92 +5614,119 @@ def get_maintenance_windows(unit, start_date, end_date):
     Query all maintenance periods for a unit within a date range.
     Returns: dict {date: [list of maintenance records]}
     """
-    from frappe.utils import getdate, add_days
-    
     start_dt = getdate(start_date)
     end_dt = getdate(end_date)
-    
-    if not frappe.db.exists("DocType", "Equipment Maintenance"):
-        return {}
-    
-    records = frappe.db.sql("""
-        SELECT name, unit, maintenance_type, start_date, end_date, status
-        FROM `tabEquipment Maintenance`
-        WHERE unit = %s
-          AND start_date <= %s
-          AND end_date >= %s
-          AND docstatus < 2
-    """, (unit, end_dt, start_dt), as_dict=True)
-    
-    # Build date map
-    result = {}
-    for rec in records:
-        current = getdate(rec.start_date)
-        end = getdate(rec.end_date)
-        while current <= end:
-            date_str = str(current)
-            if date_str not in result:
-                result[date_str] = []
-            result[date_str].append({
-                "type": rec.maintenance_type,
-                "start_date": str(rec.start_date),
-                "end_date": str(rec.end_date),
-                "status": rec.status
-            })
-            current = add_days(current, 1)
-    
-    return result
+    return _maintenance_calendar(start_dt, end_dt).windows(unit, start_dt, end_dt)
 
 def is_date_under_maintenance(unit, date_string):
     """Check if date has BLOCKING maintenance scheduled for unit."""
-    from frappe.utils import getdate
-    
-    if not frappe.db.exists("DocType", "Equipment Maintenance"):
-        return False
-    
-    check_date = getdate(date_string)
-
-    count = frappe.db.sql("""
-        SELECT COUNT(*) as cnt
-        FROM `tabEquipment Maintenance`
-        WHERE unit = %s
-          AND start_date <= %s
-          AND end_date >= %s
-          AND docstatus < 2
-          AND UPPER(TRIM(COALESCE(maintenance_type, ''))) NOT IN ('MESH CHANGE', 'DIE CHANGE')
-        """, (unit, check_date, check_date))
-    
-    return count[0][0] > 0 if count else False
+    return _maintenance_calendar(date_string).is_blocked(unit, date_string)
 
 def get_maintenance_info_on_date(unit, date_string):
     """Get BLOCKING maintenance details if date is under maintenance."""
-    from frappe.utils import getdate
-    
-    if not frappe.db.exists("DocType", "Equipment Maintenance"):
-        return None
-    
-    check_date = getdate(date_string)
-    
-    rec = frappe.db.sql("""
-        SELECT name, maintenance_type, start_date, end_date, status
-        FROM `tabEquipment Maintenance`
-        WHERE unit = %s
-          AND start_date <= %s
-          AND end_date >= %s
-          AND docstatus < 2
-          AND UPPER(TRIM(COALESCE(maintenance_type, ''))) NOT IN ('MESH CHANGE', 'DIE CHANGE')
-        LIMIT 1
-    """, (unit, check_date, check_date), as_dict=True)
-    
+    rec = _maintenance_calendar(date_string).blocking_record(unit, date_string)
     if rec:
         return {
-            "type": rec[0].maintenance_type,
-            "start_date": str(rec[0].start_date),
-            "end_date": str(rec[0].end_date),
-            "status": rec[0].status
+            "type": rec.get("maintenance_type"),
+            "start_date": str(rec["start_date"]),
+            "end_date": str(rec["end_date"]),
+            "status": rec.get("status")
         }
     return None
 
+def next_unblocked_maintenance_day(unit, date_string):
+    """First day on or after date_string without BLOCKING maintenance for unit."""
+    day = getdate(date_string)
+    while True:
+        cal = _maintenance_calendar(day)
+        nxt = cal.next_unblocked_day(unit, day)
+        if nxt == day:
+            return day
+        # A blocking range can end past the loaded horizon; keep going from there.
+        day = nxt
+
+def _blocking_maintenance_days(start_date, end_date):
+    """Set of (unit, 'YYYY-MM-DD') under BLOCKING maintenance in the window."""
+    return _maintenance_calendar(start_date, end_date).blocked_days(start_date, end_date)
+
+class CascadePlanner:
+    """
+    Shared engine for date cascades (maintenance add / remove, date-range forwarding, white queue).
+
+    Moves are planned in memory against one UnitLoadGrid and the request's MaintenanceCalendar;
+    apply() writes them with one multi-row UPDATE per chunk (_bulk_update_by_name), setting
+    planned_date and effective_date together, refreshes the touched unit-load days once and returns
+    the movement log. A day fits when load + tons <= HARD_LIMITS[unit] * tolerance, or when the day
+    is empty and the item alone is over the limit.
+    """
+
+    def __init__(self, grid=None, tolerance=1.05):
+        self.grid = grid if isinstance(grid, UnitLoadGrid) else UnitLoadGrid()
+        self.tolerance = flt(tolerance) or 1.0
+        self.updates = {}
+        self.movement_log = []
+        self.touched_dates = set()
+
+    def fits(self, day, unit, tons):
+        load = self.grid.get(day, unit, "__all__", pb_only=1)
+        limit = HARD_LIMITS.get(unit, 999.0)
+        return (load + tons <= limit * self.tolerance) or (load == 0 and tons >= limit)
+
+    def find_day(self, unit, tons, first_day, max_days=None, on_blocked=None):
+        """
+        First 'YYYY-MM-DD' from first_day on that is free of blocking maintenance and fits tons.
+        max_days caps the days looked at (blocked days count, as in the old loops); with None the
+        search jumps over whole maintenance windows and runs until a day fits.
+        on_blocked(day) is called for each blocked day (once per window when jumping).
+        """
+        day = getdate(first_day)
+        steps = 0
+        while max_days is None or steps < max_days:
+            day_str = str(day)
+            if is_date_under_maintenance(unit, day_str):
+                if on_blocked:
+                    on_blocked(day_str)
+                if max_days is None:
+                    day = next_unblocked_maintenance_day(unit, day_str)
+                    continue
+            elif self.fits(day_str, unit, tons):
+                return day_str
+            day = frappe.utils.add_days(day, 1)
+            steps += 1
+        return None
+
+    def move(self, item_name, unit, tons, from_day, to_day, columns=None, log=None):
+        """
+        Book tons on (to_day, unit) and queue the row's new planned_date (plus extra columns).
+        ``log`` adds fields to the movement-log entry.
+        """
+        self.grid.add(to_day, unit, tons)
+        self.queue(item_name, from_day, to_day, columns, log)
+
+    def queue(self, item_name, from_day, to_day, columns=None, log=None):
+        """Queue a date change without capacity booking (restores put rows back where they were)."""
+        row = self.updates.setdefault(item_name, {})
+        row["planned_date"] = to_day
+        row.update(columns or {})
+        entry = {"item_name": item_name, "from_date": from_day, "to_date": to_day}
+        entry.update(log or {})
+        self.movement_log.append(entry)
+        self.touched_dates.update(d for d in (from_day, to_day) if d)
+
+    def apply(self):
+        """Write every planned move, refresh the touched days and return the movement log."""
+        if self.updates:
+            delta = BoardDelta(list(self.updates), reason="cascade", track_slots=False)
+            if _has_pt_effective_date():
+                # planned_date leads the effective-date COALESCE, so it is the new effective date.
+                for row in self.updates.values():
+                    row["effective_date"] = row["planned_date"]
+            _bulk_update_by_name("Planning Table", self.updates)
+            delta.publish(dates=self.touched_dates)
+        _touch_unit_load_days(self.touched_dates)
+        return self.movement_log
+
+
 def get_next_available_date_skipping_maintenance(unit, start_date, required_tons=0, days_ahead=30):
     """Find next date where unit has capacity and is NOT under maintenance."""
     from frappe.utils import getdate, add_days
@@ -4982,29 +5738,22 @@ def get_next_available_date_skipping_maintenance(unit, start_date, required_tons
     required = flt(required_tons)
     days_ahead = cint(days_ahead) or 30
     limit = HARD_LIMITS.get(unit, 999.0)
-    
-    for i in range(days_ahead + 1):
-        candidate = add_days(start_dt, i)
-        candidate_str = str(candidate)
-        
-        # Skip if under maintenance
-        if is_date_under_maintenance(unit, candidate_str):
-            continue
-        
-        load = get_unit_load(candidate_str, unit, "__all__", pb_only=0)
-        if load + required <= (limit * 1.05):
-            return {
-                "date": candidate_str,
-                "current_load": load,
-                "limit": limit,
-                "reason": "available"
-            }
+    # One grid + one maintenance query for the whole horizon; blocked days are skipped.
+    finder = SlotFinder(start_dt, days=days_ahead, tolerance=1.05, skip_maintenance=True)
+    hit = finder.find(required, preferred_unit=unit, neighbours=False)
+    if hit:
+        return {
+            "date": str(hit[0]),
+            "current_load": hit[2],
+            "limit": limit,
+            "reason": "available"
+        }
     
     # Fallback suggestion
     fallback = add_days(start_dt, 1)
     return {
         "date": str(fallback),
-        "current_load": get_unit_load(str(fallback), unit, "__all__", pb_only=0),
+        "current_load": finder.grid.get(str(fallback), unit, "__all__", pb_only=0),
         "limit": limit,
         "reason": "no_clean_slot_found"
     }
@@ -5027,6 +5776,7 @@ def add_equipment_maintenance(unit, maintenance_type, start_date, end_date, note
         "status": "Planned"
     })
     doc.insert(ignore_permissions=False)
+    invalidate_maintenance_calendar()
 
     cascade_result = {"cascaded_count": 0}
     if not _is_non_blocking_maintenance_type(maintenance_type):
@@ -5075,13 +5825,14 @@ def cascade_orders_after_maintenance_removal(unit, maint_start_date, maint_end_d
     end_dt = getdate(maint_end_date)
     
     # Find all items planned between maintenance start and end dates
-    items = frappe.db.sql("""
+    eff_col = _pt_effective_date_sql()
+    items = frappe.db.sql(f"""
         SELECT i.name, i.qty, i.unit, COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date) as effective_planned_date
         FROM `tabPlanning Table` i
         JOIN `tabPlanning sheet` p ON i.parent = p.name
         WHERE i.unit = %s
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) >= %s
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) <= %s
+          AND {eff_col} >= %s
+          AND {eff_col} <= %s
           AND p.docstatus < 2
           AND i.docstatus < 2
     """, (unit, start_dt, end_dt), as_dict=True)
@@ -5089,58 +5840,20 @@ def cascade_orders_after_maintenance_removal(unit, maint_start_date, maint_end_d
     if not items:
         return {"status": "success", "message": "No items to cascade", "cascaded_count": 0}
     
-    has_item_planned_col = frappe.db.has_column("Planning Table", "planned_date")
-    cascaded_count = 0
-    local_loads = {}
-    movement_log = []
-    
+    if not _has_column("Planning Table", "planned_date"):
+        return {"status": "success", "message": "Cascaded 0 items to next available dates", "cascaded_count": 0, "movement_log": []}
+
+    planner = CascadePlanner(get_unit_load_grid(add_days(start_dt, 1), add_days(end_dt, 31)))
     for item in items:
-        if not has_item_planned_col:
-            continue
-        
-        item_name = item.get("name")
         qty_tons = flt(item.get("qty")) / 1000.0
-        unit_limit = HARD_LIMITS.get(unit, 999.0)
         current_date = getdate(item.get("effective_planned_date"))
-        original_date_str = current_date.strftime("%Y-%m-%d")
-        
-        # Find next available date (skipping maintenance)
-        candidate = add_days(current_date, 1)
-        found_slot = False
-        
-        for i in range(30):  # Look ahead 30 days
-            candidate_str = candidate if isinstance(candidate, str) else candidate.strftime("%Y-%m-%d")
-            
-            # Skip if under maintenance
-            if is_date_under_maintenance(unit, candidate_str):
-                candidate = add_days(candidate, 1)
-                continue
-            
-            load_key = (candidate_str, unit)
-            if load_key not in local_loads:
-                local_loads[load_key] = get_unit_load(candidate_str, unit, "__all__", pb_only=1)
-            
-            current_load = local_loads[load_key]
-            
-            if (current_load + qty_tons <= unit_limit * 1.05) or (current_load == 0 and qty_tons >= unit_limit):
-                local_loads[load_key] = current_load + qty_tons
-                # Update item's planned date
-                frappe.db.sql("""
-                    UPDATE `tabPlanning Table`
-                    SET planned_date = %s
-                    WHERE name = %s
-                """, (candidate_str, item_name))
-                movement_log.append({
-                    "item_name": item_name,
-                    "from_date": original_date_str,
-                    "to_date": candidate_str
-                })
-                cascaded_count += 1
-                found_slot = True
-                break
-            
-            candidate = add_days(candidate, 1)
-    
+        # Next available date within 30 days, skipping maintenance
+        to_day = planner.find_day(unit, qty_tons, add_days(current_date, 1), max_days=30)
+        if to_day:
+            planner.move(item.get("name"), unit, qty_tons, str(current_date), to_day)
+
+    movement_log = planner.apply()
+    cascaded_count = len(movement_log)
     frappe.db.commit()
     
     return {
@@ -5180,11 +5893,12 @@ def forward_orders_from_date_range(cascade_start_date, cascade_end_date, plan_na
     start_dt = getdate(cascade_start_date)
     end_dt = getdate(cascade_end_date)
     
-    if not frappe.db.has_column("Planning Table", "planned_date"):
+    if not _has_column("Planning Table", "planned_date"):
         return {"status": "error", "message": "Required column planned_date not found"}
     
     # Find ALL items (any type) queued on dates in the cascade range
-    items = frappe.db.sql("""
+    eff_col = _pt_effective_date_sql()
+    items = frappe.db.sql(f"""
         SELECT 
             i.name, 
             i.qty, 
@@ -5195,8 +5909,8 @@ def forward_orders_from_date_range(cascade_start_date, cascade_end_date, plan_na
         JOIN `tabPlanning sheet` p ON i.parent = p.name
         WHERE p.docstatus < 2
           AND i.docstatus < 2
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) >= %s
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) <= %s
+          AND {eff_col} >= %s
+          AND {eff_col} <= %s
     """, (start_dt, end_dt), as_dict=True)
     
     if not items:
@@ -5223,9 +5937,7 @@ def forward_orders_from_date_range(cascade_start_date, cascade_end_date, plan_na
             items_by_unit[unit] = []
         items_by_unit[unit].append(item)
     
-    forwarded_count = 0
-    movement_log = []
-    local_loads = {}  # (date, unit) -> current load in tons
+    planner = CascadePlanner(get_unit_load_grid(add_days(end_dt, 1), add_days(end_dt, 60)))
     
     # Generate date list for cleared dates
     dates_cleared = []
@@ -5236,64 +5948,23 @@ def forward_orders_from_date_range(cascade_start_date, cascade_end_date, plan_na
     
     # Process each unit independently
     for unit, unit_items in items_by_unit.items():
-        unit_limit = HARD_LIMITS.get(unit, 999.0)
-        
         for item in unit_items:
             item_name = item.get("name")
             qty_tons = flt(item.get("qty")) / 1000.0
-            original_date = getdate(item.get("effective_planned_date"))
-            original_date_str = str(original_date)
-            color = item.get("color") or ""
-            
-            # Start looking from the day AFTER cascade_end_date
-            candidate = add_days(end_dt, 1)
-            forward_found = False
-            
-            # Search up to 60 days ahead for available slot
-            for search_days in range(60):
-                candidate_str = str(candidate) if isinstance(candidate, str) else candidate.strftime("%Y-%m-%d")
-                
-                # Skip if under maintenance
-                if is_date_under_maintenance(unit, candidate_str):
-                    candidate = add_days(candidate, 1)
-                    continue
-                
-                # Check current load for this date/unit
-                load_key = (candidate_str, unit)
-                if load_key not in local_loads:
-                    local_loads[load_key] = get_unit_load(candidate_str, unit, "__all__", pb_only=1)
-                
-                current_load = local_loads[load_key]
-                
-                # Check if item fits (with 5% buffer) or if day is empty but item is oversized
-                if (current_load + qty_tons <= unit_limit * 1.05) or (current_load == 0 and qty_tons >= unit_limit):
-                    local_loads[load_key] = current_load + qty_tons
-                    
-                    # Update the item's planned date
-                    frappe.db.sql("""
-                        UPDATE `tabPlanning Table`
-                        SET planned_date = %s
-                        WHERE name = %s
-                    """, (candidate_str, item_name))
-                    
-                    movement_log.append({
-                        "item_name": item_name,
-                        "color": color,
-                        "from_date": original_date_str,
-                        "to_date": candidate_str,
-                        "unit": unit,
-                        "qty_tons": round(qty_tons, 2)
-                    })
-                    
-                    forwarded_count += 1
-                    forward_found = True
-                    break
-                
-                candidate = add_days(candidate, 1)
+            original_date_str = str(getdate(item.get("effective_planned_date")))
             
-            if not forward_found:
+            # Search up to 60 days after cascade_end_date for an available slot
+            to_day = planner.find_day(unit, qty_tons, add_days(end_dt, 1), max_days=60)
+            if not to_day:
                 frappe.log_error(f"Could not forward item {item_name} from {original_date_str} - no available slot found in 60 days", "Forward Orders Error")
+                continue
+            planner.move(
+                item_name, unit, qty_tons, original_date_str, to_day,
+                log={"color": item.get("color") or "", "unit": unit, "qty_tons": round(qty_tons, 2)},
+            )
     
+    movement_log = planner.apply()
+    forwarded_count = len(movement_log)
     frappe.db.commit()
     
     return {
@@ -5329,9 +6000,24 @@ def _restore_orders_to_original_dates(unit, movement_log):
     if not movement_log:
         return {"restored_count": 0, "skipped_count": 0}
 
-    if not frappe.db.has_column("Planning Table", "planned_date"):
+    if not _has_column("Planning Table", "planned_date"):
         return {"restored_count": 0, "skipped_count": len(movement_log)}
 
+    # Current unit / effective date of every logged row, from one query.
+    names = list({m.get("item_name") for m in movement_log if m.get("item_name")})
+    current = {}
+    if names:
+        for r in frappe.db.sql("""
+            SELECT i.name, i.unit, COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date) AS effective_planned_date
+            FROM `tabPlanning Table` i
+            JOIN `tabPlanning sheet` p ON p.name = i.parent
+            WHERE i.name IN %s
+              AND p.docstatus < 2
+              AND i.docstatus < 2
+        """, (tuple(names),), as_dict=True):
+            current[r.name] = {"unit": r.unit, "effective": str(getdate(r.effective_planned_date))}
+
+    planner = CascadePlanner()
     restored_count = 0
     skipped_count = 0
 
@@ -5344,26 +6030,14 @@ def _restore_orders_to_original_dates(unit, movement_log):
             skipped_count += 1
             continue
 
-        row = frappe.db.sql("""
-            SELECT i.unit, COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date) AS effective_planned_date
-            FROM `tabPlanning Table` i
-            JOIN `tabPlanning sheet` p ON p.name = i.parent
-            WHERE i.name = %s
-              AND p.docstatus < 2
-              AND i.docstatus < 2
-            LIMIT 1
-        """, (item_name,), as_dict=True)
-
+        row = current.get(item_name)
         if not row:
             skipped_count += 1
             continue
 
-        current_unit = row[0].get("unit")
-        current_effective = str(getdate(row[0].get("effective_planned_date")))
-
         # Restore if item is still on or after the maintenance-shifted date.
         # This allows rollback even when later logic pushed it further forward.
-        if current_unit != unit or current_effective < str(getdate(to_date)):
+        if row["unit"] != unit or row["effective"] < str(getdate(to_date)):
             skipped_count += 1
             continue
 
@@ -5372,13 +6046,11 @@ def _restore_orders_to_original_dates(unit, movement_log):
             skipped_count += 1
             continue
 
-        frappe.db.sql("""
-            UPDATE `tabPlanning Table`
-            SET planned_date = %s
-            WHERE name = %s
-        """, (from_date, item_name))
+        planner.queue(item_name, row["effective"], from_date)
+        row["effective"] = str(getdate(from_date))
         restored_count += 1
 
+    planner.apply()
     frappe.db.commit()
     return {"restored_count": restored_count, "skipped_count": skipped_count}
 
@@ -5386,7 +6058,7 @@ def _fallback_restore_by_range(unit, maint_start_date, maint_end_date):
     """Fallback restore when movement log is missing/corrupted: pull next-day shifted items back into the maintenance window dates."""
     from frappe.utils import getdate, add_days
 
-    if not frappe.db.has_column("Planning Table", "planned_date"):
+    if not _has_column("Planning Table", "planned_date"):
         return {"restored_count": 0, "skipped_count": 0}
 
     start_dt = getdate(maint_start_date)
@@ -5394,58 +6066,37 @@ def _fallback_restore_by_range(unit, maint_start_date, maint_end_date):
     window_days = (end_dt - start_dt).days + 1
     search_end = add_days(end_dt, max(3, window_days + 2))
 
-    rows = frappe.db.sql("""
+    eff_col = _pt_effective_date_sql()
+    rows = frappe.db.sql(f"""
         SELECT i.name, i.unit, i.qty,
                DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) AS effective_planned_date
         FROM `tabPlanning Table` i
         JOIN `tabPlanning sheet` p ON p.name = i.parent
         WHERE i.unit = %s
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) > %s
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) <= %s
+          AND {eff_col} > %s
+          AND {eff_col} <= %s
           AND p.docstatus < 2
           AND i.docstatus < 2
-        ORDER BY DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) ASC, i.idx ASC
+        ORDER BY {eff_col} ASC, i.idx ASC
     """, (unit, end_dt, search_end), as_dict=True)
 
     if not rows:
         return {"restored_count": 0, "skipped_count": 0}
 
-    local_loads = {}
+    planner = CascadePlanner(get_unit_load_grid(start_dt, end_dt))
     restored = 0
     skipped = 0
-    unit_limit = HARD_LIMITS.get(unit, 999.0)
 
     for r in rows:
-        item_name = r.get("name")
         qty_tons = flt(r.get("qty")) / 1000.0
-
-        placed = False
-        for day_offset in range(window_days):
-            candidate = add_days(start_dt, day_offset)
-            candidate_str = candidate if isinstance(candidate, str) else candidate.strftime("%Y-%m-%d")
-
-            if is_date_under_maintenance(unit, candidate_str):
-                continue
-
-            load_key = (candidate_str, unit)
-            if load_key not in local_loads:
-                local_loads[load_key] = get_unit_load(candidate_str, unit, "__all__", pb_only=1)
-
-            current_load = local_loads[load_key]
-            if (current_load + qty_tons <= unit_limit * 1.05) or (current_load == 0 and qty_tons >= unit_limit):
-                frappe.db.sql("""
-                    UPDATE `tabPlanning Table`
-                    SET planned_date = %s
-                    WHERE name = %s
-                """, (candidate_str, item_name))
-                local_loads[load_key] = current_load + qty_tons
-                restored += 1
-                placed = True
-                break
-
-        if not placed:
+        to_day = planner.find_day(unit, qty_tons, start_dt, max_days=window_days)
+        if not to_day:
             skipped += 1
+            continue
+        planner.move(r.get("name"), unit, qty_tons, str(r.get("effective_planned_date")), to_day)
+        restored += 1
 
+    planner.apply()
     frappe.db.commit()
     return {"restored_count": restored, "skipped_count": skipped}
 
@@ -5478,6 +6129,7 @@ def delete_maintenance_and_cascade(maintenance_record_name):
     
     # Delete the maintenance record
     frappe.delete_doc("Equipment Maintenance", maintenance_record_name)
+    invalidate_maintenance_calendar()
 
     if _is_non_blocking_maintenance_type(maintenance_type):
         try:
@@ -5534,42 +6186,107 @@ def get_all_equipment_maintenance(start_date=None, end_date=None):
         )
         return records
 
-def find_best_slot(item_qty_tons, quality, preferred_unit, start_date, recursion_depth=0):
+class SlotFinder:
+    """
+    Capacity-aware slot search over a fixed horizon.
+
+    Loads the UnitLoadGrid (and, with skip_maintenance, the blocking maintenance days) for
+    [start_date, start_date + days] once, then answers any number of placements in memory.
+    Search order per day: preferred unit first, then neighbour units (Unit 1..4) that accept
+    the quality, then the next day. A slot fits when load + tons <= HARD_LIMITS[unit] * tolerance.
+    place() books the item into the grid so later items in the same batch see it.
+    """
+
+    NEIGHBOUR_UNITS = ("Unit 1", "Unit 2", "Unit 3", "Unit 4")
+
+    def __init__(self, start_date, days=30, tolerance=1.0, skip_maintenance=False, plan_name=None, pb_only=0, grid=None):
+        self.start = getdate(start_date)
+        self.days = cint(days)
+        self.end = frappe.utils.add_days(self.start, self.days)
+        self.dates = [frappe.utils.add_days(self.start, i) for i in range(self.days + 1)]
+        self.date_keys = [str(d) for d in self.dates]
+        self.tolerance = flt(tolerance) or 1.0
+        self.plan_name = plan_name
+        self.pb_only = cint(pb_only)
+        self.grid = grid.load(self.start, self.end) if grid is not None else get_unit_load_grid(self.start, self.end)
+        self.blocked = _blocking_maintenance_days(self.start, self.end) if skip_maintenance else set()
+
+    def candidate_units(self, quality, preferred_unit, neighbours=True):
+        if not neighbours:
+            return [preferred_unit] if preferred_unit else []
+        units = []
+        if preferred_unit and preferred_unit in HARD_LIMITS:
+            units.append(preferred_unit)
+        for unit in self.NEIGHBOUR_UNITS:
+            if unit == preferred_unit or unit not in HARD_LIMITS:
+                continue
+            if quality in UNIT_QUALITY_MAP.get(unit, []):
+                units.append(unit)
+        return units
+
+    def find(self, tons, quality=None, preferred_unit=None, neighbours=True, start_offset=0):
+        """First fitting (date, unit, current_load) in search order, or None."""
+        tons = flt(tons)
+        units = self.candidate_units(quality, preferred_unit, neighbours)
+        if not units:
+            return None
+        limits = [HARD_LIMITS.get(u, 999.0) * self.tolerance for u in units]
+        for i in range(max(0, cint(start_offset)), len(self.dates)):
+            dkey = self.date_keys[i]
+            for unit, limit in zip(units, limits):
+                if self.blocked and (unit, dkey) in self.blocked:
+                    continue
+                load = self.grid.get(dkey, unit, self.plan_name, pb_only=self.pb_only)
+                if load + tons <= limit:
+                    return self.dates[i], unit, load
+        return None
+
+    def place(self, tons, quality=None, preferred_unit=None, neighbours=True, start_offset=0):
+        """find() and book the tons into the grid; returns {"date", "unit"} or None."""
+        hit = self.find(tons, quality, preferred_unit, neighbours, start_offset)
+        if not hit:
+            return None
+        self.grid.add(hit[0], hit[1], tons, self.plan_name)
+        return {"date": hit[0], "unit": hit[1]}
+
+    def place_batch(self, items):
+        """
+        Place many items in one pass. items: [{"qty_tons", "quality", "preferred_unit", "start_date"?}].
+        Returns one {"date", "unit"} (or None) per item, in input order.
+        """
+        out = []
+        for it in items or []:
+            offset = 0
+            if it.get("start_date"):
+                offset = (getdate(it.get("start_date")) - self.start).days
+                if offset < 0 or offset > self.days:
+                    out.append(None)
+                    continue
+            out.append(self.place(it.get("qty_tons"), it.get("quality"), it.get("preferred_unit"), start_offset=offset))
+        return out
+
+
+def find_best_slot(item_qty_tons, quality, preferred_unit, start_date, recursion_depth=0, grid=None):
     """
-    Recursive function to find the best available slot (Date/Unit).
+    Find the best available slot (Date/Unit) within 30 days of start_date.
     Order:
     1. Preferred Unit (on Date)
     2. Neighbor Units (on Date) - Must support Quality
-    3. Next Day (Recurse)
+    3. Next Day
+    recursion_depth is kept for old callers: it shortens the horizon like the former recursion did.
     """
-    if recursion_depth > 30: # Look ahead max 30 days
+    days = 30 - cint(recursion_depth)
+    if days < 0: # Look ahead max 30 days
         return None # No slot found
+    hit = SlotFinder(start_date, days=days, grid=grid).find(item_qty_tons, quality, preferred_unit)
+    if not hit:
+        return None
+    return {"date": hit[0], "unit": hit[1]}
 
-    check_date = getdate(start_date)
-    
-    # 1. Check Preferred Unit
-    if preferred_unit and preferred_unit in HARD_LIMITS:
-        current_load = get_unit_load(check_date, preferred_unit)
-        if current_load + item_qty_tons <= HARD_LIMITS[preferred_unit]:
-            return {"date": check_date, "unit": preferred_unit}
-
-    # 2. Check Neighbor Units (on same date)
-    compatible_units = []
-    for unit, valid_qualities in UNIT_QUALITY_MAP.items():
-        if unit == preferred_unit: continue
-        if quality in valid_qualities:
-            compatible_units.append(unit)
-    
-    # Check Neighbors
-    for unit in ["Unit 1", "Unit 2", "Unit 3", "Unit 4"]:
-        if unit in compatible_units and unit in HARD_LIMITS:
-            load = get_unit_load(check_date, unit)
-            if load + item_qty_tons <= HARD_LIMITS[unit]:
-                return {"date": check_date, "unit": unit}
 
-    # 3. Next Day (Recurse)
-    next_date = frappe.utils.add_days(check_date, 1)
-    return find_best_slot(item_qty_tons, quality, preferred_unit, next_date, recursion_depth + 1)
+def find_best_slots(items, start_date, days=30):
+    """Batch find_best_slot: each placed item counts against capacity for the items after it."""
+    return SlotFinder(start_date, days=days).place_batch(items)
 
 
 def get_preferred_unit(quality):
@@ -5586,50 +6303,20 @@ def generate_plan_code(date_str, unit, plan_name):
     Generates a readable plan code: {YY}{MonthLetter}{Unit}-{PlanName}
     e.g. 26CU1-PLAN 1
     UNASSIGNED uses segment UA. Legacy Mixed normalizes to UNASSIGNED before this runs.
+    Unit segments and plan bases come from the memoized tables in plan_codes.py.
     """
     if not str(date_str) or not plan_name or not unit:
         return ""
-    
+    segment = unit_segment(unit)
+    if not segment:
+        return ""
     try:
-        # Robust unit normalization for code generation
-        u_clean = str(unit).upper().replace(" ", "")
-        if "LAMINATIONUNIT" in u_clean:
-            u_code = "L1"
-        elif "SLITTINGUNIT" in u_clean:
-            u_code = "SL1"
-        elif "L3" in u_clean and "TSNPL" in u_clean and "REWINDING" in u_clean:
-            u_code = "RW3"
-        elif "L4" in u_clean and "JSB" in u_clean and "REWINDING" in u_clean:
-            u_code = "RW4"
-        elif "L5" in u_clean and "JSB" in u_clean and "REWINDING" in u_clean:
-            u_code = "RW5"
-        elif "REWINDING" in u_clean and "UNASSIGNED" in u_clean:
-            u_code = "RWU"
-        elif "UNIT1" in u_clean:
-            u_code = "U1"
-        elif "UNIT2" in u_clean:
-            u_code = "U2"
-        elif "UNIT3" in u_clean:
-            u_code = "U3"
-        elif "UNIT4" in u_clean:
-            u_code = "U4"
-        elif u_clean in ("UNASSIGNED", "NONE", "NA") or "MIXED" in u_clean:
-            u_code = "UA"
-        else:
-            return ""
-
         d = frappe.utils.getdate(str(date_str))
-        yy = str(d.year)[-2:]
-        # Month letters mapping (A-L)
-        month_letters = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L"]
-        month_char = month_letters[d.month - 1]
-        
-        # Strip Month/Week prefix (e.g., "MARCH W10 26 PLAN 1" -> "PLAN 1")
-        clean_plan = _strip_legacy_prefixes(plan_name)
-        
-        return f"{yy}{month_char}{u_code}-{clean_plan}"
     except Exception:
         return ""
+    if not d:
+        return ""
+    return f"{month_prefix(d)}{segment}-{plan_base(plan_name)}"
 
 def update_sheet_plan_codes(sheet_doc, include_legacy=False):
     """
@@ -5642,41 +6329,6 @@ def update_sheet_plan_codes(sheet_doc, include_legacy=False):
 
     unique_codes = set()
 
-    def _row_unit(raw):
-        item_unit = raw
-        raw_upper = str(raw or "").upper().replace(" ", "")
-        if item_unit:
-            iu_upper = raw_upper
-            if "LAMINATIONUNIT" in iu_upper:
-                item_unit = "Lamination Unit"
-            elif "SLITTINGUNIT" in iu_upper:
-                item_unit = "Slitting Unit"
-            elif "UNIT1" in iu_upper:
-                item_unit = "Unit 1"
-            elif "UNIT2" in iu_upper:
-                item_unit = "Unit 2"
-            elif "UNIT3" in iu_upper:
-                item_unit = "Unit 3"
-            elif "UNIT4" in iu_upper:
-                item_unit = "Unit 4"
-        normalized = normalize_planning_unit_for_select(item_unit)
-        # Preserve dedicated process units even if older normalizer maps them to UNASSIGNED.
-        if normalized == "UNASSIGNED":
-            if "LAMINATIONUNIT" in raw_upper:
-                return "Lamination Unit"
-            if "SLITTINGUNIT" in raw_upper:
-                return "Slitting Unit"
-            if "REWINDING" in raw_upper:
-                if "L3" in raw_upper and "TSNPL" in raw_upper:
-                    return REWINDING_UNIT_L3
-                if "L4" in raw_upper and "JSB" in raw_upper:
-                    return REWINDING_UNIT_L4
-                if "L5" in raw_upper and "JSB" in raw_upper:
-                    return REWINDING_UNIT_L5
-                if "UNASSIGNED" in raw_upper:
-                    return REWINDING_UNASSIGNED_UNIT
-        return normalized
-
     def _row_planned_date(item):
         if isinstance(item, dict):
             return (
@@ -5696,20 +6348,20 @@ def update_sheet_plan_codes(sheet_doc, include_legacy=False):
         return getattr(item, "unit", None)
 
     def _calc_code_for_item(item):
-        item_unit = _row_unit(_item_unit_raw(item))
-        item_date = _row_planned_date(item)
-        return generate_plan_code(item_date, item_unit, active_plan)
+        return plan_code(_row_planned_date(item), _item_unit_raw(item), active_plan)
+
+    code_fields = {}
 
     def _apply_code_to_row(item, code):
         """Set only fields that exist on the child DocType (Planning sheet Item vs Planning Table)."""
         dt = getattr(item, "doctype", None)
         if not dt:
             return
-        meta = frappe.get_meta(dt)
-        if meta.has_field("custom_plan_code"):
-            item.custom_plan_code = code
-        if meta.has_field("plan_name"):
-            item.plan_name = code
+        if dt not in code_fields:
+            meta = frappe.get_meta(dt)
+            code_fields[dt] = [f for f in ("custom_plan_code", "plan_name") if meta.has_field(f)]
+        for fieldname in code_fields[dt]:
+            setattr(item, fieldname, code)
 
     if include_legacy:
         for item in sheet_doc.get("items", []):
@@ -5735,6 +6387,116 @@ def update_sheet_plan_codes(sheet_doc, include_legacy=False):
         sheet_doc.custom_plan_code = ""
 
 
+# ===========================
+# PLAN CODE RECOMPUTE
+# ===========================
+# Set-based counterpart of update_sheet_plan_codes for whole sheets / the whole site: every board
+# row comes from one fetch, codes come from the memoized tables in plan_codes.py, and only codes
+# that differ from what is stored are written, with multi-row UPDATEs (_bulk_update_by_name).
+PLAN_CODE_TABLE_FIELDS = ["planned_items", "custom_planned_items", "planning_table", "custom_planning_table", "table"]
+# Changed rows listed in a dry-run response (counts always cover everything).
+PLAN_CODE_DIFF_LIMIT = 500
+
+
+def _plan_code_rows(doctype, scope_cond, params):
+    """Rows of a plan-code child table with their sheet header, ordered like the sheet's table."""
+    date_cols = [c for c in ("planned_date", "custom_item_planned_date") if _has_column(doctype, c)]
+    code_cols = [c for c in ("plan_name", "custom_plan_code") if _has_column(doctype, c)]
+    planned = "p.custom_planned_date" if _has_planned_date_column() else "NULL"
+    plan = "p.custom_plan_name" if _has_column("Planning sheet", "custom_plan_name") else "NULL"
+    sheet_code = "p.custom_plan_code" if _has_column("Planning sheet", "custom_plan_code") else "NULL"
+    rows = frappe.db.sql(
+        f"""
+        SELECT i.name, i.parent, i.parentfield, i.unit{''.join(', i.' + c for c in date_cols + code_cols)},
+            {planned} AS sheet_planned_date, p.ordered_date, {plan} AS sheet_plan, {sheet_code} AS sheet_code
+        FROM `tab{doctype}` i
+        JOIN `tabPlanning sheet` p ON p.name = i.parent
+        WHERE i.parenttype = 'Planning sheet' AND {scope_cond}
+        ORDER BY i.parent, i.idx
+        """,
+        params,
+        as_dict=True,
+    )
+    return rows, code_cols
+
+
+def _plan_code_diff(sheet_names=None, include_legacy=False):
+    """
+    Plan codes update_sheet_plan_codes would set, for ``sheet_names`` (None = every sheet with
+    docstatus < 2), as a diff against what is stored:
+        {"sheets": n scanned, "rows": {row: {"parent", "old", "new"}}, "headers": {sheet: {"old", "new"}},
+         "code_cols": Planning Table code columns}
+    Rows whose new code is empty are left alone, like the doc-based path.
+    include_legacy adds Planning sheet Item codes to the header list (legacy rows are not written).
+    """
+    diff = {"sheets": 0, "rows": {}, "headers": {}, "code_cols": []}
+    if sheet_names is None:
+        scope_cond, params = "p.docstatus < 2", ()
+    else:
+        sheet_names = tuple(sorted({s for s in sheet_names if s}))
+        if not sheet_names:
+            return diff
+        scope_cond, params = "p.name IN %s", (sheet_names,)
+
+    rows, code_cols = _plan_code_rows("Planning Table", scope_cond, params)
+    diff["code_cols"] = code_cols
+    headers = {}
+    by_sheet = {}
+    for r in rows:
+        headers.setdefault(r.parent, r)
+        by_sheet.setdefault(r.parent, {}).setdefault(r.parentfield, []).append(r)
+
+    codes = {}
+
+    def _row_code(r):
+        header = headers[r.parent]
+        day = (
+            r.get("planned_date")
+            or r.get("custom_item_planned_date")
+            or header.sheet_planned_date
+            or header.ordered_date
+        )
+        code = plan_code(day, r.unit, header.sheet_plan or "Default")
+        if code:
+            codes.setdefault(r.parent, set()).add(code)
+        return code
+
+    if include_legacy:
+        legacy_rows, _legacy_cols = _plan_code_rows("Planning sheet Item", scope_cond, params)
+        for r in legacy_rows:
+            headers.setdefault(r.parent, r)
+            _row_code(r)
+
+    for sheet, tables in by_sheet.items():
+        # update_sheet_plan_codes codes the first board table field that has rows.
+        table = next((tables[tf] for tf in PLAN_CODE_TABLE_FIELDS if tables.get(tf)), None)
+        for r in table or []:
+            code = _row_code(r)
+            if code and any(r.get(c) != code for c in code_cols):
+                diff["rows"][r.name] = {"parent": sheet, "old": r.get(code_cols[0]) if code_cols else None, "new": code}
+
+    if _has_column("Planning sheet", "custom_plan_code"):
+        for sheet, sheet_codes in codes.items():
+            new = ", ".join(sorted(sheet_codes))
+            old = headers[sheet].sheet_code
+            if new != old:
+                diff["headers"][sheet] = {"old": old, "new": new}
+    diff["sheets"] = len(headers)
+    return diff
+
+
+def _apply_plan_code_diff(diff):
+    """Write a _plan_code_diff: one multi-row UPDATE per chunk of rows / sheet headers."""
+    _bulk_update_by_name(
+        "Planning Table",
+        {name: {c: change["new"] for c in diff["code_cols"]} for name, change in diff["rows"].items()},
+    )
+    _bulk_update_by_name(
+        "Planning sheet",
+        {name: {"custom_plan_code": change["new"]} for name, change in diff["headers"].items()},
+    )
+
+
 @frappe.whitelist()
 def update_sequence(items):
     """
@@ -5856,6 +6618,12 @@ def update_schedule(item_name, unit, date, index=0, force_move=0, perform_split=
             # Only add a second Planning sheet Item row when remainder and split piece land on different units.
             units_differ = nu_rem != nu_split
 
+            delta = BoardDelta(
+                [item.name],
+                slots=[(target_date, nu_split), (best_slot_rem["date"], nu_rem)],
+                reason="update_schedule",
+            )
+
             # Update Original Item -> remainder; will be moved to best_slot_rem below
             item.qty = remainder_qty
             item.is_split = 1
@@ -5904,12 +6672,12 @@ def update_schedule(item_name, unit, date, index=0, force_move=0, perform_split=
                 normalize_planning_unit_for_select(unit),
                 (parent_sheet.get("custom_plan_name") or "Default"),
             )
-            if frappe.db.has_column("Planning Table", "plan_name"):
+            if _has_column("Planning Table", "plan_name"):
                 new_row_doc.plan_name = split_code
-            if frappe.db.has_column("Planning Table", "custom_plan_code"):
+            if _has_column("Planning Table", "custom_plan_code"):
                 new_row_doc.custom_plan_code = split_code
             # New split line represents remaining/new queue work; never carry old SPR link.
-            if frappe.db.has_column("Planning Table", "spr_name"):
+            if _has_column("Planning Table", "spr_name"):
                 new_row_doc.spr_name = ""
             if new_legacy_name and src_psi and units_differ:
                 new_row_doc.source_item = new_legacy_name
@@ -5922,12 +6690,11 @@ def update_schedule(item_name, unit, date, index=0, force_move=0, perform_split=
             frappe.db.commit()
 
             _move_item_to_slot(item, best_slot_rem["unit"], best_slot_rem["date"], None, plan_name)
+            _sync_effective_dates(item_names=[item.name, new_row_doc.name])
+            _touch_unit_load_days([target_date, current_effective_date])
+            delta.publish(extra_names=[new_row_doc.name])
 
             frappe.db.commit()
-            try:
-                frappe.publish_realtime("production_board_update", {"date": str(best_slot_rem["date"])})
-            except Exception:
-                pass
             return {"status": "success", "message": "Split successful"}
             
         else:
@@ -5950,11 +6717,12 @@ def update_schedule(item_name, unit, date, index=0, force_move=0, perform_split=
     # User drags to specific position. index is the new index in the list.
     # We should respect it.
     
+    delta = BoardDelta([item_name], slots=[(final_date, final_unit)], reason="update_schedule")
     _move_item_to_slot(item, final_unit, final_date, idx_val, plan_name)
-    
+    delta.publish()
+
     frappe.db.commit()
     try:
-        frappe.publish_realtime("production_board_update", {"date": str(final_date)})
         frappe.publish_realtime(
             "planning_sheet_row_sync",
             {"planning_sheet": item.parent, "row": item_name, "unit": final_unit, "date": str(final_date)},
@@ -5977,9 +6745,9 @@ def _planning_sheet_item_so_line_column():
 
 def _planning_table_so_line_column():
     """Column on Planning Table that links to the Sales Order line."""
-    if frappe.db.has_column("Planning Table", "sales_order_item"):
+    if _has_column("Planning Table", "sales_order_item"):
         return "sales_order_item"
-    if frappe.db.has_column("Planning Table", "custom_sales_order_item"):
+    if _has_column("Planning Table", "custom_sales_order_item"):
         return "custom_sales_order_item"
     return None
 
@@ -6273,14 +7041,14 @@ def _move_item_to_slot(item_doc, unit, date, new_idx=None, plan_name=None):
     # Update Item unit and parent first ÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â use raw SQL to bypass docstatus immutability
 
     update_fields = {"unit": unit, "source_item": item_doc.source_item}
-    if frappe.db.has_column("Planning Table", "planned_date"):
+    if _has_column("Planning Table", "planned_date"):
         update_fields["planned_date"] = target_date
-    if frappe.db.has_column("Planning Table", "plan_name"):
+    if _has_column("Planning Table", "plan_name"):
         update_fields["plan_name"] = move_code
-    if frappe.db.has_column("Planning Table", "custom_plan_code"):
+    if _has_column("Planning Table", "custom_plan_code"):
         update_fields["custom_plan_code"] = move_code
     # Moving to a different production date starts a new run context; old SPR must not flow forward.
-    if frappe.db.has_column("Planning Table", "spr_name"):
+    if _has_column("Planning Table", "spr_name"):
         date_changed = str(source_effective_date) != str(target_date)
         if date_changed:
             update_fields["spr_name"] = ""
@@ -6341,58 +7109,74 @@ def _move_item_to_slot(item_doc, unit, date, new_idx=None, plan_name=None):
             frappe.log_error(f"Global Sequence Fix Error: {str(e)}")
 
     # 3. Update Plan Codes for Affected Sheets (Planning Table only)
-    for sheet_name in set([source_parent.name, item_doc.parent]):
-        if frappe.db.exists("Planning sheet", sheet_name):
-            doc_sheet = frappe.get_doc("Planning sheet", sheet_name, ignore_cache=True)
-            update_sheet_plan_codes(doc_sheet, include_legacy=True)
-            frappe.db.sql("UPDATE `tabPlanning sheet` SET custom_plan_code = %s WHERE name = %s", (doc_sheet.custom_plan_code, doc_sheet.name))
-
-            for tf in ["planned_items", "custom_planned_items", "planning_table", "custom_planning_table", "table"]:
-                new_items = doc_sheet.get(tf)
-                if new_items:
-                    for d in new_items:
-                        if d.get("plan_name"):
-                            frappe.db.sql("UPDATE `tabPlanning Table` SET plan_name = %s WHERE name = %s", (d.plan_name, d.name))
-                    break
+    _refresh_sheet_plan_codes([source_parent.name, item_doc.parent])
+    _sync_effective_dates(item_names=[item_doc.name])
+    _touch_unit_load_days([item_doc.get("planned_date") or source_effective_date, target_date])
+
+
+def _refresh_sheet_plan_codes(sheet_names):
+    """Recompute sheet + Planning Table plan codes after moves (one fetch, changed codes only)."""
+    _apply_plan_code_diff(_plan_code_diff(sheet_names, include_legacy=True))
 
 @frappe.whitelist()
-def get_kanban_board(start_date, end_date):
+def get_kanban_board(start_date, end_date, page=None, page_size=None):
+    """
+    Kanban cards for sheets ordered in [start_date, end_date].
+
+    Two queries regardless of range size: the sheets, then all of their Planning Table rows
+    (parent IN ...), grouped in one Python pass. Pass ``page_size`` (and optional 1-based ``page``)
+    for large ranges; the response is then {"data", "page", "page_size", "has_more"} instead of
+    the plain list.
+    """
     start_date = getdate(start_date)
     end_date = getdate(end_date)
-    
-    sheets = frappe.get_all(
-        "Planning sheet",
-        filters={
-            "ordered_date": ["between", [start_date, end_date]],
-            "docstatus": ["<", 2]
-        },
-        fields=["name", "customer", "party_code", "ordered_date", "dod", "planning_status", "docstatus"],
-        order_by="ordered_date asc"
-    )
-    
+    page_size = cint(page_size)
+    page = max(1, cint(page) or 1)
+
+    limit_clause = ""
+    if page_size > 0:
+        # One extra row tells the client whether another page exists without a COUNT(*).
+        limit_clause = " LIMIT {} OFFSET {}".format(page_size + 1, (page - 1) * page_size)
+
+    sheets = frappe.db.sql(f"""
+        SELECT name, customer, party_code, ordered_date, dod, planning_status, docstatus
+        FROM `tabPlanning sheet`
+        WHERE ordered_date BETWEEN %s AND %s AND docstatus < 2
+        ORDER BY ordered_date ASC, name ASC{limit_clause}
+    """, (start_date, end_date), as_dict=True)
+
+    has_more = False
+    if page_size > 0 and len(sheets) > page_size:
+        has_more = True
+        sheets = sheets[:page_size]
+
+    items_by_sheet = {}
+    if sheets:
+        for item in frappe.db.sql("""
+            SELECT parent, qty, unit, custom_quality, color, gsm
+            FROM `tabPlanning Table`
+            WHERE parent IN %s
+            ORDER BY parent, idx
+        """, (tuple(s.name for s in sheets),), as_dict=True):
+            parent = item.pop("parent")
+            # Map custom_quality to quality for frontend consistency
+            item["quality"] = item.get("custom_quality")
+            items_by_sheet.setdefault(parent, []).append(item)
+
     data = []
     for sheet in sheets:
-        items = frappe.get_all(
-            "Planning Table",
-            filters={"parent": sheet.name},
-            fields=["qty", "unit", "custom_quality", "color", "gsm"],
-            order_by="idx"
-        )
-        
-        # Map custom_quality to quality for frontend consistency
-        for item in items:
-            item["quality"] = item.get("custom_quality")
+        items = items_by_sheet.get(sheet.name, [])
+
+        total_weight = 0.0
+        unit_counts = {}
+        for d in items:
+            total_weight += flt(d.qty)
+            if d.unit:
+                unit_counts[d.unit] = unit_counts.get(d.unit, 0) + 1
+
+        # Major Unit: most frequent unit on the sheet
+        unit = max(unit_counts, key=unit_counts.get) if unit_counts else "Unit 1"
 
-        total_weight = sum([flt(d.qty) for d in items])
-        
-        # Determine Major Unit
-        unit = "Unit 1" # Default
-        if items:
-            # Get most frequent unit
-            units = [d.unit for d in items if d.unit]
-            if units:
-                unit = max(set(units), key=units.count)
-        
         data.append({
             "name": sheet.name,
             "customer": sheet.customer,
@@ -6405,7 +7189,9 @@ def get_kanban_board(start_date, end_date):
             "total_weight": total_weight,
             "items": items
         })
-        
+
+    if page_size > 0:
+        return {"data": data, "page": page, "page_size": page_size, "has_more": has_more}
     return data
 
 # ... (Existing get_color_chart_data, update_item_unit, update_items_bulk, etc. - UNCHANGED) ...
@@ -6466,29 +7252,35 @@ def get_color_sequence(date, unit, plan_name="Default"):
 
 @frappe.whitelist()
 def get_color_sequences_range(start_date, end_date, unit=None, plan_name="__all__"):
-    """Fetches all color sequences for a range of dates and units."""
+    """Fetches all color sequences for a range of dates and units (latest saved per unit/date)."""
     try:
-        filters = {
-            "date": ["between", [start_date, end_date]]
-        }
+        params = {"start": start_date, "end": end_date}
+        conditions = ["c.date BETWEEN %(start)s AND %(end)s"]
+        plan_cond = ""
         if unit and unit != "All Units":
-            filters["unit"] = _normalize_unit(unit)
+            params["unit"] = _normalize_unit(unit)
+            conditions.append("c.unit = %(unit)s")
         if plan_name and plan_name != "__all__":
-            filters["plan_name"] = plan_name
-            
-        sequences = frappe.get_all("Color Sequence Approval", 
-            filters=filters, 
-            fields=["name", "date", "unit", "plan_name", "sequence_data", "status"],
-            order_by="modified desc"
-        )
+            params["plan_name"] = plan_name
+            conditions.append("c.plan_name = %(plan_name)s")
+            plan_cond = "AND n.plan_name = %(plan_name)s"
+
+        # Only the most recently modified row per unit/date is loaded and parsed.
+        sequences = frappe.db.sql(f"""
+            SELECT c.unit, c.date, c.sequence_data, c.status
+            FROM `tabColor Sequence Approval` c
+            WHERE {' AND '.join(conditions)}
+                AND NOT EXISTS (
+                    SELECT 1 FROM `tabColor Sequence Approval` n
+                    WHERE n.unit = c.unit AND n.date = c.date {plan_cond}
+                        AND (n.modified > c.modified OR (n.modified = c.modified AND n.name > c.name))
+                )
+        """, params, as_dict=True)
         
         result = {}
         for s in sequences:
             # Key by unit-date for easy frontend lookup
             key = f"{s.unit}-{s.date}"
-            # Keep first seen entry (latest modified due to order_by).
-            if key in result:
-                continue
             try:
                 seq = json.loads(s.sequence_data) if s.sequence_data else []
             except Exception:
@@ -6540,38 +7332,212 @@ def save_color_sequence(date, unit, sequence_data, plan_name="Default", new_date
         doc.sequence_data = sequence_data
     else:
         doc.sequence_data = json.dumps(sequence_data)
+    if _has_sequence_summary_columns():
+        doc.update(_sequence_summaries({name: _parse_sequence(doc.sequence_data)})[name])
         
     doc.save()
     frappe.db.commit()
-    return {"status": "success", "name": name, "date": date}
+    return {"status": "success", "name": name, "date": date}
+
+
+# ---- Colour sequence history ----
+# Rollback snapshots of Color Sequence Approval.sequence_data, one row per save in
+# SEQUENCE_HISTORY_TABLE, indexed by (plan, unit, date, id). A row holds the full sequence
+# (keyframe) or a compact diff against an earlier snapshot of the same scope, recorded in base_id
+# (see production_scheduler.sequence_diff). Replay applies each diff to its own base row, so two
+# saves that diffed against the same snapshot concurrently both restore intact. At most SEQUENCE_HISTORY_KEYFRAME_EVERY rows chain off a
+# keyframe, so the latest / previous snapshot is two indexed queries over a bounded range.
+# Saves only append; prune_sequence_history (daily) trims each scope to SEQUENCE_HISTORY_KEEP
+# snapshots. The table is created, and histories kept in global defaults by older versions are
+# imported, by build_sequence_history (patch); until then snapshots are skipped.
+
+SEQUENCE_HISTORY_TABLE = "production_sequence_history"
+SEQUENCE_HISTORY_BUILT_KEY = "production_scheduler_sequence_history_built"
+SEQUENCE_HISTORY_LEGACY_PREFIX = "production_sequence_history::"
+SEQUENCE_HISTORY_KEEP = 20
+SEQUENCE_HISTORY_KEYFRAME_EVERY = 10
+
+
+def _ensure_sequence_history_table():
+    frappe.db.sql(f"""
+        CREATE TABLE IF NOT EXISTS `{SEQUENCE_HISTORY_TABLE}` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            `plan_name` VARCHAR(140) NOT NULL,
+            `unit` VARCHAR(140) NOT NULL,
+            `seq_date` VARCHAR(20) NOT NULL,
+            `keyframe_id` BIGINT NULL,
+            `base_id` BIGINT NULL,
+            `depth` INT NOT NULL DEFAULT 0,
+            `status` VARCHAR(40),
+            `owner` VARCHAR(140),
+            `creation` DATETIME,
+            `payload` LONGTEXT,
+            KEY `idx_scope` (`plan_name`, `unit`, `seq_date`, `id`)
+        )
+    """)
+
+
+def build_sequence_history():
+    """
+    Create the history table and import the global-defaults histories (run once per site by the
+    build_sequence_history patch; later calls only make sure the table exists).
+    """
+    _ensure_sequence_history_table()
+    if not frappe.db.get_default(SEQUENCE_HISTORY_BUILT_KEY):
+        legacy = frappe.db.sql(
+            "SELECT `defkey`, `defvalue` FROM `tabDefaultValue` WHERE `parent` = '__default' AND `defkey` LIKE %s",
+            (SEQUENCE_HISTORY_LEGACY_PREFIX + "%",),
+        )
+        for key, raw in legacy:
+            if not key.startswith(SEQUENCE_HISTORY_LEGACY_PREFIX):
+                continue
+            parts = key[len(SEQUENCE_HISTORY_LEGACY_PREFIX):].rsplit("::", 2)
+            if len(parts) == 3:
+                try:
+                    entries = json.loads(raw) if raw else []
+                except Exception:
+                    entries = []
+                for entry in entries if isinstance(entries, list) else []:
+                    if isinstance(entry, dict) and entry.get("sequence_data"):
+                        _insert_sequence_snapshot(
+                            tuple(parts), entry["sequence_data"], entry.get("status"), entry.get("by"), entry.get("ts")
+                        )
+            frappe.defaults.clear_default(key)
+        frappe.db.set_default(SEQUENCE_HISTORY_BUILT_KEY, frappe.utils.now())
+    frappe.local.production_scheduler_sequence_history_ready = True
+    frappe.db.commit()
 
 
-def _sequence_history_key(date, unit, plan_name):
-    return f"production_sequence_history::{plan_name}::{_normalize_unit(unit)}::{date}"
+def _sequence_history_ready():
+    """True once build_sequence_history has run; memoized per request."""
+    ready = getattr(frappe.local, "production_scheduler_sequence_history_ready", None)
+    if ready is None:
+        ready = bool(frappe.db.get_default(SEQUENCE_HISTORY_BUILT_KEY))
+        frappe.local.production_scheduler_sequence_history_ready = ready
+    return ready
 
 
-def _append_sequence_history(date, unit, plan_name, sequence_data, status=None):
+def _sequence_history_scope(date, unit, plan_name):
+    return (plan_name or "Default", _normalize_unit(unit), str(date))
+
+
+def _sequence_history_snapshots(scope, count=1):
     """
-    Store compact sequence history in defaults for rollback.
-    Keeps most recent 20 snapshots per date/unit/plan.
+    Newest-first snapshots of a scope, at most ``count``:
+    [{"id", "keyframe_id", "depth", "status", "by", "ts", "sequence_data"}].
     """
-    if not sequence_data:
-        return
-    key = _sequence_history_key(date, unit, plan_name or "Default")
-    raw = frappe.defaults.get_global_default(key) or "[]"
+    heads = frappe.db.sql(f"""
+        SELECT `id`, `keyframe_id` FROM `{SEQUENCE_HISTORY_TABLE}`
+        WHERE `plan_name` = %s AND `unit` = %s AND `seq_date` = %s
+        ORDER BY `id` DESC LIMIT %s
+    """, scope + (cint(count),))
+    if not heads:
+        return []
+    first = min(keyframe_id or row_id for row_id, keyframe_id in heads)
+    rows = frappe.db.sql(f"""
+        SELECT `id`, `keyframe_id`, `base_id`, `depth`, `status`, `owner`, `creation`, `payload`
+        FROM `{SEQUENCE_HISTORY_TABLE}`
+        WHERE `plan_name` = %s AND `unit` = %s AND `seq_date` = %s AND `id` BETWEEN %s AND %s
+        ORDER BY `id`
+    """, scope + (first, heads[0][0]), as_dict=True)
+    snapshots = []
+    states = {}
+    for r in rows:
+        if r.keyframe_id is None:
+            raw = r.payload or "[]"
+            try:
+                current = json.loads(raw)
+            except Exception:
+                current = None
+        else:
+            base = states.get(r.base_id)
+            if not isinstance(base, list):
+                continue
+            current = apply_sequence_diff(base, json.loads(r.payload or "{}"))
+            raw = json.dumps(current)
+        states[r.id] = current
+        snapshots.append({
+            "id": r.id,
+            "keyframe_id": r.keyframe_id,
+            "depth": cint(r.depth),
+            "status": r.status,
+            "by": r.owner,
+            "ts": r.creation,
+            "sequence_data": raw,
+            "sequence": current if isinstance(current, list) else None,
+        })
+    snapshots.reverse()
+    return snapshots[:count]
+
+
+def _insert_sequence_snapshot(scope, sequence_data, status=None, owner=None, ts=None):
+    raw = sequence_data if isinstance(sequence_data, str) else json.dumps(sequence_data)
+    keyframe_id = None
+    base_id = None
+    depth = 0
+    payload = raw
     try:
-        arr = json.loads(raw) if raw else []
+        current = json.loads(raw)
     except Exception:
-        arr = []
-    arr.append({
-        "ts": frappe.utils.now(),
-        "by": frappe.session.user,
-        "status": status or "Draft",
-        "sequence_data": sequence_data if isinstance(sequence_data, str) else json.dumps(sequence_data),
-    })
-    if len(arr) > 20:
-        arr = arr[-20:]
-    frappe.defaults.set_global_default(key, json.dumps(arr))
+        current = None
+    if isinstance(current, list):
+        previous = _sequence_history_snapshots(scope, 1)
+        prev = previous[0] if previous else None
+        if prev and isinstance(prev["sequence"], list) and prev["depth"] < SEQUENCE_HISTORY_KEYFRAME_EVERY - 1:
+            diff = json.dumps(encode_sequence_diff(prev["sequence"], current))
+            if len(diff) < len(raw):
+                keyframe_id = prev["keyframe_id"] or prev["id"]
+                base_id = prev["id"]
+                depth = prev["depth"] + 1
+                payload = diff
+    frappe.db.sql(f"""
+        INSERT INTO `{SEQUENCE_HISTORY_TABLE}`
+            (`plan_name`, `unit`, `seq_date`, `keyframe_id`, `base_id`, `depth`, `status`, `owner`, `creation`, `payload`)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, scope + (keyframe_id, base_id, depth, status or "Draft", owner, ts or frappe.utils.now(), payload))
+
+
+def _append_sequence_history(date, unit, plan_name, sequence_data, status=None):
+    """
+    Append a rollback snapshot of a sequence (full or diffed against the previous one).
+    Retention is left to prune_sequence_history.
+    """
+    if not sequence_data or not _sequence_history_ready():
+        return
+    _insert_sequence_snapshot(
+        _sequence_history_scope(date, unit, plan_name), sequence_data, status, frappe.session.user
+    )
+
+
+def prune_sequence_history():
+    """Daily job: keep the newest SEQUENCE_HISTORY_KEEP snapshots per plan/unit/date (and the keyframe they build on)."""
+    if not _sequence_history_ready():
+        return {"status": "not_built", "scopes_pruned": 0}
+    scopes = frappe.db.sql(f"""
+        SELECT `plan_name`, `unit`, `seq_date` FROM `{SEQUENCE_HISTORY_TABLE}`
+        GROUP BY `plan_name`, `unit`, `seq_date`
+        HAVING COUNT(*) > %s
+    """, (SEQUENCE_HISTORY_KEEP,))
+    pruned = 0
+    for i, scope in enumerate(scopes, 1):
+        scope = tuple(scope)
+        oldest_kept = frappe.db.sql(f"""
+            SELECT `id`, `keyframe_id` FROM `{SEQUENCE_HISTORY_TABLE}`
+            WHERE `plan_name` = %s AND `unit` = %s AND `seq_date` = %s
+            ORDER BY `id` DESC LIMIT 1 OFFSET %s
+        """, scope + (SEQUENCE_HISTORY_KEEP - 1,))
+        if not oldest_kept:
+            continue
+        keep_from = oldest_kept[0][1] or oldest_kept[0][0]
+        frappe.db.sql(f"""
+            DELETE FROM `{SEQUENCE_HISTORY_TABLE}`
+            WHERE `plan_name` = %s AND `unit` = %s AND `seq_date` = %s AND `id` < %s
+        """, scope + (keep_from,))
+        pruned += 1
+        if i % 500 == 0:
+            frappe.db.commit()
+    frappe.db.commit()
+    return {"status": "success", "scopes_pruned": pruned}
 
 
 @frappe.whitelist()
@@ -6580,17 +7546,15 @@ def restore_last_color_sequence(date, unit, plan_name="Default"):
     Restore previous saved sequence snapshot for a specific unit/date/plan.
     """
     unit = _normalize_unit(unit)
-    key = _sequence_history_key(date, unit, plan_name)
-    raw = frappe.defaults.get_global_default(key) or "[]"
-    try:
-        arr = json.loads(raw) if raw else []
-    except Exception:
-        arr = []
-    if not arr:
+    if not _sequence_history_ready():
+        return {"status": "error", "message": "Sequence history is not set up yet; run bench migrate"}
+    latest = _sequence_history_snapshots(_sequence_history_scope(date, unit, plan_name), 1)
+    if not latest:
         return {"status": "error", "message": f"No saved history for {unit} on {date}"}
 
-    last = arr.pop()
-    frappe.defaults.set_global_default(key, json.dumps(arr))
+    last = latest[0]
+    # Pop the newest row (no later diff builds on it); the save below snapshots the current sequence.
+    frappe.db.sql(f"DELETE FROM `{SEQUENCE_HISTORY_TABLE}` WHERE `id` = %s", (last["id"],))
     return save_color_sequence(
         date=date,
         unit=unit,
@@ -6634,12 +7598,75 @@ def reject_sequence(date, unit, plan_name="Default"):
     frappe.db.commit()
     return {"status": "success"}
 
+SEQUENCE_SUMMARY_FIELDS = ("item_count", "total_qty", "first_color", "last_color")
+
+
+def _has_sequence_summary_columns():
+    """Check if the Color Sequence Approval summary columns exist (added after the doctype)."""
+    return _has_column("Color Sequence Approval", "first_color")
+
+
+def _parse_sequence(sequence_data):
+    """Planning Table row names of a saved sequence; [] for empty / unparsable data."""
+    if isinstance(sequence_data, (list, tuple)):
+        return list(sequence_data)
+    try:
+        seq = json.loads(sequence_data) if sequence_data else []
+    except Exception:
+        return []
+    return seq if isinstance(seq, list) else []
+
+
+def _sequence_summaries(sequences):
+    """
+    {key: [Planning Table row names]} -> {key: {item_count, total_qty, first_color, last_color}},
+    reading every referenced row with one query. Rows that no longer exist are skipped, so the
+    count, quantity and colours all describe the same rows.
+    """
+    item_names = {n for seq in sequences.values() for n in seq if isinstance(n, str) and n}
+    rows = {}
+    if item_names:
+        for r in frappe.db.sql(
+            "SELECT name, color, qty FROM `tabPlanning Table` WHERE name IN %s",
+            (tuple(item_names),), as_dict=True,
+        ):
+            rows[r.name] = r
+    summaries = {}
+    for key, seq in sequences.items():
+        found = [rows[n] for n in seq if isinstance(n, str) and n in rows]
+        summaries[key] = {
+            "item_count": len(found),
+            "total_qty": sum(flt(r.qty) for r in found),
+            "first_color": (found[0].color or "") if found else "",
+            "last_color": (found[-1].color or "") if found else "",
+        }
+    return summaries
+
+
+def _fill_sequence_summaries(rows):
+    """Compute and store summaries for list rows saved before the summary columns existed."""
+    missing = [r.name for r in rows if r.get("first_color") is None and not r.get("item_count")]
+    if not missing:
+        return
+    raw = dict(frappe.db.sql(
+        "SELECT name, sequence_data FROM `tabColor Sequence Approval` WHERE name IN %s",
+        (tuple(missing),),
+    ))
+    summaries = _sequence_summaries({n: _parse_sequence(raw.get(n)) for n in missing})
+    _bulk_update_by_name("Color Sequence Approval", summaries)
+    for r in rows:
+        if r.name in summaries:
+            r.update(summaries[r.name])
+
+
 @frappe.whitelist()
-def get_pending_approvals(limit=200):
+def get_pending_approvals(limit=200, after_modified=None, after_name=None):
     """
-    Colour / arrangement dashboard list (historical).
+    Colour / arrangement dashboard list (historical), newest first.
 
     Include all statuses so Approved/Rejected sequences remain visible in the sidebar.
+    Rows carry summary fields only (the sequence itself comes from get_approval_sequence);
+    pass the last row's modified / name as after_modified / after_name for the next page.
     """
     lim = None
     try:
@@ -6647,13 +7674,36 @@ def get_pending_approvals(limit=200):
     except Exception:
         lim = 200
 
-    return frappe.get_all(
+    fields = ["name", "date", "unit", "status", "plan_name", "modified", "owner"]
+    has_summary = _has_sequence_summary_columns()
+    if has_summary:
+        fields.extend(SEQUENCE_SUMMARY_FIELDS)
+    filters = {}
+    or_filters = None
+    if after_modified:
+        # Keyset on (modified, name): modified <= cursor AND (modified < cursor OR name < cursor name).
+        filters["modified"] = ["<=", after_modified]
+        or_filters = {"modified": ["<", after_modified], "name": ["<", after_name or ""]}
+
+    rows = frappe.get_list(
         "Color Sequence Approval",
-        filters={},
-        fields=["name", "date", "unit", "status", "plan_name", "sequence_data", "modified", "owner"],
-        order_by="modified desc",
+        filters=filters,
+        or_filters=or_filters,
+        fields=fields,
+        order_by="modified desc, name desc",
         limit=lim,
     )
+    if has_summary:
+        _fill_sequence_summaries(rows)
+    return rows
+
+
+@frappe.whitelist()
+def get_approval_sequence(name):
+    """Saved sequence (Planning Table row names) of one arrangement, loaded when it is opened."""
+    doc = frappe.get_doc("Color Sequence Approval", name)
+    doc.check_permission("read")
+    return _parse_sequence(doc.sequence_data)
 
 @frappe.whitelist()
 def get_items_by_name(names):
@@ -6698,23 +7748,23 @@ def _get_color_chart_data_impl(
         # Pull Orders dialog: shows ALL items currently ON the board for source_date.
         # This includes color items (explicitly pushed, have planned_date = target_date)
         # AND white items (auto-planned, use ordered_date = target_date with no item-level date).
-        has_col = frappe.db.has_column("Planning Table", "planned_date")
+        has_col = _has_column("Planning Table", "planned_date")
         clean_white_sql_pull = ", ".join([f"'{c.upper().replace(' ', '')}'" for c in WHITE_COLORS])
         
         # Dynamically detect Sales Order Item column
         so_item_real_col = "sales_order_item"
-        if not frappe.db.has_column("Planning Table", so_item_real_col):
+        if not _has_column("Planning Table", so_item_real_col):
             so_item_real_col = "custom_sales_order_item"
         
         # Only use the column if it's found in the physical table
-        columns = frappe.db.get_table_columns("Planning Table")
+        columns = _table_columns("Planning Table")
         if so_item_real_col not in columns:
             so_item_col = "'' as salesOrderItem,"
         else:
             so_item_col = f"i.{so_item_real_col} as salesOrderItem,"
 
         split_col = ""
-        if frappe.db.has_column("Planning Table", "is_split"):
+        if _has_column("Planning Table", "is_split"):
             split_col = "i.is_split as isSplit,"
         else:
             split_col = "0 as isSplit,"
@@ -6723,6 +7773,7 @@ def _get_color_chart_data_impl(
             # All items on board for target_date:
             # 1. Items with explicit planned_date = target_date (colors + manually-moved whites)
             # 2. White items with ordered_date = target_date and no item-level override
+            eff_col = _pt_effective_date_sql()
             items = frappe.db.sql(f"""
                 SELECT 
                     i.name as itemName, i.item_code, i.item_name, i.qty, i.uom, i.unit,
@@ -6736,7 +7787,7 @@ def _get_color_chart_data_impl(
                 LEFT JOIN `tabCustomer` c ON p.customer = c.name
                 WHERE i.color IS NOT NULL AND i.color != ''
                   AND p.docstatus < 2
-                  AND DATE(COALESCE(NULLIF(i.planned_date, ''), NULLIF(p.custom_planned_date, ''), p.ordered_date)) = DATE(%s)
+                  AND {eff_col} = DATE(%s)
                   AND (
                         REPLACE(UPPER(COALESCE(i.color, '')), ' ', '') IN ({clean_white_sql_pull})
                         OR COALESCE(NULLIF(i.planned_date, ''), '') != ''
@@ -6747,7 +7798,7 @@ def _get_color_chart_data_impl(
             """, (target_date,), as_dict=True)
         else:
             # Fallback: use sheet-level date
-            sheet_date_col = "COALESCE(p.custom_planned_date, p.ordered_date)" if frappe.db.has_column("Planning sheet", "custom_planned_date") else "p.ordered_date"
+            sheet_date_col = "COALESCE(p.custom_planned_date, p.ordered_date)" if _has_column("Planning sheet", "custom_planned_date") else "p.ordered_date"
             items = frappe.db.sql(f"""
                 SELECT 
                     i.name as itemName, i.item_code, i.item_name, i.qty, i.uom, i.unit,
@@ -6808,11 +7859,11 @@ def _get_color_chart_data_impl(
     # Use item-level planned_date when set, else sheet custom_planned_date
     if mode == "pull_board" and date:
         target_date = getdate(date)
-        has_item_planned = frappe.db.has_column("Planning Table", "planned_date")
-        has_sheet_planned = frappe.db.has_column("Planning sheet", "custom_planned_date")
+        has_item_planned = _has_column("Planning Table", "planned_date")
+        has_sheet_planned = _has_column("Planning sheet", "custom_planned_date")
         # Effective date: prefer item level, then sheet level, fallback to ordered_date (for auto-whites)
         item_date_expr = (
-            "COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date) = %s"
+            f"{_pt_effective_date_sql()} = %s"
             if (has_item_planned and has_sheet_planned)
             else "COALESCE(p.custom_planned_date, p.ordered_date) = %s" if has_sheet_planned else "p.ordered_date = %s"
         )
@@ -6820,7 +7871,7 @@ def _get_color_chart_data_impl(
 
         # Dynamically detect Sales Order Item column
         so_item_real_col = "sales_order_item"
-        columns = frappe.db.get_table_columns("Planning Table")
+        columns = _table_columns("Planning Table")
         if "sales_order_item" not in columns and "custom_sales_order_item" in columns:
             so_item_real_col = "custom_sales_order_item"
         
@@ -6828,7 +7879,7 @@ def _get_color_chart_data_impl(
             so_item_col = "'' as salesOrderItem,"
         else:
             so_item_col = f"i.{so_item_real_col} as salesOrderItem,"
-        split_col = "i.is_split as isSplit," if frappe.db.has_column("Planning Table", "is_split") else "0 as isSplit,"
+        split_col = "i.is_split as isSplit," if _has_column("Planning Table", "is_split") else "0 as isSplit,"
 
         items = frappe.db.sql(f"""
             SELECT
@@ -6973,7 +8024,7 @@ def _get_color_chart_data_impl(
     # Non-white items are filtered per-item later unless they belong to a PB plan.
     if cint(planned_only) and _has_planned_date_column():
         # Allow sheets where EITHER the sheet has custom_planned_date OR items have planned_date
-        has_item_planned = frappe.db.has_column("Planning Table", "planned_date")
+        has_item_planned = _has_column("Planning Table", "planned_date")
         if has_item_planned:
             plan_condition += f""" AND (
                 (p.custom_planned_date IS NOT NULL AND p.custom_planned_date != '')
@@ -7108,7 +8159,7 @@ def _get_color_chart_data_impl(
 
         so_order_code_col = None
         for c in ["order_code", "custom_order_code", "po_no", "customer_order_no"]:
-            if frappe.db.has_column("Sales Order", c):
+            if _has_column("Sales Order", c):
                 so_order_code_col = c
                 break
             
@@ -7398,7 +8449,7 @@ def _get_color_chart_data_impl(
     # Shaft Production Run aggregation (submitted docs) for production flows
     try:
         if frappe.db.exists("DocType", "Shaft Production Run"):
-            spr_cols = frappe.db.get_table_columns("Shaft Production Run") or []
+            spr_cols = _table_columns("Shaft Production Run") or []
             spr_produced_col = None
             for c in ["total_produced_weight", "custom_total_produced_weight", "produced_qty"]:
                 if c in spr_cols:
@@ -7502,7 +8553,7 @@ def _get_color_chart_data_impl(
     spr_pp_achieved_weight_map = {}  # Map PP to SPR achieved weight
     try:
         if valid_pps and frappe.db.exists("DocType", "Shaft Production Run"):
-            spr_cols_local = frappe.db.get_table_columns("Shaft Production Run") or []
+            spr_cols_local = _table_columns("Shaft Production Run") or []
             spr_pp_link_col = next((c for c in ["production_plan", "custom_production_plan"] if c in spr_cols_local), None)
             spr_achieved_col = next(
                 (
@@ -7597,8 +8648,8 @@ def _get_color_chart_data_impl(
     # Fetch SPR production via spr_name field on Planning Table (board rows)
     spr_psi_achieved_weight_map = {}  # Map PSI to SPR achieved weight
     try:
-        if frappe.db.has_column("Planning Table", "spr_name") and frappe.db.exists("DocType", "Shaft Production Run"):
-            spr_cols_pt = frappe.db.get_table_columns("Shaft Production Run") or []
+        if _has_column("Planning Table", "spr_name") and frappe.db.exists("DocType", "Shaft Production Run"):
+            spr_cols_pt = _table_columns("Shaft Production Run") or []
             spr_produced_col_pt = None
             for c in ["total_produced_weight", "custom_total_produced_weight", "produced_qty"]:
                 if c in spr_cols_pt:
@@ -7653,7 +8704,7 @@ def _get_color_chart_data_impl(
     # Item-level produced quantity map via sales_order_item/custom_sales_order_item
     if sheet_names:
         # 1) Strongest link: Planning Sheet Item -> Production Plan -> Work Order
-        if psi_pp_field and frappe.db.has_column("Planning Table", psi_pp_field):
+        if psi_pp_field and _has_column("Planning Table", psi_pp_field):
             fmt_sheet = ','.join(['%s'] * len(sheet_names))
             psi_pp_rows = frappe.db.sql(f"""
                 SELECT name as psi_name, {psi_pp_field} as production_plan
@@ -7699,10 +8750,10 @@ def _get_color_chart_data_impl(
                         pp_wo_count_map[pp] = cint(row.get("wo_count"))
 
         # 2) Fallback link: Planning Sheet Item sales_order_item -> Work Order
-        psi_so_item_col = "sales_order_item" if frappe.db.has_column("Planning Table", "sales_order_item") else "custom_sales_order_item"
+        psi_so_item_col = "sales_order_item" if _has_column("Planning Table", "sales_order_item") else "custom_sales_order_item"
         wo_so_item_col = "sales_order_item" if frappe.db.has_column("Work Order", "sales_order_item") else "custom_sales_order_item"
 
-        if psi_so_item_col and wo_so_item_col and frappe.db.has_column("Planning Table", psi_so_item_col) and frappe.db.has_column("Work Order", wo_so_item_col):
+        if psi_so_item_col and wo_so_item_col and _has_column("Planning Table", psi_so_item_col) and frappe.db.has_column("Work Order", wo_so_item_col):
             fmt_sheet = ','.join(['%s'] * len(sheet_names))
             so_item_rows = frappe.db.sql(f"""
                 SELECT DISTINCT {psi_so_item_col} as so_item
@@ -7750,7 +8801,7 @@ def _get_color_chart_data_impl(
     split_so_item_produced_alloc_map = {}
     spr_has_unit_col = False
     try:
-        spr_has_unit_col = frappe.db.has_column("Shaft Production Run", "unit")
+        spr_has_unit_col = _has_column("Shaft Production Run", "unit")
     except Exception:
         spr_has_unit_col = False
 
@@ -8046,7 +9097,7 @@ def _get_color_chart_data_impl(
                 item_pp = so_item_pp_cache.get(so_item_key)
                 if item_pp:
                     item_pp_map[item.get("name")] = item_pp
-                    if psi_pp_field and frappe.db.has_column("Planning Table", psi_pp_field):
+                    if psi_pp_field and _has_column("Planning Table", psi_pp_field):
                         try:
                             current_pp = frappe.db.get_value("Planning Table", item.get("name"), psi_pp_field)
                             if not current_pp:
@@ -8365,9 +9416,203 @@ def update_item_unit(item_name, unit):
     frappe.db.set_value(
         "Planning Table", item_name, "unit", normalize_planning_unit_for_select(unit)
     )
+    # Same date, other unit: both (date, unit) summary rows change.
+    _touch_unit_load_days(_item_effective_dates([item_name]))
     return {"status": "success"}
 
 
+def _bulk_schedule_moves(rows):
+    """
+    Set-based counterpart of update_schedule for plain moves (no force/split/next-day flags).
+
+    - one fetch for all rows + parents, one UnitLoadGrid for every source/target date
+    - capacity per move with update_schedule's rule (load of the sheet's own plan + weight > HARD_LIMITS
+      -> overflow); accepted moves are booked into the grid so later rows in the batch see them
+    - unit/date/plan code (+ legacy Planning sheet Item mirror) written with multi-row UPDATEs
+    - each affected (date, unit, PB plan) slot re-sequenced once, plan codes refreshed once per sheet
+
+    Rows whose legacy PSI is shared with other board rows (splits), has sibling rows for the same
+    SO line, or is missing need the clone/merge logic in _move_item_to_slot; they are returned in "fallback" for the single-row path.
+    Returns {"moved": [...], "overflow": [...], "fallback": [...], "dates": set()}.
+    """
+    out = {"moved": [], "overflow": [], "fallback": [], "dates": set()}
+    names = [r.get("name") for r in rows if r.get("name")]
+    if not names:
+        return out
+
+    planned_col = "i.planned_date" if _has_column("Planning Table", "planned_date") else "NULL"
+    pb_plan_col = "p.custom_pb_plan_name" if _has_column("Planning sheet", "custom_pb_plan_name") else "''"
+    current = {
+        r.name: r
+        for r in frappe.db.sql(f"""
+            SELECT i.name, i.parent, i.unit, i.qty, i.source_item, i.custom_quality,
+                   {planned_col} AS planned_date,
+                   p.custom_planned_date, p.ordered_date, p.custom_plan_name,
+                   {pb_plan_col} AS pb_plan_name
+            FROM `tabPlanning Table` i
+            JOIN `tabPlanning sheet` p ON i.parent = p.name
+            WHERE i.name IN %s
+        """, (tuple(names),), as_dict=True)
+    }
+
+    # Legacy PSI links: existing + how many board rows share each one.
+    sources = list({c.source_item for c in current.values() if c.source_item})
+    existing_psi = set()
+    shared_psi = set()
+    if sources:
+        existing_psi = {r[0] for r in frappe.db.sql(
+            "SELECT name FROM `tabPlanning sheet Item` WHERE name IN %s", (tuple(sources),)
+        )}
+        shared_psi = {r[0] for r in frappe.db.sql("""
+            SELECT source_item FROM `tabPlanning Table`
+            WHERE source_item IN %s
+            GROUP BY source_item
+            HAVING COUNT(*) > 1
+        """, (tuple(sources),))}
+        # Same SO line split over several legacy rows: _move_item_to_slot may merge them on arrival.
+        so_col = _planning_sheet_item_so_line_column()
+        if so_col:
+            shared_psi.update(r[0] for r in frappe.db.sql(f"""
+                SELECT psi.name
+                FROM `tabPlanning sheet Item` psi
+                JOIN `tabPlanning sheet Item` sib
+                  ON sib.parent = psi.parent AND sib.`{so_col}` = psi.`{so_col}` AND sib.name != psi.name
+                WHERE psi.name IN %s AND IFNULL(psi.`{so_col}`, '') != ''
+            """, (tuple(sources),)))
+
+    plans = []
+    for row in rows:
+        cur = current.get(row.get("name"))
+        if not cur:
+            continue
+        src_date = cur.planned_date or cur.custom_planned_date or cur.ordered_date
+        target_date = row.get("date") or cur.planned_date or cur.custom_planned_date or cur.ordered_date
+        if not target_date or not src_date:
+            continue
+        if not cur.source_item or cur.source_item not in existing_psi or cur.source_item in shared_psi:
+            out["fallback"].append(row)
+            continue
+        plans.append((row, cur, getdate(src_date), getdate(target_date), normalize_planning_unit_for_select(row.get("unit") or cur.unit)))
+    if not plans:
+        return out
+
+    all_dates = [p[2] for p in plans] + [p[3] for p in plans]
+    grid = get_unit_load_grid(min(all_dates), max(all_dates))
+
+    moved = []
+    for row, cur, src_date, target_date, unit in plans:
+        tons = flt(cur.qty) / 1000.0
+        sheet_plan = cur.custom_plan_name or "Default"
+        pb_flag = 1 if cur.custom_planned_date else 0
+        if not is_quality_allowed(unit, cur.custom_quality or ""):
+            frappe.throw(_("Quality <b>{}</b> is not allowed in <b>{}</b>.").format(cur.custom_quality or "", unit))
+
+        # Take the row off its source slot first: a same-slot reorder then checks against the
+        # unchanged load, a cross-slot move against target load + own weight (as update_schedule).
+        grid.remove(src_date, cur.unit, tons, sheet_plan, pb=pb_flag)
+        current_load = grid.get(target_date, unit, sheet_plan)
+        limit = HARD_LIMITS.get(unit, 999.0)
+        if current_load + tons > limit:
+            grid.add(src_date, cur.unit, tons, sheet_plan, pb=pb_flag)
+            out["overflow"].append({
+                "name": cur.name,
+                "status": "overflow",
+                "available": max(0, limit - current_load),
+                "limit": limit,
+                "current_load": current_load,
+                "order_weight": tons,
+                "target_date": str(target_date),
+                "target_unit": unit,
+            })
+            continue
+        grid.add(target_date, unit, tons, sheet_plan, pb=pb_flag)
+        moved.append((row, cur, src_date, target_date, unit))
+
+    if not moved:
+        return out
+
+    # Batched writes: Planning Table rows + legacy Planning sheet Item mirror.
+    has_planned = _has_column("Planning Table", "planned_date")
+    has_plan_name = _has_column("Planning Table", "plan_name")
+    has_plan_code = _has_column("Planning Table", "custom_plan_code")
+    has_spr = _has_column("Planning Table", "spr_name")
+    psi_has_unit = frappe.db.has_column("Planning sheet Item", "unit")
+    psi_has_code = frappe.db.has_column("Planning sheet Item", "custom_plan_code")
+    row_updates = {}
+    psi_updates = {}
+    for row, cur, src_date, target_date, unit in moved:
+        move_code = generate_plan_code(target_date, unit, cur.custom_plan_name or "Default")
+        vals = {"unit": unit}
+        if has_planned:
+            vals["planned_date"] = target_date
+        if has_plan_name:
+            vals["plan_name"] = move_code
+        if has_plan_code:
+            vals["custom_plan_code"] = move_code
+        # Moving to a different production date starts a new run context; old SPR must not flow forward.
+        if has_spr and str(getdate(cur.custom_planned_date or cur.ordered_date)) != str(target_date):
+            vals["spr_name"] = ""
+        row_updates[cur.name] = vals
+
+        psi_vals = {}
+        if psi_has_unit:
+            psi_vals["unit"] = unit
+        if move_code and psi_has_code:
+            psi_vals["custom_plan_code"] = move_code
+        if psi_vals:
+            psi_updates[cur.source_item] = psi_vals
+    _bulk_update_by_name("Planning Table", row_updates)
+    _bulk_update_by_name("Planning sheet Item", psi_updates)
+
+    sheets = {cur.parent for _row, cur, _s, _t, _u in moved}
+    for sheet_name in {cur.parent for _row, cur, _s, _t, unit in moved if normalize_planning_unit_for_select(cur.unit) != unit}:
+        try:
+            _merge_reunited_legacy_psi_rows(sheet_name)
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "merge reunited legacy PSI")
+
+    # Re-sequence each (date, unit, PB plan) slot once, applying the requested positions in input order.
+    slots = {}
+    for row, cur, _src, target_date, unit in moved:
+        idx_val = cint(row.get("index") or 0)
+        if idx_val:
+            slots.setdefault((target_date, unit, cur.pb_plan_name or ""), []).append((cur.name, idx_val))
+    if slots:
+        eff = _effective_date_expr("sheet")
+        idx_updates = {}
+        for (target_date, unit, pb_plan), placements in slots.items():
+            moving = [n for n, _i in placements]
+            if pb_plan:
+                pb_cond = "AND sheet.custom_pb_plan_name = %(pb_plan)s"
+            else:
+                pb_cond = "AND (sheet.custom_pb_plan_name IS NULL OR sheet.custom_pb_plan_name = '')"
+            others = [r[0] for r in frappe.db.sql(f"""
+                SELECT item.name
+                FROM `tabPlanning Table` item
+                JOIN `tabPlanning sheet` sheet ON item.parent = sheet.name
+                WHERE {eff} = %(target_date)s AND item.unit = %(unit)s AND item.name NOT IN %(moving)s
+                {pb_cond}
+                ORDER BY item.idx ASC, item.creation ASC
+            """, {"target_date": target_date, "unit": unit, "moving": tuple(moving), "pb_plan": pb_plan})]
+            for name, idx_val in placements:
+                if name in others:
+                    others.remove(name)
+                others.insert(max(0, idx_val - 1), name)
+            for i, name in enumerate(others):
+                idx_updates[name] = {"idx": i + 1}
+        _bulk_update_by_name("Planning Table", idx_updates)
+
+    _refresh_sheet_plan_codes(sheets)
+
+    for row, cur, src_date, target_date, unit in moved:
+        out["moved"].append(cur.name)
+        out["dates"].add(str(src_date))
+        out["dates"].add(str(target_date))
+    _sync_effective_dates(item_names=out["moved"])
+    _touch_unit_load_days(out["dates"])
+    return out
+
+
 @frappe.whitelist()
 def update_items_bulk(items, plan_name=None):
     """Bulk move/update Planning Sheet Items.
@@ -8379,9 +9624,10 @@ def update_items_bulk(items, plan_name=None):
     - index: desired 1-based position within the (unit, date, plan) slot (optional)
     - force_move / perform_split / strict_next_day: forwarded to update_schedule
 
-    We intentionally route through ``update_schedule`` so that capacity rules,
-    quality rules, and idx-based re-sequencing remain consistent with
-    single-item drag-and-drop behaviour on the board.
+    Plain moves go through ``_bulk_schedule_moves`` (same capacity and sequencing rules as
+    ``update_schedule``, validated against one load grid and written in one transaction).
+    Rows with force/split/next-day flags, or whose legacy row is shared by a split, still
+    route through ``update_schedule``.
     """
     import json
 
@@ -8391,13 +9637,32 @@ def update_items_bulk(items, plan_name=None):
     if not items:
         return {"status": "success", "count": 0}
 
-    moved_dates = set()
-    count = 0
-
+    simple_rows = []
+    flagged_rows = []
     for row in items:
-        name = row.get("name")
-        if not name:
+        if not row.get("name"):
             continue
+        if cint(row.get("force_move")) or cint(row.get("perform_split")) or cint(row.get("strict_next_day")):
+            flagged_rows.append(row)
+        else:
+            simple_rows.append(row)
+
+    delta = BoardDelta([row["name"] for row in simple_rows], reason="update_items_bulk")
+    targets = []
+    for row in simple_rows:
+        cur = delta.before.get(row["name"]) or {}
+        targets.append((row.get("date") or cur.get("date"), normalize_planning_unit_for_select(row.get("unit") or cur.get("unit"))))
+    delta.add_slots(targets)
+    bulk = _bulk_schedule_moves(simple_rows)
+    delta.publish(dates=bulk["dates"])
+    frappe.db.commit()
+
+    moved_dates = set(bulk["dates"])
+    count = len(bulk["moved"])
+    overflow = list(bulk["overflow"])
+
+    for row in bulk["fallback"] + flagged_rows:
+        name = row.get("name")
 
         # Fetch current state to provide sensible fallbacks
         current = frappe.db.get_value(
@@ -8429,37 +9694,28 @@ def update_items_bulk(items, plan_name=None):
             # If we still don't have a date, skip this item
             continue
 
-        index = row.get("index") or 0
-        force_move = row.get("force_move", 0)
-        perform_split = row.get("perform_split", 0)
-        strict_next_day = row.get("strict_next_day", 0)
-
         res = update_schedule(
             name,
             target_unit,
             target_date,
-            index=index,
-            force_move=force_move,
-            perform_split=perform_split,
+            index=row.get("index") or 0,
+            force_move=row.get("force_move", 0),
+            perform_split=row.get("perform_split", 0),
             plan_name=plan_name,
-            strict_next_day=strict_next_day,
+            strict_next_day=row.get("strict_next_day", 0),
         )
 
         if isinstance(res, dict) and res.get("status") == "success":
             moved_dates.add(str(target_date))
             count += 1
-
-    # Fire a coarse realtime update for all affected dates
-    for d in moved_dates:
-        try:
-            frappe.publish_realtime("production_board_update", {"date": d})
-        except Exception:
-            pass
+        elif isinstance(res, dict) and res.get("status") == "overflow":
+            overflow.append(dict(res, name=name))
 
     return {
         "status": "success",
         "count": count,
-        "skipped": 0,
+        "skipped": len(overflow),
+        "overflow": overflow,
         "dates": sorted(list(moved_dates))
     }
 
@@ -8490,9 +9746,10 @@ def bulk_confirm_orders(items):
                 frappe.db.set_value("Planning sheet", parent_sheet, "planning_status", "Finalized")
                 count += 1
     
+    # Sheet status changes touch every row of the sheet: boards refetch.
+    _queue_board_delta([], None, resync=True, reason="confirmation")
     frappe.db.commit()
-    # Trigger realtime update
-    frappe.publish_realtime("production_board_update", {"type": "confirmation"})
+    _bump_board_versions(None)
     
     return {"status": "success", "message": f"Successfully confirmed {count} orders.", "count": count}
 
@@ -8540,91 +9797,243 @@ def get_plans(date=None, start_date=None, end_date=None, **kwargs):
 # --------------------------------------------------------------------------------
 # Persistent Plans System
 # --------------------------------------------------------------------------------
+# Colour Chart / Production Board plans live in an indexed registry table (one row per plan:
+# type, name, month context, locked, created_by) instead of one JSON string in global defaults.
+# Each worker keeps the whole registry in memory per site; writes bump PLAN_REGISTRY_VERSION_KEY
+# (now and after commit / rollback) and every process reloads on its next request. The old
+# `production_scheduler_{plan_type}_plans` defaults are seeded into the table once by the
+# build_plan_registry patch (until it has run, reads fall back to them and writes are refused).
+# On sites that also run production_entry, that JSON stays the shared store: production_entry
+# reads and writes it, so plans and locks are read from it, and every write here goes to both.
 
-def get_persisted_plans(plan_type):
-    """Returns list of dicts: [{'name': '...', 'locked': 0}] from frappe.defaults"""
-    key = f"production_scheduler_{plan_type}_plans"
-    val = frappe.defaults.get_global_default(key)
-    if val:
-        import json
-        try:
-            return json.loads(val)
-        except:
-            pass
-    if plan_type == "color_chart":
-        return [{"name": "Default", "locked": 0}]
-    return []
+PLAN_REGISTRY_TABLE = "production_plan_registry"
+PLAN_REGISTRY_BUILT_KEY = "production_scheduler_plan_registry_built"
+PLAN_REGISTRY_VERSION_KEY = "production_scheduler:plan_registry_version"
+PLAN_TYPES = ("color_chart", "production_board")
 
-@frappe.whitelist()
-def add_persistent_plan(plan_type, name):
-    plans = get_persisted_plans(plan_type)
-    if not any(p.get("name") == name for p in plans):
-        plans.append({"name": name, "locked": 0})
-        import json
-        frappe.defaults.set_global_default(f"production_scheduler_{plan_type}_plans", json.dumps(plans))
-    return plans
+_plan_registries = {}
+_plan_registry_lock = threading.Lock()
 
-@frappe.whitelist()
-def toggle_plan_lock(plan_type, name, locked):
-    plans = get_persisted_plans(plan_type)
-    for p in plans:
-        if p.get("name") == name:
-            p["locked"] = int(locked)
-    import json
-    frappe.defaults.set_global_default(f"production_scheduler_{plan_type}_plans", json.dumps(plans))
-    return plans
 
-@frappe.whitelist()
-def get_active_plans():
-    cc_plans = get_persisted_plans("color_chart")
-    pb_plans = get_persisted_plans("production_board")
-    active_cc = next((p["name"] for p in cc_plans if not p.get("locked")), "Default")
-    active_pb = next((p["name"] for p in pb_plans if not p.get("locked")), "")
-    return {"color_chart": active_cc, "production_board": active_pb}
+def _plan_defaults_key(plan_type):
+    return f"production_scheduler_{plan_type}_plans"
+
+
+def _legacy_persisted_plans(plan_type):
+    """Plans stored in the global-defaults JSON (double-encoded values included); [] when unset."""
+    val = frappe.defaults.get_global_default(_plan_defaults_key(plan_type))
+    if not val:
+        return []
+    try:
+        plans = json.loads(val)
+        if isinstance(plans, str):
+            plans = json.loads(plans)
+    except Exception:
+        return []
+    if not isinstance(plans, list):
+        return []
+    return [p for p in plans if isinstance(p, dict) and p.get("name")]
+
+
+def _ensure_plan_registry_table():
+    frappe.db.sql(f"""
+        CREATE TABLE IF NOT EXISTS `{PLAN_REGISTRY_TABLE}` (
+            `seq` BIGINT NOT NULL AUTO_INCREMENT,
+            `plan_type` VARCHAR(40) NOT NULL,
+            `plan_name` VARCHAR(140) NOT NULL,
+            `month_context` VARCHAR(7) NOT NULL DEFAULT '',
+            `locked` TINYINT NOT NULL DEFAULT 0,
+            `created_by` VARCHAR(140),
+            `creation` DATETIME DEFAULT CURRENT_TIMESTAMP,
+            `modified` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (`plan_type`, `plan_name`),
+            UNIQUE KEY `idx_seq` (`seq`),
+            KEY `idx_type_locked` (`plan_type`, `locked`),
+            KEY `idx_type_month` (`plan_type`, `month_context`)
+        )
+    """)
+
+
+def build_plan_registry():
+    """
+    Create the registry and seed it from the global-defaults JSON (run once per site by the
+    build_plan_registry patch; later calls only make sure the table exists).
+    """
+    _ensure_plan_registry_table()
+    if not frappe.db.get_default(PLAN_REGISTRY_BUILT_KEY):
+        for plan_type in PLAN_TYPES:
+            for p in _legacy_persisted_plans(plan_type):
+                _insert_plan_rows(plan_type, [(str(p["name"]).strip(), cint(p.get("locked")))])
+        frappe.db.set_default(PLAN_REGISTRY_BUILT_KEY, frappe.utils.now())
+        _write_plan_registry_version()
+    frappe.local.production_scheduler_plan_registry_ready = True
+    frappe.db.commit()
+
+
+def _plan_registry_ready():
+    """True once build_plan_registry has run; memoized per request."""
+    ready = getattr(frappe.local, "production_scheduler_plan_registry_ready", None)
+    if ready is None:
+        ready = bool(frappe.db.get_default(PLAN_REGISTRY_BUILT_KEY))
+        frappe.local.production_scheduler_plan_registry_ready = ready
+    return ready
+
+
+def _require_plan_registry():
+    if not _plan_registry_ready():
+        frappe.throw(_("The plan registry is not set up yet. Run bench migrate."))
+
+
+def _insert_plan_rows(plan_type, rows, update_locked=False):
+    """Insert (name, locked) rows; existing plans keep their lock unless ``update_locked``."""
+    rows = [(name, locked) for name, locked in rows if name]
+    if not rows:
+        return
+    user = getattr(frappe.session, "user", None)
+    values = []
+    params = []
+    for name, locked in rows:
+        values.append("(%s, %s, %s, %s, %s, NOW())")
+        params.extend([plan_type, name, plan_month(name), cint(locked), user])
+    on_dup = "`locked` = VALUES(`locked`)" if update_locked else "`plan_name` = `plan_name`"
+    frappe.db.sql(f"""
+        INSERT INTO `{PLAN_REGISTRY_TABLE}`
+            (`plan_type`, `plan_name`, `month_context`, `locked`, `created_by`, `creation`)
+        VALUES {', '.join(values)}
+        ON DUPLICATE KEY UPDATE {on_dup}
+    """, tuple(params))
+
+
+def _plan_registry_version():
+    ver = getattr(frappe.local, "production_scheduler_plan_registry_version", None)
+    if ver is None:
+        ver = frappe.cache().get_value(PLAN_REGISTRY_VERSION_KEY) or ""
+        frappe.local.production_scheduler_plan_registry_version = ver
+    return ver
+
+
+def _shared_plan_store():
+    """True when production_entry shares the global-defaults plan JSON with this app."""
+    return "production_entry" in frappe.get_installed_apps()
+
+
+def _legacy_plan_locked(plan):
+    return 1 if str(plan.get("locked", 0)).strip().lower() in ("1", "true") else 0
+
+
+def _plan_registry():
+    """{plan_type: ((name, locked), ...)} in creation order, loaded once per worker until a write."""
+    if not _plan_registry_ready() or _shared_plan_store():
+        return {
+            plan_type: tuple((str(p["name"]).strip(), _legacy_plan_locked(p)) for p in _legacy_persisted_plans(plan_type))
+            for plan_type in PLAN_TYPES
+        }
+    site = getattr(frappe.local, "site", None) or ""
+    version = _plan_registry_version()
+    with _plan_registry_lock:
+        cached = _plan_registries.get(site)
+        if cached and cached[0] == version:
+            return cached[1]
+    registry = {}
+    for plan_type, name, locked in frappe.db.sql(
+        f"SELECT `plan_type`, `plan_name`, `locked` FROM `{PLAN_REGISTRY_TABLE}` ORDER BY `seq`"
+    ):
+        registry.setdefault(plan_type, []).append((name, cint(locked)))
+    registry = {plan_type: tuple(rows) for plan_type, rows in registry.items()}
+    with _plan_registry_lock:
+        _plan_registries[site] = (version, registry)
+    return registry
+
+
+def _write_plan_registry_version():
+    frappe.cache().set_value(PLAN_REGISTRY_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def _plan_registry_changed(plan_type):
+    """After a registry write: make every worker reload."""
+    _write_plan_registry_version()
+    for hook in ("after_commit", "after_rollback"):
+        callbacks = getattr(frappe.db, hook, None)
+        if callbacks is not None:
+            callbacks.add(_write_plan_registry_version)
+    frappe.local.production_scheduler_plan_registry_version = None
+
+
+def _update_shared_plans(plan_type, add=(), remove=None, lock=None):
+    """
+    Apply a registry write to the JSON production_entry shares (no-op without it): append ``add``
+    names, drop ``remove``, or set ``lock`` = (name, locked), adding that plan when missing.
+    """
+    if not _shared_plan_store():
+        return
+    plans = _legacy_persisted_plans(plan_type)
+    names = {str(p["name"]).strip() for p in plans}
+    plans.extend({"name": name, "locked": 0} for name in add if name not in names)
+    if remove:
+        plans = [p for p in plans if str(p["name"]).strip() != remove]
+    if lock:
+        name, locked = lock
+        plan = next((p for p in plans if str(p["name"]).strip() == name), None)
+        if plan is None:
+            plan = {"name": name}
+            plans.insert(0 if name == "Default" else len(plans), plan)
+        plan["locked"] = cint(locked)
+    frappe.defaults.set_global_default(_plan_defaults_key(plan_type), json.dumps(plans))
+
+
+def _register_plans(plan_type, names):
+    """Add unlocked plans that are not registered yet (existing ones keep their lock)."""
+    known = {p["name"] for p in get_persisted_plans(plan_type)}
+    new = []
+    for name in names:
+        if name and name not in known and name not in new:
+            new.append(name)
+    if not new:
+        return
+    _require_plan_registry()
+    _insert_plan_rows(plan_type, [(name, 0) for name in new])
+    _plan_registry_changed(plan_type)
+    _update_shared_plans(plan_type, add=new)
+
+
+def _unregister_plan(plan_type, name):
+    _require_plan_registry()
+    frappe.db.sql(
+        f"DELETE FROM `{PLAN_REGISTRY_TABLE}` WHERE `plan_type` = %s AND `plan_name` = %s",
+        (plan_type, name),
+    )
+    _plan_registry_changed(plan_type)
+    _update_shared_plans(plan_type, remove=name)
+
+
+def _locked_plan_names(plan_type):
+    return {name for name, locked in _plan_registry().get(plan_type, ()) if locked}
 
-# --------------------------------------------------------------------------------
-# Persistent Plans System
-# --------------------------------------------------------------------------------
 
 def get_persisted_plans(plan_type):
-    """Returns list of dicts: [{'name': '...', 'locked': 0}] from frappe.defaults"""
-    key = f"production_scheduler_{plan_type}_plans"
-    val = frappe.defaults.get_global_default(key)
-    if val:
-        import json
-        try:
-            plans = json.loads(val)
-            if isinstance(plans, str):
-                plans = json.loads(plans)
-            if not isinstance(plans, list):
-                plans = []
-            if not any(isinstance(p, dict) and p.get("name") == "Default" for p in plans):
-                plans.insert(0, {"name": "Default", "locked": 0})
-            return plans
-        except:
-            pass
-    if plan_type == "color_chart":
-        return [{"name": "Default", "locked": 0}]
-    return []
+    """Returns list of dicts: [{'name': '...', 'locked': 0}], Default first for the Colour Chart."""
+    plans = [{"name": name, "locked": locked} for name, locked in _plan_registry().get(plan_type, ())]
+    if plans or plan_type == "color_chart":
+        default = next((p for p in plans if p["name"] == "Default"), None)
+        if default is not None:
+            plans.remove(default)
+        plans.insert(0, default or {"name": "Default", "locked": 0})
+    return plans
 
 @frappe.whitelist()
 def add_persistent_plan(plan_type, name):
-    plans = get_persisted_plans(plan_type)
-    if not any(p.get("name") == name for p in plans):
-        plans.append({"name": name, "locked": 0})
-        import json
-        frappe.defaults.set_global_default(f"production_scheduler_{plan_type}_plans", json.dumps(plans))
-    return plans
+    _register_plans(plan_type, [name])
+    return get_persisted_plans(plan_type)
 
 @frappe.whitelist()
 def toggle_plan_lock(plan_type, name, locked):
-    plans = get_persisted_plans(plan_type)
-    for p in plans:
-        if p.get("name") == name:
-            p["locked"] = int(locked)
-    import json
-    frappe.defaults.set_global_default(f"production_scheduler_{plan_type}_plans", json.dumps(plans))
-    return plans
+    # Only listed plans can be (un)locked; the implicit Default gets its row here.
+    if any(p["name"] == name for p in get_persisted_plans(plan_type)):
+        _require_plan_registry()
+        _insert_plan_rows(plan_type, [(name, locked)], update_locked=True)
+        _plan_registry_changed(plan_type)
+        _update_shared_plans(plan_type, lock=(name, locked))
+    return get_persisted_plans(plan_type)
 
 @frappe.whitelist()
 def get_active_plans():
@@ -8635,6 +10044,28 @@ def get_active_plans():
     return {"color_chart": active_cc, "production_board": active_pb}
 
 
+def locked_sheets(names, include_submitted=True):
+    """
+    Set of the given Planning sheets that are locked: submitted / cancelled (unless
+    include_submitted=0), or in a locked Colour Chart plan. One query for the whole batch;
+    unknown names are not locked.
+    """
+    names = list({n for n in (names or []) if n})
+    if not names:
+        return set()
+    has_plan_col = _has_column("Planning sheet", "custom_plan_name")
+    plan_expr = "IFNULL(NULLIF(`custom_plan_name`, ''), 'Default')" if has_plan_col else "'Default'"
+    locked_plans = _locked_plan_names("color_chart")
+    locked = set()
+    for name, docstatus, plan_name in frappe.db.sql(
+        f"SELECT `name`, `docstatus`, {plan_expr} FROM `tabPlanning sheet` WHERE `name` IN %s",
+        (tuple(names),),
+    ):
+        if (include_submitted and cint(docstatus) != 0) or plan_name in locked_plans:
+            locked.add(name)
+    return locked
+
+
 @frappe.whitelist()
 def get_monthly_plans(start_date, end_date):
     query_start = getdate(start_date)
@@ -8703,22 +10134,11 @@ def migrate_to_full_plan_names():
         
         new_global_plans.add(full_name)
     
-    # Update Persisted Plans in Global Defaults
-    # We merge existing persisted plans but using their full names if possible
-    old_persisted = get_persisted_plans("color_chart")
-    # For each persisted plan, if it's a base name, we might not know the date.
-    # But we can at least ensure if any sheet uses it, it's kept.
-    
-    current_full_list = [{"name": p["name"], "locked": p.get("locked", 0)} for p in old_persisted]
-    # (Note: we don't automatically know which month to prefix a generic "PLAN 1" in defaults,
+    # Register the full names next to the existing persisted plans (which keep their lock).
+    # (Note: we don't automatically know which month to prefix a generic "PLAN 1" in the registry,
     # but the sheets update above will capture all actually used ones.)
-    
-    for full in new_global_plans:
-        if not any(p["name"] == full for p in current_full_list):
-            current_full_list.append({"name": full, "locked": 0})
-            
-    import json
-    frappe.defaults.set_global_default("production_scheduler_color_chart_plans", json.dumps(current_full_list))
+    _register_plans("color_chart", sorted(new_global_plans))
+    current_full_list = get_persisted_plans("color_chart")
     
     frappe.db.commit()
     
@@ -8760,7 +10180,7 @@ def create_plan_name_field():
     
     
     # Fix: Set NULL custom_plan_name to 'Default' so plan filtering works correctly
-    if frappe.db.has_column("Planning sheet", "custom_plan_name"):
+    if _has_column("Planning sheet", "custom_plan_name"):
         frappe.db.sql("""
             UPDATE `tabPlanning sheet` 
             SET custom_plan_name = 'Default' 
@@ -8902,36 +10322,24 @@ def create_plan_name_field():
         cf_lam_so.insert(ignore_permissions=True)
     
     frappe.db.commit()
+    clear_schema_registry()
     
     # Automatically kick off a background job to populate old sheets if they are missing codes
-    frappe.enqueue("production_entry.production_planning.scheduler_api.backfill_plan_codes", queue="short", timeout=300)
+    _enqueue_backfill("plan_codes")
 
     return {"status": "success"}
 
+def _backfill_chunk_plan_codes(sheets, report=None):
+    """Recompute plan codes of ``sheets`` with the set-based engine; only changed codes are written."""
+    diff = _plan_code_diff(sheets)
+    _apply_plan_code_diff(diff)
+    return {"sheets": diff["sheets"], "updated": len(diff["rows"])}
+
+
 @frappe.whitelist()
 def backfill_plan_codes():
-    """Updates existing Planning Sheets and Items that are missing a plan code."""
-    sheets = frappe.get_all("Planning sheet", filters={"docstatus": ["<", 2]}, fields=["name"])
-    count = 0
-    for s in sheets:
-        try:
-            doc = frappe.get_doc("Planning sheet", s.name)
-            update_sheet_plan_codes(doc)
-            for tf in ["planned_items", "custom_planned_items", "planning_table", "custom_planning_table", "table"]:
-                new_items = doc.get(tf)
-                if new_items:
-                    for i in new_items:
-                        if i.get("plan_name"):
-                            frappe.db.sql(
-                                "UPDATE `tabPlanning Table` SET plan_name = %s WHERE name = %s",
-                                (i.plan_name, i.name),
-                            )
-                    break
-            count += 1
-        except Exception:
-            pass
-    frappe.db.commit()
-    return {"status": "success", "updated_count": count}
+    """Updates existing Planning Sheets and Items that are missing a plan code (background job, resumable)."""
+    return _enqueue_backfill("plan_codes")
 
 @frappe.whitelist()
 def get_previous_production_date(date):
@@ -9067,10 +10475,7 @@ def delete_plan(plan_name, date=None, start_date=None, end_date=None):
         count += 1
 
     # Remove from persistent plans
-    persisted = get_persisted_plans("color_chart")
-    persisted = [p for p in persisted if p["name"] != plan_name]
-    import json
-    frappe.defaults.set_global_default("production_scheduler_color_chart_plans", json.dumps(persisted))
+    _unregister_plan("color_chart", plan_name)
 
     frappe.db.commit()
     return {"status": "success", "deleted_count": count}
@@ -9189,13 +10594,56 @@ UNIT_QUALITY_ORDER = {
     "Unit 4": ["PREMIUM","GOLD","SILVER","BRONZE","CLASSIC","CRT"],
 }
 
+# Precomputed {unit: {quality: rank}} for smart push sorting (replaces list.index per comparison).
+UNIT_QUALITY_RANK = build_quality_ranks(UNIT_QUALITY_ORDER)
+
 @frappe.whitelist()
 def get_board_seeds(target_date, plan_name=None, exclude_items=None):
-    """API to fetch seeds for all 4 units for the frontend."""
+    """
+    API to fetch seeds for all 4 units for the frontend.
+    One query for every unit; the first row per unit follows get_last_unit_order's ordering.
+    """
+    target_date = getdate(target_date) if target_date else getdate(frappe.utils.today())
+    if isinstance(exclude_items, str):
+        import json
+        exclude_items = json.loads(exclude_items)
+    exclude_items = [n for n in (exclude_items or []) if n]
+
+    unit_keys = {"UNIT1": "Unit 1", "UNIT2": "Unit 2", "UNIT3": "Unit 3", "UNIT4": "Unit 4"}
+    clean_white_sql = ", ".join([f"'{c.upper().replace(' ', '')}'" for c in WHITE_COLORS])
+    exclude_sql = "AND i.name NOT IN %(exclude)s" if exclude_items else ""
+    eff_col = _pt_effective_date_sql()
+    rows = frappe.db.sql(f"""
+        SELECT
+            REPLACE(UPPER(i.unit), ' ', '') AS unit_key,
+            i.color, i.custom_quality as quality, i.gsm
+        FROM `tabPlanning Table` i
+        JOIN `tabPlanning sheet` p ON i.parent = p.name
+        WHERE REPLACE(UPPER(i.unit), ' ', '') IN %(units)s
+          AND p.docstatus < 2
+          AND (i.color IS NOT NULL AND i.color != '' AND i.color != '0' AND i.color != '0.0')
+          AND {eff_col} = DATE(%(date)s)
+          {exclude_sql}
+        ORDER BY
+          unit_key,
+          (CASE WHEN REPLACE(UPPER(i.color), ' ', '') NOT IN ({clean_white_sql}) THEN 0 ELSE 1 END) ASC,
+          p.docstatus DESC,
+          i.idx DESC,
+          p.modified DESC
+    """, {"units": tuple(unit_keys), "date": target_date, "exclude": tuple(exclude_items)}, as_dict=True)
+
     seeds = {}
-    for u in ["Unit 1", "Unit 2", "Unit 3", "Unit 4"]:
-        s = get_last_unit_order(u, target_date, plan_name, exclude_items)
-        if s: seeds[u] = s
+    for r in rows:
+        u = unit_keys.get(r.unit_key)
+        if not u or u in seeds:
+            continue
+        seeds[u] = {
+            "color": (r.color or "").upper().strip(),
+            "quality": (r.quality or "").upper().strip(),
+            "gsm": r.gsm,
+            "is_white": (r.color or "").upper().strip() in WHITE_COLORS,
+            "date": target_date
+        }
     return seeds
 
 @frappe.whitelist()
@@ -9224,6 +10672,7 @@ def get_last_unit_order(unit, date=None, plan_name=None, exclude_items=None):
     clean_white_sql = ", ".join([f"'{c.upper().replace(' ', '')}'" for c in WHITE_COLORS])
     
     # --- Combined Search Part 1: Items on Target Date (Color or White) ---
+    eff_col = _pt_effective_date_sql()
     rows = frappe.db.sql(f"""
         SELECT 
             i.color, i.custom_quality as quality, i.gsm, i.item_name, i.idx, 
@@ -9233,7 +10682,7 @@ def get_last_unit_order(unit, date=None, plan_name=None, exclude_items=None):
         WHERE REPLACE(UPPER(i.unit), ' ', '') = %s
           AND p.docstatus < 2
           AND (i.color IS NOT NULL AND i.color != '' AND i.color != '0' AND i.color != '0.0')
-          AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) = DATE(%s)
+          AND {eff_col} = DATE(%s)
           {exclude_sql}
         ORDER BY 
           -- Prioritize color items over white if they share the same date
@@ -9270,10 +10719,17 @@ def get_smart_push_sequence(item_names, target_date=None, seed_quality=None, see
     if isinstance(item_names, str):
         item_names = json.loads(item_names)
     
-    items = frappe.get_all("Planning Table", 
-        filters={"name": ["in", item_names]},
-        fields=["name", "item_code", "item_name", "qty", "unit", "color", "custom_quality", "gsm", "parent", "planned_date"]
-    )
+    # One joined fetch (customer / party code included); modified DESC matches the old get_all order,
+    # which decides ties in the stable sort below.
+    items = frappe.db.sql("""
+        SELECT i.name, i.item_code, i.item_name, i.qty, i.unit, i.color, i.custom_quality, i.gsm,
+               i.parent, i.planned_date,
+               p.customer AS sheet_customer, p.party_code AS sheet_party_code
+        FROM `tabPlanning Table` i
+        LEFT JOIN `tabPlanning sheet` p ON i.parent = p.name
+        WHERE i.name IN %s
+        ORDER BY i.modified DESC
+    """, (tuple(item_names or [""]),), as_dict=True)
     
     if not items:
         return {"sequence": [], "seeds": {}}
@@ -9283,82 +10739,29 @@ def get_smart_push_sequence(item_names, target_date=None, seed_quality=None, see
     # Always fetch seeds for all 4 units for UI visibility (Board End display)
     unit_seeds = get_board_seeds(target_date, plan_name, item_names)
 
-    # Enrichment bucket for UI
-    parent_cache = {}
-    
-    # Group by unit for specialized sorting
-    result_sequence = []
-    for u in ["Unit 1", "Unit 2", "Unit 3", "Unit 4", "UNASSIGNED"]:
-        unit_items = [it for it in items if _normalize_unit(it.get("unit")) == u]
-        if not unit_items: continue
-        
-        seed = unit_seeds.get(u)
-        s_col = (seed.get("color") if seed else seed_color or "").upper().strip()
-        s_qual = (seed.get("quality") if seed else seed_quality or "").upper().strip()
-
-        # Separate into Perfect Match, Color Match, and Others
-        perfect = []
-        same_col = []
-        remaining = []
-        
-        for it in unit_items:
-            c = (it.get("color") or "").upper().strip()
-            q = (it.get("custom_quality") or "").upper().strip()
-            if c == s_col and q == s_qual: perfect.append(it)
-            elif c == s_col: same_col.append(it)
-            else: remaining.append(it)
-
-        def color_sort_key_fn(it):
-            col = (it.get("color") or "").upper().strip()
-            qual = (it.get("custom_quality") or "").upper().strip()
-            
-            # Priority 1: COLOR lightÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¥ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â dark order with WRAP-AROUND
-            c_idx = COLOR_PRIORITY.get(col, 999)
-            s_idx = COLOR_PRIORITY.get(s_col, -1)
-            
-            if s_idx != -1 and c_idx != 999:
-                # Continuous Flow: index relative to the seed
-                total_colors = len(COLOR_ORDER_LIST)
-                color_score = (c_idx - s_idx + total_colors) % total_colors
-            else:
-                # Fallback to absolute rank if seed or color not found in hierarchy
-                color_score = c_idx
-            
-            # Priority 2: Quality order
-            q_order = UNIT_QUALITY_ORDER.get(u, [])
-            q_idx = q_order.index(qual) if qual in q_order else 999
-            
-            # Priority 3: GSM (High to Low -> negative)
-            gsm_val = -float(it.get("gsm") or 0)
-            
-            return (color_score, q_idx, gsm_val)
+    result_sequence = order_smart_push(
+        items,
+        unit_seeds,
+        COLOR_PRIORITY,
+        len(COLOR_ORDER_LIST),
+        UNIT_QUALITY_RANK,
+        _normalize_unit,
+        seed_color=seed_color,
+        seed_quality=seed_quality,
+    )
 
-        # Final Sort within buckets
-        perfect.sort(key=color_sort_key_fn)
-        same_col.sort(key=color_sort_key_fn)
-        remaining.sort(key=color_sort_key_fn)
-        
-        # Merge buckets for this unit
-        unit_sorted = perfect + same_col + remaining
-        
-        # Enrich items for the frontend as we add them
-        for it in unit_sorted:
-            if it.parent not in parent_cache:
-                parent_cache[it.parent] = frappe.db.get_value("Planning sheet", it.parent, ["customer","party_code"], as_dict=1) or {}
-            p = parent_cache[it.parent]
-            
-            it["customer"] = p.get("customer","")
-            it["partyCode"] = p.get("party_code","")
-            it["pbPlanName"] = ""
-            it["quality"] = (it.get("custom_quality") or "").upper().strip()
-            it["colorKey"] = (it.get("color") or "").upper().strip()
-            it["unit"] = _normalize_unit(it.get("unit"))
-            it["unitKey"] = it["unit"]
-            it["gsmVal"] = float(it.get("gsm") or 0)
-            it["plannedDate"] = str(it.get("planned_date") or "")
-            it["description"] = it.get("item_name") or ""
-            
-            result_sequence.append(it)
+    # Enrich items for the frontend
+    for it in result_sequence:
+        it["customer"] = it.pop("sheet_customer", None) or ""
+        it["partyCode"] = it.pop("sheet_party_code", None) or ""
+        it["pbPlanName"] = ""
+        it["quality"] = (it.get("custom_quality") or "").upper().strip()
+        it["colorKey"] = (it.get("color") or "").upper().strip()
+        it["unit"] = _normalize_unit(it.get("unit"))
+        it["unitKey"] = it["unit"]
+        it["gsmVal"] = float(it.get("gsm") or 0)
+        it["plannedDate"] = str(it.get("planned_date") or "")
+        it["description"] = it.get("item_name") or ""
 
     # Safety: add sequence_no
     for i, it in enumerate(result_sequence):
@@ -9377,7 +10780,8 @@ def move_items_to_plan(item_names, target_plan, date=None, start_date=None, end_
     Copies specific Planning Sheet Items to a target Color Chart plan.
     - days_in_view: scale capacity limit (e.g. 28 for monthly February, 7 for weekly).
     - force_move=1: skip capacity check entirely (used in monthly/weekly views).
-    - Items linked to cancelled Sales Orders are silently skipped with a warning.
+    - Items linked to cancelled Sales Orders, or sitting in a locked plan, are skipped with a warning.
+    - A locked target plan is refused.
     """
     import json
     if isinstance(item_names, str):
@@ -9387,6 +10791,8 @@ def move_items_to_plan(item_names, target_plan, date=None, start_date=None, end_
 
     if not item_names or not target_plan:
         return {"status": "error", "message": "Missing item names or target plan"}
+    if target_plan in _locked_plan_names("color_chart"):
+        return {"status": "error", "message": f"Plan {target_plan} is locked"}
 
     moved = 0
     skipped = []
@@ -9398,6 +10804,15 @@ def move_items_to_plan(item_names, target_plan, date=None, start_date=None, end_
     # Clear doctype meta cache so custom fields (custom_plan_name) are recognized
     frappe.clear_cache(doctype="Planning sheet")
 
+    delta = BoardDelta(item_names, reason="move_items_to_plan", track_slots=False)
+    # Re-parenting changes the row's plan (and maybe its date): refresh old and new days alike.
+    touched_dates = _item_effective_dates(item_names)
+    # One lock check for the whole batch; submitted sources are re-parented below, so only plan locks count.
+    locked_parents = locked_sheets(
+        frappe.get_all("Planning Table", filters={"name": ["in", item_names]}, pluck="parent"),
+        include_submitted=False,
+    )
+    moved_names = []
     for name in item_names:
         try:
             item_doc = frappe.get_doc("Planning Table", name)
@@ -9407,6 +10822,10 @@ def move_items_to_plan(item_names, target_plan, date=None, start_date=None, end_
             effective_date = parent_sheet.get("custom_planned_date") or parent_sheet.ordered_date
             party_code = parent_sheet.party_code or ""
 
+            if parent_sheet.name in locked_parents:
+                skipped.append(f"{name}: plan {parent_sheet.get('custom_plan_name') or 'Default'} is locked, skipped")
+                continue
+
             # --- Guard: skip items on cancelled Sales Orders ---
             if parent_sheet.sales_order:
                 so_status = frappe.db.get_value("Sales Order", parent_sheet.sales_order, "docstatus")
@@ -9447,7 +10866,7 @@ def move_items_to_plan(item_names, target_plan, date=None, start_date=None, end_
                         new_sheet.insert(ignore_permissions=True)
                         target_sheet_name = new_sheet.name
                     # Force custom_plan_name via raw SQL to ensure persistence
-                    if frappe.db.has_column("Planning sheet", "custom_plan_name"):
+                    if _has_column("Planning sheet", "custom_plan_name"):
                         frappe.db.sql(
                             "UPDATE `tabPlanning sheet` SET custom_plan_name = %s WHERE name = %s",
                             (target_plan, target_sheet_name)
@@ -9484,10 +10903,16 @@ def move_items_to_plan(item_names, target_plan, date=None, start_date=None, end_
                 WHERE name = %s
             """, (target_sheet_name, _get_pt_parentfield(), name))
             moved += 1
+            moved_names.append(name)
 
         except Exception as e:
             errors.append(f"{name}: {str(e)}")
 
+    synced_dates = _sync_effective_dates(item_names=item_names)
+    if moved_names:
+        touched_dates |= _item_effective_dates(moved_names)
+        _touch_unit_load_days(touched_dates - synced_dates)
+    delta.publish()
     frappe.db.commit()
     result = {"status": "success", "moved": moved}
     if skipped:
@@ -9582,6 +11007,11 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
         except Exception:
             return 0.0
 
+    delta = BoardDelta(
+        [entry.get("itemName") if isinstance(entry, dict) else entry for entry in item_names],
+        reason="move_orders_to_date",
+        track_slots=False,
+    )
     for entry in item_names:
         # Support both simple list of names and list of {itemName, qty}
         name = entry.get("itemName") if isinstance(entry, dict) else entry
@@ -9627,7 +11057,7 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
                 new_row_doc.qty = flt(req_qty)
                 new_row_doc.is_split = 1
                 new_row_doc.split_from = doc.name
-                if frappe.db.has_column("Planning Table", "spr_name"):
+                if _has_column("Planning Table", "spr_name"):
                     new_row_doc.spr_name = ""
                 new_row_doc.source_item = _resolve_planning_table_source_item_link(
                     new_row_doc.get("source_item"), doc.name
@@ -9657,10 +11087,11 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
             continue
             
     # 2. Check Limits (skip if force_move ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ e.g. monthly/weekly aggregate view)
-    if not force_move:
+    if not force_move and weights_to_add:
+        grid = get_unit_load_grid(target_date, target_date)
         for unit, added_weight in weights_to_add.items():
             if unit in HARD_LIMITS:
-                current_load = get_unit_load(target_date, unit)
+                current_load = grid.get(target_date, unit)
                 limit = HARD_LIMITS[unit]
                 
                 if current_load + added_weight > limit:
@@ -9669,6 +11100,7 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
                     )
 
     count = 0
+    touched_dates = {target_date}
     
     # 1. Group items by Current Parent
     items_by_parent = {}
@@ -9721,7 +11153,7 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
                     # Create NEW sheet only if SO has no sheet at all
                     target_sheet = frappe.new_doc("Planning sheet")
                     target_sheet.ordered_date = target_date
-                    if frappe.db.has_column("Planning sheet", "custom_planned_date"):
+                    if _has_column("Planning sheet", "custom_planned_date"):
                         target_sheet.custom_planned_date = target_date
                     target_sheet.party_code = parent_doc.party_code
                     target_sheet.customer = _resolve_customer_link(parent_doc.customer, parent_doc.party_code)
@@ -9766,7 +11198,7 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
             # Use SQL for direct re-parenting (Robust for rescue)
             # Make sure we also update planned_date so pulled items don't vanish from the board
             pt_pf = _get_pt_parentfield()
-            set_date = f", planned_date = '{target_date}'" if frappe.db.has_column("Planning Table", "planned_date") else ""
+            set_date = f", planned_date = '{target_date}'" if _has_column("Planning Table", "planned_date") else ""
             frappe.db.sql(f"""
                 UPDATE `tabPlanning Table`
                 SET parent = %s, idx = %s, unit = %s, parenttype='Planning sheet', parentfield=%s{set_date}
@@ -9774,6 +11206,7 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
             """, (target_sheet.name, new_idx, new_unit, pt_pf, item_doc.name))
 
             _sync_legacy_planning_sheet_item_unit(item_doc.get("source_item"), new_unit)
+            touched_dates.add(item_doc.get("planned_date") or parent_doc.get("custom_planned_date") or parent_doc.ordered_date)
 
             count = int(count) + 1
         
@@ -9794,6 +11227,9 @@ def move_orders_to_date(item_names, target_date, target_unit=None, plan_name=Non
                     # We catch it so the move doesn't crash since the items were already moved via SQL.
                     frappe.logger().error(f"Could not delete empty planning sheet {parent_doc.name}: {e}")
         
+    _sync_effective_dates(item_names=[d.name for docs in items_by_parent.values() for d in docs])
+    _touch_unit_load_days(touched_dates)
+    delta.publish(extra_names=[d.name for d in docs_to_move], dates=touched_dates)
     frappe.db.commit()
 
 
@@ -9854,7 +11290,7 @@ def rescue_orphaned_items(target_date=None, colour=None, party_code=None):
             else:
                 new_sheet = frappe.new_doc("Planning sheet")
                 new_sheet.ordered_date = target_date
-                if frappe.db.has_column("Planning sheet", "custom_planned_date"):
+                if _has_column("Planning sheet", "custom_planned_date"):
                     new_sheet.custom_planned_date = target_date
                 new_sheet.party_code = party
                 new_sheet.customer = _resolve_customer_link(first.get("customer"), first.get("party_code") or party)
@@ -9870,6 +11306,7 @@ def rescue_orphaned_items(target_date=None, colour=None, party_code=None):
                 WHERE name = %s
             """, (sheet_name, _get_pt_parentfield(), item.name))
             rescued += 1
+        _sync_effective_dates(item_names=[item.name for item in items])
     
     frappe.db.commit()
     return {"status": "success", "count": rescued, "message": f"Rescued {rescued} orphaned items to {target_date}"}
@@ -9943,8 +11380,10 @@ def _get_confirmed_orders_kanban_impl(order_date=None, delivery_date=None, party
     # Effective date for Confirmed Orders grouping:
     # Prefer item-level `planned_date` so the queue date matches what users see on the Board.
     # Fallback to sheet-level `custom_planned_date`, then `ordered_date`.
-    if frappe.db.has_column("Planning Table", "planned_date"):
-        if frappe.db.has_column("Planning sheet", "custom_planned_date"):
+    if _has_pt_effective_date():
+        eff = "i.effective_date"
+    elif _has_column("Planning Table", "planned_date"):
+        if _has_column("Planning sheet", "custom_planned_date"):
             # Some sites store dates as empty string '' instead of NULL.
             # NULLIF(...,'') lets COALESCE correctly fall back.
             eff = "COALESCE(NULLIF(i.planned_date, ''), NULLIF(p.custom_planned_date, ''), NULLIF(p.ordered_date, ''))"
@@ -9955,7 +11394,7 @@ def _get_confirmed_orders_kanban_impl(order_date=None, delivery_date=None, party
     conditions = ["p.docstatus < 2"]
     values = []
 
-    if frappe.db.has_column("Sales Order", "custom_production_status"):
+    if _has_column("Sales Order", "custom_production_status"):
         so_confirmed_sql = "so.custom_production_status = 'Confirmed'"
     else:
         frappe.log_error(
@@ -9975,7 +11414,7 @@ def _get_confirmed_orders_kanban_impl(order_date=None, delivery_date=None, party
         values.append(order_date)
 
     # Filter by Delivery Date (DOD)
-    if delivery_date and frappe.db.has_column("Planning sheet", "dod"):
+    if delivery_date and _has_column("Planning sheet", "dod"):
         conditions.append("p.dod = %s")
         values.append(delivery_date)
 
@@ -9985,12 +11424,12 @@ def _get_confirmed_orders_kanban_impl(order_date=None, delivery_date=None, party
 
     where_clause = " AND ".join(conditions)
 
-    so_status_sel = "so.delivery_status" if frappe.db.has_column("Sales Order", "delivery_status") else "NULL"
-    so_cps_sel = "so.custom_production_status" if frappe.db.has_column("Sales Order", "custom_production_status") else "NULL"
+    so_status_sel = "so.delivery_status" if _has_column("Sales Order", "delivery_status") else "NULL"
+    so_cps_sel = "so.custom_production_status" if _has_column("Sales Order", "custom_production_status") else "NULL"
 
-    qual_expr = "i.custom_quality" if frappe.db.has_column("Planning Table", "custom_quality") else "NULL"
-    width_expr = "i.width_inch" if frappe.db.has_column("Planning Table", "width_inch") else "0"
-    dod_expr = "p.dod" if frappe.db.has_column("Planning sheet", "dod") else "NULL"
+    qual_expr = "i.custom_quality" if _has_column("Planning Table", "custom_quality") else "NULL"
+    width_expr = "i.width_inch" if _has_column("Planning Table", "width_inch") else "0"
+    dod_expr = "p.dod" if _has_column("Planning sheet", "dod") else "NULL"
 
     sql = f"""
         SELECT 
@@ -10101,11 +11540,8 @@ def create_planning_sheet_from_so(doc):
         ps.insert()
         frappe.db.commit()
         _link_board_planned_rows_to_legacy_items(ps.name)
-        _sync_lamination_fabric_planning_rows(ps.name)
-        _sync_slitting_fabric_planning_rows(ps.name)
-        _sync_bopp_child_planning_rows(ps.name)
+        _sync_bom_child_planning_rows(ps.name, processes=BOM_CHILD_SYNC_SO_CREATE_PROCESSES)
         _force_slitting_unit_on_sheet(ps.name)
-        _sync_rewinding_fabric_planning_rows(ps.name)
         _force_rewinding_unit_on_sheet(ps.name)
         final_doc = frappe.get_doc("Planning sheet", ps.name)
         update_sheet_plan_codes(final_doc, include_legacy=True)
@@ -10150,9 +11586,9 @@ def create_production_plan_from_sheet(sheet_name):
         frappe.db.set_value("Production Plan", pp.name, "planning_sheet", sheet.name)
 
     # Persist PP link at sheet header (legacy) and item-level (source of truth for row actions)
-    if frappe.db.has_column("Planning sheet", "custom_production_plan"):
+    if _has_column("Planning sheet", "custom_production_plan"):
         frappe.db.set_value("Planning sheet", sheet.name, "custom_production_plan", pp.name)
-    elif frappe.db.has_column("Planning sheet", "production_plan"):
+    elif _has_column("Planning sheet", "production_plan"):
         frappe.db.set_value("Planning sheet", sheet.name, "production_plan", pp.name)
 
     psi_pp_field = _psi_production_plan_field()
@@ -10282,9 +11718,9 @@ def create_production_plan_bulk(sheets):
         psi_pp_field = _psi_production_plan_field()
         psi_order_sheet_field = _psi_order_sheet_field()
         for s in cust_sheets:
-            if frappe.db.has_column("Planning sheet", "custom_production_plan"):
+            if _has_column("Planning sheet", "custom_production_plan"):
                 frappe.db.set_value("Planning sheet", s.name, "custom_production_plan", pp.name)
-            elif frappe.db.has_column("Planning sheet", "production_plan"):
+            elif _has_column("Planning sheet", "production_plan"):
                 frappe.db.set_value("Planning sheet", s.name, "production_plan", pp.name)
 
             if psi_pp_field or psi_order_sheet_field:
@@ -10325,7 +11761,7 @@ def audit_production_plans_for_planning_sheet(planning_sheet_name):
 
     header_pp = None
     for col in ("custom_production_plan", "production_plan"):
-        if frappe.db.has_column("Planning sheet", col):
+        if _has_column("Planning sheet", col):
             header_pp = frappe.db.get_value("Planning sheet", planning_sheet_name, col)
             break
 
@@ -10338,61 +11774,229 @@ def audit_production_plans_for_planning_sheet(planning_sheet_name):
     }
 
 
+# ------------------------------------------------------------
+# BULK PLANNING SHEET CREATION
+# ------------------------------------------------------------
+# A confirmation day can submit hundreds of Sales Orders at once. PlanningSheetPrefetch loads the
+# batch's SOs, SO items, Item qualities and existing sheets up front; while a chunk runs it sits on
+# frappe.local so the per-line helpers read those rows, and BOM resolutions are shared by every sheet
+# of the chunk. Large batches are split into chunks run by background workers; per-SO results are
+# kept in the cache under the batch id and published as PLANNING_SHEET_BULK_PROGRESS_EVENT.
+PLANNING_SHEET_BULK_CHUNK_SIZE = 20
+PLANNING_SHEET_BULK_RESULT_TTL = 24 * 3600
+PLANNING_SHEET_BULK_PROGRESS_EVENT = "production_scheduler_sheet_bulk_progress"
+PLANNING_SHEET_BULK_KEY_PREFIX = "production_scheduler:sheet_bulk:"
+
+
+class PlanningSheetPrefetch:
+    """
+    Rows bulk Planning sheet creation reads per Sales Order, loaded for a batch in a few queries.
+    orders: {SO name: frappe._dict header with ``items``}; so_items: {SO Item name: row};
+    item_quality: {item_code: Item custom_quality / quality}; existing: {SO name: oldest sheet};
+    bom_resolutions: shared _BomChildSync resolver memo.
+    """
+
+    def __init__(self, sales_orders):
+        names = tuple(dict.fromkeys(str(s or "").strip() for s in sales_orders or [] if str(s or "").strip()))
+        self.orders = {}
+        self.so_items = {}
+        self.item_quality = {}
+        self.existing = {}
+        self.bom_resolutions = {}
+        if not names:
+            return
+        for so in frappe.db.sql("SELECT * FROM `tabSales Order` WHERE name IN %s", (names,), as_dict=True):
+            so["items"] = []
+            self.orders[so.name] = so
+        for it in frappe.db.sql(
+            "SELECT * FROM `tabSales Order Item` WHERE parent IN %s ORDER BY parent, idx", (names,), as_dict=True
+        ):
+            if it.parent in self.orders:
+                self.orders[it.parent]["items"].append(it)
+                self.so_items[it.name] = it
+        for s in frappe.db.sql(
+            "SELECT name, sales_order FROM `tabPlanning sheet` WHERE sales_order IN %s ORDER BY creation ASC",
+            (names,),
+            as_dict=True,
+        ):
+            self.existing.setdefault(s.sales_order, s.name)
+        codes = tuple({it.item_code for it in self.so_items.values() if it.item_code})
+        cols = [c for c in ("custom_quality", "quality") if _has_column("Item", c)]
+        if codes and cols:
+            for row in frappe.db.sql(
+                f"SELECT name, {', '.join(cols)} FROM `tabItem` WHERE name IN %s", (codes,), as_dict=True
+            ):
+                self.item_quality[row.name] = str(next((row.get(c) for c in cols if row.get(c)), "") or "").strip()
+
+
+def _sheet_prefetch():
+    """The PlanningSheetPrefetch of the bulk chunk running in this request / job, if any."""
+    return getattr(frappe.local, "production_scheduler_sheet_prefetch", None)
+
+
+def _prefetched_sales_order_item(so_item_name):
+    prefetch = _sheet_prefetch()
+    if not prefetch or not so_item_name:
+        return None
+    return prefetch.so_items.get(so_item_name)
+
+
+def _item_default_quality(item_code):
+    """Item custom_quality / quality, used when the SO line text names no quality."""
+    prefetch = _sheet_prefetch()
+    if prefetch and item_code in prefetch.item_quality:
+        return prefetch.item_quality[item_code]
+    return str(
+        frappe.db.get_value("Item", item_code, "custom_quality")
+        or frappe.db.get_value("Item", item_code, "quality")
+        or ""
+    ).strip()
+
+
+def _create_planning_sheet_from_prefetch(so_name, prefetch):
+    """Create one sheet (insert, BOM child rows, process units), committed on its own; None if one exists."""
+    # Strict singleton: never create another sheet unless existing one is deleted.
+    if _find_existing_sheet_for_sales_order(so_name):
+        return None
+    doc = prefetch.orders.get(so_name)
+    if not doc:
+        frappe.throw(_("Sales Order {0} not found").format(so_name))
+
+    ps = frappe.new_doc("Planning sheet")
+    ps.sales_order = doc.name
+    ps.party_code = doc.get("party_code") or doc.customer
+    ps.customer = _resolve_customer_link(doc.customer, doc.get("party_code"))
+    ps.dod = doc.delivery_date
+    ps.ordered_date = doc.transaction_date
+    ps.planning_status = "Draft"
+
+    _populate_planning_sheet_items(ps, doc)
+    update_sheet_plan_codes(ps, include_legacy=True)
+    if not ps.get("quality"):
+        ps.quality = "Standard"
+    ps.insert(ignore_permissions=True)
+    frappe.db.commit()
+    _link_board_planned_rows_to_legacy_items(ps.name)
+    _sync_bom_child_planning_rows(ps.name, processes=BOM_CHILD_SYNC_SO_CREATE_PROCESSES)
+    _force_slitting_unit_on_sheet(ps.name)
+    _force_rewinding_unit_on_sheet(ps.name)
+    frappe.db.commit()
+    return ps.name
+
+
+def _create_planning_sheets_chunk(sales_orders, batch_id=None):
+    """Create sheets for a chunk of SOs with one prefetch; returns per-SO results (also cached for batch_id)."""
+    prefetch = PlanningSheetPrefetch(sales_orders)
+    frappe.local.production_scheduler_sheet_prefetch = prefetch
+    results = []
+    try:
+        for so_name in sales_orders:
+            result = {"sales_order": so_name}
+            existing = prefetch.existing.get(so_name)
+            try:
+                sheet = None if existing else _create_planning_sheet_from_prefetch(so_name, prefetch)
+                if sheet:
+                    result.update(status="created", sheet=sheet)
+                else:
+                    result.update(status="exists", sheet=existing or (_find_existing_sheet_for_sales_order(so_name) or {}).get("name"))
+            except Exception as e:
+                frappe.db.rollback()
+                frappe.log_error(frappe.get_traceback(), f"Failed to create plan for {so_name}")
+                result.update(status="failed", error=str(e))
+            results.append(result)
+            if batch_id:
+                _record_planning_sheet_bulk_result(batch_id, result)
+    finally:
+        frappe.local.production_scheduler_sheet_prefetch = None
+    return results
+
+
+def _planning_sheet_bulk_key(batch_id, sales_order=None):
+    key = f"{PLANNING_SHEET_BULK_KEY_PREFIX}{batch_id}"
+    return f"{key}:{sales_order}" if sales_order else key
+
+
+def _record_planning_sheet_bulk_result(batch_id, result):
+    frappe.cache().set_value(
+        _planning_sheet_bulk_key(batch_id, result["sales_order"]), result, expires_in_sec=PLANNING_SHEET_BULK_RESULT_TTL
+    )
+    frappe.publish_realtime(
+        PLANNING_SHEET_BULK_PROGRESS_EVENT, dict(result, batch_id=batch_id), user=frappe.session.user
+    )
+
+
+def run_planning_sheet_bulk_chunk(batch_id, sales_orders):
+    """Background job: one chunk of a create_planning_sheets_bulk batch."""
+    return _create_planning_sheets_chunk(sales_orders, batch_id=batch_id)
+
+
 @frappe.whitelist()
-def create_planning_sheets_bulk(sales_orders):
+def create_planning_sheets_bulk(sales_orders, background=None):
     """
     Creates Planning Sheets for selected Sales Orders.
     Uses GSM usage logic (Unit 1>50, etc) to auto-allocate items.
+    Up to PLANNING_SHEET_BULK_CHUNK_SIZE orders run in this request; larger batches (or background=1)
+    are split into chunks for background workers; poll get_planning_sheet_bulk_status(batch_id).
     """
-    import json
     if isinstance(sales_orders, str):
         sales_orders = json.loads(sales_orders)
-        
-    created = []
-    errors = []
-    
-    # GSM/Quality Maps (Helper)
-    # Re-defining here or using global
-    
-    for so_name in sales_orders:
-        try:
-            # Strict singleton: never create another sheet unless existing one is deleted.
-            if _find_existing_sheet_for_sales_order(so_name):
-                continue
-                
-            doc = frappe.get_doc("Sales Order", so_name)
-            
-            ps = frappe.new_doc("Planning sheet")
-            ps.sales_order = doc.name
-            ps.party_code = doc.get("party_code") or doc.customer
-            ps.customer = _resolve_customer_link(doc.customer, doc.get("party_code"))
-            ps.dod = doc.delivery_date
-            ps.ordered_date = doc.transaction_date
-            ps.planning_status = "Draft"
-            
-            _populate_planning_sheet_items(ps, doc)
-            update_sheet_plan_codes(ps, include_legacy=True)
-            if not ps.get("quality"):
-                ps.quality = "Standard"
-            ps.insert(ignore_permissions=True)
-            frappe.db.commit()
-            _link_board_planned_rows_to_legacy_items(ps.name)
-            _sync_lamination_fabric_planning_rows(ps.name)
-            _sync_slitting_fabric_planning_rows(ps.name)
-            _sync_bopp_child_planning_rows(ps.name)
-            _force_slitting_unit_on_sheet(ps.name)
-            _sync_rewinding_fabric_planning_rows(ps.name)
-            _force_rewinding_unit_on_sheet(ps.name)
-            final_doc = frappe.get_doc("Planning sheet", ps.name)
-            update_sheet_plan_codes(final_doc, include_legacy=True)
-            created.append(ps.name)
-            
-        except Exception as e:
-            frappe.log_error(f"Failed to create plan for {so_name}: {str(e)}")
-            errors.append(so_name)
-            
-            
-    return {"created": created, "errors": errors}
+    names = list(dict.fromkeys(str(s or "").strip() for s in sales_orders or [] if str(s or "").strip()))
+    if background is None:
+        background = len(names) > PLANNING_SHEET_BULK_CHUNK_SIZE
+    if not cint(background):
+        results = _create_planning_sheets_chunk(names)
+        return {
+            "created": [r["sheet"] for r in results if r["status"] == "created"],
+            "errors": [r["sales_order"] for r in results if r["status"] == "failed"],
+            "results": results,
+        }
+
+    batch_id = frappe.generate_hash(length=10)
+    chunks = [names[i:i + PLANNING_SHEET_BULK_CHUNK_SIZE] for i in range(0, len(names), PLANNING_SHEET_BULK_CHUNK_SIZE)]
+    frappe.cache().set_value(
+        _planning_sheet_bulk_key(batch_id),
+        {"sales_orders": names, "chunks": len(chunks), "queued_at": frappe.utils.now()},
+        expires_in_sec=PLANNING_SHEET_BULK_RESULT_TTL,
+    )
+    for i, chunk in enumerate(chunks):
+        frappe.enqueue(
+            "production_scheduler.api.run_planning_sheet_bulk_chunk",
+            queue=PLANNING_SHEET_PIPELINE_QUEUE,
+            timeout=PLANNING_SHEET_PIPELINE_TIMEOUT,
+            job_id=f"planning_sheet_bulk::{batch_id}::{i}",
+            enqueue_after_commit=True,
+            batch_id=batch_id,
+            sales_orders=chunk,
+        )
+    return {
+        "status": "queued",
+        "batch_id": batch_id,
+        "total": len(names),
+        "chunks": len(chunks),
+        "progress_event": PLANNING_SHEET_BULK_PROGRESS_EVENT,
+    }
+
+
+@frappe.whitelist()
+def get_planning_sheet_bulk_status(batch_id):
+    """Per-SO results of a queued create_planning_sheets_bulk batch (SOs not reached yet are 'queued')."""
+    manifest = frappe.cache().get_value(_planning_sheet_bulk_key(batch_id))
+    if not manifest:
+        return {"status": "unknown", "batch_id": batch_id}
+    results = [
+        frappe.cache().get_value(_planning_sheet_bulk_key(batch_id, so)) or {"sales_order": so, "status": "queued"}
+        for so in manifest.get("sales_orders") or []
+    ]
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {
+        "batch_id": batch_id,
+        "status": "running" if counts.get("queued") else "completed",
+        "total": len(results),
+        "counts": counts,
+        "results": results,
+    }
 
 
 @frappe.whitelist()
@@ -10439,6 +12043,9 @@ def update_sequence(items):
     # Batch update? No, simple loop is fine for < 50 items usually.
     for i in items:
         frappe.db.sql("UPDATE `tabPlanning Table` SET idx=%s WHERE name=%s", (i["idx"], i["name"]))
+
+    # Order changes what the board shows for these days: drop their cached snapshots.
+    _bump_board_versions(_item_effective_dates([i.get("name") for i in items]))
         
     frappe.db.commit() # Ensure committed immediately 
     return "ok"
@@ -10502,9 +12109,10 @@ def get_multiple_dates_capacity(dates, plan_name=None, pb_only=0):
         dates = [d.strip() for d in dates.split(",") if d.strip()]
         
     result = {}
+    grid = get_unit_load_grid(min(getdate(d) for d in dates), max(getdate(d) for d in dates)) if dates else None
     for unit in ["Unit 1", "Unit 2", "Unit 3", "Unit 4"]:
         total_limit = HARD_LIMITS.get(unit, 999.0) * len(dates)
-        total_load = sum(get_unit_load(d, unit, plan_name, pb_only=pb_only) for d in dates)
+        total_load = sum(grid.get(d, unit, plan_name, pb_only=pb_only) for d in dates)
         result[unit] = {
             "total_limit": total_limit,
             "total_load": total_load
@@ -10522,16 +12130,17 @@ def find_next_available_date(unit, start_date, required_tons=0, pb_only=1, days_
     pb_only = cint(pb_only)
     days_ahead = cint(days_ahead) or 30
     limit = HARD_LIMITS.get(unit, 999.0)
+    grid = get_unit_load_grid(frappe.utils.add_days(start_dt, 1), frappe.utils.add_days(start_dt, days_ahead))
 
     for i in range(1, days_ahead + 1):
         candidate = frappe.utils.add_days(start_dt, i)
-        load = get_unit_load(candidate, unit, "__all__", pb_only=pb_only)
+        load = grid.get(candidate, unit, "__all__", pb_only=pb_only)
         if load + required <= (limit * 1.05):
             return {"date": str(candidate), "current_load": load, "limit": limit}
 
     # Fallback suggestion if no clean slot found in lookahead window
     fallback = frappe.utils.add_days(start_dt, 1)
-    return {"date": str(fallback), "current_load": get_unit_load(fallback, unit, "__all__", pb_only=pb_only), "limit": limit}
+    return {"date": str(fallback), "current_load": grid.get(fallback, unit, "__all__", pb_only=pb_only), "limit": limit}
 
 @frappe.whitelist()
 def push_to_pb(item_names, pb_plan_name, target_dates=None, target_date=None, fetch_dates=None):
@@ -10557,8 +12166,10 @@ def push_to_pb(item_names, pb_plan_name, target_dates=None, target_date=None, fe
     updated_count = 0
     skipped_already_pushed = []
     pb_sheet_cache = {}  # (party_code, effective_date) -> pb sheet name
-    local_loads = {} # (date, unit) -> current load
+    grid = UnitLoadGrid() # (date, unit) loads, fetched per date window on first use
+    touched_dates = set()
 
+    delta = BoardDelta(item_names, reason="push_to_pb", track_slots=False)
     for name in item_names:
         try:
             item = frappe.get_doc("Planning Table", name)
@@ -10567,7 +12178,7 @@ def push_to_pb(item_names, pb_plan_name, target_dates=None, target_date=None, fe
             already_pushed = False
             if parent.get("custom_pb_plan_name"):
                 already_pushed = True
-            if not already_pushed and frappe.db.has_column("Planning Table", "planned_date"):
+            if not already_pushed and _has_column("Planning Table", "planned_date"):
                 if item.get("planned_date"):
                     already_pushed = True
             if already_pushed:
@@ -10583,15 +12194,11 @@ def push_to_pb(item_names, pb_plan_name, target_dates=None, target_date=None, fe
                 unit = item.unit or get_preferred_unit(item.custom_quality)
                 limit = HARD_LIMITS.get(unit, 999.0)
                 for check_date in dates:
-                    load_key = (check_date, unit)
-                    if load_key not in local_loads:
-                        local_loads[load_key] = get_unit_load(check_date, unit, "__all__", pb_only=1)
-                    
-                    load = local_loads[load_key]
+                    load = grid.get(check_date, unit, "__all__", pb_only=1)
                     # Allow the item to slot here if we are under the limit, OR if it's the very last date fallback 
                     if (load + item_wt <= limit * 1.05) or (check_date == dates[-1]):
                         effective_date = check_date
-                        local_loads[load_key] = load + item_wt
+                        grid.add(check_date, unit, item_wt)
                         break
             # ------------------------------------------------
 
@@ -10635,7 +12242,7 @@ def push_to_pb(item_names, pb_plan_name, target_dates=None, target_date=None, fe
                     # Force custom fields via SQL
                     # IMPORTANT: only write sheet-level planned date when a new sheet is created.
                     # Reused sheets must not have their header date overwritten.
-                    if created_pb_sheet and frappe.db.has_column("Planning sheet", "custom_pb_plan_name"):
+                    if created_pb_sheet and _has_column("Planning sheet", "custom_pb_plan_name"):
                         frappe.db.sql("""
                             UPDATE `tabPlanning sheet`
                             SET custom_pb_plan_name = %s, custom_plan_name = %s,
@@ -10659,27 +12266,25 @@ def push_to_pb(item_names, pb_plan_name, target_dates=None, target_date=None, fe
             """, (pb_sheet_name, _get_pt_parentfield(), max_idx + 1, name))
 
             # Also set item-level planned date for consistency
-            if frappe.db.has_column("Planning Table", "planned_date"):
+            if _has_column("Planning Table", "planned_date"):
                 frappe.db.sql("""
                     UPDATE `tabPlanning Table`
                     SET planned_date = %s
                     WHERE name = %s
                 """, (effective_date, name))
 
+            touched_dates.update([parent.get("custom_planned_date") or parent.ordered_date, effective_date])
             updated_count += 1
 
         except Exception as e:
             frappe.log_error(f"push_to_pb error for item {name}: {e}", "Push to PB")
 
+    _sync_effective_dates(item_names=item_names)
+    _touch_unit_load_days(touched_dates)
+    delta.publish(dates=touched_dates)
+
     # Persist this PB plan name so it appears in the plan dropdown
-    persisted = get_persisted_plans("production_board")
-    if not any(p["name"] == pb_plan_name for p in persisted):
-        persisted.append({"name": pb_plan_name, "locked": 0})
-        import json as _json
-        frappe.defaults.set_global_default(
-            "production_scheduler_production_board_plans",
-            _json.dumps(persisted)
-        )
+    _register_plans("production_board", [pb_plan_name])
 
     frappe.db.commit()
     if updated_count == 0 and skipped_already_pushed:
@@ -10725,7 +12330,7 @@ def push_items_to_pb(
     if not items_data:
         return {"status": "error", "message": "Missing item data"}
 
-    def _cascade_white_queue_for_unit(target_date_val, unit_val, active_pb_plan=None, shared_loads=None):
+    def _cascade_white_queue_for_unit(target_date_val, unit_val, active_pb_plan=None, shared_grid=None):
         """
         Shift queued white items forward day-by-day for a given unit/date slot.
         This frees the target slot for incoming color push while preserving white order.
@@ -10734,8 +12339,7 @@ def push_items_to_pb(
         from frappe.utils import getdate, add_days
 
         target_dt = getdate(target_date_val)
-        unit_limit = HARD_LIMITS.get(unit_val, 999.0)
-        shared_loads = shared_loads if isinstance(shared_loads, dict) else {}
+        shared_grid = shared_grid if isinstance(shared_grid, UnitLoadGrid) else UnitLoadGrid()
 
         white_sql = ", ".join([f"'{c.upper().replace(' ', '')}'" for c in WHITE_COLORS])
         plan_cond = ""
@@ -10744,6 +12348,7 @@ def push_items_to_pb(
             plan_cond = "AND COALESCE(p.custom_pb_plan_name, '') = %s"
             params.append(active_pb_plan)
 
+        eff_col = _pt_effective_date_sql()
         rows = frappe.db.sql(f"""
             SELECT
                 i.name,
@@ -10755,19 +12360,19 @@ def push_items_to_pb(
             WHERE p.docstatus < 2
               AND i.docstatus < 2
               AND i.unit = %s
-              AND DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) >= DATE(%s)
+              AND {eff_col} >= DATE(%s)
               AND REPLACE(UPPER(COALESCE(i.color, '')), ' ', '') IN ({white_sql})
               {plan_cond}
-            ORDER BY DATE(COALESCE(i.planned_date, p.custom_planned_date, p.ordered_date)) ASC, i.idx ASC
+            ORDER BY {eff_col} ASC, i.idx ASC
         """, tuple([params[1], params[0]] + params[2:]), as_dict=True)
 
         if not rows:
             return {"moved": 0, "dates": set()}
 
-        has_item_planned_col = frappe.db.has_column("Planning Table", "planned_date")
-        has_plan_code_col = frappe.db.has_column("Planning Table", "plan_name")
+        has_item_planned_col = _has_column("Planning Table", "planned_date")
+        has_plan_code_col = _has_column("Planning Table", "plan_name")
 
-        moved_count = 0
+        planner = CascadePlanner(shared_grid)
         moved_dates = set()
 
         for r in rows:
@@ -10775,59 +12380,24 @@ def push_items_to_pb(
             qty_tons = flt(r.get("qty")) / 1000.0
             source_date = str(getdate(r.get("effective_date")))
 
-            # Remove this item's load from its current source day in the shared cache.
-            src_key = (source_date, unit_val)
-            if src_key not in shared_loads:
-                shared_loads[src_key] = get_unit_load(source_date, unit_val, "__all__", pb_only=1)
-            shared_loads[src_key] = max(0.0, shared_loads[src_key] - qty_tons)
+            # Remove this item's load from its current source day in the shared grid.
+            shared_grid.remove(source_date, unit_val, qty_tons)
 
             # Queue shift rule: each white item moves to at least the next day, skipping maintenance dates.
-            candidate = add_days(getdate(source_date), 1)
-            maintenance_encountered = None
-            
-            while True:
-                candidate_str = candidate if isinstance(candidate, str) else candidate.strftime("%Y-%m-%d")
-                
-                # CHECK MAINTENANCE: Skip if date is under maintenance
-                if is_date_under_maintenance(unit_val, candidate_str):
-                    maint_info = get_maintenance_info_on_date(unit_val, candidate_str)
-                    if not maintenance_encountered:
-                        maintenance_encountered = maint_info
-                    candidate = add_days(candidate, 1)
-                    continue  # Skip this date, try next day
-                
-                load_key = (candidate_str, unit_val)
-                if load_key not in shared_loads:
-                    shared_loads[load_key] = get_unit_load(candidate_str, unit_val, "__all__", pb_only=1)
-
-                current_load = shared_loads[load_key]
-                if (current_load + qty_tons <= unit_limit * 1.05) or (current_load == 0 and qty_tons >= unit_limit):
-                    shared_loads[load_key] = current_load + qty_tons
-                    break
-
-                candidate = add_days(candidate, 1)
+            blocked_days = []
+            candidate_str = planner.find_day(unit_val, qty_tons, add_days(getdate(source_date), 1), on_blocked=blocked_days.append)
+            maintenance_encountered = get_maintenance_info_on_date(unit_val, blocked_days[0]) if blocked_days else None
 
             if not has_item_planned_col:
+                shared_grid.add(candidate_str, unit_val, qty_tons)
                 continue
 
-            if has_plan_code_col:
-                new_code = generate_plan_code(candidate_str, unit_val, active_pb_plan)
-                frappe.db.sql("""
-                    UPDATE `tabPlanning Table`
-                    SET planned_date = %s,
-                        plan_name = %s
-                    WHERE name = %s
-                """, (candidate_str, new_code, item_name))
-            else:
-                frappe.db.sql("""
-                    UPDATE `tabPlanning Table`
-                    SET planned_date = %s
-                    WHERE name = %s
-                """, (candidate_str, item_name))
-
-            moved_count += 1
+            columns = {"plan_name": generate_plan_code(candidate_str, unit_val, active_pb_plan)} if has_plan_code_col else None
+            planner.move(item_name, unit_val, qty_tons, source_date, candidate_str, columns=columns)
             moved_dates.add(candidate_str)
 
+        planner.apply()
+        moved_count = len(planner.movement_log)
         return {"moved": moved_count, "dates": moved_dates, "maintenance_skipped": maintenance_encountered is not None, "maintenance_info": maintenance_encountered}
 
     approve_cross_month = cint(approve_cross_month)
@@ -10837,9 +12407,10 @@ def push_items_to_pb(
     push_errors = []
     updated_sheets = set()
     pb_sheet_cache = {}  # (party_code, target_date) -> pb sheet name
-    local_loads = {} # (date, unit) -> current load
+    grid = UnitLoadGrid() # (date, unit) loads, fetched per date window on first use
     unit_date_idx_offsets = {} # (unit, date) -> max_idx
     effective_dates_used = set()
+    touched_dates = set()
     white_shifted_count = 0
     white_shifted_dates = set()
     cross_month_candidates = []
@@ -10848,6 +12419,11 @@ def push_items_to_pb(
     # Disabled by request: do not pre-shift queued white orders when pushing colors.
     # Keep counters for response compatibility.
 
+    delta = BoardDelta(
+        [it.get("name") if isinstance(it, dict) else it for it in items_data],
+        reason="push_items_to_pb",
+        track_slots=False,
+    )
     for item in items_data:
         name = item.get("name") if isinstance(item, dict) else item
         target_date_raw = item.get("target_dates") or item.get("target_date") if isinstance(item, dict) else None
@@ -10862,7 +12438,7 @@ def push_items_to_pb(
             # Prevent re-pushing ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ check ITEM-LEVEL only (not parent-level!)
             # Parent-level check was blocking ALL items from a sheet once one was pushed
             already_pushed = False
-            if frappe.db.has_column("Planning Table", "planned_date"):
+            if _has_column("Planning Table", "planned_date"):
                 if item_doc.get("planned_date"):
                     already_pushed = True
             if already_pushed:
@@ -10894,10 +12470,7 @@ def push_items_to_pb(
                         proposed = next_d if isinstance(next_d, str) else next_d.strftime("%Y-%m-%d")
                         if is_date_under_maintenance(unit, proposed):
                             continue
-                        load_key_next = (proposed, unit)
-                        if load_key_next not in local_loads:
-                            local_loads[load_key_next] = get_unit_load(proposed, unit, "__all__", pb_only=1)
-                        next_load = local_loads[load_key_next]
+                        next_load = grid.get(proposed, unit, "__all__", pb_only=1)
                         if ((next_load + item_wt <= limit * 1.05) or (next_load == 0 and item_wt >= limit)):
                             break
                     if proposed == current_check_date:
@@ -10920,10 +12493,7 @@ def push_items_to_pb(
                         continue
                     current_check_date = proposed
 
-                load_key = (current_check_date, unit)
-                if load_key not in local_loads:
-                    local_loads[load_key] = get_unit_load(current_check_date, unit, "__all__", pb_only=1)
-                load = local_loads[load_key]
+                load = grid.get(current_check_date, unit, "__all__", pb_only=1)
                 if not ((load + item_wt <= limit * 1.05) or (load == 0 and item_wt >= limit)):
                     frappe.msgprint(
                         f"ÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã¢â‚¬Â¦Ãƒâ€šÃ‚Â¡ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â ÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¯ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¸ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â Item {item_doc.item_code}: target date {current_check_date} is at capacity for {unit}. Please change date.",
@@ -10932,7 +12502,7 @@ def push_items_to_pb(
                     continue
 
                 effective_date = current_check_date
-                local_loads[load_key] = load + item_wt
+                grid.add(current_check_date, unit, item_wt)
             else:
                 # FLEX MODE: User confirmed cascading - allow flexible dates but WITH LIMITS
                 maintenance_block = None
@@ -10955,17 +12525,13 @@ def push_items_to_pb(
                         cascade_days += 1
                         continue
                     
-                    load_key = (current_check_date, unit)
-                    if load_key not in local_loads:
-                        local_loads[load_key] = get_unit_load(current_check_date, unit, "__all__", pb_only=1)
-                    
-                    load = local_loads[load_key]
+                    load = grid.get(current_check_date, unit, "__all__", pb_only=1)
                     
                     # Allow placement if it fits within the limit (with 5% buffer)
                     # OR if the day is completely empty but the item itself is larger than the limit (prevents infinite loop)
                     if (load + item_wt <= limit * 1.05) or (load == 0 and item_wt >= limit):
                         effective_date = current_check_date
-                        local_loads[load_key] = load + item_wt
+                        grid.add(current_check_date, unit, item_wt)
                         # Track if maintenance was encountered
                         if maintenance_block and "maintenance_conflicts" not in locals():
                             maintenance_conflicts = []
@@ -11091,7 +12657,7 @@ def push_items_to_pb(
 
             # 2. Set item-level planned date + plan code for consistency
             # This ensures ONLY the pushed item moves, staying granular.
-            if frappe.db.has_column("Planning Table", "planned_date"):
+            if _has_column("Planning Table", "planned_date"):
                 new_plan_code = generate_plan_code(effective_date, unit, pb_plan_name)
                 
                 frappe.db.sql("""
@@ -11100,6 +12666,7 @@ def push_items_to_pb(
                     WHERE name = %s
                 """, (effective_date, new_plan_code, name))
             effective_dates_used.add(effective_date)
+            touched_dates.update([item_doc.get("planned_date") or parent_doc.get("custom_planned_date") or parent_doc.ordered_date, effective_date])
 
             # ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡ Update idx for sequence ordering on board ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡ÃƒÆ’Ã†â€™Ãƒâ€¦Ã‚Â½ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€¦Ã¢â‚¬Å“ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã¢â‚¬Å¡Ãƒâ€šÃ‚Â¶ÃƒÆ’Ã†â€™Ãƒâ€ Ã¢â‚¬â„¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â¡
             # Use a global offset for the unit/date to ensure monotonic sequence
@@ -11161,15 +12728,12 @@ def push_items_to_pb(
             "count": len(cross_month_candidates),
         }
 
+    _sync_effective_dates(item_names=[it.get("name") if isinstance(it, dict) else it for it in items_data])
+    _touch_unit_load_days(touched_dates)
+    delta.publish(dates=touched_dates)
+
     # Persist this PB plan name
-    persisted = get_persisted_plans("production_board")
-    if not any(p["name"] == pb_plan_name for p in persisted):
-        persisted.append({"name": pb_plan_name, "locked": 0})
-        import json as _json
-        frappe.defaults.set_global_default(
-            "production_scheduler_production_board_plans",
-            _json.dumps(persisted)
-        )
+    _register_plans("production_board", [pb_plan_name])
 
     frappe.db.commit()
     
@@ -11199,254 +12763,196 @@ def push_items_to_pb(
 
 
 
+def _backfill_sheet_sales_orders(sheets):
+    """{sheet name: sales_order} for the sheets of a backfill chunk that carry one."""
+    return {
+        r.name: r.sales_order
+        for r in frappe.db.sql(
+            "SELECT name, sales_order FROM `tabPlanning sheet` WHERE name IN %s AND IFNULL(sales_order, '') != ''",
+            (tuple(sheets),),
+            as_dict=True,
+        )
+    }
+
+
+def _backfill_chunk_production_plan_links(sheets, report=None):
+    """Point every row of ``sheets`` at the latest open Production Plan of the sheet's Sales Order."""
+    sheet_so = _backfill_sheet_sales_orders(sheets)
+    if not sheet_so:
+        return {}
+    pp_by_so = {}
+    for pp in frappe.db.sql(
+        """
+        SELECT name, sales_order FROM `tabProduction Plan`
+        WHERE sales_order IN %s AND docstatus < 2
+        ORDER BY modified DESC
+        """,
+        (tuple(set(sheet_so.values())),),
+        as_dict=True,
+    ):
+        pp_by_so.setdefault(pp.sales_order, pp.name)
+    linked = {s: pp_by_so[so] for s, so in sheet_so.items() if so in pp_by_so}
+    updates = {}
+    if linked:
+        for r in frappe.db.sql(
+            "SELECT name, parent, custom_production_plan FROM `tabPlanning Table` WHERE parent IN %s",
+            (tuple(linked),),
+            as_dict=True,
+        ):
+            if r.custom_production_plan != linked[r.parent]:
+                updates[r.name] = {"custom_production_plan": linked[r.parent]}
+    _bulk_update_by_name("Planning Table", updates)
+    return {"updated": len(updates), "skipped": len(sheet_so) - len(linked)}
+
+
 @frappe.whitelist()
 def backfill_production_plan_links(sales_order=None):
     """
     Backfill custom_production_plan field on Planning Sheet Items.
     Links items to their Production Plans based on Sales Order.
+    Without a Sales Order every sheet is walked by a resumable background job.
     """
-    import json
-    
-    result = {
-        "updated": 0,
-        "skipped": 0,
-        "errors": []
-    }
-    
+    if not sales_order:
+        return _enqueue_backfill("production_plan_links")
+    if not frappe.db.exists("Planning sheet", {"sales_order": sales_order}):
+        return {"status": "error", "message": f"No Planning Sheets found for SO: {sales_order}"}
+    result = {"updated": 0, "skipped": 0, "errors": []}
     try:
-        # Find Planning Sheets for this SO
-        if sales_order:
-            sheets = frappe.get_all("Planning sheet", filters={"sales_order": sales_order}, fields=["name"])
-        else:
-            sheets = frappe.get_all("Planning sheet", fields=["name"])
-        
-        if not sheets:
-            return {"status": "error", "message": f"No Planning Sheets found for SO: {sales_order}"}
-        
-        sheet_names = [s["name"] for s in sheets]
-        
-        for sheet_name in sheet_names:
-            try:
-                sheet_doc = frappe.get_doc("Planning sheet", sheet_name)
-                so = sheet_doc.sales_order
-                
-                if not so:
-                    continue
-                
-                # Find Production Plans for this Sales Order
-                pps = frappe.get_all("Production Plan", 
-                    filters={"sales_order": so, "docstatus": ["<", 2]},
-                    fields=["name"],
-                    limit=1
-                )
-                
-                if not pps:
-                    result["skipped"] += 1
-                    continue
-                
-                pp_name = pps[0]["name"]
-                
-                # Update all items in this sheet
-                items = frappe.get_all("Planning Table", 
-                    filters={"parent": sheet_name},
-                    fields=["name"]
-                )
-                
-                for item in items:
-                    try:
-                        frappe.db.set_value(
-                            "Planning Table",
-                            item["name"],
-                            "custom_production_plan",
-                            pp_name
-                        )
-                        result["updated"] += 1
-                    except Exception as e:
-                        result["errors"].append(f"Item {item['name']}: {str(e)}")
-                        result["skipped"] += 1
-            
-            except Exception as e:
-                result["errors"].append(f"Sheet {sheet_name}: {str(e)}")
-        
-        frappe.db.commit()
+        result.update(_run_backfill("production_plan_links", {"sales_order": sales_order}))
         result["status"] = "success"
-    
     except Exception as e:
+        frappe.db.rollback()
         result["status"] = "error"
         result["message"] = str(e)
-    
     return result
 
 
+def _backfill_chunk_sales_order_item_links(sheets, report=None):
+    """Link rows of ``sheets`` to the Sales Order Item with the same item_code on the sheet's SO."""
+    sheet_so = _backfill_sheet_sales_orders(sheets)
+    if not sheet_so:
+        return {}
+    so_item_map = {}
+    for soi in frappe.db.sql(
+        "SELECT name, parent, item_code FROM `tabSales Order Item` WHERE parent IN %s ORDER BY parent, idx",
+        (tuple(set(sheet_so.values())),),
+        as_dict=True,
+    ):
+        so_item_map[(soi.parent, soi.item_code)] = soi.name
+    updates = {}
+    skipped = 0
+    for r in frappe.db.sql(
+        "SELECT name, parent, item_code, sales_order_item FROM `tabPlanning Table` WHERE parent IN %s",
+        (tuple(sheet_so),),
+        as_dict=True,
+    ):
+        so_item = so_item_map.get((sheet_so[r.parent], r.item_code))
+        if not so_item:
+            skipped += 1
+        elif r.sales_order_item != so_item:
+            updates[r.name] = {"sales_order_item": so_item}
+    _bulk_update_by_name("Planning Table", updates)
+    return {"updated": len(updates), "skipped": skipped}
+
+
 @frappe.whitelist()
 def backfill_sales_order_item_links(sales_order=None):
     """
     Backfill sales_order_item field on Planning Sheet Items.
     Links items to their Sales Order Items based on item_code matching.
+    Without a Sales Order every sheet is walked by a resumable background job.
     """
-    import json
-    
-    result = {
-        "updated": 0,
-        "skipped": 0,
-        "errors": []
-    }
-    
+    if not sales_order:
+        return _enqueue_backfill("sales_order_item_links")
+    if not frappe.db.exists("Planning sheet", {"sales_order": sales_order}):
+        return {"status": "error", "message": "No Planning Sheets found"}
+    result = {"updated": 0, "skipped": 0, "errors": []}
     try:
-        # Find Planning Sheets
-        if sales_order:
-            sheets = frappe.get_all("Planning sheet", filters={"sales_order": sales_order}, fields=["name", "sales_order"])
-        else:
-            sheets = frappe.get_all("Planning sheet", fields=["name", "sales_order"])
-        
-        if not sheets:
-            return {"status": "error", "message": f"No Planning Sheets found"}
-        
-        for sheet in sheets:
-            try:
-                sheet_name = sheet["name"]
-                so = sheet["sales_order"]
-                
-                if not so:
-                    continue
-                
-                # Get all items in this Planning Sheet
-                psi_items = frappe.get_all("Planning Table",
-                    filters={"parent": sheet_name},
-                    fields=["name", "item_code"]
-                )
-                
-                # Get all Sales Order Items for this SO
-                so_items = frappe.get_all("Sales Order Item",
-                    filters={"parent": so},
-                    fields=["name", "item_code"]
-                )
-                
-                # Create mapping: item_code -> SO Item name
-                so_item_map = {soi["item_code"]: soi["name"] for soi in so_items}
-                
-                # Link Planning Sheet Items to Sales Order Items
-                for psi in psi_items:
-                    item_code = psi["item_code"]
-                    if item_code in so_item_map:
-                        so_item_name = so_item_map[item_code]
-                        try:
-                            frappe.db.set_value(
-                                "Planning Table",
-                                psi["name"],
-                                "sales_order_item",
-                                so_item_name
-                            )
-                            result["updated"] += 1
-                        except Exception as e:
-                            result["errors"].append(f"PSI {psi['name']}: {str(e)}")
-                            result["skipped"] += 1
-                    else:
-                        result["skipped"] += 1
-            
-            except Exception as e:
-                result["errors"].append(f"Sheet {sheet_name}: {str(e)}")
-        
-        frappe.db.commit()
+        result.update(_run_backfill("sales_order_item_links", {"sales_order": sales_order}))
         result["status"] = "success"
-    
     except Exception as e:
+        frappe.db.rollback()
         result["status"] = "error"
         result["message"] = str(e)
-    
     return result
 
 
-@frappe.whitelist()
-def backfill_wo_production_plan_links(sales_order=None, item_code=None):
-    """
-    Backfill custom_production_plan on Planning Sheet Items by finding Work Orders.
-    Links WO -> Production Plan -> Planning Sheet Item.
-    Works even if Work Orders don't have sales_order field set.
-    """
-    result = {
-        "updated": 0,
-        "skipped": 0,
-        "errors": [],
-        "linked_items": []
-    }
+def _backfill_chunk_wo_production_plan_links(sheets, report=None, item_code=None):
+    """Link rows of ``sheets`` to the Production Plan of the latest Work Order for their item_code."""
     psi_pp_field = _psi_production_plan_field()
     psi_order_sheet_field = _psi_order_sheet_field()
-    
-    try:
-        # Find Planning Sheets
-        if sales_order:
-            sheets = frappe.get_all("Planning sheet", filters={"sales_order": sales_order}, fields=["name", "sales_order"])
-        else:
-            sheets = frappe.get_all("Planning sheet", fields=["name", "sales_order"])
-        
-        if not sheets:
-            return {"status": "error", "message": f"No Planning Sheets found"}
-        
-        for sheet in sheets:
-            try:
-                sheet_name = sheet["name"]
-                
-                # Get all items in this Planning Sheet
-                psi_items = frappe.get_all("Planning Table",
-                    filters={"parent": sheet_name},
-                    fields=["name", "item_code"]
-                )
-                
-                for psi in psi_items:
-                    psi_item_code = psi["item_code"]
-                    
-                    try:
-                        # Find Work Orders with matching item code
-                        wos = frappe.db.sql("""
-                            SELECT name, production_plan
-                            FROM `tabWork Order`
-                            WHERE production_item = %s
-                              AND docstatus < 2
-                            ORDER BY creation DESC
-                            LIMIT 1
-                        """, (psi_item_code,), as_dict=True)
-                        
-                        if wos and wos[0].get("production_plan"):
-                            pp = wos[0]["production_plan"]
-                            if psi_pp_field:
-                                frappe.db.set_value(
-                                    "Planning Table",
-                                    psi["name"],
-                                    psi_pp_field,
-                                    pp
-                                )
-                            if psi_order_sheet_field and psi_order_sheet_field != psi_pp_field:
-                                frappe.db.set_value(
-                                    "Planning Table",
-                                    psi["name"],
-                                    psi_order_sheet_field,
-                                    pp
-                                )
-                            result["updated"] += 1
-                            result["linked_items"].append({
-                                "psi": psi["name"],
-                                "item_code": psi_item_code,
-                                "wo": wos[0]["name"],
-                                "pp": pp
-                            })
-                        else:
-                            result["skipped"] += 1
-                    
-                    except Exception as e:
-                        result["errors"].append(f"PSI {psi['name']}: {str(e)}")
-                        result["skipped"] += 1
-            
-            except Exception as e:
-                result["errors"].append(f"Sheet {sheet_name}: {str(e)}")
-        
-        frappe.db.commit()
+    fields = [f for f in (psi_pp_field, psi_order_sheet_field) if f]
+    if not fields:
+        return {}
+    item_filter = " AND item_code = %s" if item_code else ""
+    params = (tuple(sheets), item_code) if item_code else (tuple(sheets),)
+    rows = frappe.db.sql(
+        f"""
+        SELECT name, item_code, {', '.join(f'`{f}`' for f in sorted(set(fields)))}
+        FROM `tabPlanning Table`
+        WHERE parent IN %s AND IFNULL(item_code, '') != ''{item_filter}
+        """,
+        params,
+        as_dict=True,
+    )
+    if not rows:
+        return {}
+    latest_wo = {}
+    for wo in frappe.db.sql(
+        """
+        SELECT name, production_item, production_plan
+        FROM `tabWork Order`
+        WHERE production_item IN %s AND docstatus < 2
+        ORDER BY creation DESC
+        """,
+        (tuple({r.item_code for r in rows}),),
+        as_dict=True,
+    ):
+        latest_wo.setdefault(wo.production_item, wo)
+    updates = {}
+    updated = skipped = 0
+    for r in rows:
+        wo = latest_wo.get(r.item_code)
+        if not wo or not wo.production_plan:
+            skipped += 1
+            continue
+        values = {f: wo.production_plan for f in fields if r.get(f) != wo.production_plan}
+        if values:
+            updates[r.name] = values
+        updated += 1
+        if report is not None:
+            report.setdefault("linked_items", []).append({
+                "psi": r.name,
+                "item_code": r.item_code,
+                "wo": wo.name,
+                "pp": wo.production_plan
+            })
+    _bulk_update_by_name("Planning Table", updates)
+    return {"updated": updated, "skipped": skipped}
+
+
+@frappe.whitelist()
+def backfill_wo_production_plan_links(sales_order=None, item_code=None):
+    """
+    Backfill custom_production_plan on Planning Sheet Items by finding Work Orders.
+    Links WO -> Production Plan -> Planning Sheet Item.
+    Works even if Work Orders don't have sales_order field set.
+    Without a Sales Order every sheet is walked by a resumable background job.
+    """
+    if not sales_order:
+        return _enqueue_backfill("wo_production_plan_links", {"item_code": item_code})
+    if not frappe.db.exists("Planning sheet", {"sales_order": sales_order}):
+        return {"status": "error", "message": "No Planning Sheets found"}
+    result = {"updated": 0, "skipped": 0, "errors": [], "linked_items": []}
+    try:
+        result.update(_run_backfill(
+            "wo_production_plan_links", {"sales_order": sales_order, "item_code": item_code}, report=result
+        ))
         result["status"] = "success"
-    
     except Exception as e:
+        frappe.db.rollback()
         result["status"] = "error"
         result["message"] = str(e)
-    
     return result
 
 
@@ -11654,7 +13160,7 @@ def debug_production_qty_fallback_map(planning_sheet=None, item_name=None):
         if so_names:
             so_order_code_col = None
             for c in ["order_code", "custom_order_code", "po_no", "customer_order_no"]:
-                if frappe.db.has_column("Sales Order", c):
+                if _has_column("Sales Order", c):
                     so_order_code_col = c
                     break
             
@@ -11747,7 +13253,7 @@ def revert_items_from_pb(item_names):
             parent_doc = frappe.get_doc("Planning sheet", parent)
             
             # Clear Item-level Planned Date
-            if frappe.db.has_column("Planning Table", "planned_date"):
+            if _has_column("Planning Table", "planned_date"):
                 frappe.db.set_value("Planning Table", name, "planned_date", None)
             
             # If the parent has custom_pb_plan_name (it's a PB sheet), move item back
@@ -11798,11 +13304,13 @@ def revert_items_from_pb(item_names):
                 frappe.db.set_value("Planning sheet", parent, "custom_pb_plan_name", "")
                 if _has_planned_date_column():
                     frappe.db.set_value("Planning sheet", parent, "custom_planned_date", None)
+                    _sync_effective_dates(parents=[parent])
             
             count += 1
         except Exception as e:
             frappe.log_error(f"revert_items_from_pb error for {name}: {e}", "Revert from PB")
 
+    _sync_effective_dates(item_names=item_names)
     frappe.db.commit()
     return {"status": "success", "reverted_items": count}
 
@@ -11856,62 +13364,121 @@ def sync_custom_fields():
         pass
 
     frappe.db.commit()
+    clear_schema_registry()
     return "Custom fields synced successfully."
 
 
-@frappe.whitelist()
-def backfill_item_level_production_plan_links(planning_sheet_name=None):
-    """Backfill Planning Sheet Item -> Production Plan links for legacy data."""
-    frappe.only_for("System Manager")
+def _resolve_pps_by_sales_order_items(so_items):
+    """Batch _resolve_pp_by_sales_order_item: {sales_order_item: latest submitted Production Plan}."""
+    so_items = tuple({str(s or "").strip() for s in so_items or []} - {""})
+    if not so_items:
+        return {}
+    so_item_col = None
+    for col in ("sales_order_item", "custom_sales_order_item"):
+        if frappe.db.has_column("Production Plan Item", col):
+            so_item_col = col
+            break
+    if not so_item_col:
+        return {}
+    resolved = {}
+    for r in frappe.db.sql(
+        f"""
+        SELECT ppi.{so_item_col} AS so_item, pp.name
+        FROM `tabProduction Plan` pp
+        INNER JOIN `tabProduction Plan Item` ppi ON ppi.parent = pp.name
+        WHERE pp.docstatus = 1
+          AND ppi.{so_item_col} IN %s
+        ORDER BY pp.creation DESC
+        """,
+        (so_items,),
+        as_dict=True,
+    ):
+        resolved.setdefault(r.so_item, r.name)
+    return resolved
+
 
+def _backfill_chunk_item_level_production_plan_links(sheets, report=None):
+    """Item-level PP links for rows of ``sheets`` without one: SO item's PP, else the sheet header PP."""
     psi_pp_field = _psi_production_plan_field()
     psi_order_sheet_field = _psi_order_sheet_field()
     if not psi_pp_field and not psi_order_sheet_field:
-        return {"status": "error", "message": "Planning Sheet Item production plan field not found. Run sync_custom_fields first."}
-
-    filters = {}
-    if planning_sheet_name:
-        filters["parent"] = planning_sheet_name
-
-    rows = frappe.get_all(
-        "Planning Table",
-        filters=filters,
-        fields=["name", "parent", "sales_order_item", "custom_sales_order_item"],
-        limit_page_length=0,
+        return {}
+    pp_fields = _psi_production_plan_fields()
+    so_cols = [c for c in ("sales_order_item", "custom_sales_order_item") if _has_column("Planning Table", c)]
+    rows = frappe.db.sql(
+        f"""
+        SELECT {', '.join(['name', 'parent'] + [f'`{c}`' for c in so_cols + pp_fields])}
+        FROM `tabPlanning Table`
+        WHERE parent IN %s
+        """,
+        (tuple(sheets),),
+        as_dict=True,
     )
+    if not rows:
+        return {}
+    # _get_item_level_production_plan also reads the legacy table under the same row name.
+    legacy_fields = [f for f in pp_fields if frappe.db.has_column("Planning sheet Item", f)]
+    legacy = {}
+    if legacy_fields:
+        legacy = {
+            r.name: r
+            for r in frappe.db.sql(
+                f"SELECT name, {', '.join(f'`{f}`' for f in legacy_fields)} FROM `tabPlanning sheet Item` WHERE name IN %s",
+                (tuple(r.name for r in rows),),
+                as_dict=True,
+            )
+        }
+    header_cols = [c for c in ("custom_production_plan", "production_plan") if _has_column("Planning sheet", c)]
+    header_pp = {}
+    if header_cols:
+        for h in frappe.db.sql(
+            f"SELECT name, {', '.join(header_cols)} FROM `tabPlanning sheet` WHERE name IN %s",
+            (tuple(sheets),),
+            as_dict=True,
+        ):
+            header_pp[h.name] = next((h.get(c) for c in header_cols if h.get(c)), None)
 
-    linked = 0
-    unresolved = 0
-
+    pending = []
     for r in rows:
-        existing_pp = _get_item_level_production_plan(r.name)
-        if existing_pp:
+        existing = None
+        for f in pp_fields:
+            existing = r.get(f) or (legacy.get(r.name) or {}).get(f)
+            if existing:
+                break
+        if not existing:
+            so_item = next((str(r.get(c)).strip() for c in so_cols if r.get(c)), "")
+            pending.append((r, so_item))
+    pp_by_so_item = _resolve_pps_by_sales_order_items([so_item for _r, so_item in pending])
+    updates = {}
+    unresolved = 0
+    for r, so_item in pending:
+        pp_id = pp_by_so_item.get(so_item) or header_pp.get(r.parent)
+        if not pp_id:
+            unresolved += 1
             continue
+        updates[r.name] = {f: pp_id for f in (psi_pp_field, psi_order_sheet_field) if f}
+    _bulk_update_by_name("Planning Table", updates)
+    return {"linked": len(updates), "unresolved": unresolved, "scanned": len(rows)}
 
-        so_item = r.get("sales_order_item") or r.get("custom_sales_order_item")
-        pp_id = _resolve_pp_by_sales_order_item(so_item) if so_item else None
 
-        if not pp_id:
-            # Fallback to header-level PP field
-            pp_id = frappe.db.get_value("Planning sheet", r.parent, "custom_production_plan") if frappe.db.has_column("Planning sheet", "custom_production_plan") else None
-            if (not pp_id) and frappe.db.has_column("Planning sheet", "production_plan"):
-                pp_id = frappe.db.get_value("Planning sheet", r.parent, "production_plan")
+@frappe.whitelist()
+def backfill_item_level_production_plan_links(planning_sheet_name=None):
+    """Backfill Planning Sheet Item -> Production Plan links for legacy data."""
+    frappe.only_for("System Manager")
 
-        if pp_id:
-            if psi_pp_field:
-                frappe.db.set_value("Planning Table", r.name, psi_pp_field, pp_id)
-            if psi_order_sheet_field and psi_order_sheet_field != psi_pp_field:
-                frappe.db.set_value("Planning Table", r.name, psi_order_sheet_field, pp_id)
-            linked += 1
-        else:
-            unresolved += 1
+    psi_pp_field = _psi_production_plan_field()
+    psi_order_sheet_field = _psi_order_sheet_field()
+    if not psi_pp_field and not psi_order_sheet_field:
+        return {"status": "error", "message": "Planning Sheet Item production plan field not found. Run sync_custom_fields first."}
+    if not planning_sheet_name:
+        return _enqueue_backfill("item_level_production_plan_links")
 
-    frappe.db.commit()
+    counts = _run_backfill("item_level_production_plan_links", {"planning_sheet_name": planning_sheet_name})
     return {
         "status": "success",
-        "linked": linked,
-        "unresolved": unresolved,
-        "scanned": len(rows),
+        "linked": cint(counts.get("linked")),
+        "unresolved": cint(counts.get("unresolved")),
+        "scanned": cint(counts.get("scanned")),
         "fields": [f for f in [psi_pp_field, psi_order_sheet_field] if f],
     }
 
@@ -11961,7 +13528,7 @@ def revert_items_to_last_sheet_planned_date(
     try:
         frappe.only_for("System Manager")
 
-        if not frappe.db.has_column("Planning Table", "planned_date"):
+        if not _has_column("Planning Table", "planned_date"):
             return {"status": "error", "message": "planned_date column not found"}
 
         src_months = from_months
@@ -12028,7 +13595,7 @@ def revert_items_to_last_sheet_planned_date(
                 "samples": [],
             }
 
-        has_plan_code_col = frappe.db.has_column("Planning Table", "plan_name")
+        has_plan_code_col = _has_column("Planning Table", "plan_name")
         updated = 0
         skipped = 0
         samples = []
@@ -12087,6 +13654,7 @@ def revert_items_to_last_sheet_planned_date(
             updated += 1
 
         if not dry:
+            _sync_effective_dates(item_names=[r.get("name") for r in candidates])
             frappe.db.commit()
 
         return {
@@ -12137,10 +13705,7 @@ def delete_pb_plan(pb_plan_name, date=None, start_date=None, end_date=None):
     affected = frappe.db.sql("SELECT ROW_COUNT() as cnt")[0][0]
 
     # Remove from persistent plans
-    persisted = get_persisted_plans("production_board")
-    persisted = [p for p in persisted if p["name"] != pb_plan_name]
-    import json
-    frappe.defaults.set_global_default("production_scheduler_production_board_plans", json.dumps(persisted))
+    _unregister_plan("production_board", pb_plan_name)
 
     frappe.db.commit()
     return {"status": "success", "cleared_count": affected}
@@ -12153,6 +13718,19 @@ def emergency_cleanup_all_pushed_status():
     Finds every Planning Sheet and Item that is marked as 'Pushed' 
     and strips the flags so they appear back in the Color Chart.
     """
+    clean_white_sql = ", ".join([f"'{c.upper()}'" for c in WHITE_COLORS])
+    # Days the cleared rows sit on before the cleanup; the sync below adds the days they land on.
+    pushed_sheets = frappe.db.sql_list("""
+        SELECT name FROM `tabPlanning sheet`
+        WHERE custom_pb_plan_name IS NOT NULL AND custom_pb_plan_name != ''
+    """)
+    pushed_items = frappe.db.sql_list(f"""
+        SELECT name FROM `tabPlanning Table`
+        WHERE (planned_date IS NOT NULL OR plan_name IS NOT NULL)
+          AND UPPER(color) NOT IN ({clean_white_sql})
+    """)
+    touched_dates = _item_effective_dates(pushed_items, parents=pushed_sheets)
+
     # 1. Clear Sheet-level flags
     frappe.db.sql("""
         UPDATE `tabPlanning sheet` 
@@ -12162,7 +13740,6 @@ def emergency_cleanup_all_pushed_status():
     
     # 2. Clear Item-level flags
     # We exclude items with WHITE colors to avoid erasing auto-planned white orders
-    clean_white_sql = ", ".join([f"'{c.upper()}'" for c in WHITE_COLORS])
     frappe.db.sql(f"""
         UPDATE `tabPlanning Table` 
         SET planned_date = NULL, plan_name = NULL
@@ -12170,6 +13747,9 @@ def emergency_cleanup_all_pushed_status():
           AND UPPER(color) NOT IN ({clean_white_sql})
     """)
     
+    _touch_unit_load_days(touched_dates - _sync_effective_dates(item_names=pushed_items, parents=pushed_sheets))
+    # Sheet headers (PB plan) change for every pushed sheet, dated or not.
+    _bump_board_versions(None)
     frappe.db.commit()
     return {"status": "success", "message": "All color orders unlocked and returned to Color Chart. White orders preserved."}
 
@@ -12228,6 +13808,7 @@ def fix_recently_cleared_whites():
             elif restored_item_count > 0:
                 # Even if sheet header was okay, we restored item dates
                 count += 1
+            _sync_effective_dates(parents=[s.name])
                 
     frappe.db.commit()
     return {"status": "success", "restored_count": count}
@@ -12247,11 +13828,12 @@ def revert_items_to_color_chart(item_names):
     if not item_names:
         return {"status": "error", "message": "No items provided"}
 
+    touched_dates = _item_effective_dates(item_names)
     updated_sheets = set()
     for name in item_names:
         try:
             # 1. Clean item-level tracking explicitly
-            if frappe.db.has_column("Planning Table", "planned_date"):
+            if _has_column("Planning Table", "planned_date"):
                 frappe.db.sql("""
                     UPDATE `tabPlanning Table`
                     SET planned_date = NULL, plan_name = NULL
@@ -12268,6 +13850,7 @@ def revert_items_to_color_chart(item_names):
                 """, (parent,))[0][0]
                 
                 if still_pushed == 0:
+                    touched_dates |= _item_effective_dates(parents=[parent])
                     frappe.db.sql("""
                         UPDATE `tabPlanning sheet`
                         SET custom_planned_date = NULL, custom_pb_plan_name = NULL
@@ -12278,6 +13861,7 @@ def revert_items_to_color_chart(item_names):
         except Exception as e:
             frappe.log_error(f"revert error for {name}: {e}", "Revert to Color Chart")
 
+    _touch_unit_load_days(touched_dates - _sync_effective_dates(item_names=item_names, parents=updated_sheets))
     frappe.db.commit()
     return {"status": "success", "reverted_items": len(item_names), "sheets_checked": len(updated_sheets)}
 
@@ -12353,6 +13937,12 @@ def revert_pb_push(pb_plan_name, date=None):
 # AUTO-CREATE PLANNING SHEET (BACKGROUND EXECUTION)
 # ------------------------------------------------------------
 
+def _commit_unless_pipeline():
+    """Intermediate commit for direct callers; a pipeline job keeps one transaction per attempt."""
+    if not frappe.flags.in_planning_sheet_pipeline:
+        frappe.db.commit()
+
+
 def auto_create_planning_sheet(doc, method=None):
     """Create a Planning Sheet for a Sales Order.
     - Uses the first unlocked Color Chart plan.
@@ -12390,12 +13980,9 @@ def auto_create_planning_sheet(doc, method=None):
             ensure_lamination_booking_for_planning_sheet(sheet)
             update_sheet_plan_codes(sheet, include_legacy=True)
             sheet.save(ignore_permissions=True)
-            frappe.db.commit()
-            _sync_lamination_fabric_planning_rows(sheet.name)
-            _sync_slitting_fabric_planning_rows(sheet.name)
-            _sync_bopp_child_planning_rows(sheet.name)
+            _commit_unless_pipeline()
+            _sync_bom_child_planning_rows(sheet.name, processes=BOM_CHILD_SYNC_SO_CREATE_PROCESSES)
             _force_slitting_unit_on_sheet(sheet.name)
-            _sync_rewinding_fabric_planning_rows(sheet.name)
             _force_rewinding_unit_on_sheet(sheet.name)
             sheet.reload()
             ensure_lamination_booking_for_planning_sheet(sheet)
@@ -12429,15 +14016,12 @@ def auto_create_planning_sheet(doc, method=None):
 
     ps.flags.ignore_permissions = True
     ps.insert()
-    frappe.db.commit()
+    _commit_unless_pipeline()
 
     # 4. Link board rows to legacy rows (source_item), then lamination fabric rows
     _link_board_planned_rows_to_legacy_items(ps.name)
-    _sync_lamination_fabric_planning_rows(ps.name)
-    _sync_slitting_fabric_planning_rows(ps.name)
-    _sync_bopp_child_planning_rows(ps.name)
+    _sync_bom_child_planning_rows(ps.name, processes=BOM_CHILD_SYNC_SO_CREATE_PROCESSES)
     _force_slitting_unit_on_sheet(ps.name)
-    _sync_rewinding_fabric_planning_rows(ps.name)
     _force_rewinding_unit_on_sheet(ps.name)
             
     frappe.msgprint(f"Planning Sheet <b>{ps.name}</b> created in unlocked plan <b>{ps.custom_plan_name}</b> and synchronized.")
@@ -12451,6 +14035,138 @@ def auto_create_planning_sheet(doc, method=None):
     
     return final_doc
 
+# ------------------------------------------------------------
+# QUEUED SALES ORDER -> PLANNING SHEET PIPELINE
+# ------------------------------------------------------------
+# Sales Order on_submit only enqueues; the worker runs auto_create_planning_sheet (populate, save,
+# lamination / slitting / BOPP / rewinding passes) as one transaction. One job per SO (job_id +
+# deduplicate, retries included), progress in Sales Order.custom_planning_pipeline_status (so a
+# first run that fails before any sheet exists still shows) and, once it exists, in Planning
+# sheet.custom_pipeline_status. A failed attempt is rolled back
+# and parked in PLANNING_SHEET_PIPELINE_RETRY_KEY with an exponential backoff; the per-minute
+# enqueue_due_planning_sheet_pipeline_retries job queues it once it is due.
+PLANNING_SHEET_PIPELINE_QUEUE = "long"
+PLANNING_SHEET_PIPELINE_TIMEOUT = 1500
+PLANNING_SHEET_PIPELINE_MAX_ATTEMPTS = 3
+PLANNING_SHEET_PIPELINE_RETRY_DELAY = 60  # seconds before attempt 2; doubles for every later attempt
+PLANNING_SHEET_PIPELINE_RETRY_KEY = "production_scheduler:planning_sheet_pipeline_retries"
+
+
+def _planning_sheet_pipeline_job_id(sales_order):
+    # Retries share the id, so a retry never runs next to a fresh submit of the same SO.
+    return f"planning_sheet_pipeline::{sales_order}"
+
+
+def _set_planning_sheet_pipeline_status(sales_order, status, error=None, sheet_name=None):
+    """
+    Write pipeline status on the Sales Order and on its Planning sheet (``sheet_name``, else the
+    existing one, if any) without touching modified; each is a no-op until the patches have run.
+    """
+    error = (error or "")[-2000:]
+    for doctype, name, status_col, error_col in (
+        ("Sales Order", sales_order, "custom_planning_pipeline_status", "custom_planning_pipeline_error"),
+        ("Planning sheet", sheet_name or (_find_existing_sheet_for_sales_order(sales_order) or {}).get("name"),
+            "custom_pipeline_status", "custom_pipeline_error"),
+    ):
+        if not name or not _has_column(doctype, status_col):
+            continue
+        values = {status_col: status}
+        if _has_column(doctype, error_col):
+            values[error_col] = error
+        frappe.db.set_value(doctype, name, values, update_modified=False)
+
+
+def enqueue_planning_sheet_pipeline(doc, method=None, attempt=1):
+    """
+    Sales Order on_submit target: queue Planning sheet creation and return immediately.
+    A job already queued / running for the same SO is not queued again.
+    """
+    so_name = doc if isinstance(doc, str) else doc.name
+    _set_planning_sheet_pipeline_status(so_name, "Queued")
+    frappe.enqueue(
+        "production_scheduler.api.run_planning_sheet_pipeline",
+        queue=PLANNING_SHEET_PIPELINE_QUEUE,
+        timeout=PLANNING_SHEET_PIPELINE_TIMEOUT,
+        job_id=_planning_sheet_pipeline_job_id(so_name),
+        deduplicate=True,
+        enqueue_after_commit=True,
+        sales_order=so_name,
+        attempt=attempt,
+    )
+
+
+def sales_order_on_submit(doc, method=None):
+    """
+    Sales Order on_submit hook. production_entry owns Planning sheet creation when it is installed
+    (its hook calls enqueue_planning_sheet_pipeline), so this only queues on sites without it.
+    """
+    if "production_entry" in frappe.get_installed_apps():
+        return
+    enqueue_planning_sheet_pipeline(doc, method)
+
+
+def _planning_sheet_pipeline_retry_delay(attempt):
+    """Backoff before ``attempt``: 60s before the 2nd, 120s before the 3rd, ..."""
+    return PLANNING_SHEET_PIPELINE_RETRY_DELAY * (2 ** max(cint(attempt) - 2, 0))
+
+
+def _schedule_planning_sheet_pipeline_retry(sales_order, attempt):
+    due = frappe.utils.add_to_date(
+        frappe.utils.now_datetime(), seconds=_planning_sheet_pipeline_retry_delay(attempt)
+    )
+    frappe.cache().hset(PLANNING_SHEET_PIPELINE_RETRY_KEY, sales_order, {"attempt": attempt, "due": str(due)})
+
+
+def enqueue_due_planning_sheet_pipeline_retries():
+    """Scheduler (every minute): queue the pipeline retries whose backoff has elapsed."""
+    cache = frappe.cache()
+    now = frappe.utils.now_datetime()
+    for sales_order, entry in (cache.hgetall(PLANNING_SHEET_PIPELINE_RETRY_KEY) or {}).items():
+        if isinstance(sales_order, bytes):
+            sales_order = sales_order.decode()
+        if not isinstance(entry, dict) or frappe.utils.get_datetime(entry.get("due")) > now:
+            continue
+        cache.hdel(PLANNING_SHEET_PIPELINE_RETRY_KEY, sales_order)
+        enqueue_planning_sheet_pipeline(sales_order, attempt=cint(entry.get("attempt")) or 2)
+    frappe.db.commit()
+
+
+def run_planning_sheet_pipeline(sales_order, attempt=1):
+    """Background job: create / re-sync the Planning sheet for a submitted Sales Order."""
+    if cint(frappe.db.get_value("Sales Order", sales_order, "docstatus")) != 1:
+        return None
+    _set_planning_sheet_pipeline_status(sales_order, "Running")
+    frappe.db.commit()
+    frappe.flags.in_planning_sheet_pipeline = True
+    try:
+        sheet = auto_create_planning_sheet(frappe.get_doc("Sales Order", sales_order))
+        _set_planning_sheet_pipeline_status(sales_order, "Completed", sheet_name=sheet.name if sheet else None)
+        frappe.db.commit()
+        return sheet.name if sheet else None
+    except Exception:
+        # Nothing of this attempt was committed, so a retry starts from the pre-attempt state.
+        frappe.db.rollback()
+        error = frappe.get_traceback()
+        frappe.log_error(error, f"Planning sheet pipeline failed: {sales_order} (attempt {attempt})")
+        retry = attempt < PLANNING_SHEET_PIPELINE_MAX_ATTEMPTS
+        _set_planning_sheet_pipeline_status(sales_order, "Queued" if retry else "Failed", error)
+        if retry:
+            _schedule_planning_sheet_pipeline_retry(sales_order, attempt + 1)
+        frappe.db.commit()
+        return None
+    finally:
+        frappe.flags.in_planning_sheet_pipeline = False
+
+
+@frappe.whitelist()
+def retry_planning_sheet_pipeline(so_name):
+    """Re-queue the pipeline for a Sales Order (e.g. after a Failed status), starting a fresh attempt count."""
+    if not so_name:
+        frappe.throw("Sales Order Name is required")
+    frappe.cache().hdel(PLANNING_SHEET_PIPELINE_RETRY_KEY, so_name)
+    enqueue_planning_sheet_pipeline(so_name)
+    return {"status": "queued", "sales_order": so_name}
+
 # ------------------------------------------------------------
 # REGENERATE PLANNING SHEET (MANUAL RE-CREATION)
 # ------------------------------------------------------------
@@ -12482,12 +14198,8 @@ def regenerate_planning_sheet(so_name):
         _ps.save(ignore_permissions=True)
         frappe.db.commit()
         _link_board_planned_rows_to_legacy_items(_ps.name)
-        _sync_lamination_fabric_planning_rows(_ps.name)
-        _sync_slitting_fabric_planning_rows(_ps.name)
-        _sync_sheet_cutting_fabric_planning_rows(_ps.name)
-        _sync_bopp_child_planning_rows(_ps.name)
+        _sync_bom_child_planning_rows(_ps.name)
         _force_slitting_unit_on_sheet(_ps.name)
-        _sync_rewinding_fabric_planning_rows(_ps.name)
         _force_rewinding_unit_on_sheet(_ps.name)
         _ps.reload()
         ensure_lamination_booking_for_planning_sheet(_ps)
@@ -12530,12 +14242,8 @@ def regenerate_planning_sheet(so_name):
     frappe.db.commit()
 
     _link_board_planned_rows_to_legacy_items(ps.name)
-    _sync_lamination_fabric_planning_rows(ps.name)
-    _sync_slitting_fabric_planning_rows(ps.name)
-    _sync_sheet_cutting_fabric_planning_rows(ps.name)
-    _sync_bopp_child_planning_rows(ps.name)
+    _sync_bom_child_planning_rows(ps.name)
     _force_slitting_unit_on_sheet(ps.name)
-    _sync_rewinding_fabric_planning_rows(ps.name)
     _force_rewinding_unit_on_sheet(ps.name)
     ps.reload()
     ensure_lamination_booking_for_planning_sheet(ps)
@@ -12569,12 +14277,8 @@ def sync_bom_children_for_planning_sheet(planning_sheet):
         frappe.db.commit()
 
     _link_board_planned_rows_to_legacy_items(ps_name)
-    _sync_lamination_fabric_planning_rows(ps_name)
-    _sync_slitting_fabric_planning_rows(ps_name)
-    _sync_sheet_cutting_fabric_planning_rows(ps_name)
-    _sync_bopp_child_planning_rows(ps_name)
+    _sync_bom_child_planning_rows(ps_name)
     _force_slitting_unit_on_sheet(ps_name)
-    _sync_rewinding_fabric_planning_rows(ps_name)
     _force_rewinding_unit_on_sheet(ps_name)
     ps.reload()
     ensure_lamination_booking_for_planning_sheet(ps)
@@ -12659,6 +14363,7 @@ def run_global_cleanup():
     removed_sheets = 0
     removed_items = 0
     sheet_details = []
+    touched_dates = set()
 
     # ÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚ÂÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â PHASE 1: Deduplicate Planning Sheet HEADERS per Sales Order ÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚ÂÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚ÂÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚ÂÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚ÂÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¢ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â€šÂ¬Ã…Â¡Ãƒâ€šÃ‚Â¬ÃƒÆ’Ã‚Â¢ÃƒÂ¢Ã¢â‚¬Å¡Ã‚Â¬Ãƒâ€šÃ‚Â
     all_sheets = frappe.get_all(
@@ -12684,6 +14389,7 @@ def run_global_cleanup():
         keep_sheet = sheets[0].name
         dup_sheet_names = [s.name for s in sheets[1:]]
 
+        touched_dates |= _item_effective_dates(parents=dup_sheet_names)
         for dup_name in dup_sheet_names:
             # Move items from duplicate to kept sheet using raw SQL
             frappe.db.sql(
@@ -12693,6 +14399,7 @@ def run_global_cleanup():
             # PROPER DELETE: Use frappe.delete_doc to clean up child table records
             frappe.delete_doc("Planning sheet", dup_name, force=1, ignore_permissions=True)
             removed_sheets += 1
+        touched_dates -= _sync_effective_dates(parents=[keep_sheet])
 
         sheet_details.append({
             "sales_order": so,
@@ -12723,10 +14430,15 @@ def run_global_cleanup():
             """, (row.parent, row.item_name), as_dict=True)
 
         if len(items) > 1:
+            touched_dates |= _item_effective_dates([it.name for it in items[1:]])
             for it in items[1:]:
                 frappe.db.sql("DELETE FROM `tabPlanning Table` WHERE name = %s", (it.name,))
                 removed_items += 1
 
+    _touch_unit_load_days(touched_dates)
+    if removed_sheets or removed_items:
+        # Site-wide sweep: rows without an effective date are not covered by the day versions.
+        _bump_board_versions(None)
     frappe.db.commit()
     return {
         "status": "success",
@@ -12920,12 +14632,14 @@ def force_merge_order_sheets(sales_order):
     source_sheets = [s.name for s in sheets[1:]]
     
     moved_count = 0
+    touched_dates = _item_effective_dates(parents=source_sheets)
     for src in source_sheets:
         # Move items via SQL
         frappe.db.sql("UPDATE `tabPlanning Table` SET parent = %s WHERE parent = %s", (target_sheet, src))
         # Delete source sheet
         frappe.delete_doc("Planning sheet", src, force=1, ignore_permissions=True)
         moved_count += 1
+    _touch_unit_load_days(touched_dates - _sync_effective_dates(parents=[target_sheet]))
         
     frappe.db.commit()
     return {"status": "success", "message": f"Merged {moved_count} sheets into {target_sheet}"}
@@ -13011,8 +14725,10 @@ def revert_split_item(item_name):
         new_qty = flt(target.qty) + flt(it.qty)
 
         # Update target and remove current in Planning Table
+        touched_dates = _item_effective_dates([it.name, target.name])
         frappe.db.sql("UPDATE `tabPlanning Table` SET qty = %s WHERE name = %s", (new_qty, target.name))
         frappe.db.sql("DELETE FROM `tabPlanning Table` WHERE name = %s", (it.name,))
+        _touch_unit_load_days(touched_dates)
         
         frappe.db.commit() # Ensure revert persists
         
@@ -13153,7 +14869,7 @@ def debug_plan_check():
     result = {}
     
     # 1. Check if column exists
-    result["column_exists"] = frappe.db.has_column("Planning sheet", "custom_plan_name")
+    result["column_exists"] = _has_column("Planning sheet", "custom_plan_name")
     
     # 2. Check Custom Field record
     result["custom_field_exists"] = frappe.db.exists("Custom Field", "Planning sheet-custom_plan_name")
@@ -13185,47 +14901,52 @@ def debug_plan_check():
 
 
 @frappe.whitelist()
-def recalculate_all_plan_codes():
+def recalculate_all_plan_codes(dry_run=0, sheets=None):
     """
-    Bulk-recalculates and persists plan_name on Planning Table rows and header plan code.
+    Bulk-recalculates and persists plan codes on Planning Table rows and sheet headers: one fetch
+    for every row, changed codes written with multi-row UPDATEs.
     Does not write legacy Planning sheet Item rows (board is source of truth for plan codes).
+    dry_run=1 returns the diff (first PLAN_CODE_DIFF_LIMIT rows / headers) without writing.
+    sheets: optional list / JSON list of Planning sheet names (default: every sheet with docstatus < 2).
     """
-    create_plan_name_field()
-    sheets = frappe.db.sql("""
-        SELECT name FROM `tabPlanning sheet`
-        WHERE docstatus < 2
-        ORDER BY creation DESC
-    """, as_dict=True)
-    
-    updated = 0
-    failed = 0
-    
-    for row in sheets:
-        try:
-            doc = frappe.get_doc("Planning sheet", row.name)
-            update_sheet_plan_codes(doc)
-            if getattr(doc, "custom_plan_code", None):
-                frappe.db.sql(
-                    "UPDATE `tabPlanning sheet` SET custom_plan_code = %s WHERE name = %s",
-                    (doc.custom_plan_code, doc.name),
-                )
-            for tf in ["planned_items", "custom_planned_items", "planning_table", "custom_planning_table", "table"]:
-                new_items = doc.get(tf)
-                if new_items:
-                    for i in new_items:
-                        if i.get("plan_name"):
-                            frappe.db.sql(
-                                "UPDATE `tabPlanning Table` SET plan_name = %s WHERE name = %s",
-                                (i.plan_name, i.name),
-                            )
-                    break
-            updated += 1
-        except Exception as e:
-            frappe.log_error(f"Failed to recalculate plan code for {row.name}: {e}")
-            failed += 1
-    
-    frappe.db.commit()
-    return {"updated": updated, "failed": failed, "total": len(sheets)}
+    import time
+
+    if isinstance(sheets, str):
+        sheets = json.loads(sheets) if sheets.strip().startswith("[") else [s.strip() for s in sheets.split(",")]
+    dry_run = cint(dry_run)
+    if not dry_run:
+        create_plan_name_field()
+
+    started = time.monotonic()
+    diff = _plan_code_diff(sheets or None)
+    changed_sheets = {c["parent"] for c in diff["rows"].values()} | set(diff["headers"])
+    result = {
+        "status": "success",
+        "dry_run": dry_run,
+        "total": diff["sheets"],
+        "count": len(changed_sheets),
+        "updated": len(changed_sheets),
+        "rows_changed": len(diff["rows"]),
+        "headers_changed": len(diff["headers"]),
+        "failed": 0,
+    }
+    if dry_run:
+        result["changes"] = [
+            {"row": name, "sheet": c["parent"], "old": c["old"], "new": c["new"]}
+            for name, c in list(diff["rows"].items())[:PLAN_CODE_DIFF_LIMIT]
+        ]
+        result["header_changes"] = [
+            {"sheet": name, "old": c["old"], "new": c["new"]}
+            for name, c in list(diff["headers"].items())[:PLAN_CODE_DIFF_LIMIT]
+        ]
+    elif changed_sheets:
+        _apply_plan_code_diff(diff)
+        # Plan codes show on every board row.
+        _queue_board_delta([], None, resync=True, reason="plan_codes")
+        frappe.db.commit()
+        _bump_board_versions(None)
+    result["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+    return result
 
 @frappe.whitelist()
 def get_master_code(doctype, name, possible_fields):
@@ -13636,7 +15357,7 @@ def run_orphan_cleanup():
             
     # 2. Deduplicate items within sheets (handle dynamic schema)
     # Get actual table columns to avoid 1054 errors - USE DOCTYPE NAME
-    columns = frappe.db.get_table_columns("Planning Table")
+    columns = _table_columns("Planning Table")
     
     so_item_col = None
     if "sales_order_item" in columns:
@@ -13714,10 +15435,10 @@ def get_planning_sheet_pp_id(planning_sheet_name, sales_order_item=None, plannin
             pp_id = _resolve_pp_by_sales_order_item(sales_order_item)
 
         # Strategy 1: direct link fields on Planning sheet
-        if (not pp_id) and frappe.db.has_column("Planning sheet", "custom_production_plan"):
+        if (not pp_id) and _has_column("Planning sheet", "custom_production_plan"):
             pp_id = frappe.db.get_value("Planning sheet", planning_sheet_name, "custom_production_plan")
 
-        if (not pp_id) and frappe.db.has_column("Planning sheet", "production_plan"):
+        if (not pp_id) and _has_column("Planning sheet", "production_plan"):
             pp_id = frappe.db.get_value("Planning sheet", planning_sheet_name, "production_plan")
 
         if not pp_id:
@@ -13863,7 +15584,7 @@ def debug_item_pp_id(item_name):
         # Strategy 3: via sheet
         sheet_pp_fields = ["custom_production_plan", "production_plan"]
         for field in sheet_pp_fields:
-            if frappe.db.has_column("Planning sheet", field):
+            if _has_column("Planning sheet", field):
                 value = frappe.db.get_value("Planning sheet", item.parent, field)
                 result["strategies"][f"Sheet: {field}"] = value or "empty"
         
@@ -13881,6 +15602,71 @@ def debug_item_pp_id(item_name):
 
 
 
+def _backfill_chunk_pp_id_to_sheet_items(sheets, report=None, dry_run=1):
+    """order_sheet on rows of ``sheets``: the first PP in the sheet's order_sheet list that has the row's item_code."""
+    items = frappe.db.sql(
+        "SELECT `name`, `parent`, `item_code`, `order_sheet` "
+        "FROM `tabPlanning Table` WHERE parent IN %s ORDER BY parent ASC, idx ASC",
+        (tuple(sheets),),
+        as_dict=True,
+    )
+    if not items:
+        return {}
+    sheet_pps = {
+        s.name: [p.strip() for p in (s.order_sheet or "").split(",") if p.strip()]
+        for s in frappe.db.sql(
+            "SELECT name, order_sheet FROM `tabPlanning sheet` WHERE name IN %s",
+            (tuple(sheets),),
+            as_dict=True,
+        )
+    }
+    existing = {(psi.get("order_sheet") or "").strip() for psi in items} - {""}
+    all_pps = existing | {pp for pps in sheet_pps.values() for pp in pps}
+    known_pps = set()
+    pp_item_codes = set()
+    if all_pps:
+        known_pps = set(frappe.db.sql_list("SELECT name FROM `tabProduction Plan` WHERE name IN %s", (tuple(all_pps),)))
+        pp_item_codes = {
+            (r.parent, r.item_code)
+            for r in frappe.db.sql(
+                "SELECT DISTINCT parent, item_code FROM `tabProduction Plan Item` WHERE parent IN %s",
+                (tuple(all_pps),),
+                as_dict=True,
+            )
+        }
+
+    counts = {"updated": 0, "already_set": 0, "not_found": 0}
+    updates = {}
+
+    def _note(bucket, entry):
+        counts[bucket] += 1
+        if report is not None:
+            report.setdefault(bucket, []).append(entry)
+
+    for psi in items:
+        existing_pp = (psi.get("order_sheet") or "").strip()
+        if existing_pp and existing_pp in known_pps:
+            _note("already_set", {"item": psi.name, "sheet": psi.parent, "pp_id": existing_pp})
+            continue
+        item_code = psi.get("item_code") or ""
+        if not item_code:
+            _note("not_found", {"item": psi.name, "sheet": psi.parent, "reason": "no item_code"})
+            continue
+        pp_list = sheet_pps.get(psi.parent) or []
+        if not pp_list:
+            _note("not_found", {"item": psi.name, "sheet": psi.parent, "reason": "parent sheet has no order_sheet PPs"})
+            continue
+        found_pp = next((pp_id for pp_id in pp_list if (pp_id, item_code) in pp_item_codes), None)
+        if found_pp:
+            if not dry_run:
+                updates[psi.name] = {"order_sheet": found_pp}
+            _note("updated", {"item": psi.name, "sheet": psi.parent, "pp_id": found_pp, "dry_run": bool(dry_run)})
+        else:
+            _note("not_found", {"item": psi.name, "sheet": psi.parent, "reason": f"item_code not found in any PP: {pp_list}"})
+    _bulk_update_by_name("Planning Table", updates)
+    return counts
+
+
 @frappe.whitelist()
 def backfill_pp_id_to_sheet_items(planning_sheet_name=None, dry_run=1):
     """
@@ -13890,90 +15676,281 @@ def backfill_pp_id_to_sheet_items(planning_sheet_name=None, dry_run=1):
     (comma-separated PP IDs). We find which PP contains that item_code.
 
     Args:
-        planning_sheet_name: Optional. Limit to one sheet. If blank, all sheets.
+        planning_sheet_name: Optional. Limit to one sheet. If blank, all sheets
+            (resumable background job; per-row lists are only returned for one sheet).
         dry_run: 1 = preview only, 0 = actually write.
     """
     dry_run = cint(dry_run)
+    if not planning_sheet_name:
+        return _enqueue_backfill("pp_id_to_sheet_items", {"dry_run": dry_run})
+
+    results = {"updated": [], "already_set": [], "not_found": [], "errors": []}
+    try:
+        _run_backfill("pp_id_to_sheet_items", {"planning_sheet_name": planning_sheet_name, "dry_run": dry_run}, report=results)
+    except Exception as e:
+        frappe.db.rollback()
+        results["errors"].append({"item": planning_sheet_name, "error": str(e)})
+    return results
+
+
+# ============================================================================
+# RESUMABLE BACKFILLS
+# ============================================================================
+# Each backfill_* endpoint is a chunk handler registered in BACKFILLS. The runner walks
+# `tabPlanning sheet` by name (keyset: name > cursor ORDER BY name LIMIT n) and hands every chunk of
+# sheet names to the handler, which reads the chunk's rows with a few IN queries and writes them with
+# _bulk_update_by_name. After each chunk commits, the cursor and counters go to frappe.cache (not
+# site defaults, whose every write clears the site-wide defaults cache); the state is persisted to
+# defaults when the job starts and ends. A killed job resumes from the cached cursor (from the last
+# persisted one if the cache was lost; handlers are idempotent, so a re-run chunk is harmless).
+# Unscoped calls run as one deduplicated background job per backfill and publish
+# BACKFILL_PROGRESS_EVENT after every chunk; calls scoped to a Sales Order / sheet run inline
+# through the same handler.
+BACKFILL_CHUNK_SIZE = 100
+BACKFILL_QUEUE = "long"
+BACKFILL_TIMEOUT = 6 * 3600
+BACKFILL_PROGRESS_EVENT = "production_scheduler_backfill_progress"
+BACKFILL_STATE_KEY_PREFIX = "production_scheduler_backfill::"
+# Scope options -> the Planning sheet column they filter on (not passed to handlers).
+BACKFILL_SCOPE_COLUMNS = {"sales_order": "sales_order", "planning_sheet_name": "name"}
+
+_SHEETS_WITH_SALES_ORDER = "IFNULL(sales_order, '') != ''"
+
+# handler(sheet_names, report=None, **options) -> {counter: int}; options lists what start_backfill accepts.
+BACKFILLS = {
+    "parent_child_trace_ids": {
+        "handler": _backfill_chunk_parent_child_trace_ids,
+        "options": ("planning_sheet_name",),
+    },
+    "plan_codes": {
+        "handler": _backfill_chunk_plan_codes,
+        "sheet_filter": "docstatus < 2",
+        "options": (),
+    },
+    "production_plan_links": {
+        "handler": _backfill_chunk_production_plan_links,
+        "sheet_filter": _SHEETS_WITH_SALES_ORDER,
+        "options": ("sales_order",),
+    },
+    "sales_order_item_links": {
+        "handler": _backfill_chunk_sales_order_item_links,
+        "sheet_filter": _SHEETS_WITH_SALES_ORDER,
+        "options": ("sales_order",),
+    },
+    "wo_production_plan_links": {
+        "handler": _backfill_chunk_wo_production_plan_links,
+        "options": ("sales_order", "item_code"),
+    },
+    "item_level_production_plan_links": {
+        "handler": _backfill_chunk_item_level_production_plan_links,
+        "options": ("planning_sheet_name",),
+    },
+    "pp_id_to_sheet_items": {
+        "handler": _backfill_chunk_pp_id_to_sheet_items,
+        "options": ("planning_sheet_name", "dry_run"),
+    },
+}
+
+
+def _backfill_spec(backfill):
+    spec = BACKFILLS.get(backfill)
+    if not spec:
+        frappe.throw(_("Unknown backfill: {0}").format(backfill))
+    return spec
+
+
+def _backfill_options(backfill, options):
+    """Drop empty values and anything the backfill does not take, so stored options compare equal."""
+    allowed = _backfill_spec(backfill)["options"]
+    return {k: v for k, v in (options or {}).items() if k in allowed and v not in (None, "")}
+
 
-    # Fetch items - only confirmed fields: name, parent, item_code, order_sheet
-    parent_filter = "WHERE 1=1"
+def _backfill_sheet_conditions(spec, options):
+    conditions = []
     params = []
-    if planning_sheet_name:
-        parent_filter = "WHERE parent = %s"
-        params.append(planning_sheet_name)
+    if spec.get("sheet_filter"):
+        conditions.append(spec["sheet_filter"])
+    for key, column in BACKFILL_SCOPE_COLUMNS.items():
+        if options.get(key):
+            conditions.append(f"`{column}` = %s")
+            params.append(options[key])
+    return conditions, params
+
+
+def _backfill_sheet_batch(spec, options, after, limit):
+    """Next ``limit`` sheet names after the cursor (keyset pagination on the primary key)."""
+    conditions, params = _backfill_sheet_conditions(spec, options)
+    conditions.insert(0, "name > %s")
+    params.insert(0, after or "")
+    return frappe.db.sql_list(
+        f"SELECT name FROM `tabPlanning sheet` WHERE {' AND '.join(conditions)} ORDER BY name LIMIT {cint(limit)}",
+        tuple(params),
+    )
 
-    items = frappe.db.sql(
-        f"SELECT `name`, `parent`, `item_code`, `order_sheet` "
-        f"FROM `tabPlanning Table` {parent_filter} ORDER BY parent ASC, idx ASC",
-        params, as_dict=True
+
+def _backfill_sheet_count(spec, options):
+    conditions, params = _backfill_sheet_conditions(spec, options)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return cint(frappe.db.sql(f"SELECT COUNT(*) FROM `tabPlanning sheet` {where}", tuple(params))[0][0])
+
+
+def get_backfill_state(backfill):
+    """Run state (cursor, counters, status, options) of a backfill, or None; live progress first."""
+    key = BACKFILL_STATE_KEY_PREFIX + backfill
+    raw = frappe.cache().get_value(key) or frappe.db.get_default(key)
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _cache_backfill_state(backfill, state):
+    frappe.cache().set_value(BACKFILL_STATE_KEY_PREFIX + backfill, json.dumps(state, default=str))
+
+
+def _save_backfill_state(backfill, state):
+    """Persist the state to site defaults (start / end of a run) and refresh the cached copy."""
+    frappe.db.set_default(BACKFILL_STATE_KEY_PREFIX + backfill, json.dumps(state, default=str))
+    _cache_backfill_state(backfill, state)
+
+
+def _publish_backfill_progress(backfill, state):
+    frappe.publish_realtime(
+        BACKFILL_PROGRESS_EVENT,
+        {
+            "backfill": backfill,
+            "status": state.get("status"),
+            "processed": cint(state.get("processed")),
+            "total": cint(state.get("total")),
+            "cursor": state.get("cursor"),
+            "counts": state.get("counts") or {},
+        },
+        user=state.get("user"),
     )
 
-    results = {"updated": [], "already_set": [], "not_found": [], "errors": []}
 
-    # Cache parent sheet PP lists to avoid repeated DB calls
-    sheet_pp_cache = {}
+def _run_backfill(backfill, options=None, report=None, state=None, chunk_size=BACKFILL_CHUNK_SIZE):
+    """
+    Walk the backfill's sheets chunk by chunk, committing after each, and return the summed counters.
+    With ``state`` the walk starts at state["cursor"], and cursor / counters are cached and published
+    after every committed chunk; without it (scoped inline calls) it starts at the first sheet.
+    """
+    spec = _backfill_spec(backfill)
+    options = options or {}
+    handler_options = {k: v for k, v in options.items() if k not in BACKFILL_SCOPE_COLUMNS}
+    dry_run = cint(options.get("dry_run"))
+    counts = dict((state or {}).get("counts") or {})
+    cursor = (state or {}).get("cursor") or ""
+    while True:
+        sheets = _backfill_sheet_batch(spec, options, cursor, chunk_size)
+        if not sheets:
+            break
+        chunk_counts = spec["handler"](sheets, report=report, **handler_options) or {}
+        for key, value in chunk_counts.items():
+            counts[key] = cint(counts.get(key)) + cint(value)
+        if not dry_run and (cint(chunk_counts.get("updated")) or cint(chunk_counts.get("linked"))):
+            _bump_board_versions(None)
+        cursor = sheets[-1]
+        frappe.db.commit()
+        if state is not None:
+            # Only advance the state once the chunk is committed.
+            state.update(
+                cursor=cursor,
+                counts=dict(counts),
+                processed=cint(state.get("processed")) + len(sheets),
+                updated_at=frappe.utils.now(),
+            )
+            _cache_backfill_state(backfill, state)
+            _publish_backfill_progress(backfill, state)
+        if len(sheets) < chunk_size:
+            break
+    return counts
+
 
-    for psi in items:
-        try:
-            # Skip if already filled
-            existing_pp = psi.get("order_sheet") or ""
-            if existing_pp.strip() and frappe.db.exists("Production Plan", existing_pp.strip()):
-                results["already_set"].append({
-                    "item": psi.name, "sheet": psi.parent, "pp_id": existing_pp.strip()
-                })
-                continue
+def run_backfill_job(backfill):
+    """Background job: run / resume a backfill from its persisted state (see _enqueue_backfill)."""
+    state = get_backfill_state(backfill)
+    if not state or state.get("status") == "completed":
+        return state
+    state.update(status="running", error=None)
+    _save_backfill_state(backfill, state)
+    frappe.db.commit()
+    try:
+        _run_backfill(backfill, state.get("options"), state=state)
+    except Exception:
+        frappe.db.rollback()
+        error = frappe.get_traceback()
+        frappe.log_error(error, f"Backfill failed: {backfill} (after {state.get('cursor') or 'start'})")
+        state.update(status="failed", error=error[-2000:])
+    else:
+        state.update(status="completed", finished_at=frappe.utils.now())
+    _save_backfill_state(backfill, state)
+    frappe.db.commit()
+    _publish_backfill_progress(backfill, state)
+    return state
 
-            item_code = psi.get("item_code") or ""
-            if not item_code:
-                results["not_found"].append({"item": psi.name, "sheet": psi.parent, "reason": "no item_code"})
-                continue
 
-            # Get PP list from parent sheet (cached)
-            if psi.parent not in sheet_pp_cache:
-                sheet_order = frappe.db.get_value("Planning sheet", psi.parent, "order_sheet") or ""
-                sheet_pp_cache[psi.parent] = [p.strip() for p in sheet_order.split(",") if p.strip()]
+def _enqueue_backfill(backfill, options=None, restart=False):
+    """
+    Queue the background run of a backfill. An unfinished run with the same options resumes from its
+    cursor; a finished one, different options or ``restart`` start again from the first sheet.
+    """
+    spec = _backfill_spec(backfill)
+    options = _backfill_options(backfill, options)
+    state = get_backfill_state(backfill)
+    if restart or not state or state.get("status") == "completed" or state.get("options") != options:
+        state = {
+            "backfill": backfill,
+            "options": options,
+            "cursor": "",
+            "counts": {},
+            "processed": 0,
+            "total": _backfill_sheet_count(spec, options),
+            "started_at": frappe.utils.now(),
+            "user": frappe.session.user,
+        }
+    if state.get("status") != "running":
+        # A "running" state is either a live job (deduplicated below) or a crashed one to resume;
+        # leave it alone so a live job's cursor is not overwritten.
+        state["status"] = "queued"
+        _save_backfill_state(backfill, state)
+    frappe.enqueue(
+        "production_scheduler.api.run_backfill_job",
+        queue=BACKFILL_QUEUE,
+        timeout=BACKFILL_TIMEOUT,
+        job_id=BACKFILL_STATE_KEY_PREFIX + backfill,
+        deduplicate=True,
+        enqueue_after_commit=True,
+        backfill=backfill,
+    )
+    return {
+        "status": "queued",
+        "backfill": backfill,
+        "resume_after": state.get("cursor") or None,
+        "processed": cint(state.get("processed")),
+        "total": cint(state.get("total")),
+        "progress_event": BACKFILL_PROGRESS_EVENT,
+    }
 
-            pp_list = sheet_pp_cache[psi.parent]
 
-            if not pp_list:
-                results["not_found"].append({"item": psi.name, "sheet": psi.parent, "reason": "parent sheet has no order_sheet PPs"})
-                continue
+@frappe.whitelist()
+def start_backfill(backfill, options=None, restart=0):
+    """Queue (or resume) one of BACKFILLS as a background job; progress arrives as BACKFILL_PROGRESS_EVENT."""
+    frappe.only_for("System Manager")
+    if isinstance(options, str):
+        options = json.loads(options or "{}")
+    return _enqueue_backfill(backfill, options, restart=cint(restart))
 
-            # Find which PP in the list has this item_code
-            # (Loop through PPs to find which one has this item_code)
-            found_pp = None
-            for pp_id in pp_list:
-                pp_items = frappe.db.get_all("Production Plan Item", 
-                    filters={"parent": pp_id, "item_code": item_code},
-                    fields=["name"])
-                if pp_items:
-                    found_pp = pp_id
-                    break
-            
-            if found_pp:
-                if not dry_run:
-                    frappe.db.set_value("Planning Table", psi["name"], "order_sheet", found_pp)
-                results["updated"].append({
-                    "item": psi["name"],
-                    "sheet": psi["parent"],
-                    "pp_id": found_pp,
-                    "dry_run": bool(dry_run)
-                })
-            else:
-                results["not_found"].append({
-                    "item": psi["name"],
-                    "sheet": psi["parent"],
-                    "reason": f"item_code not found in any PP: {pp_list}"
-                })
-        
-        except Exception as e:
-            results["errors"].append({
-                "item": psi.get("name", "unknown"),
-                "error": str(e)
-            })
-    
-    return results
 
+@frappe.whitelist()
+def get_backfill_status(backfill=None):
+    """Persisted state of one backfill, or {name: state} for all of them."""
+    if backfill:
+        _backfill_spec(backfill)
+        return get_backfill_state(backfill)
+    return {name: get_backfill_state(name) for name in BACKFILLS}
 
 # ============================================================================
 # TEST & VERIFICATION FUNCTIONS
@@ -14165,7 +16142,7 @@ def create_item_spr(pp_id, planning_sheet_item_names):
             try:
                 if not spr_name_to_link or not planning_sheet_item_names:
                     return
-                if not frappe.db.has_column("Planning Table", "spr_name"):
+                if not _has_column("Planning Table", "spr_name"):
                     return
                 for psi_name in planning_sheet_item_names:
                     if frappe.db.exists("Planning Table", psi_name):
@@ -14257,9 +16234,9 @@ def create_item_spr(pp_id, planning_sheet_item_names):
             """Resolve child fabric PP IDs using trace-id first, then SO-item fallback."""
             pp_ids = set()
             pp_fields = _psi_production_plan_fields()
-            has_trace_col = frappe.db.has_column("Planning Table", "custom_parent_child_trace_id")
-            has_so_item_col = frappe.db.has_column("Planning Table", "sales_order_item")
-            has_custom_so_item_col = frappe.db.has_column("Planning Table", "custom_sales_order_item")
+            has_trace_col = _has_column("Planning Table", "custom_parent_child_trace_id")
+            has_so_item_col = _has_column("Planning Table", "sales_order_item")
+            has_custom_so_item_col = _has_column("Planning Table", "custom_sales_order_item")
             for row in rows or []:
                 parent_sheet = str(row.get("parent") or "").strip()
                 if not parent_sheet:
@@ -15059,7 +17036,7 @@ def sync_merge_planned_date(merge_id, new_date):
     
     # Update each item's planned_date if the column exists
     updated_count = 0
-    if frappe.db.has_column("Planning Table", "custom_planned_date"):
+    if _has_column("Planning Table", "custom_planned_date"):
         for item_name in merged_items:
             frappe.db.set_value("Planning Table", item_name, "custom_planned_date", new_date)
             updated_count += 1
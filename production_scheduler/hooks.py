@@ -16,6 +16,76 @@ app_include_js = "production_scheduler.bundle.js"
 
 # Document hooks are owned by production_entry when both apps are installed
 # (scheduler_hooks + scheduler_api) to avoid double execution. Sales Order
-# on_submit creates Planning sheets only via production_entry.
+# on_submit creates Planning sheets via production_entry there; point it at
+# production_scheduler.api.enqueue_planning_sheet_pipeline so submit returns before the sheet is built.
+# sales_order_on_submit below queues the same pipeline only on sites without production_entry.
 # Color Chart / board UIs call production_scheduler.api.* for whitelisted methods.
-doc_events = {}
+# Entries below only invalidate production_scheduler caches / refresh its summary tables, so they are
+# safe next to production_entry.
+doc_events = {
+	"Sales Order": {
+		"on_submit": "production_scheduler.api.sales_order_on_submit",
+	},
+	"Colour Master": {
+		"on_update": "production_scheduler.api.invalidate_colour_code_index",
+		"on_trash": "production_scheduler.api.invalidate_colour_code_index",
+		"after_rename": [
+			"production_scheduler.api.invalidate_colour_code_index",
+			"production_scheduler.api.invalidate_bom_graph_cache",
+		],
+	},
+	"Quality Master": {
+		"after_insert": "production_scheduler.api.invalidate_item_text_extractor",
+		"on_update": "production_scheduler.api.invalidate_item_text_extractor",
+		"on_trash": "production_scheduler.api.invalidate_item_text_extractor",
+		"after_rename": "production_scheduler.api.invalidate_item_text_extractor",
+	},
+	"Planning sheet": {
+		"on_update": "production_scheduler.api.sync_unit_load_for_sheet",
+		"on_submit": "production_scheduler.api.sync_unit_load_for_sheet",
+		"on_cancel": "production_scheduler.api.sync_unit_load_for_sheet",
+		"on_update_after_submit": "production_scheduler.api.sync_unit_load_for_sheet",
+		"after_delete": "production_scheduler.api.sync_unit_load_for_sheet",
+	},
+	"BOM": {
+		"on_update": "production_scheduler.api.invalidate_bom_graph_cache",
+		"on_submit": "production_scheduler.api.invalidate_bom_graph_cache",
+		"on_cancel": "production_scheduler.api.invalidate_bom_graph_cache",
+		"on_update_after_submit": "production_scheduler.api.invalidate_bom_graph_cache",
+		"on_trash": "production_scheduler.api.invalidate_bom_graph_cache",
+	},
+	"Item": {
+		"after_insert": "production_scheduler.api.invalidate_bom_graph_cache",
+		"on_update": "production_scheduler.api.invalidate_bom_graph_cache",
+		"on_trash": "production_scheduler.api.invalidate_bom_graph_cache",
+		"after_rename": "production_scheduler.api.invalidate_bom_graph_cache",
+	},
+	"Work Order": {
+		"on_submit": "production_scheduler.api.invalidate_board_snapshots",
+		"on_cancel": "production_scheduler.api.invalidate_board_snapshots",
+		"on_update_after_submit": "production_scheduler.api.invalidate_board_snapshots",
+	},
+	"Shaft Production Run": {
+		"on_submit": [
+			"production_scheduler.api.sync_spr_weight_on_submit",
+			"production_scheduler.api.invalidate_board_snapshots",
+		],
+		"on_cancel": "production_scheduler.api.invalidate_board_snapshots",
+	},
+}
+
+scheduler_events = {
+	"hourly": [
+		"production_scheduler.api.repair_unit_load_summary",
+		"production_scheduler.api.sync_spr_weights_incremental",
+	],
+	"daily": [
+		"production_scheduler.api.prune_sequence_history",
+		"production_scheduler.api.sync_spr_weights_full",
+	],
+	"cron": {
+		"* * * * *": [
+			"production_scheduler.api.enqueue_due_planning_sheet_pipeline_retries",
+		],
+	},
+}
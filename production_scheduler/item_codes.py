@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Item-code decoder shared by board, sync and SPR paths in api.py.
+
+decode_item_code(code) returns a frozen ItemCodeSpec with every field the scheduler reads from an
+item code (process prefix, trace id, GSM / width segments, colour-code candidates, 104 lamination
+suffix, 102 rewinding width, 107 BOPP breakdown). Specs are memoized in a bounded LRU, so a code
+seen on hundreds of rows is parsed once per process. Pure Python (no frappe import) so
+benchmark_item_codes.py can run it standalone.
+
+Numeric codes: PPP|QQQ|CCC|GGG|WWWW (process, quality, colour, gsm, width mm), optional "-suffix".
+107 BOPP codes are design-first: ``7499-107F101MCC91500``.
+"""
+
+import re
+from functools import lru_cache
+
+ITEM_CODE_CACHE_SIZE = 16384
+
+# Lamination GSM from suffix after '-' on 104 codes: 10-A, 12-B, 13-C, 15-D, 20-E, 30-F
+LAM_GSM_SUFFIX_MAP = {"A": 10, "B": 12, "C": 13, "D": 15, "E": 20, "F": 30}
+
+# 107 decoding MUST match production_entry.production_planning.scheduler_api exactly.
+# Otherwise regenerate will show wrong GSMs vs creation (C->20, M->30, etc.).
+LAM_GSM_SUFFIX_MAP_SUB = {"A": 10, "B": 12, "C": 13, "D": 15, "E": 20, "F": 30}
+LAMINATION_QUALITY_BY_CODE_SUB = {
+	"A": "PREMIUM",
+	"B": "PLATINUM",
+	"C": "SUPER PLATINUM",
+	"D": "GOLD",
+	"E": "SILVER",
+	"F": "BRONZE",
+	"G": "CLASSIC",
+	"H": "SUPER CLASSIC",
+	"I": "LIFE STYLE",
+	"J": "ECO SPECIAL",
+	"K": "ECO GREEN",
+	"L": "SUPER ECO",
+	"M": "ULTRA",
+	"N": "DELUXE",
+	"O": "VIRGIN MIX - GOLD MIX",
+	"P": "MID MIX - CLASSIC MIX",
+	"Q": "ECO MIX",
+	"R": "DELUXE MIX",
+}
+LAMINATION_FABRIC_GSM_BY_CODE_SUB = {
+	"A": 20,
+	"B": 25,
+	"C": 30,
+	"D": 35,
+	"E": 40,
+	"F": 45,
+	"G": 50,
+	"H": 55,
+	"I": 60,
+	"J": 65,
+	"K": 70,
+	"L": 75,
+	"M": 80,
+	"N": 85,
+	"O": 90,
+	"P": 95,
+	"Q": 100,
+	"R": 105,
+	"S": 110,
+	"T": 115,
+	"U": 120,
+}
+LAMINATION_BOPP_GSM_BY_CODE_SUB = {"A": 10, "B": 12, "C": 15, "D": 30}
+
+_NON_DIGITS = re.compile(r"\D+")
+_WHITESPACE = re.compile(r"\s+")
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+_FIRST_HYPHEN_TRIPLE = re.compile(r"-(\d{3})")
+_TAIL_3 = r"(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{3})(?P<finish1>\d)(?P<finish2>\d)$"
+_TAIL_4 = r"(?P<quality>[A-Z])(?P<colour>\d{3})(?P<fabric>[A-Z])(?P<bopp>[A-Z])(?P<lam>[A-Z])(?P<width>\d{4})(?P<finish1>[A-Z0-9])(?P<finish2>[A-Z0-9])$"
+_BOPP_107_FULL = (
+	re.compile(r"^(?P<design>[A-Z0-9]+)-(?P<process>107)" + _TAIL_3),
+	re.compile(r"^(?P<design>[A-Z0-9]+)-(?P<process>107)" + _TAIL_4),
+)
+_BOPP_107_NUMERIC = re.compile(r"^(?P<design>[A-Z0-9]+)-(?P<process>107)(?P<body>\d+)$")
+_BOPP_107_TAIL = (re.compile("^" + _TAIL_3), re.compile("^" + _TAIL_4))
+
+_BOPP_107_BLANK = (
+	("design_code", ""),
+	("process", "107"),
+	("quality_code", ""),
+	("quality_name", ""),
+	("colour_code", ""),
+	("fabric_gsm_code", ""),
+	("fabric_gsm", 0),
+	("bopp_gsm_code", ""),
+	("bopp_gsm", 0),
+	("lam_gsm_code", ""),
+	("lam_gsm", 0),
+	("width_code", ""),
+	("width_inch", 0.0),
+	("finish_matte_glossy", "0"),
+	("finish_metallic_cooler", "0"),
+)
+
+
+class ItemCodeSpec:
+	"""
+	Immutable decoded item code. ``bopp_107`` holds the 107 breakdown as (key, value) pairs
+	(empty when the code is not a 107 design code); use ``bopp_107_dict()`` for a fresh dict.
+	"""
+
+	__slots__ = (
+		"code",
+		"digits",
+		"process",
+		"trace_id",
+		"laminated_gsm",
+		"lam_suffix_gsm",
+		"rewinding_width_mm",
+		"colour_candidates",
+		"is_bopp_107",
+		"bopp_107",
+	)
+
+	def __init__(self, **fields):
+		for name in self.__slots__:
+			object.__setattr__(self, name, fields[name])
+
+	def __setattr__(self, name, value):
+		raise AttributeError("ItemCodeSpec is immutable")
+
+	def __delattr__(self, name):
+		raise AttributeError("ItemCodeSpec is immutable")
+
+	def __repr__(self):
+		return f"ItemCodeSpec(code={self.code!r}, process={self.process!r}, trace_id={self.trace_id!r})"
+
+	def bopp_107_dict(self):
+		return dict(self.bopp_107)
+
+
+def _process_prefix(digits):
+	return digits[:3] if len(digits) >= 3 else ""
+
+
+def _trace_id(code, process):
+	"""<process>-<colour>-<gsm>-<width>[-suffix] for 103 / 104 codes, '' otherwise."""
+	if len(code) < 16 or process not in ("103", "104"):
+		return ""
+	left = code
+	suffix = ""
+	if "-" in code:
+		left, right = code.rsplit("-", 1)
+		suffix = str(right or "").strip().upper()
+	digits = _NON_DIGITS.sub("", left)
+	if len(digits) < 16:
+		return ""
+	colour, gsm, width = digits[6:9], digits[9:12], digits[12:16]
+	if suffix:
+		return f"{process}-{colour}-{gsm}-{width}-{suffix}"
+	return f"{process}-{colour}-{gsm}-{width}"
+
+
+def _lam_suffix_gsm(code):
+	"""Lamination GSM from the suffix after the last '-', for 104 codes only."""
+	upper = code.upper()
+	if "-" not in upper:
+		return 0
+	left, suffix = upper.rsplit("-", 1)
+	if _process_prefix(_NON_DIGITS.sub("", left.strip())) != "104":
+		return 0
+	return int(LAM_GSM_SUFFIX_MAP.get(suffix.strip(), 0) or 0)
+
+
+def _rewinding_width_mm(code, process):
+	"""Last hyphen segment on 102 codes, e.g. 1021035420501600-1600 -> 1600 (mm)."""
+	if process != "102":
+		return None
+	parts = code.split("-")
+	if len(parts) < 2:
+		return None
+	tail = parts[-1].strip()
+	return int(tail) if tail.isdigit() else None
+
+
+def _colour_candidates(digits):
+	"""Colour codes to try against Colour Master: digits 6-8, then 5-7, then 7-9."""
+	if len(digits) < 9:
+		return ()
+	candidates = []
+	for start in (6, 5, 7):
+		if len(digits) >= start + 3:
+			cc = digits[start:start + 3]
+			if cc and cc not in candidates:
+				candidates.append(cc)
+	return tuple(candidates)
+
+
+def _bopp_107_from_groups(design, gd):
+	width_code = gd.get("width") or ""
+	width_inch = 0.0
+	if width_code.isdigit():
+		if len(width_code) == 4:
+			width_inch = float(width_code) / 25.4
+		elif len(width_code) == 3:
+			width_inch = float(width_code) / 10.0
+	qc = (gd.get("quality") or "").strip().upper()
+	lam_letter = (gd.get("lam") or "").strip().upper()
+	fab_letter = (gd.get("fabric") or "").strip().upper()
+	bopp_letter = (gd.get("bopp") or "").strip().upper()
+	return (
+		("design_code", design or ""),
+		("process", "107"),
+		("quality_code", qc),
+		("quality_name", LAMINATION_QUALITY_BY_CODE_SUB.get(qc, "")),
+		("colour_code", gd.get("colour") or ""),
+		("fabric_gsm_code", fab_letter),
+		("fabric_gsm", int(LAMINATION_FABRIC_GSM_BY_CODE_SUB.get(fab_letter, 0) or 0)),
+		("bopp_gsm_code", bopp_letter),
+		("bopp_gsm", int(LAMINATION_BOPP_GSM_BY_CODE_SUB.get(bopp_letter, 0) or 0)),
+		("lam_gsm_code", lam_letter),
+		("lam_gsm", int(LAM_GSM_SUFFIX_MAP_SUB.get(lam_letter, 0) or 0)),
+		("width_code", width_code),
+		("width_inch", width_inch),
+		("finish_matte_glossy", gd.get("finish1") or "0"),
+		("finish_metallic_cooler", gd.get("finish2") or "0"),
+	)
+
+
+def _bopp_107(raw):
+	"""107 design-first breakdown as (key, value) pairs; () when no known pattern matches."""
+	code = _WHITESPACE.sub("", raw.strip().upper())
+	# Every 107 pattern needs "-107"; skip the regex work for all other codes.
+	if "-107" not in code:
+		return ()
+	for pattern in _BOPP_107_FULL:
+		m = pattern.match(code)
+		if m:
+			return _bopp_107_from_groups((m.group("design") or "").strip().upper(), m.groupdict())
+	m = _BOPP_107_NUMERIC.match(code)
+	if m:
+		return (("design_code", m.group("design") or ""),) + _BOPP_107_BLANK[1:]
+	pos = code.find("-107")
+	if pos > 0:
+		design = _NON_ALNUM.sub("", code[:pos])
+		tail = code[pos + 4:]
+		if design:
+			for pattern in _BOPP_107_TAIL:
+				m = pattern.match(tail)
+				if m:
+					return _bopp_107_from_groups(design, m.groupdict())
+	return ()
+
+
+@lru_cache(maxsize=ITEM_CODE_CACHE_SIZE)
+def _decode(raw):
+	code = raw.strip()
+	digits = _NON_DIGITS.sub("", code)
+	process = _process_prefix(digits)
+	m = _FIRST_HYPHEN_TRIPLE.search(code)
+	return ItemCodeSpec(
+		code=code,
+		digits=digits,
+		process=process,
+		trace_id=_trace_id(code, process),
+		laminated_gsm=int(digits[9:12]) if len(digits) >= 12 else 0,
+		lam_suffix_gsm=_lam_suffix_gsm(code),
+		rewinding_width_mm=_rewinding_width_mm(code, process),
+		colour_candidates=_colour_candidates(_NON_DIGITS.sub("", raw)),
+		is_bopp_107=bool(code) and (process == "107" or bool(m and m.group(1) == "107")),
+		bopp_107=_bopp_107(raw),
+	)
+
+
+def decode_item_code(item_code):
+	"""Memoized ItemCodeSpec for an item code (None / non-str values are decoded as their str())."""
+	return _decode(str(item_code or ""))
+
+
+def item_code_cache_info():
+	"""functools CacheInfo (hits, misses, maxsize, currsize) of the decoder LRU."""
+	return _decode.cache_info()
+
+
+def clear_item_code_cache():
+	"""Drop every memoized spec (benchmarks; decode tables are module constants so callers never need it)."""
+	_decode.cache_clear()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Quality / colour extraction from Sales Order item text (item code + item name).
+
+ItemTextExtractor compiles the quality and colour vocabularies into Aho-Corasick automata once;
+each lookup is a single pass over the text instead of one substring test per vocabulary entry.
+Results are identical to the old longest-first scans: the winner is the match that comes first in
+the vocabulary sorted by length (longest first, ties in list order).
+Pure Python (no frappe import) so backfill / verification scripts can build one from plain lists;
+api.get_item_text_extractor() keeps the site's instance and rebuilds it on master changes.
+"""
+
+import re
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize_quality_key(text):
+	"""Upper-case alphanumerics only, so 'LIFE STYLE' / 'LIFE-STYLE' / 'LIFESTYLE' compare equal."""
+	return _NON_ALNUM.sub("", str(text or "").upper())
+
+
+def item_search_text(raw_text):
+	"""' WORD WORD ... ' search text used for matching (hyphen / underscore / brackets as spaces)."""
+	clean = str(raw_text or "").upper().replace("-", " ").replace("_", " ").replace("(", " ").replace(")", " ")
+	return " " + " ".join(clean.split()) + " "
+
+
+class PatternAutomaton:
+	"""
+	Aho-Corasick automaton over ``patterns``; a pattern's priority is its position in the list
+	(lower wins). Patterns must be non-empty; duplicates keep their first position.
+	"""
+
+	__slots__ = ("patterns", "_goto", "_fail", "_out")
+
+	def __init__(self, patterns):
+		self.patterns = []
+		goto = [{}]
+		out = [()]
+		seen = set()
+		for pattern in patterns:
+			if not pattern or pattern in seen:
+				continue
+			seen.add(pattern)
+			state = 0
+			for ch in pattern:
+				nxt = goto[state].get(ch)
+				if nxt is None:
+					nxt = len(goto)
+					goto[state][ch] = nxt
+					goto.append({})
+					out.append(())
+				state = nxt
+			out[state] = out[state] + ((len(self.patterns), len(pattern)),)
+			self.patterns.append(pattern)
+
+		fail = [0] * len(goto)
+		queue = list(goto[0].values())
+		for state in queue:
+			for ch, nxt in goto[state].items():
+				queue.append(nxt)
+				f = fail[state]
+				while f and ch not in goto[f]:
+					f = fail[f]
+				fail[nxt] = goto[f].get(ch, 0)
+				out[nxt] = out[nxt] + out[fail[nxt]]
+		self._goto = goto
+		self._fail = fail
+		self._out = out
+
+	def scan(self, text):
+		"""Yield (priority, start, end) for every occurrence, overlapping ones included."""
+		goto, fail, out = self._goto, self._fail, self._out
+		state = 0
+		for i, ch in enumerate(text):
+			while state and ch not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(ch, 0)
+			for priority, length in out[state]:
+				yield priority, i + 1 - length, i + 1
+
+	def best(self, text):
+		"""Highest-priority pattern occurring anywhere in ``text``, or ''."""
+		best = None
+		for priority, _start, _end in self.scan(text):
+			if best is None or priority < best:
+				best = priority
+				if best == 0:
+					break
+		return self.patterns[best] if best is not None else ""
+
+
+def _longest_first(values):
+	ordered = []
+	seen = set()
+	for v in values:
+		v = str(v or "").upper().strip()
+		if v and v not in seen:
+			seen.add(v)
+			ordered.append(v)
+	ordered.sort(key=len, reverse=True)
+	return ordered
+
+
+class ItemTextExtractor:
+	"""
+	Prebuilt quality + colour matcher.
+
+	qualities: names matched on normalize_quality_key() of both sides, anywhere in the text.
+	colours: names matched as whole words (' NAME ') first, then as plain substrings.
+	"""
+
+	__slots__ = ("qualities", "colours", "_quality_names", "_quality_automaton", "_colour_automaton")
+
+	def __init__(self, qualities, colours):
+		self.qualities = tuple(_longest_first(qualities))
+		self.colours = tuple(_longest_first(colours))
+		keys = []
+		names = {}
+		for q in self.qualities:
+			key = normalize_quality_key(q)
+			if key and key not in names:
+				names[key] = q
+				keys.append(key)
+		self._quality_names = names
+		self._quality_automaton = PatternAutomaton(keys)
+		self._colour_automaton = PatternAutomaton(self.colours)
+
+	def quality(self, search_text):
+		key = self._quality_automaton.best(normalize_quality_key(search_text))
+		return self._quality_names.get(key, "")
+
+	def colour(self, search_text):
+		"""Whole-word match first, substring fallback; ``search_text`` should come from item_search_text()."""
+		text = str(search_text or "").upper()
+		bounded = None
+		loose = None
+		last = len(text) - 1
+		for priority, start, end in self._colour_automaton.scan(text):
+			if loose is None or priority < loose:
+				loose = priority
+			if start > 0 and end <= last and text[start - 1] == " " and text[end] == " ":
+				if bounded is None or priority < bounded:
+					bounded = priority
+					if bounded == 0:
+						break
+		if bounded is not None:
+			return self.colours[bounded]
+		return self.colours[loose] if loose is not None else ""
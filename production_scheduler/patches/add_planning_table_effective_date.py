@@ -0,0 +1,34 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+
+def execute():
+    create_custom_fields(
+        {
+            "Planning Table": [
+                {
+                    "fieldname": "effective_date",
+                    "label": "Effective Date",
+                    "fieldtype": "Date",
+                    "insert_after": "planned_date",
+                    "read_only": 1,
+                    "hidden": 1,
+                    "search_index": 1,
+                    "no_copy": 1,
+                }
+            ]
+        },
+        ignore_validate=True,
+        update=True,
+    )
+
+    columns = set(frappe.db.get_table_columns("Planning Table") or [])
+    frappe.db.add_index("Planning Table", ["effective_date", "unit"], "effective_date_unit_index")
+    if "plan_name" in columns:
+        frappe.db.add_index("Planning Table", ["effective_date", "plan_name"], "effective_date_plan_name_index")
+
+    from production_scheduler.api import _backfill_effective_dates, clear_schema_registry
+
+    clear_schema_registry()
+    _backfill_effective_dates()
+    frappe.db.commit()
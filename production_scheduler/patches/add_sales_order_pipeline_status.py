@@ -0,0 +1,39 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+
+def execute():
+    create_custom_fields(
+        {
+            "Sales Order": [
+                {
+                    "fieldname": "custom_planning_pipeline_status",
+                    "label": "Planning Pipeline Status",
+                    "fieldtype": "Select",
+                    "options": "\nQueued\nRunning\nCompleted\nFailed",
+                    "insert_after": "status",
+                    "read_only": 1,
+                    "allow_on_submit": 1,
+                    "no_copy": 1,
+                    "in_standard_filter": 1,
+                },
+                {
+                    "fieldname": "custom_planning_pipeline_error",
+                    "label": "Planning Pipeline Error",
+                    "fieldtype": "Small Text",
+                    "insert_after": "custom_planning_pipeline_status",
+                    "read_only": 1,
+                    "allow_on_submit": 1,
+                    "no_copy": 1,
+                    "depends_on": "eval:doc.custom_planning_pipeline_status=='Failed'",
+                },
+            ]
+        },
+        ignore_validate=True,
+        update=True,
+    )
+
+    from production_scheduler.api import clear_schema_registry
+
+    clear_schema_registry()
+    frappe.db.commit()
@@ -0,0 +1,4 @@
+def execute():
+    from production_scheduler.api import build_plan_registry
+
+    build_plan_registry()
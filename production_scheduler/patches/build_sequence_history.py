@@ -0,0 +1,4 @@
+def execute():
+    from production_scheduler.api import build_sequence_history
+
+    build_sequence_history()
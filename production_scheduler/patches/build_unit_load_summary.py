@@ -0,0 +1,5 @@
+def execute():
+    from production_scheduler.api import _ensure_unit_load_summary_table, rebuild_unit_load_summary
+
+    _ensure_unit_load_summary_table()
+    rebuild_unit_load_summary()
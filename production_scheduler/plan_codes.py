@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Plan-code engine shared by update_sheet_plan_codes and the set-based recompute in api.py.
+
+A plan code is {YY}{month letter A-L}{unit segment}-{plan base}, e.g. 26CU1-PLAN 1. The three
+translations it needs (row unit -> board unit -> code segment, plan name -> base name without
+month / week prefix, date -> YY + month letter) are memoized tables, so recomputing a whole site
+costs a few dict lookups per row. Pure Python (no frappe import); same answers as the per-row
+string munging in update_sheet_plan_codes / generate_plan_code it replaced.
+"""
+
+import datetime
+import re
+from functools import lru_cache
+
+from production_scheduler.planning_doctypes import (
+	REWINDING_UNASSIGNED_UNIT,
+	REWINDING_UNIT_L3,
+	REWINDING_UNIT_L4,
+	REWINDING_UNIT_L5,
+	normalize_planning_unit_for_select,
+)
+
+PLAN_CODE_CACHE_SIZE = 4096
+MONTH_LETTERS = "ABCDEFGHIJKL"
+
+_WEEK_PREFIX = re.compile(r"^[A-Z]+\s+W\d+\s+\d{2}\s+", re.IGNORECASE)  # MARCH W10 26 PLAN 1
+_MON_YY_PREFIX = re.compile(r"^[A-Z]{3}-\d{2}\s+", re.IGNORECASE)  # MAR-26 PLAN 1
+_MONTH_YY_PREFIX = re.compile(r"^[A-Z]+\s+\d{2}\s+", re.IGNORECASE)  # MARCH 26 PLAN 1
+
+
+@lru_cache(maxsize=PLAN_CODE_CACHE_SIZE)
+def plan_base(plan_name):
+	"""Plan name without its month / week prefix: 'MAR-26 PLAN 1' -> 'PLAN 1'."""
+	if not plan_name or plan_name == "Default":
+		return plan_name
+	for pattern in (_WEEK_PREFIX, _MON_YY_PREFIX, _MONTH_YY_PREFIX):
+		stripped = pattern.sub("", plan_name)
+		if stripped != plan_name:
+			return stripped.strip()
+	return plan_name.strip()
+
+
+@lru_cache(maxsize=PLAN_CODE_CACHE_SIZE)
+def plan_row_unit(raw):
+	"""Board unit a row's raw `unit` value is coded under (process units survive normalization)."""
+	compact = str(raw or "").upper().replace(" ", "")
+	unit = raw
+	if raw:
+		if "LAMINATIONUNIT" in compact:
+			unit = "Lamination Unit"
+		elif "SLITTINGUNIT" in compact:
+			unit = "Slitting Unit"
+		else:
+			for i in (1, 2, 3, 4):
+				if f"UNIT{i}" in compact:
+					unit = f"Unit {i}"
+					break
+	normalized = normalize_planning_unit_for_select(unit)
+	if normalized == "UNASSIGNED":
+		if "LAMINATIONUNIT" in compact:
+			return "Lamination Unit"
+		if "SLITTINGUNIT" in compact:
+			return "Slitting Unit"
+		if "REWINDING" in compact:
+			if "L3" in compact and "TSNPL" in compact:
+				return REWINDING_UNIT_L3
+			if "L4" in compact and "JSB" in compact:
+				return REWINDING_UNIT_L4
+			if "L5" in compact and "JSB" in compact:
+				return REWINDING_UNIT_L5
+			if "UNASSIGNED" in compact:
+				return REWINDING_UNASSIGNED_UNIT
+	return normalized
+
+
+@lru_cache(maxsize=PLAN_CODE_CACHE_SIZE)
+def unit_segment(unit):
+	"""Code segment for a board unit (U1..U4, L1, SL1, RW3..RW5, RWU, UA); '' when it has none."""
+	compact = str(unit or "").upper().replace(" ", "")
+	if "LAMINATIONUNIT" in compact:
+		return "L1"
+	if "SLITTINGUNIT" in compact:
+		return "SL1"
+	if "REWINDING" in compact:
+		if "L3" in compact and "TSNPL" in compact:
+			return "RW3"
+		if "L4" in compact and "JSB" in compact:
+			return "RW4"
+		if "L5" in compact and "JSB" in compact:
+			return "RW5"
+		if "UNASSIGNED" in compact:
+			return "RWU"
+	for i in (1, 2, 3, 4):
+		if f"UNIT{i}" in compact:
+			return f"U{i}"
+	if compact in ("UNASSIGNED", "NONE", "NA") or "MIXED" in compact:
+		return "UA"
+	return ""
+
+
+@lru_cache(maxsize=PLAN_CODE_CACHE_SIZE)
+def month_prefix(value):
+	"""'26C' for any day in March 2026; '' when ``value`` is not a date / ISO date string."""
+	if isinstance(value, datetime.datetime):
+		value = value.date()
+	if not isinstance(value, datetime.date):
+		try:
+			value = datetime.date.fromisoformat(str(value or "").strip()[:10])
+		except ValueError:
+			return ""
+	return f"{str(value.year)[-2:]}{MONTH_LETTERS[value.month - 1]}"
+
+
+_MONTH_NUMBERS = {
+	name: i + 1
+	for i, name in enumerate(("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"))
+}
+_PLAN_MONTH = re.compile(r"^([A-Z]+)(?:\s+W\d+\s+|-|\s+)(\d{2})\s+", re.IGNORECASE)
+
+
+@lru_cache(maxsize=PLAN_CODE_CACHE_SIZE)
+def plan_month(plan_name):
+	"""'2026-03' for 'MARCH W12 26 PLAN 1' / 'MAR-26 PLAN 1' / 'MARCH 26 PLAN 1'; '' for unprefixed names."""
+	m = _PLAN_MONTH.match(str(plan_name or "").strip())
+	if not m:
+		return ""
+	month = _MONTH_NUMBERS.get(m.group(1)[:3].upper())
+	if not month:
+		return ""
+	return f"20{m.group(2)}-{month:02d}"
+
+
+def plan_code(date_value, raw_unit, plan_name):
+	"""Plan code of a row: its date, its raw unit and the sheet's active plan ('' when any part is missing)."""
+	prefix = month_prefix(date_value) if date_value else ""
+	segment = unit_segment(plan_row_unit(raw_unit))
+	if not prefix or not segment or not plan_name:
+		return ""
+	return f"{prefix}{segment}-{plan_base(plan_name)}"
+
+
+def plan_code_cache_info():
+	"""CacheInfo per translation table (benchmarks / debugging)."""
+	return {
+		"plan_base": plan_base.cache_info(),
+		"plan_row_unit": plan_row_unit.cache_info(),
+		"unit_segment": unit_segment.cache_info(),
+		"month_prefix": month_prefix.cache_info(),
+		"plan_month": plan_month.cache_info(),
+	}
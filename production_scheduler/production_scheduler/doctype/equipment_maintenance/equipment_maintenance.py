@@ -3,6 +3,15 @@
 
 from frappe.model.document import Document
 
+from production_scheduler.api import invalidate_maintenance_calendar
+
+
 class EquipmentMaintenance(Document):
 	"""Equipment Maintenance record for tracking unit maintenance schedules."""
-	pass
+
+	def on_update(self):
+		# Slot search / cascades later in this request must see the new window.
+		invalidate_maintenance_calendar()
+
+	def on_trash(self):
+		invalidate_maintenance_calendar()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Compact diffs between two colour sequences (JSON lists), used by the sequence history in api.py.
+
+A diff keeps the common head and tail of the previous sequence and replaces the middle:
+{"h": head length, "t": tail length, "m": [new middle items]}. Moving, adding or dropping one
+colour stores a few items instead of the whole list. Pure Python (no frappe import).
+"""
+
+
+def encode_sequence_diff(previous, current):
+	"""Diff turning list ``previous`` into list ``current``."""
+	n = min(len(previous), len(current))
+	head = 0
+	while head < n and previous[head] == current[head]:
+		head += 1
+	tail = 0
+	while tail < n - head and previous[-1 - tail] == current[-1 - tail]:
+		tail += 1
+	return {"h": head, "t": tail, "m": current[head:len(current) - tail]}
+
+
+def apply_sequence_diff(previous, diff):
+	"""Rebuild the sequence a diff was encoded for from the list it was encoded against."""
+	head = int(diff.get("h") or 0)
+	tail = int(diff.get("t") or 0)
+	rest = previous[len(previous) - tail:] if tail else []
+	return previous[:head] + list(diff.get("m") or []) + rest
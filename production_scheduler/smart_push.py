@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Smart push ordering used by api.get_smart_push_sequence.
+
+Pure Python (no frappe import) so benchmark_smart_push_sequence.py can run it on fixture data.
+Order inside each unit:
+1. Perfect match (seed colour AND quality), 2. colour match, 3. everything else;
+each bucket by colour distance from the seed (wrap-around), unit quality rank, GSM high -> low.
+Ties keep the input order (stable sort), exactly like the previous per-bucket list.sort().
+"""
+
+SMART_PUSH_UNITS = ("Unit 1", "Unit 2", "Unit 3", "Unit 4", "UNASSIGNED")
+
+# Rank used when a colour / quality is not in the hierarchy.
+UNRANKED = 999
+
+
+def build_quality_ranks(unit_quality_order):
+    """{unit: {quality: position}} keeping the first position, i.e. the same answer as list.index()."""
+    ranks = {}
+    for unit, order in (unit_quality_order or {}).items():
+        unit_ranks = {}
+        for i, quality in enumerate(order):
+            unit_ranks.setdefault(quality, i)
+        ranks[unit] = unit_ranks
+    return ranks
+
+
+def _clean(value):
+    return (value or "").upper().strip()
+
+
+def order_smart_push(items, unit_seeds, color_priority, total_colors, quality_ranks, normalize_unit, seed_color=None, seed_quality=None):
+    """
+    Return ``items`` in smart push order (items whose unit is outside SMART_PUSH_UNITS are dropped).
+
+    color_priority: {colour: rank}; total_colors: length of the colour hierarchy (wrap-around size);
+    quality_ranks: build_quality_ranks(UNIT_QUALITY_ORDER); normalize_unit: raw unit -> SMART_PUSH_UNITS.
+    One pass buckets items by unit with a precomputed sort key, then each unit is sorted once.
+    """
+    by_unit = {}
+    seed_keys = {}
+    for seq, it in enumerate(items):
+        u = normalize_unit(it.get("unit"))
+        if u not in SMART_PUSH_UNITS:
+            continue
+        if u not in seed_keys:
+            seed = (unit_seeds or {}).get(u)
+            s_col = _clean(seed.get("color") if seed else seed_color)
+            s_qual = _clean(seed.get("quality") if seed else seed_quality)
+            seed_keys[u] = (s_col, s_qual, color_priority.get(s_col, -1), quality_ranks.get(u, {}))
+        s_col, s_qual, s_idx, q_ranks = seed_keys[u]
+
+        col = _clean(it.get("color"))
+        qual = _clean(it.get("custom_quality"))
+        if col == s_col:
+            bucket = 0 if qual == s_qual else 1
+        else:
+            bucket = 2
+
+        c_idx = color_priority.get(col, UNRANKED)
+        if s_idx != -1 and c_idx != UNRANKED:
+            # Continuous flow: distance from the seed colour, wrapping around the hierarchy.
+            color_score = (c_idx - s_idx + total_colors) % total_colors
+        else:
+            color_score = c_idx
+
+        key = (bucket, color_score, q_ranks.get(qual, UNRANKED), -float(it.get("gsm") or 0), seq)
+        by_unit.setdefault(u, []).append((key, it))
+
+    ordered = []
+    for u in SMART_PUSH_UNITS:
+        rows = by_unit.get(u)
+        if rows:
+            rows.sort(key=lambda r: r[0])
+            ordered.extend(it for _key, it in rows)
+    return ordered
@@ -42,3 +42,19 @@ print(f"Extracted Color: {col}")
 assert qual == "PREMIUM"
 assert col == "BROWN 1.0"
 print("✅ Verification Successful!")
+
+# Text fallback (codes without Quality / Colour Master hits) uses the same extractor as
+# production_scheduler.api.get_item_text_extractor(); here built from plain lists.
+from production_scheduler.item_text import ItemTextExtractor, item_search_text
+
+extractor = ItemTextExtractor(
+    ["PREMIUM", "SUPER PLATINUM", "PLATINUM", "LIFE STYLE", "LIFESTYLE"],
+    ["GOLDEN YELLOW", "YELLOW", "BROWN 1.0", "WHITE", "SUPER WHITE"],
+)
+text = item_search_text("100PREMIUM542150 SUPER-PLATINUM Golden Yellow 45 GSM W36")
+print(f"Text fallback: {extractor.quality(text)} / {extractor.colour(text)}")
+assert extractor.quality(text) == "SUPER PLATINUM"
+assert extractor.colour(text) == "GOLDEN YELLOW"
+assert extractor.colour(item_search_text("HDPE SUPERWHITE")) == "WHITE"  # substring fallback
+assert extractor.quality(item_search_text("LIFE-STYLE fabric")) == "LIFE STYLE"
+print("✅ Text fallback verification successful!")